@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# Generate an OpenAPI schema from an api-design.md document.
+#
+# The Resources and Endpoints sections are parsed into a small model, and a
+# dependency graph records which resource owns which paths. Rendered
+# fragments are cached per resource, so editing one resource only
+# regenerates the paths and schema that depend on it.
+
+from dataclasses import dataclass, field
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import re
+
+CACHE_VERSION = 3
+HTTP_METHODS = ("get", "post", "put", "patch", "delete", "head", "options")
+PUBLIC_AUTH = {"", "none", "public", "no", "optional", "-"}
+PARAM_PATTERN = re.compile(r"\{([^}/]+)\}")
+
+
+@dataclass
+class Endpoint:
+    method: str
+    path: str
+    description: str
+    auth: str
+    operation_id: str = ""
+
+
+@dataclass
+class Resource:
+    name: str
+    endpoints: list[Endpoint] = field(default_factory=list)
+
+    def digest(self) -> str:
+        payload = json.dumps(
+            {
+                "name": self.name,
+                "endpoints": [
+                    [e.method, e.path, e.description, e.auth, e.operation_id]
+                    for e in self.endpoints
+                ],
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def read_sections(text: str) -> dict[str, list[str]]:
+    sections: dict[str, list[str]] = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("## "):
+            current = line[3:].strip().lower()
+            sections[current] = []
+        elif current is not None:
+            sections[current].append(line)
+    return sections
+
+
+def parse_resources(lines: list[str]) -> list[str]:
+    names = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped.startswith(("- ", "* ")):
+            continue
+        name = stripped[2:].split(":", 1)[0].strip().strip("`")
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def parse_endpoints(lines: list[str]) -> list[Endpoint]:
+    endpoints = []
+    header: list[str] | None = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped.startswith("|"):
+            continue
+        cells = [cell.strip() for cell in stripped.strip("|").split("|")]
+        if header is None:
+            header = [cell.lower() for cell in cells]
+            continue
+        if all(set(cell) <= set("-: ") for cell in cells):
+            continue
+        row = dict(zip(header, cells))
+        method = row.get("method", "").lower()
+        path = row.get("path", "").strip("`")
+        if method not in HTTP_METHODS or not path.startswith("/"):
+            continue
+        endpoints.append(
+            Endpoint(
+                method=method,
+                path=path,
+                description=row.get("description", ""),
+                auth=row.get("auth", ""),
+            )
+        )
+    return endpoints
+
+
+def owning_resource(path: str, names: list[str]) -> str:
+    segments = [s for s in path.strip("/").split("/") if s and not s.startswith("{")]
+    for segment in segments:
+        if segment in names:
+            return segment
+    return segments[0] if segments else "root"
+
+
+def build_model(text: str) -> tuple[list[Resource], dict[str, list[str]]]:
+    """Parse the design and return resources plus the resource -> paths graph."""
+    sections = read_sections(text)
+    names = parse_resources(sections.get("resources", []))
+    resources = {name: Resource(name) for name in names}
+    for endpoint in parse_endpoints(sections.get("endpoints", [])):
+        owner = owning_resource(endpoint.path, names)
+        resources.setdefault(owner, Resource(owner)).endpoints.append(endpoint)
+
+    assign_operation_ids(list(resources.values()))
+
+    graph = {}
+    for name, resource in resources.items():
+        paths = []
+        for endpoint in resource.endpoints:
+            if endpoint.path not in paths:
+                paths.append(endpoint.path)
+        graph[name] = paths
+    return list(resources.values()), graph
+
+
+def schema_name(resource: str) -> str:
+    name = "".join(part.capitalize() for part in re.split(r"[-_\s]+", resource))
+    return name or "Example"
+
+
+def quote(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 3:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 1:
+        return word[:-1]
+    return word
+
+
+def operation_id(endpoint: Endpoint, schema: str) -> str:
+    """Verb plus every literal path segment, e.g. GET /users/{id}/posts -> listUserPosts."""
+    is_item = endpoint.path.rstrip("/").endswith("}")
+    verbs = {
+        "get": "get" if is_item else "list",
+        "post": "create",
+        "put": "replace",
+        "patch": "update",
+        "delete": "delete",
+    }
+    verb = verbs.get(endpoint.method, endpoint.method)
+    segments = [s for s in endpoint.path.strip("/").split("/") if s and not s.startswith("{")]
+    if not segments:
+        return f"{verb}{schema}"
+    nouns = [schema_name(singular(s)) for s in segments[:-1]] + [schema_name(segments[-1])]
+    return verb + "".join(nouns)
+
+
+def assign_operation_ids(resources: list[Resource]) -> None:
+    """Give every endpoint a unique operationId.
+
+    Paths differing only in parameters share a base id; repeats are numbered
+    in (path, method) order, so ids do not depend on the order of resources.
+    """
+    endpoints = [
+        (endpoint, schema_name(resource.name)) for resource in resources for endpoint in resource.endpoints
+    ]
+    endpoints.sort(key=lambda item: (item[0].path, HTTP_METHODS.index(item[0].method)))
+    bases = [operation_id(endpoint, schema) for endpoint, schema in endpoints]
+    taken = set(bases)
+    used: set[str] = set()
+    for (endpoint, _), base in zip(endpoints, bases):
+        name, number = base, 1
+        while name in used or (name != base and name in taken):
+            number += 1
+            name = f"{base}{number}"
+        used.add(name)
+        endpoint.operation_id = name
+
+
+def render_operation(endpoint: Endpoint, schema: str) -> list[str]:
+    ref = f'$ref: "#/components/schemas/{schema}"'
+    is_item = endpoint.path.rstrip("/").endswith("}")
+    lines = [f"    {endpoint.method}:"]
+    lines.append(f"      summary: {quote(endpoint.description or endpoint.path)}")
+    lines.append(f"      operationId: {endpoint.operation_id}")
+    params = PARAM_PATTERN.findall(endpoint.path)
+    if params:
+        lines.append("      parameters:")
+        for param in params:
+            lines.extend(
+                [
+                    f"        - name: {param}",
+                    "          in: path",
+                    "          required: true",
+                    "          schema:",
+                    "            type: string",
+                ]
+            )
+    if endpoint.auth.lower() in PUBLIC_AUTH:
+        lines.append("      security: []")
+    if endpoint.method in {"post", "put", "patch"}:
+        lines.extend(
+            [
+                "      requestBody:",
+                "        required: true",
+                "        content:",
+                "          application/json:",
+                "            schema:",
+                f"              {ref}",
+            ]
+        )
+    lines.append("      responses:")
+    if endpoint.method == "delete":
+        lines.extend(['        "204":', "          description: No Content"])
+        return lines
+    status = "201" if endpoint.method == "post" else "200"
+    lines.extend(
+        [
+            f'        "{status}":',
+            "          description: " + ("Created" if status == "201" else "OK"),
+            "          content:",
+            "            application/json:",
+            "              schema:",
+        ]
+    )
+    if endpoint.method == "get" and not is_item:
+        lines.extend(
+            [
+                "                type: object",
+                "                properties:",
+                "                  items:",
+                "                    type: array",
+                "                    items:",
+                f"                      {ref}",
+            ]
+        )
+    else:
+        lines.append(f"                {ref}")
+    return lines
+
+
+def render_resource(resource: Resource, paths: list[str]) -> dict[str, str]:
+    schema = schema_name(resource.name)
+    path_lines = []
+    for path in paths:
+        path_lines.append(f"  {path}:")
+        for endpoint in resource.endpoints:
+            if endpoint.path == path:
+                path_lines.extend(render_operation(endpoint, schema))
+    schema_lines = [
+        f"    {schema}:",
+        "      type: object",
+        "      properties:",
+        "        id:",
+        "          type: string",
+        "        name:",
+        "          type: string",
+    ]
+    return {
+        "paths": "\n".join(path_lines),
+        "schema": "\n".join(schema_lines),
+    }
+
+
+def load_cache(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("resources", {})
+
+
+def assemble(args: argparse.Namespace, resources: list[Resource], fragments: dict) -> str:
+    title = args.name or (resources[0].name if resources else "example")
+    lines = [
+        "openapi: 3.0.3",
+        "info:",
+        f"  title: {quote(title + ' API')}",
+        f"  version: {quote(args.version)}",
+        f"  description: {quote('Generated from ' + Path(args.input).name)}",
+        "servers:",
+        f"  - url: {quote(args.base_url)}",
+    ]
+    path_blocks = [fragments[r.name]["paths"] for r in resources if fragments[r.name]["paths"]]
+    lines.append("paths:" if path_blocks else "paths: {}")
+    lines.extend(path_blocks)
+    lines.append("components:")
+    lines.append("  schemas:")
+    lines.extend(fragments[r.name]["schema"] for r in resources)
+    lines.extend(
+        [
+            "  securitySchemes:",
+            "    bearerAuth:",
+            "      type: http",
+            "      scheme: bearer",
+            "security:",
+            "  - bearerAuth: []",
+        ]
+    )
+    return "\n".join(lines) + "\n"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Generate an OpenAPI schema from an API design document."
+    )
+    parser.add_argument("--input", default="api-design.md", help="API design file")
+    parser.add_argument("--output", default="openapi.yaml", help="Output file path")
+    parser.add_argument("--name", default="", help="API title (default: first resource)")
+    parser.add_argument("--version", default="1.0.0", help="API version")
+    parser.add_argument(
+        "--base-url", default="https://example.com", help="Server base URL"
+    )
+    parser.add_argument(
+        "--cache",
+        default="",
+        help="Fragment cache path (default: <output>.cache.json)",
+    )
+    parser.add_argument("--force", action="store_true", help="Overwrite existing file")
+    args = parser.parse_args()
+
+    source = Path(args.input)
+    if not source.exists():
+        print(f"Missing file: {source}")
+        return 1
+    output = Path(args.output)
+    cache_path = Path(args.cache) if args.cache else output.with_name(output.name + ".cache.json")
+    if output.exists() and not cache_path.exists() and not args.force:
+        print(f"{output} already exists (use --force to overwrite)")
+        return 1
+
+    resources, graph = build_model(source.read_text(encoding="utf-8", errors="ignore"))
+    if not resources:
+        print(f"No resources or endpoints found in {source}")
+        return 1
+
+    cached = {} if args.force else load_cache(cache_path)
+    fragments = {}
+    regenerated = []
+    for resource in resources:
+        digest = resource.digest()
+        entry = cached.get(resource.name)
+        if entry and entry.get("hash") == digest:
+            fragments[resource.name] = entry
+            continue
+        fragments[resource.name] = {
+            "hash": digest,
+            "paths_owned": graph[resource.name],
+            **render_resource(resource, graph[resource.name]),
+        }
+        regenerated.append(resource.name)
+
+    content = assemble(args, resources, fragments)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if not output.exists() or output.read_text(encoding="utf-8") != content:
+        output.write_text(content, encoding="utf-8")
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(
+        json.dumps(
+            {"version": CACHE_VERSION, "resources": fragments}, indent=2, sort_keys=True
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+
+    removed = sorted(set(cached) - set(fragments))
+    print(f"Wrote {output}")
+    print(
+        f"Regenerated {len(regenerated)} of {len(resources)} resources"
+        + (f": {', '.join(regenerated)}" if regenerated else "")
+    )
+    if removed:
+        print(f"Dropped resources: {', '.join(removed)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
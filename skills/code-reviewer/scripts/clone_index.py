@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# Duplicate-code detection backed by a persistent fingerprint index.
+#
+# Source files are tokenized (comments and whitespace dropped; with
+# --normalize, identifiers and literals are replaced by placeholders so
+# renamed copies match too), every K-token window is hashed with a rolling
+# hash, and winnowing keeps the minimum hash of each W-window as the file's
+# fingerprints: any copy of at least K + W - 1 tokens shares fingerprints with
+# its original. Fingerprints live in SQLite, indexed by hash, so finding every
+# other occurrence of a changed block is an indexed lookup. Matches between two
+# files at a constant token offset are chained into duplicated blocks. Storage
+# and incremental updates come from symbol_index.FileIndex: each update stats
+# every file, re-hashes only files whose stat changed, and re-fingerprints (in
+# a process pool on a first run) only files whose content changed.
+
+from collections import deque
+from functools import partial
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import zlib
+
+from symbol_index import FileIndex, git_diff, iter_source_files, parse_diff
+
+INDEX_VERSION = "1"
+DEFAULT_INDEX = ".clone-index.db"
+GRAM = 20
+WINDOW = 10
+MIN_TOKENS = 50
+# Fingerprints shared by more places than this are boilerplate, not copies worth a row each.
+MAX_OCCURRENCES = 50
+MAX_BYTES = 1_000_000
+MODULUS = (1 << 61) - 1
+BASE = 1_000_003
+HASH_COMMENT_SUFFIXES = {".py", ".rb", ".sh", ".bash", ".pl", ".r", ".R"}
+SLASH_COMMENT_SUFFIXES = {
+    ".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts", ".go", ".rs", ".java", ".kt", ".kts",
+    ".scala", ".swift", ".c", ".h", ".cc", ".cpp", ".cxx", ".hpp", ".cs", ".php", ".dart",
+}
+KEYWORDS = {
+    "and", "as", "assert", "async", "await", "break", "case", "catch", "class", "const", "continue", "def",
+    "default", "del", "do", "elif", "else", "enum", "except", "export", "extends", "false", "False", "finally",
+    "fn", "for", "from", "func", "function", "if", "impl", "import", "in", "interface", "is", "lambda", "let",
+    "match", "new", "nil", "None", "not", "null", "or", "pass", "private", "public", "raise", "return",
+    "self", "static", "struct", "super", "switch", "this", "throw", "true", "True", "try", "typeof", "var",
+    "void", "while", "with", "yield",
+}
+
+STRING = (
+    r"[rRbBfFuU]{0,2}(?:\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''"
+    r"|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*')|`(?:\\.|[^`\\])*`"
+)
+WORD = r"[A-Za-z_$][\w$]*|\d[\w.]*"
+HASH_TOKEN = re.compile(rf"#[^\n]*|{STRING}|{WORD}|[^\s]")
+SLASH_TOKEN = re.compile(rf"//[^\n]*|/\*[\s\S]*?\*/|{STRING}|{WORD}|[^\s]")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    tokens INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prints (
+    hash INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prints_hash ON prints (hash);
+CREATE INDEX IF NOT EXISTS prints_file ON prints (file_id, line);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_token_ids: dict[str, int] = {}
+
+
+def tokenizer_for(path: str):
+    suffix = os.path.splitext(path)[1]
+    if suffix in HASH_COMMENT_SUFFIXES:
+        return HASH_TOKEN
+    if suffix in SLASH_COMMENT_SUFFIXES:
+        return SLASH_TOKEN
+    return None
+
+
+def tokenize(text: str, pattern, normalize: bool = False) -> tuple[list[int], list[int]]:
+    """Token ids (stable across processes) and the line of each token; comments are dropped."""
+    ids: list[int] = []
+    lines: list[int] = []
+    line = 1
+    last = 0
+    for match in pattern.finditer(text):
+        start = match.start()
+        line += text.count("\n", last, start)
+        last = start
+        token = match.group()
+        first = token[0]
+        if first == "#" or token.startswith(("//", "/*")):
+            continue
+        if normalize:
+            if first.isdigit():
+                token = "0"
+            elif token[-1] in "\"'`":
+                token = '"'
+            elif (first.isalpha() or first in "_$") and token not in KEYWORDS:
+                token = "$"
+        token_id = _token_ids.get(token)
+        if token_id is None:
+            token_id = _token_ids[token] = zlib.crc32(token.encode("utf-8", errors="replace")) + 1
+        ids.append(token_id)
+        lines.append(line)
+    return ids, lines
+
+
+def winnow(ids: list[int], lines: list[int], gram: int = GRAM, window: int = WINDOW) -> list[tuple[int, int, int, int]]:
+    """(hash, token position, first line, last line) of each K-gram kept by winnowing."""
+    if len(ids) < gram:
+        return []
+    top = pow(BASE, gram - 1, MODULUS)
+    value = 0
+    for token_id in ids[:gram]:
+        value = (value * BASE + token_id) % MODULUS
+    hashes = [value]
+    for index in range(gram, len(ids)):
+        value = ((value - ids[index - gram] * top) * BASE + ids[index]) % MODULUS
+        hashes.append(value)
+
+    # Minimum of every window, rightmost on ties; a new fingerprint whenever the choice moves.
+    window = min(window, len(hashes))
+    selected = []
+    queue: deque = deque()
+    chosen = -1
+    for index, value in enumerate(hashes):
+        while queue and hashes[queue[-1]] >= value:
+            queue.pop()
+        queue.append(index)
+        if queue[0] <= index - window:
+            queue.popleft()
+        if index >= window - 1 and queue[0] != chosen:
+            chosen = queue[0]
+            selected.append((hashes[chosen], chosen, lines[chosen], lines[chosen + gram - 1]))
+    return selected
+
+
+def fingerprint(path: str, rel_path: str, settings: dict) -> tuple[str, str, dict]:
+    data = Path(path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if len(data) > MAX_BYTES or b"\x00" in data:
+        return rel_path, digest, {"tokens": 0, "prints": []}
+    ids, lines = tokenize(data.decode("utf-8", errors="replace"), tokenizer_for(rel_path), settings["normalize"])
+    return rel_path, digest, {"tokens": len(ids), "prints": winnow(ids, lines, settings["gram"], settings["window"])}
+
+
+def _fingerprint_batch(batch: list[tuple[str, str]], settings: dict) -> list[tuple[str, str, dict]]:
+    return [fingerprint(path, rel_path, settings) for path, rel_path in batch]
+
+
+def overlaps(ranges: list[tuple[int, int]], start: int, end: int) -> bool:
+    return any(first <= end and last >= start for first, last in ranges)
+
+
+class CloneIndex(FileIndex):
+    """SQLite-backed winnowing fingerprints for one repository root."""
+
+    SCHEMA = SCHEMA
+    FILE_TABLES = ("prints",)
+
+    def __init__(self, root: Path, path: Path | None = None, normalize: bool = False) -> None:
+        self.settings = {"gram": GRAM, "window": WINDOW, "normalize": normalize}
+        # Fingerprints from other settings never match these, so a change of settings starts over.
+        stamp = f"{INDEX_VERSION}:{json.dumps(self.settings, sort_keys=True)}"
+        super().__init__(root, path or root / DEFAULT_INDEX, stamp)
+
+    def source_files(self):
+        return iter_source_files(self.root, tokenizer_for)
+
+    def analyzer(self):
+        return partial(_fingerprint_batch, settings=self.settings)
+
+    def store(self, rel: str, digest: str, result: dict, size: int, mtime: int) -> None:
+        file_id = self.conn.execute(
+            "INSERT INTO files (path, size, mtime_ns, hash, tokens) VALUES (?, ?, ?, ?, ?)",
+            (rel, size, mtime, digest, result["tokens"]),
+        ).lastrowid
+        self.conn.executemany(
+            "INSERT INTO prints (hash, file_id, pos, line, end_line) VALUES (?, ?, ?, ?, ?)",
+            [(value, file_id, pos, line, end_line) for value, pos, line, end_line in result["prints"]],
+        )
+
+    def totals(self) -> dict:
+        files, tokens = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM files").fetchone()
+        prints = self.conn.execute("SELECT COUNT(*) FROM prints").fetchone()[0]
+        return {"files": files, "tokens": tokens, "prints": prints}
+
+    def duplicates(self, min_tokens: int = MIN_TOKENS) -> list[dict]:
+        """Every duplicated block of at least min_tokens tokens in the repository."""
+        rows = self.conn.execute(
+            "SELECT p.hash, p.file_id, p.pos, p.line, p.end_line FROM prints p"
+            " JOIN (SELECT hash FROM prints GROUP BY hash HAVING COUNT(*) BETWEEN 2 AND ?) d ON d.hash = p.hash",
+            (MAX_OCCURRENCES,),
+        )
+        return self._blocks(rows, min_tokens)
+
+    def changed_duplicates(self, changed: dict[str, list[tuple[int, int]]], min_tokens: int = MIN_TOKENS) -> list[dict]:
+        """Duplicated blocks with at least one copy on a changed line; the changed copy comes first."""
+        ids = {}
+        hashes = set()
+        for path, ranges in changed.items():
+            row = self.conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+            if row is None or not ranges:
+                continue
+            ids[row[0]] = path
+            for value, line, end_line in self.conn.execute(
+                "SELECT hash, line, end_line FROM prints WHERE file_id = ? AND line <= ?", (row[0], ranges[-1][1])
+            ):
+                if overlaps(ranges, line, end_line):
+                    hashes.add(value)
+        if not hashes:
+            return []
+
+        # Files sharing a fingerprint with the changed lines; their fingerprints are what blocks are chained from.
+        related = set(ids)
+        values = sorted(hashes)
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for _, file_ids in self.conn.execute(
+                f"SELECT hash, GROUP_CONCAT(file_id) FROM prints WHERE hash IN ({marks})"
+                f" GROUP BY hash HAVING COUNT(*) BETWEEN 2 AND {MAX_OCCURRENCES}",
+                chunk,
+            ):
+                related.update(int(file_id) for file_id in file_ids.split(","))
+        related_ids = sorted(related)
+        rows = []
+        for start in range(0, len(related_ids), 500):
+            chunk = related_ids[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows.extend(self.conn.execute(
+                f"SELECT hash, file_id, pos, line, end_line FROM prints WHERE file_id IN ({marks})", chunk
+            ))
+
+        result = []
+        for block in self._blocks(rows, min_tokens):
+            first, second = block["copies"]
+            if overlaps(changed.get(first["path"], []), first["start"], first["end"]):
+                result.append(block)
+            elif overlaps(changed.get(second["path"], []), second["start"], second["end"]):
+                block["copies"] = [second, first]
+                result.append(block)
+        return result
+
+    def _blocks(self, rows, min_tokens: int) -> list[dict]:
+        gram, window = self.settings["gram"], self.settings["window"]
+        by_hash: dict[int, list] = {}
+        for value, file_id, pos, line, end_line in rows:
+            by_hash.setdefault(value, []).append((file_id, pos, line, end_line))
+
+        # Copies of one block match at a constant token offset between the same two files.
+        runs: dict[tuple, list] = {}
+        for occurrences in by_hash.values():
+            if not 2 <= len(occurrences) <= MAX_OCCURRENCES:
+                continue
+            occurrences.sort()
+            for index, first in enumerate(occurrences):
+                for second in occurrences[index + 1:]:
+                    runs.setdefault((first[0], second[0], second[1] - first[1]), []).append((first, second))
+
+        paths = dict(self.conn.execute("SELECT id, path FROM files"))
+        blocks = []
+        for (first_file, second_file, offset), pairs in runs.items():
+            if len(pairs) * window + gram < min_tokens:
+                continue
+            pairs.sort()
+            begin = 0
+            for index in range(1, len(pairs) + 1):
+                # Winnowing keeps a fingerprint in every window, so a gap wider than that ends the block.
+                if index < len(pairs) and pairs[index][0][1] - pairs[index - 1][0][1] <= window:
+                    continue
+                head, tail = pairs[begin], pairs[index - 1]
+                tokens = tail[0][1] - head[0][1] + gram
+                begin = index
+                if tokens < min_tokens or (first_file == second_file and offset < tokens):
+                    continue
+                blocks.append({
+                    "tokens": tokens,
+                    "copies": [
+                        {"path": paths[first_file], "start": head[0][2], "end": tail[0][3]},
+                        {"path": paths[second_file], "start": head[1][2], "end": tail[1][3]},
+                    ],
+                })
+        blocks.sort(key=lambda item: (-item["tokens"], item["copies"][0]["path"], item["copies"][0]["start"]))
+        return blocks
+
+
+def duplicated_lines(blocks: list[dict]) -> int:
+    """Distinct lines covered by any copy of any block."""
+    spans: dict[str, list[tuple[int, int]]] = {}
+    for block in blocks:
+        for copy in block["copies"]:
+            spans.setdefault(copy["path"], []).append((copy["start"], copy["end"]))
+    total = 0
+    for ranges in spans.values():
+        covered = 0
+        for start, end in sorted(ranges):
+            if end > covered:
+                total += end - max(start, covered + 1) + 1
+                covered = end
+    return total
+
+
+def render_clones(blocks: list[dict], limit: int = 20) -> list[str]:
+    rows = ["| Block | Duplicate of | Tokens |", "| --- | --- | --- |"]
+    for block in blocks[:limit]:
+        first, second = block["copies"]
+        rows.append(
+            f"| {first['path']}:{first['start']}-{first['end']} "
+            f"| {second['path']}:{second['start']}-{second['end']} | {block['tokens']} |"
+        )
+    if len(blocks) > limit:
+        rows.append(f"| {len(blocks) - limit} more blocks | - | - |")
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Find duplicated code blocks with a persistent fingerprint index.")
+    parser.add_argument("command", choices=["update", "repo", "diff"],
+                        help="update the index, report duplicates across the repo, or only those touching the diff")
+    parser.add_argument("--root", default=".", help="Repository root (default: .)")
+    parser.add_argument("--index", help=f"Index database (default: {DEFAULT_INDEX} in root)")
+    parser.add_argument("--jobs", type=int, help="Tokenizer processes for the update (default: CPU count)")
+    parser.add_argument("--no-update", action="store_true", help="Query the index as is, without re-scanning")
+    parser.add_argument("--base", default="main", help="Base branch for diff")
+    parser.add_argument("--min-tokens", type=int, default=MIN_TOKENS, help="Smallest duplicated block to report")
+    parser.add_argument("--normalize", action="store_true",
+                        help="Match copies with renamed identifiers and changed literals too")
+    parser.add_argument("--limit", type=int, default=50, help="Most rows to print")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    with CloneIndex(root, Path(args.index) if args.index else None, args.normalize) as index:
+        if not args.no_update or args.command == "update":
+            start = time.perf_counter()
+            stats = index.update(args.jobs)
+            elapsed = time.perf_counter() - start
+            if args.command == "update" or stats["parsed"] or stats["removed"]:
+                totals = index.totals()
+                print(
+                    f"Indexed {stats['files']:,} files in {elapsed:.2f}s ({stats['parsed']:,} parsed, "
+                    f"{stats['removed']:,} removed): {totals['tokens']:,} tokens, {totals['prints']:,} fingerprints",
+                    file=sys.stderr if args.json else sys.stdout,
+                )
+        if args.command == "update":
+            return 0
+
+        start = time.perf_counter()
+        if args.command == "repo":
+            blocks = index.duplicates(args.min_tokens)
+        else:
+            try:
+                changed = parse_diff(git_diff(args.base, root))[0]
+            except (OSError, subprocess.CalledProcessError) as exc:
+                print(f"git diff against {args.base} failed: {exc}")
+                return 1
+            blocks = index.changed_duplicates(changed, args.min_tokens)
+        elapsed = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps(blocks, indent=2))
+        return 0
+    scope = "across the repository" if args.command == "repo" else f"on lines changed against {args.base}"
+    if not blocks:
+        print(f"No duplicated blocks of {args.min_tokens}+ tokens {scope} ({elapsed:.1f} ms).")
+        return 0
+    print("\n".join(render_clones(blocks, args.limit)))
+    print(
+        f"{len(blocks)} duplicated blocks {scope}, {duplicated_lines(blocks):,} lines in "
+        f"{len({copy['path'] for block in blocks for copy in block['copies']})} files ({elapsed:.1f} ms)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
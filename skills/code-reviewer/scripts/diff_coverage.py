@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Diff Coverage
+Reports test coverage of only the lines added or modified in a PR by
+intersecting the diff's changed line ranges with line-level coverage data.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from coverage_ingest import LINE_READERS, iter_line_coverage
+from review_checklist import get_diff
+from symbol_index import parse_diff
+
+
+def make_selector(changed_files):
+    """Map coverage file names (absolute or source-relative) onto diff paths."""
+    wanted = set(changed_files)
+    by_name: dict[str, list[str]] = {}
+    for path in wanted:
+        by_name.setdefault(path.rsplit("/", 1)[-1], []).append(path)
+
+    def select(name: str) -> str | None:
+        name = name.replace("\\", "/")
+        if name in wanted:
+            return name
+        for candidate in by_name.get(name.rsplit("/", 1)[-1], ()):
+            if name.endswith("/" + candidate) or candidate.endswith("/" + name):
+                return candidate
+        return None
+
+    return select
+
+
+def compress(lines: list[int]) -> str:
+    """Render sorted line numbers as compact ranges, e.g. 3-5, 9."""
+    parts = []
+    start = prev = None
+    for line in lines:
+        if prev is not None and line == prev + 1:
+            prev = line
+            continue
+        if start is not None:
+            parts.append(f"{start}-{prev}" if prev != start else str(start))
+        start = prev = line
+    if start is not None:
+        parts.append(f"{start}-{prev}" if prev != start else str(start))
+    return ", ".join(parts)
+
+
+def compute_diff_coverage(changed: dict, records) -> dict:
+    """Intersect changed line intervals with streamed (path, covered, uncovered) records.
+
+    Each coverage record is reduced to its changed lines as soon as it is read,
+    so memory follows the size of the diff rather than the coverage data.
+    """
+    hits: dict[str, set[int]] = {}
+    misses: dict[str, set[int]] = {}
+    for path, covered, uncovered in records:
+        ranges = changed[path]
+        covered, uncovered = set(covered), set(uncovered)
+        file_hits = hits.setdefault(path, set())
+        file_misses = misses.setdefault(path, set())
+        for start, end in ranges:
+            span = range(start, end + 1)
+            file_hits.update(covered.intersection(span))
+            file_misses.update(uncovered.intersection(span))
+
+    files = []
+    hit_total = exec_total = 0
+    for path, file_hits in hits.items():
+        # A line covered by any input counts as covered.
+        missing = sorted(misses[path] - file_hits)
+        total = len(file_hits) + len(missing)
+        if not total:
+            continue
+        files.append({"path": path, "hit": len(file_hits), "total": total, "missing": missing})
+        hit_total += len(file_hits)
+        exec_total += total
+    files.sort(key=lambda item: (item["hit"] / item["total"], -item["total"]))
+    return {"hit": hit_total, "total": exec_total, "files": files}
+
+
+def diff_coverage(base_branch: str, coverage_paths: list[Path], fmt: str = "auto",
+                  diff_text: str | None = None) -> dict:
+    """Changed-lines coverage for the current branch against base_branch."""
+    diff = diff_text if diff_text is not None else get_diff(base_branch, context=0)
+    changed = parse_diff(diff)[0]
+    records = iter_line_coverage(coverage_paths, make_selector(changed), fmt)
+    return compute_diff_coverage(changed, records)
+
+
+def format_percent(result: dict) -> str:
+    if not result["total"]:
+        return "n/a (no executable changed lines)"
+    return f"{100.0 * result['hit'] / result['total']:.1f}% ({result['hit']}/{result['total']} lines)"
+
+
+def render(result: dict, base_branch: str) -> str:
+    lines = ["# Diff Coverage\n"]
+    lines.append(f"- **Branch**: {base_branch} → HEAD")
+    lines.append(f"- **Changed-lines coverage**: {format_percent(result)}")
+    lines.append(f"- **Files with coverage data**: {len(result['files'])}\n")
+    uncovered = [item for item in result["files"] if item["missing"]]
+    if uncovered:
+        lines.append("## Uncovered Changes\n")
+        lines.append("| File | Coverage | Uncovered lines |")
+        lines.append("| --- | --- | --- |")
+        for item in uncovered:
+            pct = 100.0 * item["hit"] / item["total"]
+            lines.append(f"| {item['path']} | {pct:.1f}% | {compress(item['missing'])} |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report coverage of changed lines only")
+    parser.add_argument("--base", default="main", help="Base branch to compare against")
+    parser.add_argument("--coverage", action="append", required=True,
+                        help="Coverage file (Cobertura XML, LCOV or coverage.py JSON); repeatable")
+    parser.add_argument("--format", default="auto", choices=["auto", *LINE_READERS],
+                        help="Coverage file format")
+    parser.add_argument("--diff", help="Read the unified diff from a file instead of git")
+    parser.add_argument("--fail-under", type=float, help="Exit 1 when coverage is below this percent")
+    parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    paths = [Path(item) for item in args.coverage]
+    missing = [str(path) for path in paths if not path.exists()]
+    if missing:
+        print("Missing coverage files: " + ", ".join(missing))
+        return 1
+    diff_text = Path(args.diff).read_text(errors="replace") if args.diff else None
+    result = diff_coverage(args.base, paths, args.format, diff_text)
+    report = render(result, args.base)
+
+    if args.output:
+        Path(args.output).write_text(report)
+        print(f"Diff coverage written to {args.output}")
+    else:
+        print(report)
+
+    if args.fail_under is not None and result["total"]:
+        if 100.0 * result["hit"] / result["total"] < args.fail_under:
+            print(f"Changed-lines coverage below {args.fail_under}%", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,11 +38,14 @@ def get_commit_messages(base_branch: str = "main") -> list[str]:
         return []
 
 
-def get_diff(base_branch: str = "main") -> str:
-    """Get the full diff."""
+def get_diff(base_branch: str = "main", context: int | None = None) -> str:
+    """Get the full diff (optionally with a fixed number of context lines)."""
+    command = ["git", "diff", f"{base_branch}...HEAD"]
+    if context is not None:
+        command.append(f"-U{context}")
     try:
         result = subprocess.run(
-            ["git", "diff", f"{base_branch}...HEAD"],
+            command,
             capture_output=True,
             text=True,
             check=True
@@ -74,7 +77,56 @@ def categorize_file(filename: str) -> str:
     return 'general'
 
 
-def generate_review_checklist(base_branch: str = "main") -> str:
+def coverage_item(base_branch: str, coverage_paths: list[str] | None) -> str:
+    """Checklist line for coverage, with changed-lines coverage when data is given."""
+    if not coverage_paths:
+        return "- [ ] **Coverage**: Test coverage not decreased\n"
+    from diff_coverage import diff_coverage, format_percent
+
+    result = diff_coverage(base_branch, [Path(p) for p in coverage_paths])
+    uncovered = sum(1 for item in result["files"] if item["missing"])
+    return (
+        f"- [ ] **Coverage**: Changed-lines coverage {format_percent(result)}; "
+        f"{uncovered} files with uncovered changes\n"
+    )
+
+
+def git_paths() -> tuple[Path, Path] | None:
+    """Work tree root and git directory; indexes live in the latter so they never show as untracked."""
+    try:
+        top, git_dir = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel", "--absolute-git-dir"],
+            capture_output=True, text=True, check=True
+        ).stdout.split("\n")[:2]
+    except (subprocess.CalledProcessError, ValueError):
+        return None
+    return Path(top), Path(git_dir)
+
+
+def change_risk(paths: tuple[Path, Path], parsed: tuple[dict, dict, set[str]]) -> list[dict]:
+    """Changed existing definitions per file, ranked by how many other files import them."""
+    from symbol_index import DEFAULT_INDEX, SymbolIndex
+
+    top, git_dir = paths
+    with SymbolIndex(top, git_dir / DEFAULT_INDEX) as index:
+        index.update()
+        return index.change_risk(*parsed)
+
+
+def duplicate_code(paths: tuple[Path, Path], changed: dict) -> list[dict]:
+    """Duplicated blocks with at least one copy on a changed line."""
+    from clone_index import DEFAULT_INDEX, CloneIndex
+
+    top, git_dir = paths
+    with CloneIndex(top, git_dir / DEFAULT_INDEX) as index:
+        index.update()
+        return index.changed_duplicates(changed)
+
+
+def generate_review_checklist(base_branch: str = "main",
+                              coverage_paths: list[str] | None = None,
+                              risk: bool = False,
+                              clones: bool = False) -> str:
     """Generate a structured review checklist."""
     files = get_changed_files(base_branch)
     commits = get_commit_messages(base_branch)
@@ -109,6 +161,31 @@ def generate_review_checklist(base_branch: str = "main") -> str:
         for f in cat_files:
             lines.append(f"- [{f}]")
 
+    # --risk and --clones share one zero-context diff and one repository lookup.
+    paths = git_paths() if risk or clones else None
+    parsed = None
+    if paths is not None:
+        from symbol_index import parse_diff
+
+        parsed = parse_diff(get_diff(base_branch, context=0))
+
+    risks = change_risk(paths, parsed) if risk and parsed else []
+    if risk:
+        from symbol_index import render_risk
+
+        lines.append("\n## Change Risk\n")
+        if risks:
+            lines.extend(render_risk(risks))
+        else:
+            lines.append("No indexed Python or JS/TS files changed.")
+
+    duplicates = duplicate_code(paths, parsed[0]) if clones and parsed else []
+    if duplicates:
+        from clone_index import render_clones
+
+        lines.append("\n## Duplicate Code\n")
+        lines.extend(render_clones(duplicates))
+
     # Diff snippet (first 100 lines)
     lines.append("\n## Diff Preview\n")
     lines.append("```diff")
@@ -133,7 +210,12 @@ def generate_review_checklist(base_branch: str = "main") -> str:
     lines.append("\n### 📝 Code Quality\n")
     lines.append("- [ ] **Readability**: Code is clear and understandable\n")
     lines.append("- [ ] **Naming**: Variables/functions are well named\n")
-    lines.append("- [ ] **DRY**: No duplicate code\n")
+    if duplicates:
+        lines.append(f"- [ ] **DRY**: {len(duplicates)} duplicated blocks touch changed lines (see Duplicate Code)\n")
+    elif clones:
+        lines.append("- [ ] **DRY**: No duplicated blocks of 50+ tokens on changed lines\n")
+    else:
+        lines.append("- [ ] **DRY**: No duplicate code\n")
     lines.append("- [ ] **Comments**: Complex logic is explained\n")
 
     # Testing
@@ -143,7 +225,7 @@ def generate_review_checklist(base_branch: str = "main") -> str:
     else:
         lines.append("\n### 🧪 Testing\n")
         lines.append("- [ ] **Tests added**: New functionality has tests\n")
-    lines.append("- [ ] **Coverage**: Test coverage not decreased\n")
+    lines.append(coverage_item(base_branch, coverage_paths))
     lines.append("- [ ] **Edge cases**: Edge cases are tested\n")
 
     # Performance
@@ -160,6 +242,13 @@ def generate_review_checklist(base_branch: str = "main") -> str:
 
     # Breaking changes
     lines.append("\n### ⚠️ Breaking Changes\n")
+    used = [item for item in risks if item["symbols"]]
+    if used:
+        symbols = sum(len(item["symbols"]) for item in used)
+        lines.append(
+            f"- [ ] **Callers**: {symbols} changed definitions in {len(used)} files are imported elsewhere "
+            "(see Change Risk)\n"
+        )
     lines.append("- [ ] **Documented**: Breaking changes are documented\n")
     lines.append("- [ ] **Migration**: Migration guide provided if needed\n")
 
@@ -176,9 +265,20 @@ def main():
     parser = argparse.ArgumentParser(description="Generate code review checklist")
     parser.add_argument("--base", default="main", help="Base branch to compare against")
     parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--coverage", action="append",
+                        help="Coverage file for changed-lines coverage; repeatable")
+    parser.add_argument("--risk", action="store_true",
+                        help="Rank changed files by how widely their changed symbols are used")
+    parser.add_argument("--clones", action="store_true",
+                        help="Fill the DRY item from a duplicate-code index of the repository")
     args = parser.parse_args()
 
-    checklist = generate_review_checklist(args.base)
+    missing = [path for path in args.coverage or [] if not Path(path).exists()]
+    if missing:
+        print("Coverage file not found: " + ", ".join(missing))
+        sys.exit(1)
+
+    checklist = generate_review_checklist(args.base, args.coverage, args.risk, args.clones)
 
     if args.output:
         Path(args.output).write_text(checklist)
@@ -0,0 +1,859 @@
+#!/usr/bin/env python3
+# Cross-file symbol index shared by refactoring-specialist and code-reviewer.
+#
+# Records every definition (functions, classes, methods, module-level names)
+# and every reference (calls, name and attribute uses, imports) in the Python
+# and JavaScript/TypeScript files of a repository. Python is read with `ast`;
+# JS/TS with a small tokenizer that skips strings and comments and tracks
+# braces for scopes. Rows live in SQLite, indexed by name, so "who calls X"
+# and "what breaks if I rename Y" are single indexed lookups. Each update
+# stats every file, re-hashes only files whose stat changed, and re-parses
+# (in a process pool on a first run) only files whose content changed.
+# References are matched by name; files that import the defining module are
+# reported as direct uses, others as name-only matches. The SQLite and
+# incremental-update scaffolding (FileIndex) is also used by clone_index in
+# code-reviewer. Skills are installed independently, so this file is kept
+# identical in refactoring-specialist and code-reviewer.
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+import argparse
+import ast
+import hashlib
+import json
+import os
+import posixpath
+import re
+import sqlite3
+import subprocess
+import time
+
+INDEX_VERSION = "1"
+DEFAULT_INDEX = ".symbol-index.db"
+POOL_THRESHOLD = 32
+BULK_THRESHOLD = 500
+PYTHON_SUFFIXES = {".py"}
+SCRIPT_SUFFIXES = {".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts"}
+SKIP_DIRS = {
+    ".git", ".hg", ".svn", ".venv", "venv", "env", "node_modules", "__pycache__",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", "build", "dist", "site-packages",
+    "coverage", ".next", "vendor",
+}
+RISK_LEVELS = ((10, "High"), (3, "Medium"), (1, "Low"))
+HUNK_PATTERN = re.compile(r"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+CONTEXT_LINE = re.compile(r"^(?:[^+\-]|$)", re.M)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    language TEXT NOT NULL,
+    module TEXT NOT NULL,
+    lines INTEGER NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    file_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file_id, line);
+CREATE TABLE IF NOT EXISTS refs (
+    name TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    scope TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refs_name ON refs (name, file_id);
+CREATE INDEX IF NOT EXISTS refs_file ON refs (file_id);
+CREATE TABLE IF NOT EXISTS imports (
+    file_id INTEGER NOT NULL,
+    module TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS imports_module ON imports (module, name);
+CREATE INDEX IF NOT EXISTS imports_name ON imports (name);
+CREATE INDEX IF NOT EXISTS imports_file ON imports (file_id);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# --- Python -----------------------------------------------------------------
+
+def python_module(rel_path: str) -> str:
+    parts = rel_path[:-3].split("/") if rel_path.endswith(".py") else rel_path.split("/")
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+class PythonIndexer(ast.NodeVisitor):
+    """Definitions, references and imports of one module, with the enclosing scope of each reference."""
+
+    def __init__(self, rel_path: str) -> None:
+        self.module = python_module(rel_path)
+        self.is_package = rel_path.endswith("__init__.py")
+        self.defs: list[list] = []
+        self.refs: set[tuple] = set()
+        self.imports: list[list] = []
+        self.scope: list[str] = []
+        self.in_class: list[bool] = []
+
+    def ref(self, name: str, line: int, kind: str) -> None:
+        self.refs.add((name, line, kind, ".".join(self.scope)))
+
+    def define(self, node, kind: str) -> None:
+        qualname = ".".join(self.scope + [node.name])
+        self.defs.append([node.name, qualname, kind, node.lineno, node.end_lineno or node.lineno])
+
+    def visit_FunctionDef(self, node) -> None:
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self.define(node, "method" if self.in_class and self.in_class[-1] else "function")
+        self.enter(node, False)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node) -> None:
+        for expression in node.decorator_list + node.bases + [keyword.value for keyword in node.keywords]:
+            self.visit(expression)
+        self.define(node, "class")
+        self.enter(node, True)
+
+    def enter(self, node, is_class: bool) -> None:
+        self.scope.append(node.name)
+        self.in_class.append(is_class)
+        for statement in node.body:
+            self.visit(statement)
+        self.scope.pop()
+        self.in_class.pop()
+
+    def visit_Assign(self, node) -> None:
+        if not self.scope:
+            for target in node.targets:
+                for element in target.elts if isinstance(target, (ast.Tuple, ast.List)) else [target]:
+                    if isinstance(element, ast.Name):
+                        line = element.lineno
+                        self.defs.append([element.id, element.id, "variable", line, node.end_lineno or line])
+            if any(isinstance(target, ast.Name) and target.id == "__all__" for target in node.targets):
+                for element in getattr(node.value, "elts", []):
+                    if isinstance(element, ast.Constant) and isinstance(element.value, str):
+                        self.ref(element.value, element.lineno, "export")
+        self.generic_visit(node)
+
+    def visit_Call(self, node) -> None:
+        func = node.func
+        if isinstance(func, ast.Name):
+            self.ref(func.id, func.lineno, "call")
+        elif isinstance(func, ast.Attribute):
+            self.ref(func.attr, func.end_lineno or func.lineno, "call")
+            self.visit(func.value)
+        else:
+            self.visit(func)
+        for argument in node.args:
+            self.visit(argument)
+        for keyword in node.keywords:
+            self.visit(keyword.value)
+
+    def visit_Constant(self, node) -> None:
+        pass
+
+    def visit_Name(self, node) -> None:
+        if not isinstance(node.ctx, ast.Store):
+            self.ref(node.id, node.lineno, "ref")
+
+    def visit_Attribute(self, node) -> None:
+        self.ref(node.attr, node.end_lineno or node.lineno, "attr")
+        self.visit(node.value)
+
+    def visit_Import(self, node) -> None:
+        for alias in node.names:
+            self.imports.append([alias.name, "", node.lineno])
+
+    def visit_ImportFrom(self, node) -> None:
+        module = node.module or ""
+        if node.level:
+            package = self.module.split(".") if self.module else []
+            if not self.is_package:
+                package = package[:-1]
+            package = package[: len(package) - node.level + 1]
+            module = ".".join(package + ([module] if module else []))
+        for alias in node.names:
+            self.imports.append([module, alias.name, node.lineno])
+            if alias.name != "*":
+                self.ref(alias.name, node.lineno, "import")
+
+
+def index_python(text: str, rel_path: str) -> dict:
+    indexer = PythonIndexer(rel_path)
+    indexer.visit(ast.parse(text, filename=rel_path))
+    return {
+        "module": indexer.module,
+        "defs": indexer.defs,
+        "refs": sorted(indexer.refs),
+        "imports": indexer.imports,
+    }
+
+
+# --- JavaScript / TypeScript ---------------------------------------------------
+
+SCRIPT_TOKEN = re.compile(
+    r"""
+    (?P<newline>\n)
+    | (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`)
+    | (?P<name>[A-Za-z_$][\w$]*)
+    | (?P<punct>=>|[(){}\[\].,;:=*])
+    """,
+    re.S | re.X,
+)
+SCRIPT_KEYWORDS = {
+    "await", "break", "case", "catch", "class", "const", "continue", "debugger", "default", "delete", "do",
+    "else", "export", "extends", "false", "finally", "for", "from", "function", "if", "implements", "import",
+    "in", "instanceof", "interface", "let", "new", "null", "of", "return", "super", "switch", "this", "throw",
+    "true", "try", "type", "typeof", "undefined", "var", "void", "while", "with", "yield", "async", "static",
+    "get", "set", "enum", "declare", "readonly", "private", "protected", "public", "abstract", "as", "namespace",
+}
+DECLARATIONS = {"const", "let", "var"}
+TYPE_DECLARATIONS = {"interface", "type", "enum"}
+
+
+def script_tokens(text: str) -> list[tuple[str, str, int]]:
+    """(kind, text, line) for names, punctuation and strings; comments dropped."""
+    tokens = []
+    line = 1
+    for match in SCRIPT_TOKEN.finditer(text):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "newline":
+            line += 1
+            continue
+        if kind != "comment":
+            tokens.append((kind, value, line))
+        line += value.count("\n")
+    return tokens
+
+
+def resolve_script_module(rel_path: str, specifier: str) -> str:
+    if not specifier.startswith("."):
+        return specifier
+    joined = posixpath.normpath(posixpath.join(posixpath.dirname(rel_path), specifier))
+    stem, suffix = posixpath.splitext(joined)
+    joined = stem if suffix in SCRIPT_SUFFIXES else joined
+    return joined[: -len("/index")] if joined.endswith("/index") else joined
+
+
+def script_module(rel_path: str) -> str:
+    stem = posixpath.splitext(rel_path)[0]
+    return stem[: -len("/index")] if stem.endswith("/index") else stem
+
+
+def index_script(text: str, rel_path: str) -> dict:
+    tokens = script_tokens(text)
+    defs: list[list] = []
+    refs: set[tuple] = set()
+    imports: list[list] = []
+    depth = 0
+    scopes: list[tuple[str, int, int]] = []  # (name, depth of its body, index into defs)
+    classes: list[int] = []  # body depths of open class declarations
+    pending: tuple[str, int] | None = None  # a definition whose body opens at the next "{"
+    def_sites: set[int] = set()
+    count = len(tokens)
+
+    def scope_name() -> str:
+        return ".".join(name for name, _, _ in scopes)
+
+    def define(index: int, kind: str, opens_body: bool) -> None:
+        nonlocal pending
+        name, line = tokens[index][1], tokens[index][2]
+        qualname = ".".join([scope_name(), name]) if scopes else name
+        defs.append([name, qualname, kind, line, line])
+        def_sites.add(index)
+        if opens_body:
+            pending = (name, len(defs) - 1)
+
+    for index, (kind, value, line) in enumerate(tokens):
+        previous = tokens[index - 1][1] if index else ""
+        following = tokens[index + 1][1] if index + 1 < count else ""
+        if kind == "punct":
+            if value == "{":
+                depth += 1
+                if pending:
+                    scopes.append((pending[0], depth, pending[1]))
+                    if defs[pending[1]][2] == "class":
+                        classes.append(depth)
+                    pending = None
+            elif value == "}":
+                if scopes and scopes[-1][1] == depth:
+                    _, _, def_index = scopes.pop()
+                    defs[def_index][4] = line
+                if classes and classes[-1] == depth:
+                    classes.pop()
+                depth -= 1
+            elif value == ";":
+                pending = None
+            continue
+        if kind == "string":
+            continue
+        if previous == "function" or previous == "*" and index > 1 and tokens[index - 2][1] == "function":
+            define(index, "function", True)
+            continue
+        if previous == "class" and value not in SCRIPT_KEYWORDS:
+            define(index, "class", True)
+            continue
+        if previous in TYPE_DECLARATIONS and following in ("{", "=", "<", "extends"):
+            define(index, "type", previous != "type")
+            continue
+        if previous in DECLARATIONS and not scopes:
+            value_start = tokens[index + 2][1] if index + 2 < count else ""
+            function_like = following == "=" and value_start in ("function", "async", "(")
+            define(index, "function" if function_like else "variable", function_like)
+            continue
+        if value == "import" and not scopes:
+            # import x, {a as b} from "mod" / import "mod" / import * as ns from "mod"
+            names: list[str] = []
+            cursor = index + 1
+            in_braces = False
+            while cursor < count and tokens[cursor][0] != "string" and tokens[cursor][1] != ";":
+                token_value = tokens[cursor][1]
+                if token_value == "{":
+                    in_braces = True
+                elif token_value == "}":
+                    in_braces = False
+                elif tokens[cursor][0] == "name" and token_value not in ("from", "as", "type"):
+                    if tokens[cursor - 1][1] != "as":
+                        names.append(token_value if in_braces else "default")
+                    def_sites.add(cursor)
+                elif token_value == "*":
+                    names.append("*")
+                cursor += 1
+            if cursor < count and tokens[cursor][0] == "string":
+                module = resolve_script_module(rel_path, tokens[cursor][1][1:-1])
+                for name in names or [""]:
+                    imports.append([module, name, line])
+                    if name not in ("", "default", "*"):
+                        refs.add((name, line, "import", ""))
+            continue
+        if value == "require" and following == "(" and index + 2 < count and tokens[index + 2][0] == "string":
+            imports.append([resolve_script_module(rel_path, tokens[index + 2][1][1:-1]), "", line])
+            continue
+        if index in def_sites or value in SCRIPT_KEYWORDS:
+            continue
+        if classes and classes[-1] == depth and following == "(":
+            define(index, "method", True)
+            continue
+        if previous == "." or previous == "?.":
+            refs.add((value, line, "call" if following == "(" else "attr", scope_name()))
+        elif following == ":" and previous in ("{", ","):
+            continue  # object literal key
+        else:
+            refs.add((value, line, "call" if following == "(" else "ref", scope_name()))
+    return {"module": script_module(rel_path), "defs": defs, "refs": sorted(refs), "imports": imports}
+
+
+# --- indexing ---------------------------------------------------------------
+
+def language_of(path: str) -> str | None:
+    suffix = os.path.splitext(path)[1]
+    if suffix in PYTHON_SUFFIXES:
+        return "python"
+    if suffix in SCRIPT_SUFFIXES:
+        return "script"
+    return None
+
+
+def analyze(path: str, rel_path: str) -> tuple[str, str, dict]:
+    data = Path(path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    text = data.decode("utf-8", errors="replace")
+    language = language_of(rel_path)
+    result = {"language": language, "lines": text.count("\n") + 1, "error": None}
+    try:
+        result.update(index_python(text, rel_path) if language == "python" else index_script(text, rel_path))
+    except (SyntaxError, ValueError, RecursionError) as exc:
+        module = python_module(rel_path) if language == "python" else script_module(rel_path)
+        result.update(module=module, defs=[], refs=[], imports=[], error=f"{type(exc).__name__}: {exc}")
+    return rel_path, digest, result
+
+
+def _analyze_batch(batch: list[tuple[str, str]]) -> list[tuple[str, str, dict]]:
+    return [analyze(path, rel_path) for path, rel_path in batch]
+
+
+def iter_source_files(root: Path, accept=None):
+    accept = accept or language_of
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+        for filename in sorted(filenames):
+            if accept(filename) and not filename.endswith((".min.js", ".d.ts")):
+                full = os.path.join(dirpath, filename)
+                yield full, os.path.relpath(full, root).replace(os.sep, "/")
+
+
+class FileIndex(ABC):
+    """SQLite store of per-file rows for one repository root, kept current by stat and content hash.
+
+    Subclasses set SCHEMA (with a files table holding path, size, mtime_ns and
+    hash), FILE_TABLES (rows keyed by file_id), and provide analyzer() and
+    store(); clone_index builds on it as well.
+    """
+
+    SCHEMA = ""
+    FILE_TABLES: tuple[str, ...] = ()
+
+    def __init__(self, root: Path, path: Path, stamp: str) -> None:
+        self.root = root
+        self.path = path
+        self.conn = sqlite3.connect(str(self.path), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != stamp:
+            with self.transaction():
+                for table in ("files", *self.FILE_TABLES):
+                    self.conn.execute(f"DELETE FROM {table}")
+                self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (stamp,))
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def source_files(self):
+        return iter_source_files(self.root)
+
+    @abstractmethod
+    def analyzer(self):
+        """Picklable callable mapping [(path, rel_path)] to [(rel_path, digest, result)]."""
+
+    @abstractmethod
+    def store(self, rel: str, digest: str, result: dict, size: int, mtime: int) -> None:
+        """Insert the rows of one analysed file."""
+
+    def update(self, jobs: int | None = None) -> dict:
+        """Bring the index in line with the tree; returns counts of what changed."""
+        known = {
+            path: (file_id, size, mtime, digest)
+            for file_id, path, size, mtime, digest in self.conn.execute(
+                "SELECT id, path, size, mtime_ns, hash FROM files"
+            )
+        }
+        seen = set()
+        restat = []
+        pending = []
+        for full, rel in self.source_files():
+            seen.add(rel)
+            stat = os.stat(full)
+            entry = known.get(rel)
+            if entry and entry[1:3] == (stat.st_size, stat.st_mtime_ns):
+                continue
+            if entry and hashlib.sha256(Path(full).read_bytes()).hexdigest() == entry[3]:
+                restat.append((stat.st_size, stat.st_mtime_ns, entry[0]))
+                continue
+            pending.append((full, rel, stat.st_size, stat.st_mtime_ns))
+        removed = [known[rel][0] for rel in known if rel not in seen]
+
+        workers = jobs or os.cpu_count() or 1
+        work = [(full, rel) for full, rel, _, _ in pending]
+        analyzer = self.analyzer()
+        if len(work) >= POOL_THRESHOLD and workers > 1:
+            size = max(8, len(work) // (workers * 8))
+            batches = [work[start:start + size] for start in range(0, len(work), size)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = [item for batch in pool.map(analyzer, batches) for item in batch]
+        else:
+            parsed = analyzer(work)
+
+        stats = {rel: (size, mtime) for _, rel, size, mtime in pending}
+        # Building the indexes once after a large load is faster than maintaining them row by row.
+        indexes = re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)[^;]+", self.SCHEMA)
+        bulk = len(parsed) >= BULK_THRESHOLD and len(parsed) > len(known)
+        with self.transaction():
+            if bulk:
+                for name in indexes:
+                    self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+            for file_id in removed + [known[rel][0] for rel, _, _ in parsed if rel in known]:
+                for table in self.FILE_TABLES:
+                    self.conn.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+                self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            self.conn.executemany("UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?", restat)
+            for rel, digest, result in parsed:
+                self.store(rel, digest, result, *stats[rel])
+            if bulk:
+                for statement in re.findall(r"CREATE INDEX IF NOT EXISTS [^;]+", self.SCHEMA):
+                    self.conn.execute(statement)
+        return {
+            "files": len(seen),
+            "parsed": len(parsed),
+            "removed": len(removed),
+            "errors": [f"{rel}: {result['error']}" for rel, _, result in parsed if result.get("error")],
+        }
+
+
+class SymbolIndex(FileIndex):
+    """SQLite-backed definitions and references for one repository root."""
+
+    SCHEMA = SCHEMA
+    FILE_TABLES = ("symbols", "refs", "imports")
+
+    def __init__(self, root: Path, path: Path | None = None) -> None:
+        super().__init__(root, path or root / DEFAULT_INDEX, INDEX_VERSION)
+
+    def analyzer(self):
+        return _analyze_batch
+
+    def store(self, rel: str, digest: str, result: dict, size: int, mtime: int) -> None:
+        file_id = self.conn.execute(
+            "INSERT INTO files (path, size, mtime_ns, hash, language, module, lines, error)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (rel, size, mtime, digest, result["language"], result["module"], result["lines"], result["error"]),
+        ).lastrowid
+        self.conn.executemany(
+            "INSERT INTO symbols (file_id, name, qualname, kind, line, end_line) VALUES (?, ?, ?, ?, ?, ?)",
+            [(file_id, *item) for item in result["defs"]],
+        )
+        self.conn.executemany(
+            "INSERT INTO refs (name, file_id, line, kind, scope) VALUES (?, ?, ?, ?, ?)",
+            [(name, file_id, line, kind, scope) for name, line, kind, scope in result["refs"]],
+        )
+        self.conn.executemany(
+            "INSERT INTO imports (file_id, module, name, line) VALUES (?, ?, ?, ?)",
+            [(file_id, *item) for item in result["imports"]],
+        )
+
+    def totals(self) -> dict:
+        return {
+            table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("files", "symbols", "refs")
+        }
+
+    def definitions(self, name: str) -> list[dict]:
+        """Definitions of a bare name, or of a dotted qualname like Class.method."""
+        column = "s.qualname" if "." in name else "s.name"
+        rows = self.conn.execute(
+            f"SELECT f.path, f.module, s.name, s.qualname, s.kind, s.line, s.end_line"
+            f" FROM symbols s JOIN files f ON f.id = s.file_id WHERE {column} = ? ORDER BY f.path, s.line",
+            (name,),
+        )
+        keys = ("path", "module", "name", "qualname", "kind", "line", "end_line")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def references(self, name: str, kinds: tuple[str, ...] | None = None) -> list[dict]:
+        query = (
+            "SELECT f.path, r.line, r.kind, r.scope FROM refs r JOIN files f ON f.id = r.file_id WHERE r.name = ?"
+        )
+        params: list = [name]
+        if kinds:
+            query += f" AND r.kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        rows = self.conn.execute(query + " ORDER BY f.path, r.line", params)
+        return [dict(zip(("path", "line", "kind", "scope"), row)) for row in rows]
+
+    def importers(self, modules: set[str], name: str) -> dict[str, str]:
+        """Files importing name (or the whole module) from one of the defining modules."""
+        if not modules:
+            return {}
+        found: dict[str, str] = {}
+        rows = self.conn.execute(
+            "SELECT f.path, i.module, i.name FROM imports i JOIN files f ON f.id = i.file_id"
+            " WHERE i.name IN (?, '', '*', 'default')",
+            (name,),
+        )
+        for path, module, imported in rows:
+            if any(module == target or target.endswith("." + module) for target in modules):
+                found.setdefault(path, "import" if imported == name else "module")
+        # from package import module, then module.name
+        for target in modules:
+            parent, _, last = target.rpartition(".")
+            for (path,) in self.conn.execute(
+                "SELECT f.path FROM imports i JOIN files f ON f.id = i.file_id WHERE i.module = ? AND i.name = ?",
+                (parent, last),
+            ):
+                found.setdefault(path, "module")
+        return found
+
+    def impact(self, name: str) -> dict:
+        """Definitions and every file that mentions the bare name, split into direct and name-only uses."""
+        bare = name.rsplit(".", 1)[-1]
+        defs = self.definitions(name)
+        modules = {item["module"] for item in defs}
+        defining = {item["path"] for item in defs}
+        importers = self.importers(modules, bare)
+        files: dict[str, dict] = {}
+        for ref in self.references(bare):
+            entry = files.setdefault(ref["path"], {"path": ref["path"], "lines": [], "kinds": set()})
+            entry["lines"].append(ref["line"])
+            entry["kinds"].add(ref["kind"])
+        for path, entry in files.items():
+            entry["direct"] = path in defining or path in importers
+            entry["breaks_import"] = importers.get(path) == "import"
+            entry["kinds"] = sorted(entry["kinds"])
+        ordered = sorted(files.values(), key=lambda item: (not item["direct"], item["path"]))
+        return {"name": name, "definitions": defs, "files": ordered}
+
+    def change_risk(
+        self,
+        changed: dict[str, list[tuple[int, int]]],
+        added: dict[str, list[tuple[int, int]]] | None = None,
+        new_files: set[str] | frozenset = frozenset(),
+    ) -> list[dict]:
+        """Per changed file: the existing definitions its changed lines touch and the files that import them.
+
+        Only direct users count (files importing the defining module or the
+        definition's top-level name), since a bare name like `get` is referenced
+        everywhere. New files and definitions lying wholly inside added-only hunks
+        cannot break a caller and are skipped.
+        """
+        added = added or {}
+        risks = []
+        for path, ranges in sorted(changed.items()):
+            if path in new_files:
+                continue
+            row = self.conn.execute("SELECT id, module FROM files WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                continue
+            file_id, module = row
+            touched = {}
+            for name, qualname, kind, line, end_line in self.conn.execute(
+                "SELECT name, qualname, kind, line, end_line FROM symbols WHERE file_id = ?", (file_id,)
+            ):
+                if name.startswith("__") and name.endswith("__"):
+                    continue
+                if any(start <= line and end_line <= end for start, end in added.get(path, ())):
+                    continue
+                if any(start <= end_line and line <= end for start, end in ranges):
+                    touched[qualname] = (name, kind)
+            symbols = []
+            score = 0.0
+            for qualname, (name, kind) in touched.items():
+                importers = self.importers({module}, qualname.split(".", 1)[0])
+                counts = {
+                    ref_path: uses
+                    for ref_path, uses in self.conn.execute(
+                        "SELECT f.path, COUNT(*) FROM refs r JOIN files f ON f.id = r.file_id"
+                        " WHERE r.name = ? AND r.file_id != ? GROUP BY f.path",
+                        (name, file_id),
+                    )
+                    if ref_path in importers
+                }
+                if not counts:
+                    continue
+                score += len(counts)
+                symbols.append({"qualname": qualname, "kind": kind, "files": len(counts), "uses": sum(counts.values())})
+            symbols.sort(key=lambda item: -item["files"])
+            level = next((label for minimum, label in RISK_LEVELS if score >= minimum), "None")
+            risks.append({"path": path, "level": level, "score": round(score, 1), "symbols": symbols})
+        risks.sort(key=lambda item: (-item["score"], item["path"]))
+        return risks
+
+
+def parse_diff(diff: str) -> tuple[dict, dict, set[str]]:
+    """Changed line ranges, added-only ranges and new files of a unified diff.
+
+    Ranges are inclusive new-side line numbers, merged when adjacent. A line is
+    added-only when no line was removed in the same run of changes, so -U0 hunks
+    that delete nothing and pure insertions between context lines qualify.
+    """
+    changed: dict[str, list[tuple[int, int]]] = {}
+    added: dict[str, list[tuple[int, int]]] = {}
+    new_files: set[str] = set()
+    lines = diff.split("\n")
+    current = None
+    created = removed = False
+    new_line = old_left = new_left = 0
+
+    def add(target: dict, start: int, end: int) -> None:
+        ranges = target.setdefault(current, [])
+        if ranges and ranges[-1][1] + 1 >= start:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if old_left > 0 or new_left > 0:
+            tag = line[:1]
+            if tag == "+":
+                add(changed, new_line, new_line)
+                if not removed:
+                    add(added, new_line, new_line)
+                new_line += 1
+                new_left -= 1
+            elif tag == "-":
+                removed = True
+                old_left -= 1
+            elif tag == " " or not line:
+                removed = False
+                new_line += 1
+                old_left -= 1
+                new_left -= 1
+            continue
+        if line.startswith("--- "):
+            created = line[4:].split("\t", 1)[0] == "/dev/null"
+            continue
+        if line.startswith("+++ "):
+            path = line[4:].split("\t", 1)[0]
+            current = None if path == "/dev/null" else path[2:] if path.startswith("b/") else path
+            if current and created:
+                new_files.add(current)
+            continue
+        match = HUNK_PATTERN.match(line)
+        if not match or current is None:
+            continue
+        old_left = int(match.group(1)) if match.group(1) is not None else 1
+        new_line = int(match.group(2))
+        new_left = int(match.group(3)) if match.group(3) is not None else 1
+        removed = False
+        # Fast path for context-free hunks (git diff -U0): when the next
+        # old + new lines are all -/+ lines, the added lines are exactly the
+        # header's new range and the body need not be walked line by line.
+        body = lines[i:i + old_left + new_left]
+        if len(body) == old_left + new_left and not CONTEXT_LINE.search("\n".join(body)):
+            if new_left:
+                add(changed, new_line, new_line + new_left - 1)
+                if not old_left:
+                    add(added, new_line, new_line + new_left - 1)
+            i += old_left + new_left
+            old_left = new_left = 0
+    return changed, added, new_files
+
+
+def git_diff(base: str, root: Path) -> str:
+    """Zero-context diff between base and HEAD."""
+    return subprocess.run(
+        ["git", "diff", "-U0", f"{base}...HEAD"], cwd=root, capture_output=True, text=True, check=True
+    ).stdout
+
+
+def render_risk(risks: list[dict], limit: int = 20) -> list[str]:
+    rows = ["| File | Risk | Changed symbols imported elsewhere |", "| --- | --- | --- |"]
+    for item in risks[:limit]:
+        used = ", ".join(f"`{symbol['qualname']}` ({symbol['files']} files)" for symbol in item["symbols"][:4])
+        more = len(item["symbols"]) - 4
+        if more > 0:
+            used += f", +{more} more"
+        rows.append(f"| {item['path']} | {item['level']} | {used or '-'} |")
+    if len(risks) > limit:
+        rows.append(f"| {len(risks) - limit} more files | - | - |")
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query a cross-file symbol index (definitions and references).")
+    parser.add_argument("command", choices=["update", "defs", "callers", "refs", "rename", "risk"], help="Query to run")
+    parser.add_argument("name", nargs="?", help="Symbol name or Class.method (defs, callers, refs, rename)")
+    parser.add_argument("--root", default=".", help="Repository root (default: .)")
+    parser.add_argument("--index", help=f"Index database (default: {DEFAULT_INDEX} in root)")
+    parser.add_argument("--jobs", type=int, help="Parser processes for the update (default: CPU count)")
+    parser.add_argument("--no-update", action="store_true", help="Query the index as is, without re-scanning")
+    parser.add_argument("--base", default="main", help="Base branch for risk")
+    parser.add_argument("--limit", type=int, default=50, help="Most rows to print")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.command not in ("update", "risk") and not args.name:
+        parser.error(f"{args.command} needs a symbol name")
+    root = Path(args.root)
+    with SymbolIndex(root, Path(args.index) if args.index else None) as index:
+        if not args.no_update or args.command == "update":
+            start = time.perf_counter()
+            stats = index.update(args.jobs)
+            elapsed = time.perf_counter() - start
+            for error in stats["errors"][:20]:
+                print(f"Skipped {error}")
+            if args.command == "update" or stats["parsed"] or stats["removed"]:
+                totals = index.totals()
+                print(
+                    f"Indexed {stats['files']:,} files in {elapsed:.2f}s ({stats['parsed']:,} parsed, "
+                    f"{stats['removed']:,} removed): {totals['symbols']:,} definitions, {totals['refs']:,} references"
+                )
+        if args.command == "update":
+            return 0
+
+        start = time.perf_counter()
+        if args.command == "defs":
+            result = index.definitions(args.name)
+        elif args.command in ("callers", "refs"):
+            kinds = ("call",) if args.command == "callers" else None
+            result = index.references(args.name.rsplit(".", 1)[-1], kinds)
+        elif args.command == "rename":
+            result = index.impact(args.name)
+        else:
+            try:
+                result = index.change_risk(*parse_diff(git_diff(args.base, root)))
+            except (OSError, subprocess.CalledProcessError) as exc:
+                print(f"git diff against {args.base} failed: {exc}")
+                return 1
+        elapsed = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    if args.command == "defs":
+        for item in result[: args.limit]:
+            print(f"{item['path']}:{item['line']}  {item['kind']} {item['qualname']}")
+        print(f"{len(result)} definitions ({elapsed:.1f} ms)")
+    elif args.command in ("callers", "refs"):
+        for item in result[: args.limit]:
+            scope = f"  in {item['scope']}" if item["scope"] else ""
+            print(f"{item['path']}:{item['line']}  {item['kind']}{scope}")
+        label = "call sites" if args.command == "callers" else "references"
+        print(f"{len(result)} {label} in {len({item['path'] for item in result})} files ({elapsed:.1f} ms)")
+    elif args.command == "rename":
+        for item in result["definitions"]:
+            print(f"defined at {item['path']}:{item['line']}  {item['kind']} {item['qualname']}")
+        if len(result["definitions"]) > 1:
+            print(f"{len(result['definitions'])} definitions share this name; name-only matches may be any of them")
+        for item in result["files"][: args.limit]:
+            lines = ", ".join(str(line) for line in item["lines"][:8]) + (" ..." if len(item["lines"]) > 8 else "")
+            match = "imports it" if item["breaks_import"] else "direct" if item["direct"] else "name-only"
+            print(f"{item['path']}: {len(item['lines'])} uses ({match}; lines {lines})")
+        direct = sum(1 for item in result["files"] if item["direct"])
+        print(
+            f"Renaming {args.name} touches {len(result['files'])} files "
+            f"({direct} direct, {len(result['files']) - direct} name-only) ({elapsed:.1f} ms)"
+        )
+    else:
+        if not result:
+            print(f"No indexed files changed against {args.base}.")
+        else:
+            print("\n".join(render_risk(result, args.limit)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,312 @@
+# Parallel git bisect driver for debug reports.
+#
+# Finds the first bad commit between a good and a bad revision by running a
+# reproduction command, using the `git bisect run` exit codes: 0 is good, 125
+# means the commit cannot be tested, and any other code below 128 is bad.
+# Each of N git worktrees tests one candidate at a time, and N candidates
+# spread across the open range run at once. When a result narrows the range,
+# tests outside it are killed and their workers move to the widest remaining
+# gap, so the range shrinks by about a factor of N+1 per round of repro
+# runs. Results are cached per (command, commit) under the repository's git
+# directory, so re-runs and overlapping ranges do not re-test commits. Only
+# real exit codes are cached: a timeout or kill depends on --repro-timeout and
+# machine load, so those commits are tested again next time.
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+import hashlib
+import json
+import os
+import queue
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+CACHE_VERSION = 2
+SKIP_CODE = 125
+
+
+def git(repo: Path, *args: str) -> str:
+    result = subprocess.run(["git", "-C", str(repo), *args], capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def candidates(repo: Path, good: str, bad: str, first_parent: bool = False) -> list[str]:
+    """Commits after good up to and including bad, oldest first."""
+    args = ["rev-list", "--reverse", "--topo-order", "--ancestry-path"]
+    if first_parent:
+        args.append("--first-parent")
+    commits = git(repo, *args, f"{good}..{bad}").split()
+    if not commits:
+        raise RuntimeError(f"No commits in {good[:12]}..{bad[:12]}; the bad revision must descend from the good one")
+    return commits
+
+
+def classify(code: int | None) -> str:
+    if code == 0:
+        return "good"
+    if code is None or code == SKIP_CODE or code >= 128 or code < 0:
+        return "skip"
+    return "bad"
+
+
+def cacheable(code: int | None) -> bool:
+    """Exit codes that describe the commit rather than the run (no timeout, no signal)."""
+    return code is not None and 0 <= code < 128
+
+
+class ResultCache:
+    """(command, commit) -> good/bad/skip, persisted next to the repository's git data."""
+
+    def __init__(self, path: Path | None, command: str) -> None:
+        self.path = path
+        self.key = hashlib.sha256(command.encode("utf-8")).hexdigest()[:16]
+        self.data: dict = {"version": CACHE_VERSION, "commands": {}}
+        if path is not None and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == CACHE_VERSION:
+                    self.data = data
+            except (OSError, ValueError):
+                pass
+        self.results: dict[str, str] = self.data["commands"].setdefault(self.key, {})
+        self.lock = threading.Lock()
+
+    def get(self, commit: str) -> str | None:
+        return self.results.get(commit)
+
+    def put(self, commit: str, status: str) -> None:
+        with self.lock:
+            self.results[commit] = status
+            self.save()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        temp = self.path.with_name(self.path.name + ".tmp")
+        temp.write_text(json.dumps(self.data), encoding="utf-8")
+        os.replace(temp, self.path)
+
+
+class Worktrees:
+    """A pool of detached worktrees, one per concurrent test."""
+
+    def __init__(self, repo: Path, count: int, start: str) -> None:
+        self.repo = repo
+        self.root = Path(tempfile.mkdtemp(prefix="bisect-"))
+        self.paths = []
+        for number in range(count):
+            path = self.root / f"wt{number}"
+            git(repo, "worktree", "add", "--detach", "--quiet", str(path), start)
+            self.paths.append(path)
+        self.free: queue.Queue[Path] = queue.Queue()
+        for path in self.paths:
+            self.free.put(path)
+
+    def close(self) -> None:
+        for path in self.paths:
+            try:
+                git(self.repo, "worktree", "remove", "--force", str(path))
+            except RuntimeError:
+                pass
+        try:
+            git(self.repo, "worktree", "prune")
+            self.root.rmdir()
+        except (RuntimeError, OSError):
+            pass
+
+
+def kill(process: subprocess.Popen) -> None:
+    """Kills the repro command and anything it started (it runs in its own session)."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class Bisector:
+    def __init__(self, repo: Path, commits: list[str], command: str, jobs: int,
+                 cache: ResultCache, timeout: float | None = None, clean: bool = False) -> None:
+        self.repo = repo
+        self.commits = commits
+        self.command = command
+        self.jobs = max(1, jobs)
+        self.cache = cache
+        self.timeout = timeout
+        self.clean = clean
+        self.processes: dict[int, subprocess.Popen] = {}
+        self.cancelled: set[int] = set()
+        self.lock = threading.Lock()
+        self.tests: list[dict] = []
+
+    def _test(self, worktrees: Worktrees, index: int) -> tuple[int, str, float, int | None]:
+        commit = self.commits[index]
+        path = worktrees.free.get()
+        started = time.perf_counter()
+        try:
+            git(path, "checkout", "--force", "--detach", "--quiet", commit)
+            if self.clean:
+                git(path, "clean", "-fdxq")
+            with self.lock:
+                if index in self.cancelled:
+                    return index, "cancelled", 0.0, None
+                process = subprocess.Popen(
+                    self.command, shell=True, cwd=path,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+                )
+                self.processes[index] = process
+            try:
+                code = process.wait(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                kill(process)
+                process.wait()
+                code = None
+            with self.lock:
+                self.processes.pop(index, None)
+                if index in self.cancelled:
+                    return index, "cancelled", time.perf_counter() - started, None
+            return index, classify(code), time.perf_counter() - started, code
+        finally:
+            worktrees.free.put(path)
+
+    def _cancel_outside(self, low: int, high: int) -> None:
+        with self.lock:
+            for index, process in list(self.processes.items()):
+                if not low < index < high:
+                    self.cancelled.add(index)
+                    kill(process)
+
+    def _pick(self, low: int, high: int, status: dict[int, str], running: set[int]) -> int | None:
+        """Untested commit nearest the middle of the widest gap between known results and running tests."""
+        marks = sorted({low, high} | {index for index in running if low < index < high})
+        best = None
+        best_gap = 1
+        for left, right in zip(marks, marks[1:]):
+            if right - left <= best_gap:
+                continue
+            middle = (left + right) // 2
+            # Step off commits already known to be untestable.
+            open_indexes = [index for index in range(left + 1, right) if index not in status]
+            if open_indexes:
+                best = min(open_indexes, key=lambda index: abs(index - middle))
+                best_gap = right - left
+        return best
+
+    def run(self, on_result=None) -> dict:
+        """Returns the first bad commit (or the untestable range hiding it) and every test run."""
+        start = time.perf_counter()
+        low, high = -1, len(self.commits) - 1  # commits[low] good (-1 = the good revision), commits[high] bad
+        status: dict[int, str] = {high: "bad"}
+        for index, commit in enumerate(self.commits):
+            cached = self.cache.get(commit)
+            if cached:
+                status[index] = cached
+                self.tests.append({"commit": commit, "status": cached, "seconds": 0.0, "cached": True})
+        low = max([index for index, value in status.items() if value == "good"], default=-1)
+        high = min([index for index, value in status.items() if value == "bad" and index > low], default=high)
+
+        if self._pick(low, high, status, set()) is None:
+            return self._result(low, high, status, start)
+        worktrees = Worktrees(self.repo, min(self.jobs, high - low - 1), self.commits[high])
+        try:
+            with ThreadPoolExecutor(max_workers=len(worktrees.paths)) as pool:
+                running: dict = {}
+                while True:
+                    while len(running) < len(worktrees.paths):
+                        index = self._pick(low, high, status, set(running.values()))
+                        if index is None:
+                            break
+                        running[pool.submit(self._test, worktrees, index)] = index
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        running.pop(future)
+                        index, result, seconds, code = future.result()
+                        if result == "cancelled":
+                            continue
+                        status[index] = result
+                        if cacheable(code):
+                            self.cache.put(self.commits[index], result)
+                        test = {"commit": self.commits[index], "status": result, "seconds": seconds, "cached": False}
+                        self.tests.append(test)
+                        if result == "good" and index > low:
+                            low = index
+                        elif result == "bad" and index < high:
+                            high = index
+                        if on_result:
+                            on_result(test, high - low - 1)
+                    self._cancel_outside(low, high)
+        finally:
+            worktrees.close()
+        return self._result(low, high, status, start)
+
+    def _result(self, low: int, high: int, status: dict[int, str], start: float) -> dict:
+        skipped = [self.commits[index] for index in range(low + 1, high) if status.get(index) == "skip"]
+        return {
+            "first_bad": self.commits[high],
+            "last_good": self.commits[low] if low >= 0 else None,
+            # Untestable commits between the last good and first bad may hide the real culprit.
+            "skipped": skipped,
+            "tests": self.tests,
+            "candidates": len(self.commits),
+            "seconds": time.perf_counter() - start,
+        }
+
+
+def commit_summary(repo: Path, commit: str) -> dict:
+    fields = git(repo, "show", "-s", "--format=%H%x00%h%x00%s%x00%an%x00%aI", commit).split("\0")
+    return dict(zip(["sha", "short", "subject", "author", "date"], fields))
+
+
+def bisect(repo: Path, good: str, bad: str, command: str, jobs: int = 1, timeout: float | None = None,
+           cache_path: Path | None = None, first_parent: bool = False, clean: bool = False,
+           on_result=None) -> dict:
+    good_sha = git(repo, "rev-parse", "--verify", f"{good}^{{commit}}")
+    bad_sha = git(repo, "rev-parse", "--verify", f"{bad}^{{commit}}")
+    commits = candidates(repo, good_sha, bad_sha, first_parent)
+    cache = ResultCache(cache_path, command)
+    result = Bisector(repo, commits, command, jobs, cache, timeout, clean).run(on_result)
+    result.update(good=good_sha, bad=bad_sha, command=command, commit=commit_summary(repo, result["first_bad"]))
+    return result
+
+
+def default_cache(repo: Path) -> Path:
+    common = Path(git(repo, "rev-parse", "--git-common-dir"))
+    return (common if common.is_absolute() else repo / common) / "bisect-cache.json"
+
+
+def render_steps(result: dict) -> str:
+    commit = result["commit"]
+    return "\n".join([
+        f"1. `git checkout {commit['short']}` (first bad commit; `{result['good'][:12]}` is good)",
+        f"2. Run `{result['command']}` (exit 0 = good)",
+    ])
+
+
+def render_root_cause(result: dict) -> str:
+    commit = result["commit"]
+    ran = [test for test in result["tests"] if not test["cached"]]
+    cached = len(result["tests"]) - len(ran)
+    lines = [
+        f"First bad commit: `{commit['short']}` {commit['subject']} ({commit['author']}, {commit['date']})",
+        "",
+        f"- Bisected {result['candidates']} commits in {len(ran)} runs ({cached} cached) "
+        f"over {result['seconds'] / 60:.1f} min",
+    ]
+    if result["skipped"]:
+        shorts = ", ".join(sha[:12] for sha in result["skipped"][:10])
+        lines.append(f"- Untestable commits before it (exit 125 or timeout) may hide the culprit: {shorts}")
+    lines.append(f"- Inspect with `git show {commit['short']}`")
+    return "\n".join(lines)
+
+
+def render_regression(result: dict) -> str:
+    return (
+        f"- Turn `{result['command']}` into a regression test: it passes at "
+        f"`{result['good'][:12]}` and fails from `{result['commit']['short']}` on"
+    )
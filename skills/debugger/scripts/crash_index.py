@@ -0,0 +1,331 @@
+# Stack-trace fingerprints for debug reports.
+#
+# Finds Python tracebacks and JavaScript stacks in memory-mapped log files at
+# the marker offsets recorded by the log_triage scan (or by searching for the
+# markers with mmap.find when no scan ran), so only the lines around a hit
+# are parsed. Each frame is normalised to (file, function): line and
+# column numbers, addresses, hashes and temp/checkout path prefixes are
+# stripped. The frames and exception types are hashed into a fingerprint.
+# Fingerprints live in a persistent JSON index keyed by fingerprint, so a
+# crash seen in an earlier run or incident is matched with one dict lookup
+# and the report can link to where it was seen before.
+
+from datetime import datetime, timezone
+from pathlib import Path
+import hashlib
+import json
+import mmap
+import os
+import re
+
+from log_triage import JS_FRAME, PY_HEAD, format_time, parse_stamp, stack_markers
+
+INDEX_VERSION = 1
+PY_HEAD_TEXT = PY_HEAD.decode()
+CHAIN_MARKERS = (
+    "During handling of the above exception, another exception occurred:",
+    "The above exception was the direct cause of the following exception:",
+)
+MAX_FRAMES = 30
+MAX_LINES = 400
+LOOKBACK_LINES = 3
+
+PY_FRAME = re.compile(r'^\s*File "(?P<file>[^"]+)", line \d+(?:, in (?P<func>.+))?$')
+JS_AT = re.compile(r"^\s+at (?:(?P<func>.+?) \()?(?P<loc>[^()]+?)\)?$")
+EXCEPTION = re.compile(r"(?P<type>[A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Warning|Fault))\b:?\s*(?P<msg>.*)")
+LOCATION_SUFFIX = re.compile(r"(?::\d+){1,2}$")
+TEMP_PREFIX = re.compile(
+    r"^(?:/tmp|/var/tmp|/dev/shm|/private/var/folders/[^/]+/[^/]+|/var/folders/[^/]+/[^/]+"
+    r"|[A-Za-z]:[\\/]Users[\\/][^\\/]+[\\/]AppData[\\/]Local[\\/]Temp)[\\/][^\\/]+"
+)
+PACKAGE_PREFIX = re.compile(r"^.*?[\\/](site-packages|dist-packages|node_modules)[\\/]")
+STDLIB_PREFIX = re.compile(r"^.*?[\\/]lib[\\/]python\d+(?:\.\d+)?[\\/]")
+ADDRESS = re.compile(r"0x[0-9a-fA-F]+")
+HEX_RUN = re.compile(r"(?<![0-9a-zA-Z])[0-9a-f]{8,}(?![0-9a-zA-Z])|\.[0-9a-f]{6,}(?=\.)")
+QUERY = re.compile(r"[?#].*$")
+DIGITS = re.compile(r"\d+")
+
+
+def normalize_path(path: str) -> str:
+    """Drop temp dirs, install and checkout prefixes, hashes and query strings."""
+    path = QUERY.sub("", path.replace("webpack:///", "").replace("file://", ""))
+    path = TEMP_PREFIX.sub("<tmp>", path)
+    path = PACKAGE_PREFIX.sub(lambda match: match.group(1) + "/", path)
+    path = STDLIB_PREFIX.sub("<stdlib>/", path)
+    path = HEX_RUN.sub(lambda match: ".<hash>" if match.group(0).startswith(".") else "<hex>", path)
+    parts = re.split(r"[\\/]", path)
+    if not path.startswith(("<tmp>", "<stdlib>", "site-packages", "dist-packages", "node_modules")):
+        # Absolute checkout locations differ per machine; the tail identifies the file.
+        parts = parts[-3:]
+    return "/".join(part for part in parts if part)
+
+
+def normalize_function(name: str) -> str:
+    name = ADDRESS.sub("0x?", name.strip())
+    return HEX_RUN.sub("<hex>", name)
+
+
+def fingerprint(kind: str, segments: list[dict]) -> str:
+    hasher = hashlib.sha1(kind.encode("utf-8"))
+    for segment in segments:
+        hasher.update(f"\n{segment['type']}".encode("utf-8"))
+        for file, function in segment["frames"]:
+            hasher.update(f"\n{file}:{function}".encode("utf-8"))
+    return hasher.hexdigest()[:16]
+
+
+def collapse(frames: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Keep the innermost MAX_FRAMES frames, with direct recursion collapsed."""
+    collapsed: list[tuple[str, str]] = []
+    for frame in frames:
+        if not collapsed or collapsed[-1] != frame:
+            collapsed.append(frame)
+    return collapsed[-MAX_FRAMES:]
+
+
+def read_lines(view, start: int, limit: int = MAX_LINES):
+    """Decoded lines from a byte offset, with the offset after each."""
+    position = start
+    size = len(view)
+    for _ in range(limit):
+        if position >= size:
+            return
+        end = view.find(b"\n", position)
+        end = size if end < 0 else end
+        yield view[position:end].decode("utf-8", errors="replace").rstrip("\r"), end + 1
+        position = end + 1
+
+
+def line_start(view, offset: int) -> int:
+    return view.rfind(b"\n", 0, offset) + 1
+
+
+def stamp_before(view, offset: int, year: int) -> int | None:
+    """Timestamp of the line at offset or of one of the few lines before it."""
+    start = line_start(view, offset)
+    for _ in range(LOOKBACK_LINES + 1):
+        end = view.find(b"\n", start)
+        epoch, _ = parse_stamp(view[start:end if end >= 0 else len(view)], year)
+        if epoch is not None:
+            return epoch
+        if start == 0:
+            return None
+        start = line_start(view, start - 1)
+    return None
+
+
+def parse_python(view, offset: int) -> tuple[list[dict], int]:
+    """Segments of a (possibly chained) traceback starting at offset, and where it ends."""
+    segments: list[dict] = []
+    frames: list[tuple[str, str]] = []
+    end = offset
+    expecting_chain = chained = False
+    for line, after in read_lines(view, offset):
+        stripped = line.strip()
+        if expecting_chain:
+            # After the exception line only an explicit chain marker continues the crash.
+            if not stripped:
+                continue
+            if stripped in CHAIN_MARKERS:
+                chained = True
+                continue
+            if not (chained and stripped.endswith(PY_HEAD_TEXT)):
+                break
+            expecting_chain = chained = False
+        if stripped.endswith(PY_HEAD_TEXT):
+            frames = []
+            end = after
+            continue
+        frame = PY_FRAME.match(line)
+        if frame:
+            frames.append((normalize_path(frame.group("file")), normalize_function(frame.group("func") or "?")))
+            end = after
+            continue
+        if line[:1] in (" ", "\t") or not stripped:
+            # Source line under a frame, or a caret marker.
+            end = after
+            continue
+        match = EXCEPTION.search(stripped)
+        segments.append({
+            "type": match.group("type") if match else stripped.split(":", 1)[0][:80],
+            "message": (match.group("msg") if match else stripped)[:300],
+            "frames": collapse(frames),
+        })
+        end = after
+        expecting_chain = True
+    return segments, end
+
+
+def parse_javascript(view, offset: int) -> tuple[list[dict], int]:
+    """The stack whose first "    at" line follows offset (a newline), with its header line."""
+    header_start = line_start(view, offset)
+    header_end = view.find(b"\n", header_start)
+    header = view[header_start:header_end].decode("utf-8", errors="replace").strip()
+    frames: list[tuple[str, str]] = []
+    end = offset + 1
+    for line, after in read_lines(view, offset + 1):
+        match = JS_AT.match(line)
+        if not match:
+            break
+        location = LOCATION_SUFFIX.sub("", match.group("loc").strip())
+        if " " in location:
+            # Not a file: "native", "index 0", "<anonymous>" and the like.
+            location = DIGITS.sub("#", location)
+        function = match.group("func") or "<anonymous>"
+        frames.append((normalize_path(location), normalize_function(function)))
+        end = after
+    if not frames:
+        return [], end
+    match = EXCEPTION.search(header)
+    segment = {
+        "type": match.group("type") if match else DIGITS.sub("#", header)[:80] or "Error",
+        "message": (match.group("msg") if match else header)[:300],
+        # JS stacks list the innermost frame first; store outermost first like Python.
+        "frames": collapse(list(reversed(frames))),
+    }
+    return [segment], end
+
+
+def extract_crashes(paths: list[Path], stacks: dict | None = None) -> dict[str, dict]:
+    """Unique crashes by fingerprint, with counts and first/last timestamps.
+
+    stacks maps a path to the (Python, JavaScript) marker offsets found by
+    log_triage.triage(); paths without them are searched here.
+    """
+    year = datetime.now(timezone.utc).year
+    crashes: dict[str, dict] = {}
+
+    def record(kind: str, segments: list[dict], epoch: int | None, source: str) -> None:
+        if not segments:
+            return
+        key = fingerprint(kind, segments)
+        crash = crashes.get(key)
+        if crash is None:
+            last = segments[-1]
+            crash = crashes[key] = {
+                "fingerprint": key,
+                "kind": kind,
+                "type": last["type"],
+                "message": last["message"],
+                "causes": [segment["type"] for segment in segments[:-1]],
+                "frames": [f"{file}:{function}" for file, function in last["frames"][-5:]],
+                "count": 0,
+                "first_seen": epoch,
+                "last_seen": epoch,
+                "source": source,
+            }
+        crash["count"] += 1
+        if epoch is not None:
+            if crash["first_seen"] is None or epoch < crash["first_seen"]:
+                crash["first_seen"] = epoch
+            if crash["last_seen"] is None or epoch > crash["last_seen"]:
+                crash["last_seen"] = epoch
+
+    for path in paths:
+        if path.stat().st_size == 0:
+            continue
+        with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if stacks and str(path) in stacks:
+                python, javascript = stacks[str(path)]
+            else:
+                python, javascript = [], []
+                stack_markers(view, 0, len(view), python, javascript)
+            position = 0
+            for hit in python:
+                if hit < position:
+                    continue
+                segments, position = parse_python(view, line_start(view, hit))
+                position = max(position, hit + len(PY_HEAD))
+                record("python", segments, stamp_before(view, hit, year), str(path))
+            position = 0
+            for hit in javascript:
+                if hit < position:
+                    continue
+                segments, position = parse_javascript(view, hit)
+                position = max(position, hit + len(JS_FRAME))
+                record("javascript", segments, stamp_before(view, hit, year), str(path))
+    return crashes
+
+
+class CrashIndex:
+    """Persistent fingerprint -> crash history, shared across runs and incidents."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == INDEX_VERSION:
+                    self.entries = data.get("fingerprints", {})
+            except (OSError, ValueError):
+                pass
+
+    def lookup(self, key: str) -> dict | None:
+        return self.entries.get(key)
+
+    def record(self, crashes: dict[str, dict], incident: str, report: str) -> None:
+        seen = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        for key, crash in crashes.items():
+            entry = self.entries.setdefault(key, {
+                "type": crash["type"],
+                "message": crash["message"],
+                "frames": crash["frames"],
+                "count": 0,
+                "first_seen": crash["first_seen"],
+                "last_seen": crash["last_seen"],
+                "incidents": [],
+            })
+            # Re-running the same report replaces its earlier occurrence instead of adding to it.
+            incidents = [item for item in entry["incidents"] if item["report"] != report]
+            replaced = sum(item["count"] for item in entry["incidents"] if item["report"] == report)
+            entry["count"] += crash["count"] - replaced
+            for field, pick in (("first_seen", min), ("last_seen", max)):
+                values = [value for value in (entry[field], crash[field]) if value is not None]
+                entry[field] = pick(values) if values else None
+            occurrence = {"incident": incident, "report": report, "recorded": seen, "count": crash["count"]}
+            entry["incidents"] = (incidents + [occurrence])[-20:]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(self.path.name + ".tmp")
+        temp.write_text(
+            json.dumps({"version": INDEX_VERSION, "fingerprints": self.entries}, ensure_ascii=False, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(temp, self.path)
+
+
+def cell(text: str, limit: int = 100) -> str:
+    text = text if len(text) <= limit else text[: limit - 1] + "…"
+    return text.replace("|", "\\|").replace("`", "'")
+
+
+def render_crashes(crashes: dict[str, dict], known: dict[str, dict], top: int, report: str) -> str:
+    """Markdown table of unique crashes, most frequent first, linked to earlier incidents."""
+    if not crashes:
+        return "No Python tracebacks or JavaScript stacks found."
+    ordered = sorted(crashes.values(), key=lambda crash: (-crash["count"], crash["first_seen"] or 0))
+    total = sum(crash["count"] for crash in ordered)
+    lines = [
+        f"{total:,} stack traces, {len(ordered):,} unique crashes "
+        f"({sum(1 for crash in ordered if crash['fingerprint'] in known)} seen in earlier runs).",
+        "",
+        "| Fingerprint | Exception | Crash site | Count | First seen | Last seen | Seen before |",
+        "| --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for crash in ordered[:top]:
+        previous = known.get(crash["fingerprint"])
+        history = "new"
+        if previous:
+            earlier = [item for item in previous["incidents"] if item["report"] != report]
+            if earlier:
+                history = ", ".join(f"{item['incident']} ({item['report']})" for item in earlier[-3:])
+        exception = crash["type"] + (f" (from {', '.join(crash['causes'])})" if crash["causes"] else "")
+        site = crash["frames"][-1] if crash["frames"] else "-"
+        lines.append(
+            f"| `{crash['fingerprint']}` | `{cell(exception, 60)}`: {cell(crash['message'], 80)} "
+            f"| `{cell(site, 60)}` | {crash['count']:,} | {format_time(crash['first_seen'])} "
+            f"| {format_time(crash['last_seen'])} | {cell(history, 120)} |"
+        )
+    return "\n".join(lines)
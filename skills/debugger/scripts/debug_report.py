@@ -1,9 +1,27 @@
 #!/usr/bin/env python3
 # Template generator for debug report.
+#
+# With --log, the log files are triaged by log_triage (memory-mapped single
+# pass, Drain-style templates, per-window counts). The top anomalous clusters
+# fill Logs and Evidence, and the earliest anomalous error signature is
+# proposed under Root Cause. Python and JavaScript stack traces in the same
+# logs are deduplicated by fingerprint (crash_index) and matched against a
+# persistent index, so crashes from earlier incidents are linked.
+#
+# With --bisect-good/--bisect-bad/--repro, bisect_driver finds the first bad
+# commit by running the repro command in parallel git worktrees, and fills
+# Steps to Reproduce, Root Cause and Regression Tests from it.
 
 from pathlib import Path
 import argparse
+import os
+import re
 import textwrap
+import time
+
+import bisect_driver
+from crash_index import CrashIndex, extract_crashes, render_crashes
+from log_triage import parse_window, render_evidence, render_root_cause, score_clusters, triage
 
 
 def write_output(path: Path, content: str, force: bool) -> bool:
@@ -20,18 +38,110 @@ def main() -> int:
     parser.add_argument("--output", default="debug-report.md", help="Output file path")
     parser.add_argument("--name", default="example", help="Issue summary")
     parser.add_argument("--owner", default="team", help="Owning team")
+    parser.add_argument("--log", action="append", default=[], help="Log file to triage (repeatable)")
+    parser.add_argument("--window", default="1m", help="Time window for counts, e.g. 30s, 5m, 1h")
+    parser.add_argument("--top", type=int, default=10, help="Number of anomalous clusters to list")
+    parser.add_argument("--jobs", type=int, help="Scanner processes for large logs (default: CPU count)")
+    parser.add_argument("--crash-index", help="Fingerprint index (default: .crash-index.json beside the output)")
+    parser.add_argument("--no-crash-index", action="store_true", help="Do not read or update the fingerprint index")
+    parser.add_argument("--bisect-good", help="Known good revision for bisecting")
+    parser.add_argument("--bisect-bad", default="HEAD", help="Known bad revision for bisecting (default: HEAD)")
+    parser.add_argument("--repro", help="Repro command: exit 0 = good, 125 = untestable, other = bad")
+    parser.add_argument("--repo", default=".", help="Git repository to bisect")
+    parser.add_argument("--bisect-jobs", type=int, help="Commits tested in parallel (default: CPU count)")
+    parser.add_argument("--repro-timeout", type=float, help="Seconds before a repro run counts as untestable")
+    parser.add_argument("--first-parent", action="store_true", help="Bisect only the first-parent history")
+    parser.add_argument("--clean", action="store_true", help="Run git clean -fdx in the worktree before each test")
+    parser.add_argument("--no-bisect-cache", action="store_true", help="Do not read or update cached repro results")
     parser.add_argument("--force", action="store_true", help="Overwrite existing file")
     args = parser.parse_args()
 
-    content = textwrap.dedent(
-        f"""\
+    output = Path(args.output)
+    # Refuse before triaging or bisecting, which can take minutes.
+    if output.exists() and not args.force:
+        print(f"{output} already exists (use --force to overwrite)")
+        return 1
+    if bool(args.bisect_good) != bool(args.repro):
+        print("--bisect-good and --repro must be given together")
+        return 1
+    logs = [Path(value) for value in args.log]
+    missing = [str(path) for path in logs if not path.is_file()]
+    if missing:
+        print(f"Log file not found: {', '.join(missing)}")
+        return 1
+    try:
+        window = parse_window(args.window)
+    except ValueError as exc:
+        print(exc)
+        return 1
+
+    evidence = "- Attach logs, screenshots, traces"
+    root_cause = "TBD"
+    steps = "1. Step one\n2. Step two"
+    regression = "- Add or update tests"
+    index = None
+    crashes = {}
+    if args.repro:
+        repo = Path(args.repo)
+        jobs = args.bisect_jobs or os.cpu_count() or 1
+
+        def progress(test: dict, remaining: int) -> None:
+            print(f"  {test['commit'][:12]} {test['status']:<4} {test['seconds']:.1f}s ({remaining} left to narrow)")
+
+        try:
+            cache_path = None if args.no_bisect_cache else bisect_driver.default_cache(repo)
+            found = bisect_driver.bisect(
+                repo, args.bisect_good, args.bisect_bad, args.repro, jobs=jobs, timeout=args.repro_timeout,
+                cache_path=cache_path, first_parent=args.first_parent, clean=args.clean, on_result=progress,
+            )
+        except RuntimeError as exc:
+            print(exc)
+            return 1
+        steps = bisect_driver.render_steps(found)
+        root_cause = bisect_driver.render_root_cause(found)
+        regression = bisect_driver.render_regression(found)
+        print(f"First bad commit: {found['commit']['short']} {found['commit']['subject']}")
+    if logs:
+        start = time.perf_counter()
+        result = triage(logs, window, args.jobs)
+        elapsed = time.perf_counter() - start
+        ranked = score_clusters(result)
+        if not args.repro:
+            root_cause = render_root_cause(ranked, args.top)
+        else:
+            root_cause += "\n\n### Log Signals\n\n" + render_root_cause(ranked, args.top)
+        print(
+            f"Triaged {result['lines']:,} lines into {len(result['clusters']):,} templates "
+            f"in {elapsed:.1f}s ({result['lines'] / max(elapsed, 1e-9):,.0f} lines/s)"
+        )
+
+        crashes = extract_crashes(logs, result["stacks"])
+        if not args.no_crash_index:
+            index_path = Path(args.crash_index) if args.crash_index else Path(args.output).parent / ".crash-index.json"
+            index = CrashIndex(index_path)
+        known = {}
+        if index is not None:
+            for key in crashes:
+                entry = index.lookup(key)
+                if entry is not None:
+                    known[key] = entry
+        crash_table = render_crashes(crashes, known, args.top, args.output)
+        evidence = (
+            render_evidence(result, ranked, args.top, elapsed)
+            + "\n\n### Unique Crashes\n\n" + crash_table
+            + "\n\n- Attach screenshots, traces"
+        )
+        print(f"Found {len(crashes):,} unique crashes ({len(known)} already in the index)")
+
+    template = textwrap.dedent(
+        """\
         # Debug Report
 
         ## Summary
-        {args.name}
+        {name}
 
         ## Ownership
-        - Owner: {args.owner}
+        - Owner: {owner}
         - On-call: TBD
 
         ## Environment
@@ -40,35 +150,43 @@ def main() -> int:
         - Traffic level:
 
         ## Steps to Reproduce
-        1. Step one
-        2. Step two
+        {steps}
 
         ## Expected vs Actual
         - Expected:
         - Actual:
 
         ## Logs and Evidence
-        - Attach logs, screenshots, traces
+        {evidence}
 
         ## Root Cause
-        TBD
+        {root_cause}
 
         ## Fix
         - Code changes
         - Configuration changes
 
         ## Regression Tests
-        - Add or update tests
+        {regression}
 
         ## Follow-ups
         - Monitoring improvements
         - Runbook updates
         """
     ).strip() + "\n"
+    fields = {
+        "name": args.name, "owner": args.owner, "steps": steps, "evidence": evidence,
+        "root_cause": root_cause, "regression": regression,
+    }
+    # One pass over the template, so braces in log or bisect text are never substituted.
+    content = re.sub(r"\{(\w+)\}", lambda match: fields[match.group(1)], template)
 
-    output = Path(args.output)
     if not write_output(output, content, args.force):
         return 1
+    # Recorded only once the report exists, so the index never points at an unwritten incident.
+    if index is not None and crashes:
+        index.record(crashes, args.name, args.output)
+        index.save()
     print(f"Wrote {output}")
     return 0
 
@@ -0,0 +1,479 @@
+# Log triage for debug reports.
+#
+# Maps log files into memory and reads them in newline-aligned blocks. Large
+# files are split into byte ranges that are scanned by a process pool. Every
+# line is keyed by its bytes with digits deleted, which drops timestamps and
+# numbers in one C call, and counted per time window. Each distinct key is
+# masked once: the timestamp is removed and tokens containing digits become
+# <*>. The distinct messages, usually a few thousand even in very large logs,
+# are then clustered into templates by a Drain-style prefix tree, which
+# keys on token count and leading tokens. Clusters are ranked by severity,
+# burstiness against their own baseline, and late first appearance.
+# Indented continuation lines (stack frames, wrapped output) are counted but
+# not clustered. The same scan records where Python tracebacks and JavaScript
+# stacks start, so crash_index parses only those spots without re-reading the
+# logs.
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from operator import eq
+from pathlib import Path
+import calendar
+import math
+import mmap
+import os
+import re
+
+BLOCK_SIZE = 32 * 1024 * 1024
+# Below this size a single process is faster than starting a pool.
+POOL_THRESHOLD = 64 * 1024 * 1024
+EXAMPLE_LIMIT = 300
+# ISO and syslog timestamps (bracketed or not) fit in the first 20 bytes, so this
+# prefix caches each parsed second.
+STAMP_PREFIX = 20
+STAMP_CACHE = 1 << 20
+DIGITS = b"0123456789"
+WILDCARD = "<*>"
+PY_HEAD = b"Traceback (most recent call last):"
+JS_FRAME = b"\n    at "
+
+ISO_TS = re.compile(
+    rb"\[?(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:[.,]\d+)?(?:Z|[+-]\d\d:?\d\d)?\]?\s*"
+)
+SYSLOG_TS = re.compile(rb"([A-Z][a-z]{2}) ([ \d]\d) (\d\d):(\d\d):(\d\d)\s+")
+MONTHS = {
+    name.encode(): number
+    for number, name in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1
+    )
+}
+# Tokens are split on whitespace and key/value punctuation so "user=42" keeps "user=".
+MASK = re.compile(rb"(?<![^\s=:,;()\[\]\"'])[^\s=:,;()\[\]\"']*?\d[^\s=:,;()\[\]\"']*")
+ERROR_TOKENS = {"ERROR", "ERR", "FATAL", "CRITICAL", "CRIT", "SEVERE", "PANIC", "EMERG", "ALERT"}
+WARN_TOKENS = {"WARN", "WARNING"}
+ERROR_WORDS = re.compile(r"(?:Error|Exception|Traceback|failed|failure|panic|refused|timed? ?out)", re.I)
+
+
+def parse_window(value: str) -> int:
+    """"30s", "5m", "1h" or plain seconds."""
+    match = re.fullmatch(r"(\d+)\s*([smhd]?)", value.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid window: {value}")
+    scale = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+    return max(1, int(match.group(1)) * scale)
+
+
+def format_time(epoch: int | None) -> str:
+    if epoch is None:
+        return "-"
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def split_ranges(path: Path, parts: int) -> list[tuple[int, int]]:
+    """Byte ranges of roughly equal size, each ending just after a newline."""
+    size = path.stat().st_size
+    if size == 0:
+        return []
+    if parts <= 1:
+        return [(0, size)]
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        bounds = [0]
+        for number in range(1, parts):
+            newline = view.find(b"\n", max(bounds[-1], size * number // parts))
+            if newline < 0:
+                break
+            bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def iter_blocks(view, start: int, end: int, block_size: int = BLOCK_SIZE):
+    """Newline-aligned slices of a memory map between start and end."""
+    position = start
+    while position < end:
+        stop = min(end, position + block_size)
+        if stop < end:
+            newline = view.rfind(b"\n", position, stop)
+            if newline < 0:
+                # A single line longer than the block: extend to its end.
+                newline = view.find(b"\n", stop, end)
+            stop = newline + 1 if newline >= 0 else end
+        yield view[position:stop]
+        position = stop
+
+
+def parse_stamp(line: bytes, year: int) -> tuple[int | None, int]:
+    """(epoch seconds, end of timestamp) for a line starting with an ISO or syslog time."""
+    match = ISO_TS.match(line)
+    if match is not None:
+        fields = [int(value) for value in match.groups()]
+    else:
+        match = SYSLOG_TS.match(line)
+        if match is None:
+            return None, 0
+        month, *rest = match.groups()
+        fields = [year, MONTHS.get(month, 1)] + [int(value) for value in rest]
+    try:
+        return calendar.timegm(fields + [0, 0, 0]), match.end()
+    except (TypeError, ValueError, OverflowError):
+        return None, 0
+
+
+def message_template(line: bytes, year: int) -> bytes:
+    """The masked message of a line: timestamp removed, digit-bearing tokens as <*>."""
+    _, offset = parse_stamp(line, year)
+    return MASK.sub(b"<*>", line[offset:].rstrip(b"\r"))
+
+
+def stack_markers(view, start: int, end: int, python: list[int], javascript: list[int]) -> None:
+    """Append offsets of traceback headers and of the newline before each JS stack's first frame."""
+    position = start
+    while (hit := view.find(PY_HEAD, position, end)) >= 0:
+        python.append(hit)
+        position = hit + len(PY_HEAD)
+    # Slices start after a newline; include it so a stack opening the slice is found.
+    position = max(start - 1, 0)
+    previous = -1
+    while (hit := view.find(JS_FRAME, position, end)) >= 0:
+        # Later frames of a stack are parsed with its first one.
+        if hit != previous:
+            javascript.append(hit)
+        previous = view.find(b"\n", hit + 1, end)
+        position = hit + 1
+
+
+def scan_range(path: str, start: int, end: int, window: int) -> dict:
+    """Count messages per time window in one byte range of a log file.
+
+    The hot loop keys each line on its bytes with digits deleted (bytes.translate,
+    a C call). Timestamps and numbers vanish from the key, so lines differing only
+    in those share one counter, and timestamps are parsed once per distinct
+    second. Lines are counted per window in batches with Counter. Masking runs
+    once per new key, in triage().
+    """
+    messages: dict[bytes, list] = {}
+    times: dict[bytes, int | None] = {}
+    year = datetime.now(timezone.utc).year
+    current = None
+    before = None
+    bucket = -1
+    lines = continuation = 0
+    keys: list[bytes] = []
+    raw: list[bytes] = []
+    python: list[int] = []
+    javascript: list[int] = []
+
+    def flush() -> None:
+        nonlocal before
+        if not keys:
+            return
+        counts = Counter(keys)
+        fresh = counts.keys() - messages.keys()
+        if fresh:
+            # First occurrence of each new key; untimed lines take the last timestamp before
+            # them, or the batch's first timestamp when nothing precedes the batch.
+            last = before
+            if last is None:
+                stamps = (times.get(line[:STAMP_PREFIX]) for line in raw)
+                last = next((epoch for epoch in stamps if epoch is not None), None)
+            for key, line in zip(keys, raw):
+                epoch = times.get(line[:STAMP_PREFIX])
+                if epoch is not None:
+                    last = epoch
+                if key in fresh:
+                    fresh.discard(key)
+                    messages[key] = [last, line[:EXAMPLE_LIMIT], {}]
+                    if not fresh:
+                        break
+        for key, count in counts.items():
+            windows = messages[key][2]
+            windows[bucket] = windows.get(bucket, 0) + count
+        keys.clear()
+        raw.clear()
+        before = current
+
+    missing = object()
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        base = start
+        for block in iter_blocks(view, start, end):
+            # Searched while the block is hot in cache.
+            stack_markers(view, base, base + len(block), python, javascript)
+            base += len(block)
+            for line in block.split(b"\n"):
+                if not line:
+                    continue
+                lines += 1
+                if line[0] in (32, 9):
+                    continuation += 1
+                    continue
+                prefix = line[:STAMP_PREFIX]
+                epoch = times.get(prefix, missing)
+                if epoch is missing:
+                    epoch = parse_stamp(line, year)[0]
+                    if len(times) >= STAMP_CACHE:
+                        times.clear()
+                    times[prefix] = epoch
+                if epoch is not None and epoch != current:
+                    if epoch // window != bucket:
+                        # Untimed lines ahead of the first timestamp join its window.
+                        if current is not None:
+                            flush()
+                        bucket = epoch // window
+                    current = epoch
+                keys.append(line.translate(None, DIGITS))
+                raw.append(line)
+            flush()
+    return {
+        "messages": messages, "lines": lines, "continuation": continuation, "stacks": (python, javascript)
+    }
+
+
+class Drain:
+    """Fixed-depth prefix tree over token count and leading tokens (He et al., 2017)."""
+
+    def __init__(
+        self, depth: int = 4, similarity: float = 0.4, max_children: int = 100, max_leaf: int = 32
+    ) -> None:
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        # High-cardinality free text would otherwise make each leaf scan quadratic;
+        # once a leaf is full, new messages generalise its closest template.
+        self.max_leaf = max_leaf
+        self.root: dict[int, dict] = {}
+        self.clusters: list[dict] = []
+
+    def _leaf(self, tokens: list[str]) -> list[dict]:
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[: self.depth]:
+            child = node.get(token)
+            if child is None:
+                if len(node) >= self.max_children:
+                    token = WILDCARD
+                child = node.setdefault(token, {})
+            node = child
+        return node.setdefault(None, [])
+
+    def add(self, tokens: list[str]) -> dict:
+        leaf = self._leaf(tokens)
+        size = len(tokens) or 1
+        best, best_same = None, -1
+        for cluster in leaf:
+            # Position-wise equal tokens; masked parameters match the wildcard they became.
+            same = sum(map(eq, cluster["template"], tokens))
+            if same > best_same:
+                best, best_same = cluster, same
+                if same == size:
+                    break
+        if best is not None and (best_same / size >= self.similarity or len(leaf) >= self.max_leaf):
+            if best_same != size:
+                best["template"] = [
+                    left if left == right else WILDCARD for left, right in zip(best["template"], tokens)
+                ]
+            return best
+        cluster = {"id": len(self.clusters), "template": list(tokens), "count": 0, "windows": {}, "first": None}
+        self.clusters.append(cluster)
+        leaf.append(cluster)
+        return cluster
+
+
+def severity(template: list[str]) -> int:
+    """3 for errors, 2 for warnings, 1 otherwise."""
+    words = {token.strip("[]<>:|").upper() for token in template[:6]}
+    if words & ERROR_TOKENS or any(ERROR_WORDS.search(token) for token in template):
+        return 3
+    if words & WARN_TOKENS:
+        return 2
+    return 1
+
+
+def triage(paths: list[Path], window: int = 60, jobs: int | None = None) -> dict:
+    """One pass over the logs; returns clusters with per-window counts and totals."""
+    tasks = []
+    for path in paths:
+        size = path.stat().st_size
+        workers = jobs if jobs is not None else (os.cpu_count() or 1)
+        parts = workers if size >= POOL_THRESHOLD else 1
+        tasks.extend((str(path), start, end, window) for start, end in split_ranges(path, parts))
+
+    workers = jobs if jobs is not None else (os.cpu_count() or 1)
+    if len(tasks) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            parts = list(pool.map(scan_range, *zip(*tasks)))
+    else:
+        parts = [scan_range(*task) for task in tasks]
+
+    merged: dict[bytes, list] = {}
+    stacks: dict[str, tuple[list[int], list[int]]] = {}
+    lines = continuation = 0
+    for task, part in zip(tasks, parts):
+        lines += part["lines"]
+        continuation += part["continuation"]
+        python, javascript = stacks.setdefault(task[0], ([], []))
+        python.extend(part["stacks"][0])
+        javascript.extend(part["stacks"][1])
+        for key, (first, example, counts) in part["messages"].items():
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [first, example, counts]
+                continue
+            if first is not None and (entry[0] is None or first < entry[0]):
+                entry[0], entry[1] = first, example
+            target = entry[2]
+            for bucket, count in counts.items():
+                target[bucket] = target.get(bucket, 0) + count
+
+    year = datetime.now(timezone.utc).year
+    templates: dict[bytes, list] = {}
+    for first, example, counts in merged.values():
+        # Keys that differ only where digits were deleted share one masked message.
+        entry = templates.setdefault(message_template(example, year), [first, example, {}])
+        if first is not None and (entry[0] is None or first < entry[0]):
+            entry[0], entry[1] = first, example
+        windows = entry[2]
+        for bucket, count in counts.items():
+            windows[bucket] = windows.get(bucket, 0) + count
+
+    drain = Drain()
+    for key, (first, example, counts) in templates.items():
+        cluster = drain.add(key.decode("utf-8", errors="replace").split())
+        cluster["count"] += sum(counts.values())
+        windows = cluster["windows"]
+        for bucket, count in counts.items():
+            windows[bucket] = windows.get(bucket, 0) + count
+        if first is not None and (cluster["first"] is None or first < cluster["first"]):
+            cluster["first"] = first
+            cluster["example"] = example.decode("utf-8", errors="replace")
+        cluster.setdefault("example", example.decode("utf-8", errors="replace"))
+
+    buckets = {bucket for cluster in drain.clusters for bucket in cluster["windows"] if bucket >= 0}
+    return {
+        "clusters": drain.clusters,
+        "lines": lines,
+        "continuation": continuation,
+        "distinct": len(templates),
+        "window": window,
+        "span": (min(buckets), max(buckets)) if buckets else None,
+        # Per log path: offsets of Python traceback headers and JS stacks, for crash_index.
+        "stacks": stacks,
+    }
+
+
+def score_clusters(result: dict) -> list[dict]:
+    """Rank clusters: severity x volume x (burst above own baseline + novelty)."""
+    span = result["span"]
+    total_windows = span[1] - span[0] + 1 if span else 1
+    ranked = []
+    for cluster in result["clusters"]:
+        level = severity(cluster["template"])
+        timed = {bucket: count for bucket, count in cluster["windows"].items() if bucket >= 0}
+        mean = sum(timed.values()) / total_windows if timed else 0.0
+        peak_bucket, peak = max(timed.items(), key=lambda item: (item[1], -item[0])) if timed else (None, 0)
+        # Poisson-style deviation of the busiest window from the cluster's own rate.
+        burst = (peak - mean) / math.sqrt(mean + 1) if timed else 0.0
+        first_bucket = min(timed) if timed else None
+        novel = bool(span and total_windows > 4 and first_bucket is not None
+                     and first_bucket - span[0] >= total_windows * 0.2)
+        reasons = []
+        if level == 3:
+            reasons.append("error")
+        elif level == 2:
+            reasons.append("warning")
+        if burst >= 3 and peak >= 2 * mean:
+            reasons.append(f"burst x{peak / mean:.0f}" if mean else "burst")
+        if novel:
+            reasons.append("new")
+        score = level * level * math.log1p(cluster["count"]) * (1 + max(burst, 0.0) / 3 + (3 if novel else 0))
+        ranked.append({
+            **cluster,
+            "template": " ".join(cluster["template"]),
+            "severity": level,
+            "score": score,
+            "peak": peak,
+            "peak_at": peak_bucket * result["window"] if peak_bucket is not None else None,
+            "reasons": reasons,
+        })
+    ranked.sort(key=lambda item: (-item["score"], item["first"] or 0, item["id"]))
+    return ranked
+
+
+def error_timeline(result: dict, ranked: list[dict], top: int) -> list[tuple[int, int, str]]:
+    """Busiest windows by error lines, in time order, with the dominant error signature."""
+    totals: dict[int, int] = {}
+    leaders: dict[int, tuple[int, str]] = {}
+    for cluster in ranked:
+        if cluster["severity"] < 3:
+            continue
+        for bucket, count in cluster["windows"].items():
+            if bucket < 0:
+                continue
+            totals[bucket] = totals.get(bucket, 0) + count
+            if count > leaders.get(bucket, (0, ""))[0]:
+                leaders[bucket] = (count, cluster["template"])
+    busiest = sorted(totals, key=lambda bucket: -totals[bucket])[:top]
+    return [(bucket * result["window"], totals[bucket], leaders[bucket][1]) for bucket in sorted(busiest)]
+
+
+def cell(text: str, limit: int = 120) -> str:
+    text = text if len(text) <= limit else text[: limit - 1] + "…"
+    return text.replace("|", "\\|").replace("`", "'")
+
+
+def render_evidence(result: dict, ranked: list[dict], top: int, elapsed: float) -> str:
+    span = result["span"]
+    period = (
+        f"{format_time(span[0] * result['window'])} to {format_time((span[1] + 1) * result['window'])}"
+        if span else "no timestamps found"
+    )
+    lines = [
+        f"- {result['lines']:,} lines ({result['continuation']:,} continuation) in {elapsed:.1f}s, "
+        f"{result['distinct']:,} distinct messages, {len(result['clusters']):,} templates",
+        f"- Period: {period}, {result['window']}s windows",
+        "",
+        "### Top Anomalous Clusters",
+        "",
+        "| # | Template | Lines | First seen | Peak | Why |",
+        "| --- | --- | --- | --- | --- | --- |",
+    ]
+    for number, cluster in enumerate(ranked[:top], 1):
+        peak = f"{cluster['peak']} at {format_time(cluster['peak_at'])}" if cluster["peak_at"] is not None else "-"
+        lines.append(
+            f"| {number} | `{cell(cluster['template'])}` | {cluster['count']:,} | {format_time(cluster['first'])} "
+            f"| {peak} | {', '.join(cluster['reasons']) or '-'} |"
+        )
+    timeline = error_timeline(result, ranked, top)
+    if timeline:
+        lines += [
+            "",
+            "### Error Lines by Window",
+            "",
+            "| Window start | Error lines | Dominant signature |",
+            "| --- | --- | --- |",
+        ]
+        for start, count, template in timeline:
+            lines.append(f"| {format_time(start)} | {count:,} | `{cell(template, 80)}` |")
+    return "\n".join(lines)
+
+
+def render_root_cause(ranked: list[dict], top: int) -> str:
+    """Earliest anomalous error signature among the top clusters, as a lead to confirm."""
+    errors = [cluster for cluster in ranked[:top] if cluster["severity"] == 3 and cluster["first"] is not None]
+    # Errors that burst or appear late outrank steady background errors.
+    candidates = [cluster for cluster in errors if set(cluster["reasons"]) - {"error"}] or errors
+    if not candidates:
+        return "TBD (no anomalous error clusters in the logs)"
+    lead = min(candidates, key=lambda cluster: cluster["first"])
+    lines = [
+        f"Candidate (confirm before fixing): `{cell(lead['template'])}` first seen "
+        f"{format_time(lead['first'])}, {lead['count']:,} lines"
+        + (f", peak {lead['peak']} at {format_time(lead['peak_at'])}." if lead["peak_at"] is not None else "."),
+        "",
+        f"- First occurrence: `{cell(lead.get('example', ''), 200)}`",
+    ]
+    later = sorted(
+        (cluster for cluster in candidates if cluster is not lead), key=lambda cluster: cluster["first"]
+    )
+    for cluster in later[:3]:
+        lines.append(f"- Followed by `{cell(cluster['template'], 80)}` at {format_time(cluster['first'])}")
+    return "\n".join(lines)
@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 # Template generator for deployment plan.
+#
+# With --simulate, rollout_sim sweeps thousands of surge/unavailable/canary
+# schedules for the given replica count and probe timings, and the fastest
+# one that keeps capacity and blast radius within bounds is written into the
+# plan's Rollout Schedule section.
 
 from pathlib import Path
 import argparse
+import math
 import textwrap
+import time
+
+import rollout_sim
 
 
 def write_output(path: Path, content: str, force: bool) -> bool:
@@ -21,9 +30,60 @@ def main() -> int:
     parser.add_argument("--name", default="example", help="Service or app name")
     parser.add_argument("--env", default="production", help="Target environment")
     parser.add_argument("--owner", default="team", help="Owning team")
+    parser.add_argument("--simulate", action="store_true", help="Simulate rollouts and pick a schedule")
+    parser.add_argument("--replicas", type=int, default=10, help="Replica count to roll")
+    parser.add_argument("--startup", type=int, default=20, help="Seconds for a new pod to start serving")
+    parser.add_argument("--probe-delay", type=int, default=10, help="Readiness probe initialDelaySeconds")
+    parser.add_argument("--probe-period", type=int, default=5, help="Readiness probe periodSeconds")
+    parser.add_argument("--success-threshold", type=int, default=1, help="Readiness probe successThreshold")
+    parser.add_argument("--detect", type=int, default=120, help="Seconds to detect a bad release after first traffic")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Error rate of a bad release (0-1)")
+    parser.add_argument("--rps", type=float, default=100.0, help="Requests per second across the service")
+    parser.add_argument("--min-capacity", type=float, default=0.9, help="Lowest ready fraction allowed (0-1)")
+    parser.add_argument("--max-exposure", type=float, default=0.25, help="Highest traffic share on a bad release")
+    parser.add_argument("--max-extra-pods", type=int, help="Most pods above --replicas (default: 25%% of replicas)")
     parser.add_argument("--force", action="store_true", help="Overwrite existing file")
     args = parser.parse_args()
 
+    rollout = ""
+    deploy_step = f"Deploy to {args.env}"
+    if args.simulate:
+        if args.replicas < 1:
+            print("--replicas must be at least 1")
+            return 1
+        scenario = rollout_sim.Scenario(
+            replicas=args.replicas,
+            startup=args.startup,
+            probe_delay=args.probe_delay,
+            probe_period=args.probe_period,
+            success_threshold=args.success_threshold,
+            detect=args.detect,
+            error_rate=args.error_rate,
+            rps=args.rps,
+        )
+        extra = args.max_extra_pods if args.max_extra_pods is not None else math.ceil(args.replicas * 0.25)
+        candidates = rollout_sim.schedules(args.replicas)
+        start = time.perf_counter()
+        results = rollout_sim.sweep(scenario, candidates)
+        elapsed = time.perf_counter() - start
+        index, within = rollout_sim.pick(candidates, results, args.min_capacity, args.max_exposure, extra)
+        if index is None:
+            print("No simulated schedule completed; check --replicas and probe settings")
+            return 1
+        bounds = f"capacity ≥ {args.min_capacity:.0%}, blast radius ≤ {args.max_exposure:.0%}, extra pods ≤ {extra}"
+        summary = f"Chosen from {len(candidates):,} simulated schedules ({bounds})"
+        if not within:
+            summary += "; no schedule met every bound, so this one misses them by the least"
+            print(f"Warning: no schedule met {bounds}")
+        timeline: list = []
+        rollout_sim.simulate(scenario, candidates[index], timeline)
+        rollout = "\n## Rollout Schedule\n" + rollout_sim.render_schedule(
+            scenario, candidates[index], results[index], timeline, summary
+        ) + "\n"
+        deploy_step += " following the Rollout Schedule"
+        engine = "NumPy" if rollout_sim.np is not None else "event loop"
+        print(f"Simulated {len(candidates):,} rollout schedules in {elapsed:.2f}s ({engine})")
+
     content = textwrap.dedent(
         f"""\
         # Deployment Plan
@@ -42,8 +102,9 @@ def main() -> int:
         1. Build and publish artifacts
         2. Deploy to staging and run smoke tests
         3. Run migrations (if needed)
-        4. Deploy to {args.env}
+        4. {deploy_step}
         5. Verify health checks and dashboards
+        {{rollout}}
 
         ## Verification
         - Health endpoint returns 200
@@ -60,6 +121,7 @@ def main() -> int:
         - Alert channels
         """
     ).strip() + "\n"
+    content = content.replace("{rollout}\n", rollout)
 
     output = Path(args.output)
     if not write_output(output, content, args.force):
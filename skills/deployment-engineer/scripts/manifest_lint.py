@@ -0,0 +1,602 @@
+# Kubernetes and Compose manifest linter for validate_deploy.py.
+#
+# Each YAML file is split into documents, and every workload is checked for
+# resource limits, readiness probes (health checks in Compose), an explicit
+# rollout strategy, and pinned image tags. Findings depend only on file
+# content, so they are cached by sha256 and a file whose size and mtime are
+# unchanged is not even re-read. Uncached files are linted in a process pool.
+# PyYAML (with libyaml when available) parses the documents; without it, a
+# small reader for the block-style subset that manifests use takes over.
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+
+try:
+    import yaml
+
+    _LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:
+    yaml = None
+
+CACHE_VERSION = 1
+RULES_VERSION = 1
+POOL_THRESHOLD = 64
+SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__"}
+DOCUMENT_SPLIT = re.compile(r"^---[ \t]*(?:#.*)?$", re.MULTILINE)
+MANIFEST_REF = re.compile(r"[\w./-]+\.ya?ml\b|`([\w./-]+/)`")
+
+# Which deploy-plan.md section each rule backs.
+RULE_SECTIONS = {
+    "resource-limits": "Preconditions",
+    "readiness-probe": "Verification",
+    "rollout-strategy": "Steps",
+    "image-pinning": "Rollback",
+    "parse-error": "Steps",
+}
+
+POD_PATHS = {
+    "Pod": ("spec",),
+    "Deployment": ("spec", "template", "spec"),
+    "StatefulSet": ("spec", "template", "spec"),
+    "DaemonSet": ("spec", "template", "spec"),
+    "ReplicaSet": ("spec", "template", "spec"),
+    "Job": ("spec", "template", "spec"),
+    "CronJob": ("spec", "jobTemplate", "spec", "template", "spec"),
+}
+RUN_TO_COMPLETION = {"Job", "CronJob"}
+
+
+# --- YAML -------------------------------------------------------------------
+
+class MiniYaml:
+    """Block mappings and sequences, scalars, flow collections, block scalars and anchors."""
+
+    def __init__(self, text: str) -> None:
+        self.lines = text.splitlines()
+        self.pos = 0
+        self.anchors: dict = {}
+
+    def parse(self):
+        line = self._peek()
+        if line is None:
+            return None
+        data = self._block(line[0])
+        if self._peek() is not None:
+            raise ValueError(f"line {self.pos + 1}: unsupported YAML (install PyYAML)")
+        return data
+
+    def _peek(self):
+        while self.pos < len(self.lines):
+            raw = self.lines[self.pos]
+            stripped = raw.strip()
+            if stripped and not stripped.startswith("#") and stripped not in ("---", "..."):
+                return len(raw) - len(raw.lstrip(" ")), stripped
+            self.pos += 1
+        return None
+
+    def _block(self, indent: int):
+        line = self._peek()
+        if line is None or line[0] < indent:
+            return None
+        if line[1] == "-" or line[1].startswith("- "):
+            return self._sequence(line[0])
+        return self._mapping(line[0])
+
+    def _sequence(self, indent: int) -> list:
+        items = []
+        while True:
+            line = self._peek()
+            if line is None or line[0] != indent or not (line[1] == "-" or line[1].startswith("- ")):
+                return items
+            rest = line[1][1:].lstrip(" ")
+            if not rest or rest.startswith("#"):
+                self.pos += 1
+                nested = self._peek()
+                items.append(self._block(nested[0]) if nested and nested[0] > indent else None)
+            elif _split_key(rest) is not None or rest == "-" or rest.startswith("- "):
+                # "- key: value" opens a mapping (or "- - x" a sequence) aligned with its first token.
+                column = indent + len(line[1]) - len(rest)
+                self.lines[self.pos] = " " * column + rest
+                items.append(self._block(column))
+            else:
+                self.pos += 1
+                items.append(self._value(rest, indent))
+
+    def _mapping(self, indent: int) -> dict:
+        result: dict = {}
+        while True:
+            line = self._peek()
+            if line is None or line[0] != indent or line[1] == "-" or line[1].startswith("- "):
+                return result
+            split = _split_key(line[1])
+            if split is None:
+                raise ValueError(f"line {self.pos + 1}: expected 'key: value'")
+            key, rest = split
+            self.pos += 1
+            value = self._value(rest, indent)
+            if key == "<<":
+                for merged in value if isinstance(value, list) else [value]:
+                    if isinstance(merged, dict):
+                        for merge_key, merge_value in merged.items():
+                            result.setdefault(merge_key, merge_value)
+            else:
+                result[key] = value
+
+    def _value(self, rest: str, indent: int):
+        anchor = None
+        if rest.startswith("&"):
+            anchor, _, rest = rest[1:].partition(" ")
+            rest = rest.lstrip()
+        if rest.startswith("!"):
+            rest = rest.partition(" ")[2].lstrip()
+        if rest.startswith("*"):
+            value = self.anchors.get(_strip_comment(rest[1:]))
+        elif not rest or rest.startswith("#"):
+            line = self._peek()
+            if line and (line[0] > indent or line[0] == indent and (line[1] == "-" or line[1].startswith("- "))):
+                value = self._block(line[0])
+            else:
+                value = None
+        elif rest[0] in "|>":
+            value = self._block_scalar(rest[0] == ">", indent)
+        elif rest[0] in "[{":
+            text = _strip_comment(rest)
+            while _unbalanced(text) and self.pos < len(self.lines):
+                text += " " + _strip_comment(self.lines[self.pos].strip())
+                self.pos += 1
+            value, _ = _flow(text, 0)
+        else:
+            value = _scalar(_strip_comment(rest))
+        if anchor:
+            self.anchors[anchor] = value
+        return value
+
+    def _block_scalar(self, folded: bool, indent: int) -> str:
+        lines = []
+        block_indent = None
+        while self.pos < len(self.lines):
+            raw = self.lines[self.pos]
+            if raw.strip():
+                current = len(raw) - len(raw.lstrip(" "))
+                if current <= indent:
+                    break
+                if block_indent is None:
+                    block_indent = current
+                lines.append(raw[block_indent:])
+            else:
+                lines.append("")
+            self.pos += 1
+        while lines and not lines[-1]:
+            lines.pop()
+        return (" " if folded else "\n").join(lines) + "\n"
+
+
+def _split_key(text: str):
+    if text[0] in "\"'":
+        end = text.find(text[0], 1)
+        while end > 0 and text[0] == "'" and text[end + 1:end + 2] == "'":
+            end = text.find("'", end + 2)
+        if end < 0 or not text[end + 1:].startswith(":"):
+            return None
+        after = text[end + 2:]
+        if after and not after.startswith((" ", "\t")):
+            return None
+        return _scalar(text[:end + 1]), after.strip()
+    if text[0] in "[{":
+        return None
+    marker = text.find(": ")
+    if marker < 0:
+        if text.endswith(":"):
+            return text[:-1].strip(), ""
+        marker = text.find(":\t")
+        if marker < 0:
+            return None
+    key = text[:marker].strip()
+    if " #" in key:
+        return None
+    return key, text[marker + 1:].strip()
+
+
+def _strip_comment(text: str) -> str:
+    if text[:1] in "\"'":
+        quote = text[0]
+        end = 1
+        while True:
+            end = text.find(quote, end)
+            if end < 0:
+                return text
+            if quote == "'" and text[end + 1:end + 2] == "'":
+                end += 2
+                continue
+            if quote == '"' and text[end - 1] == "\\":
+                end += 1
+                continue
+            return text[:end + 1]
+    marker = text.find(" #")
+    return (text[:marker] if marker >= 0 else text).strip()
+
+
+def _unbalanced(text: str) -> bool:
+    depth = 0
+    quote = None
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+    return depth > 0
+
+
+def _flow(text: str, pos: int):
+    while pos < len(text) and text[pos] == " ":
+        pos += 1
+    opener = text[pos]
+    if opener in "[{":
+        closer = "]" if opener == "[" else "}"
+        items: list = []
+        mapping: dict = {}
+        pos += 1
+        while True:
+            while pos < len(text) and text[pos] in " ,":
+                pos += 1
+            if pos >= len(text) or text[pos] == closer:
+                return (items if opener == "[" else mapping), pos + 1
+            if opener == "{":
+                key, pos = _flow_scalar(text, pos, ":")
+                pos += 1
+                value, pos = _flow(text, pos)
+                mapping[key] = value
+            else:
+                value, pos = _flow(text, pos)
+                items.append(value)
+    return _flow_scalar(text, pos, "")
+
+
+def _flow_scalar(text: str, pos: int, extra: str):
+    if text[pos] in "\"'":
+        end = text.find(text[pos], pos + 1)
+        return _scalar(text[pos:end + 1]), end + 1
+    end = pos
+    while end < len(text) and text[end] not in ",]}" + extra:
+        end += 1
+    return _scalar(text[pos:end].strip()), end
+
+
+def _scalar(text: str):
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        inner = text[1:-1]
+        if text[0] == "'":
+            return inner.replace("''", "'")
+        try:
+            return json.loads(text)
+        except ValueError:
+            return inner
+    lowered = text.lower()
+    if lowered in ("", "~", "null"):
+        return None
+    if lowered in ("true", "yes", "on"):
+        return True
+    if lowered in ("false", "no", "off"):
+        return False
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def load_documents(text: str) -> list[tuple[int, object]]:
+    """(first line, parsed document) for each non-empty YAML document."""
+    documents = []
+    start = 0
+    line = 1
+    bounds = [(match.start(), match.end()) for match in DOCUMENT_SPLIT.finditer(text)] + [(len(text), len(text))]
+    for begin, end in bounds:
+        chunk = text[start:begin]
+        if chunk.strip():
+            if yaml is not None:
+                data = yaml.load(chunk, Loader=_LOADER)
+            else:
+                data = MiniYaml(chunk).parse()
+            offset = len(chunk) - len(chunk.lstrip("\n"))
+            documents.append((line + offset, data))
+        line += text.count("\n", start, end)
+        start = end
+    return documents
+
+
+# --- rules ------------------------------------------------------------------
+
+def _dig(data, path: tuple):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def image_problem(image) -> str | None:
+    if not isinstance(image, str) or not image:
+        return "has no image"
+    if "@sha256:" in image:
+        return None
+    name = image.rsplit("/", 1)[-1]
+    if ":" not in name:
+        return f"image `{image}` has no tag (resolves to :latest)"
+    tag = name.rsplit(":", 1)[1]
+    if tag == "latest" or "${" in tag and ":-" not in tag:
+        return f"image `{image}` is not pinned to a release tag"
+    return None
+
+
+def lint_kubernetes(document: dict, line: int) -> list[dict]:
+    kind = document.get("kind")
+    if kind == "List":
+        findings = []
+        for item in document.get("items") or []:
+            if isinstance(item, dict):
+                findings.extend(lint_kubernetes(item, line))
+        return findings
+    path = POD_PATHS.get(kind)
+    if path is None:
+        return []
+    name = _dig(document, ("metadata", "name")) or "?"
+    target = f"{kind}/{name}"
+    findings = []
+
+    def add(rule: str, severity: str, message: str) -> None:
+        findings.append({"line": line, "object": target, "rule": rule, "severity": severity, "message": message})
+
+    pod = _dig(document, path) or {}
+    for container in pod.get("containers") or []:
+        if not isinstance(container, dict):
+            continue
+        label = f"container `{container.get('name', '?')}`"
+        limits = _dig(container, ("resources", "limits")) or {}
+        missing = [resource for resource in ("cpu", "memory") if resource not in limits]
+        if missing:
+            add("resource-limits", "error", f"{label} has no {' or '.join(missing)} limit")
+        if not _dig(container, ("resources", "requests")):
+            add("resource-limits", "warning", f"{label} has no resource requests")
+        if kind not in RUN_TO_COMPLETION and not container.get("readinessProbe"):
+            add("readiness-probe", "error", f"{label} has no readinessProbe")
+        problem = image_problem(container.get("image"))
+        if problem:
+            add("image-pinning", "error", f"{label} {problem}")
+    for container in pod.get("initContainers") or []:
+        if isinstance(container, dict):
+            problem = image_problem(container.get("image"))
+            if problem:
+                add("image-pinning", "error", f"init container `{container.get('name', '?')}` {problem}")
+
+    if kind == "Deployment":
+        strategy = _dig(document, ("spec", "strategy"))
+        if not strategy:
+            add("rollout-strategy", "warning", "no explicit strategy (defaults to 25% surge / 25% unavailable)")
+        elif strategy.get("type") == "Recreate":
+            add("rollout-strategy", "warning", "Recreate strategy takes every replica down during rollout")
+        else:
+            rolling = strategy.get("rollingUpdate") or {}
+            surge = str(rolling.get("maxSurge", "25%")).rstrip("%")
+            unavailable = str(rolling.get("maxUnavailable", "25%")).rstrip("%")
+            if surge == "0" and unavailable == "0":
+                add("rollout-strategy", "error", "maxSurge and maxUnavailable are both 0; the rollout cannot progress")
+            elif unavailable == "100":
+                add("rollout-strategy", "warning", "maxUnavailable 100% allows a full outage during rollout")
+        if _dig(document, ("spec", "replicas")) == 1:
+            add("rollout-strategy", "warning", "a single replica cannot roll without losing capacity")
+    elif kind in ("StatefulSet", "DaemonSet"):
+        if _dig(document, ("spec", "updateStrategy", "type")) == "OnDelete":
+            add("rollout-strategy", "warning", "OnDelete update strategy requires pods to be deleted by hand")
+    return findings
+
+
+def lint_compose(document: dict, line: int) -> list[dict]:
+    findings = []
+    for name, service in (document.get("services") or {}).items():
+        if not isinstance(service, dict):
+            continue
+        target = f"service/{name}"
+
+        def add(rule: str, severity: str, message: str) -> None:
+            findings.append({"line": line, "object": target, "rule": rule, "severity": severity, "message": message})
+
+        deploy = service.get("deploy") or {}
+        limits = _dig(deploy, ("resources", "limits")) or {}
+        if not (limits.get("memory") or service.get("mem_limit")):
+            add("resource-limits", "error", "has no memory limit")
+        if not (limits.get("cpus") or service.get("cpus")):
+            add("resource-limits", "warning", "has no CPU limit")
+        healthcheck = service.get("healthcheck")
+        if not healthcheck:
+            add("readiness-probe", "error", "has no healthcheck")
+        elif healthcheck.get("disable"):
+            add("readiness-probe", "error", "disables its healthcheck")
+        update = deploy.get("update_config")
+        if not update:
+            add("rollout-strategy", "warning", "has no deploy.update_config")
+        elif update.get("failure_action") != "rollback":
+            add("rollout-strategy", "warning", "update_config does not roll back on failure")
+        if "image" in service or "build" not in service:
+            problem = image_problem(service.get("image"))
+            if problem:
+                add("image-pinning", "error", problem)
+    return findings
+
+
+def lint_text(text: str) -> list[dict]:
+    if "{{" in text:
+        message = "templated file; lint the rendered output (e.g. helm template) instead"
+        return [{"line": 1, "object": "-", "rule": "parse-error", "severity": "info", "message": message}]
+    try:
+        documents = load_documents(text)
+    except Exception as exc:  # Any YAML error is a finding, not a crash.
+        detail = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+        return [{"line": 1, "object": "-", "rule": "parse-error", "severity": "warning", "message": detail}]
+    findings = []
+    for line, document in documents:
+        if not isinstance(document, dict):
+            continue
+        if "apiVersion" in document and "kind" in document:
+            findings.extend(lint_kubernetes(document, line))
+        elif isinstance(document.get("services"), dict):
+            findings.extend(lint_compose(document, line))
+    return findings
+
+
+def _lint_batch(batch: list[tuple[str, str]]) -> list[tuple[str, list[dict]]]:
+    results = []
+    for path, digest in batch:
+        text = Path(path).read_text(encoding="utf-8", errors="replace")
+        results.append((digest, lint_text(text)))
+    return results
+
+
+# --- discovery and cache ----------------------------------------------------
+
+def plan_sections(text: str) -> list[tuple[int, str]]:
+    """(line, title) for each '## ' heading."""
+    return [(number, line[3:].strip()) for number, line in enumerate(text.splitlines(), 1) if line.startswith("## ")]
+
+
+def anchor(title: str) -> str:
+    slug = re.sub(r"[^\w\- ]", "", title.lower()).strip()
+    return slug.replace(" ", "-")
+
+
+def plan_references(text: str, base: Path) -> dict[Path, str]:
+    """Manifest files and directories mentioned in the plan, with the section that mentions them."""
+    references: dict[Path, str] = {}
+    section = ""
+    for line in text.splitlines():
+        if line.startswith("## "):
+            section = line[3:].strip()
+            continue
+        for match in MANIFEST_REF.finditer(line):
+            value = match.group(1) or match.group(0)
+            for candidate in (base / value, Path(value)):
+                if candidate.exists():
+                    references.setdefault(candidate, section)
+                    break
+    return references
+
+
+def discover(paths: list[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        if path.is_file():
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(name for name in dirs if name not in SKIP_DIRS)
+            files.extend(Path(root) / name for name in sorted(names) if name.endswith((".yaml", ".yml")))
+    seen = set()
+    unique = []
+    for file in files:
+        key = file.resolve()
+        if key not in seen:
+            seen.add(key)
+            unique.append(file)
+    return unique
+
+
+class LintCache:
+    """Findings by content hash, plus each file's stat signature so unchanged files are not re-read."""
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self.files: dict[str, list] = {}
+        self.results: dict[str, list] = {}
+        if path is not None and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if data.get("version") == CACHE_VERSION and data.get("rules") == RULES_VERSION:
+                self.files = data.get("files", {})
+                self.results = data.get("results", {})
+
+    def digest(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self.files.get(key)
+        if cached and cached[:2] == signature:
+            return cached[2]
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        self.files[key] = signature + [digest]
+        return digest
+
+    def save(self, live: set[str]) -> None:
+        if self.path is None:
+            return
+        digests = {entry[2] for key, entry in self.files.items() if key in live}
+        data = {
+            "version": CACHE_VERSION,
+            "rules": RULES_VERSION,
+            "files": {key: entry for key, entry in self.files.items() if key in live},
+            "results": {digest: findings for digest, findings in self.results.items() if digest in digests},
+        }
+        temp = self.path.with_name(self.path.name + ".tmp")
+        temp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(temp, self.path)
+
+
+def lint_files(files: list[Path], cache: LintCache, jobs: int) -> tuple[dict[Path, list[dict]], int]:
+    """Findings per file and the number of files that had to be linted."""
+    digests = {path: cache.digest(path) for path in files}
+    pending: dict[str, str] = {}
+    for path, digest in digests.items():
+        if digest not in cache.results:
+            pending.setdefault(digest, str(path))
+    work = [(path, digest) for digest, path in pending.items()]
+    if len(work) >= POOL_THRESHOLD and jobs > 1:
+        size = max(8, len(work) // (jobs * 4))
+        batches = [work[start:start + size] for start in range(0, len(work), size)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for results in pool.map(_lint_batch, batches):
+                cache.results.update(results)
+    else:
+        cache.results.update(_lint_batch(work))
+    return {path: cache.results[digest] for path, digest in digests.items()}, len(work)
+
+
+def render_findings(
+    findings: dict[Path, list[dict]], plan: Path, sections: list[tuple[int, str]], references: dict[Path, str]
+) -> list[str]:
+    """Findings grouped under the plan section each rule backs."""
+    titles = {title.lower(): (line, title) for line, title in sections}
+    grouped: dict[str, list[str]] = {}
+    for path, items in findings.items():
+        referenced = references.get(path)
+        if referenced is None:
+            for reference, section in references.items():
+                if reference.is_dir() and reference.resolve() in path.resolve().parents:
+                    referenced = section
+                    break
+        for finding in items:
+            section = RULE_SECTIONS[finding["rule"]]
+            note = f" (listed under {referenced})" if referenced and referenced != section else ""
+            grouped.setdefault(section, []).append(
+                f"  {finding['severity']:<7} {path}:{finding['line']} {finding['object']}: "
+                f"{finding['message']} [{finding['rule']}]{note}"
+            )
+    lines = []
+    for section in sorted(grouped, key=lambda name: titles.get(name.lower(), (10**9, ""))[0]):
+        line, title = titles.get(section.lower(), (None, section))
+        where = f"{plan}:{line} ({plan.name}#{anchor(title)})" if line else f"{plan} (no '## {section}' section)"
+        lines.append(f"## {title} -> {where}")
+        lines.extend(grouped[section])
+    return lines
@@ -0,0 +1,387 @@
+# Rollout simulator for generate_deploy.py.
+#
+# A rollout replaces `replicas` old pods with new ones under a schedule: the
+# Deployment surge and unavailable limits, plus canary steps (percent of
+# replicas on the new version) with a pause after each step. New pods become
+# ready a fixed delay after creation (startup, then the readiness probe), and
+# the controller reconciles at each event, like the Kubernetes Deployment
+# controller. If the release is bad, it is detected a fixed time after the
+# first new pod takes traffic; the traffic share on the new version up to that
+# point is the blast radius.
+#
+# simulate() jumps between events for one schedule. sweep() runs the same
+# model for thousands of schedules at once, vectorized with NumPy when it is
+# installed and one schedule at a time otherwise, and pick() returns the
+# fastest schedule that keeps capacity and blast radius within bounds.
+
+from dataclasses import dataclass
+import heapq
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CANARY_PLANS = [
+    (100,),
+    (10, 100),
+    (25, 100),
+    (5, 25, 100),
+    (10, 50, 100),
+    (5, 25, 50, 100),
+    (1, 10, 50, 100),
+    (25, 50, 75, 100),
+]
+PAUSES = [0, 30, 60, 120, 300, 600]
+FRACTIONS = [0, 0.05, 0.1, 0.2, 0.25, 0.34, 0.5, 0.75, 1.0]
+
+
+@dataclass
+class Scenario:
+    replicas: int
+    startup: int = 20
+    probe_delay: int = 10
+    probe_period: int = 5
+    success_threshold: int = 1
+    detect: int = 120
+    error_rate: float = 0.05
+    rps: float = 100.0
+
+    @property
+    def ready_delay(self) -> int:
+        """Seconds from pod creation until its readiness probe passes."""
+        first_probe = max(self.startup, self.probe_delay)
+        if self.probe_period > 0 and first_probe > self.probe_delay:
+            waited = first_probe - self.probe_delay
+            first_probe = self.probe_delay + math.ceil(waited / self.probe_period) * self.probe_period
+        return max(1, first_probe + (self.success_threshold - 1) * self.probe_period)
+
+
+@dataclass(frozen=True)
+class Schedule:
+    surge: int
+    unavailable: int
+    steps: tuple = (100,)
+    pause: int = 0
+
+    def targets(self, replicas: int) -> list[int]:
+        targets = [min(replicas, max(1, math.ceil(step * replicas / 100))) for step in self.steps]
+        targets[-1] = replicas
+        return targets
+
+
+def _finish_metrics(result: dict, time: int, detect_at: int) -> None:
+    result["duration"] = time
+    if time < detect_at:
+        result["exposure"] = 1.0
+        result["exposed_seconds"] += detect_at - time
+
+
+def simulate(scenario: Scenario, schedule: Schedule, timeline: list | None = None) -> dict:
+    """One rollout, event by event. Appends (time, old, ready, booting, step) to timeline if given."""
+    n = scenario.replicas
+    delay = scenario.ready_delay
+    targets = schedule.targets(n)
+    old, ready, booting, step, hold = n, 0, 0, 0, -1
+    arrivals: list[tuple[int, int]] = []
+    first_ready = -1
+    detect_at = math.inf
+    result = {"duration": None, "exposure": 0.0, "exposed_seconds": 0.0, "min_available": n, "peak_pods": n}
+    time = 0
+    while True:
+        while arrivals and arrivals[0][0] <= time:
+            ready += arrivals[0][1]
+            booting -= arrivals[0][1]
+            heapq.heappop(arrivals)
+        finished = False
+        while True:
+            cap = targets[step]
+            create = max(0, min(n + schedule.surge - old - ready - booting, cap - ready - booting))
+            if create:
+                booting += create
+                heapq.heappush(arrivals, (time + delay, create))
+            remove = max(0, min(old + ready - (n - schedule.unavailable), old - (n - cap)))
+            old -= remove
+            changed = bool(create or remove)
+            if ready >= cap and old <= n - cap and booting == 0:
+                if cap == n:
+                    finished = True
+                    break
+                if hold < 0:
+                    hold = time + schedule.pause
+                    changed = True
+                if time >= hold:
+                    step += 1
+                    hold = -1
+                    changed = True
+            if not changed:
+                break
+        result["min_available"] = min(result["min_available"], old + ready)
+        result["peak_pods"] = max(result["peak_pods"], old + ready + booting)
+        if first_ready < 0 and ready > 0:
+            first_ready = time
+            detect_at = time + scenario.detect
+        if timeline is not None:
+            timeline.append((time, old, ready, booting, step))
+        if finished:
+            _finish_metrics(result, time, detect_at)
+            break
+        upcoming = [arrivals[0][0]] if arrivals else []
+        if hold > time:
+            upcoming.append(hold)
+        if not upcoming:
+            break  # Stalled: surge and unavailable are both 0.
+        following = min(upcoming)
+        if time < detect_at:
+            share = ready / (old + ready) if old + ready else 0.0
+            result["exposure"] = max(result["exposure"], share)
+            result["exposed_seconds"] += share * (min(following, detect_at) - time)
+        time = following
+    return _summarize(result, scenario)
+
+
+def _summarize(result: dict, scenario: Scenario) -> dict:
+    n = scenario.replicas
+    return {
+        "duration": result["duration"],
+        "exposure": result["exposure"],
+        "failed_requests": scenario.error_rate * scenario.rps * result["exposed_seconds"],
+        "min_capacity": result["min_available"] / n,
+        "extra_pods": result["peak_pods"] - n,
+    }
+
+
+def schedules(replicas: int) -> list[Schedule]:
+    """Every surge/unavailable pair on the FRACTIONS grid, with each canary plan and pause."""
+    limits = sorted({math.ceil(fraction * replicas) for fraction in FRACTIONS} | {1})
+    result = []
+    for surge in limits:
+        for unavailable in limits:
+            if surge == 0 and unavailable == 0:
+                continue
+            for steps in CANARY_PLANS:
+                for pause in PAUSES if len(steps) > 1 else [0]:
+                    result.append(Schedule(surge, unavailable, steps, pause))
+    return result
+
+
+def sweep(scenario: Scenario, candidates: list[Schedule]) -> list[dict]:
+    if np is None or len(candidates) < 2:
+        return [simulate(scenario, schedule) for schedule in candidates]
+    return _sweep_numpy(scenario, candidates)
+
+
+def _sweep_numpy(scenario: Scenario, candidates: list[Schedule]) -> list[dict]:
+    """simulate() for every schedule at once: each array holds one value per schedule.
+
+    Each schedule keeps its own clock, and every pass handles the next event of
+    all unfinished schedules together, so the number of passes is the event
+    count of the longest single rollout rather than the number of distinct
+    event times across the sweep. Finished rows are dropped once they make up
+    half the arrays, so the long tail of slow schedules runs on short arrays.
+    """
+    n = scenario.replicas
+    delay = scenario.ready_delay
+    count = len(candidates)
+    depth = max(len(schedule.steps) for schedule in candidates)
+    targets = np.full((count, depth), n, dtype=np.int64)
+    for row, schedule in enumerate(candidates):
+        values = schedule.targets(n)
+        targets[row, :len(values)] = values
+    surge = np.array([schedule.surge for schedule in candidates], dtype=np.int64)
+    unavailable = np.array([schedule.unavailable for schedule in candidates], dtype=np.int64)
+    pause = np.array([schedule.pause for schedule in candidates], dtype=np.int64)
+    rows = np.arange(count)
+    never = np.iinfo(np.int64).max
+
+    now = np.zeros(count, dtype=np.int64)
+    old = np.full(count, n, dtype=np.int64)
+    ready = np.zeros(count, dtype=np.int64)
+    booting = np.zeros(count, dtype=np.int64)
+    step = np.zeros(count, dtype=np.int64)
+    hold = np.full(count, -1, dtype=np.int64)
+    first_ready = np.full(count, -1, dtype=np.int64)
+    detect_at = np.full(count, never, dtype=np.int64)
+    duration = np.full(count, -1, dtype=np.int64)
+    exposure = np.zeros(count)
+    exposed_seconds = np.zeros(count)
+    min_available = np.full(count, n, dtype=np.int64)
+    peak_pods = np.full(count, n, dtype=np.int64)
+    active = np.ones(count, dtype=bool)
+    # The ready delay is fixed, so each schedule's pending pods arrive in creation
+    # order: a per-row FIFO of (arrival time, pods) between head and tail.
+    queue_time = np.zeros((count, 8), dtype=np.int64)
+    queue_pods = np.zeros((count, 8), dtype=np.int64)
+    head = np.zeros(count, dtype=np.int64)
+    tail = np.zeros(count, dtype=np.int64)
+    origin = np.arange(count)
+    outputs = [np.full(count, -1, dtype=np.int64), np.zeros(count), np.zeros(count),
+               np.zeros(count, dtype=np.int64), np.zeros(count, dtype=np.int64)]
+
+    def flush() -> None:
+        for output, values in zip(outputs, (duration, exposure, exposed_seconds, min_available, peak_pods)):
+            output[origin] = values
+
+    while active.any():
+        if 2 * np.count_nonzero(active) <= len(active) and len(active) > 64:
+            flush()
+            keep = np.flatnonzero(active)
+            (now, old, ready, booting, step, hold, first_ready, detect_at, duration, exposure, exposed_seconds,
+             min_available, peak_pods, active, queue_time, queue_pods, head, tail, targets, surge, unavailable,
+             pause, origin) = (
+                array[keep] for array in (
+                    now, old, ready, booting, step, hold, first_ready, detect_at, duration, exposure,
+                    exposed_seconds, min_available, peak_pods, active, queue_time, queue_pods, head, tail,
+                    targets, surge, unavailable, pause, origin,
+                )
+            )
+            count = len(keep)
+            rows = np.arange(count)
+        pending = head < tail
+        front = np.minimum(head, queue_time.shape[1] - 1)
+        landed = active & pending & (queue_time[rows, front] <= now)
+        arrived = np.where(landed, queue_pods[rows, front], 0)
+        ready += arrived
+        booting -= arrived
+        head += landed
+
+        was_active = active.copy()
+        finished = np.zeros(count, dtype=bool)
+        while True:
+            cap = targets[rows, step]
+            create = np.maximum(0, np.minimum(n + surge - old - ready - booting, cap - ready - booting)) * active
+            created = create > 0
+            if created.any():
+                booting += create
+                at = now + delay
+                last = np.maximum(tail - 1, 0)
+                merge = created & (tail > head) & (queue_time[rows, last] == at)
+                queue_pods[rows[merge], last[merge]] += create[merge]
+                append = created & ~merge
+                if (tail[append] >= queue_time.shape[1]).any():
+                    queue_time = np.concatenate([queue_time, np.zeros_like(queue_time)], axis=1)
+                    queue_pods = np.concatenate([queue_pods, np.zeros_like(queue_pods)], axis=1)
+                queue_time[rows[append], tail[append]] = at[append]
+                queue_pods[rows[append], tail[append]] = create[append]
+                tail += append
+            remove = np.maximum(0, np.minimum(old + ready - (n - unavailable), old - (n - cap))) * active
+            old -= remove
+            reached = active & (ready >= cap) & (old <= n - cap) & (booting == 0)
+            done = reached & (cap == n)
+            finished |= done
+            active &= ~done
+            waiting = reached & ~done
+            start_hold = waiting & (hold < 0)
+            hold[start_hold] = now[start_hold] + pause[start_hold]
+            advance = waiting & (now >= hold)
+            step[advance] += 1
+            hold[advance] = -1
+            if not (created.any() or remove.any() or done.any() or start_hold.any() or advance.any()):
+                break
+
+        live = was_active
+        min_available[live] = np.minimum(min_available[live], (old + ready)[live])
+        peak_pods[live] = np.maximum(peak_pods[live], (old + ready + booting)[live])
+        newly = live & (first_ready < 0) & (ready > 0)
+        first_ready[newly] = now[newly]
+        detect_at[newly] = now[newly] + scenario.detect
+
+        duration[finished] = now[finished]
+        tail_exposed = finished & (now < detect_at)
+        exposure[tail_exposed] = 1.0
+        exposed_seconds[tail_exposed] += (detect_at - now)[tail_exposed]
+
+        front = np.minimum(head, queue_time.shape[1] - 1)
+        following = np.where(head < tail, queue_time[rows, front], never)
+        following = np.where(hold > now, np.minimum(following, hold), following)
+        active &= following != never  # Stalled: surge and unavailable are both 0.
+        window = active & (now < detect_at)
+        if window.any():
+            total = old + ready
+            share = np.divide(ready, total, out=np.zeros(count), where=total > 0)
+            exposure[window] = np.maximum(exposure[window], share[window])
+            span = np.minimum(following, detect_at) - now
+            exposed_seconds[window] += (share * span)[window]
+        now = np.where(active, following, now)
+    flush()
+
+    duration, exposure, exposed_seconds, min_available, peak_pods = outputs
+    results = []
+    for row in range(len(candidates)):
+        raw = {
+            "duration": int(duration[row]) if duration[row] >= 0 else None,
+            "exposure": float(exposure[row]),
+            "exposed_seconds": float(exposed_seconds[row]),
+            "min_available": int(min_available[row]),
+            "peak_pods": int(peak_pods[row]),
+        }
+        results.append(_summarize(raw, scenario))
+    return results
+
+
+def pick(candidates: list[Schedule], results: list[dict], min_capacity: float, max_exposure: float,
+         max_extra_pods: int | None = None) -> tuple[int | None, bool]:
+    """Index of the fastest schedule within the bounds, and whether the bounds could be met.
+
+    When no schedule meets them, the one that misses them by the least is returned instead.
+    """
+    best = None
+    best_key = None
+    for index, (schedule, result) in enumerate(zip(candidates, results)):
+        if result["duration"] is None:
+            continue
+        miss = max(0.0, min_capacity - result["min_capacity"]) + max(0.0, result["exposure"] - max_exposure)
+        if max_extra_pods is not None:
+            miss += max(0, result["extra_pods"] - max_extra_pods) / max(1, max_extra_pods)
+        key = (miss, result["duration"], result["failed_requests"], result["extra_pods"], len(schedule.steps))
+        if best_key is None or key < best_key:
+            best, best_key = index, key
+    return best, best_key is not None and best_key[0] == 0
+
+
+def format_seconds(value: float) -> str:
+    if value < 90:
+        return f"{value:.0f}s"
+    if value < 5400:
+        return f"{value / 60:.1f}m"
+    return f"{value / 3600:.1f}h"
+
+
+def render_schedule(scenario: Scenario, schedule: Schedule, result: dict, timeline: list,
+                    summary: str, rows: int = 12) -> str:
+    """Markdown for the chosen schedule: settings, estimates, a strategy snippet and a timeline."""
+    n = scenario.replicas
+    lines = [f"- Strategy: RollingUpdate, maxSurge {schedule.surge}, maxUnavailable {schedule.unavailable}"]
+    if len(schedule.steps) > 1:
+        pause = f" → pause {format_seconds(schedule.pause)} → " if schedule.pause else " → "
+        lines.append("- Canary steps: " + pause.join(f"{step}%" for step in schedule.steps))
+    lines += [
+        f"- Estimated rollout time: {format_seconds(result['duration'])} "
+        f"(new pods ready {format_seconds(scenario.ready_delay)} after creation)",
+        f"- Blast radius if the release is bad: {result['exposure']:.0%} of traffic on the new version "
+        f"when detected ({format_seconds(scenario.detect)} after the first new pod is ready), "
+        f"~{result['failed_requests']:,.0f} failed requests at {scenario.error_rate:.1%} errors and "
+        f"{scenario.rps:,.0f} rps",
+        f"- Minimum capacity: {result['min_capacity']:.0%} of {n} replicas; "
+        f"peak extra pods: {result['extra_pods']}",
+        f"- {summary}",
+        "",
+        "```yaml",
+        "strategy:",
+        "  type: RollingUpdate",
+        "  rollingUpdate:",
+        f"    maxSurge: {schedule.surge}",
+        f"    maxUnavailable: {schedule.unavailable}",
+        "```",
+        "",
+        "| Time | Old | New ready | Starting | Step |",
+        "|------|-----|-----------|----------|------|",
+    ]
+    entries = [
+        f"| {format_seconds(time)} | {old} | {ready} | {booting} | {schedule.steps[min(step, len(schedule.steps) - 1)]}% |"
+        for time, old, ready, booting, step in timeline
+    ]
+    if len(entries) > rows:
+        entries = entries[:rows // 2] + ["| … | | | | |"] + entries[-(rows - rows // 2 - 1):]
+    return "\n".join(lines + entries)
@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 # Template validator for deployment plan.
+#
+# With --lint (or --manifests), the Kubernetes and Compose manifests the plan
+# mentions are linted by manifest_lint in parallel, with findings cached by
+# content hash, and each finding is reported under the plan section it backs.
 
 from pathlib import Path
 import argparse
+import os
+import time
+
+from manifest_lint import LintCache, discover, lint_files, plan_references, plan_sections, render_findings
 
 DEFAULT_REQUIRED = [
     "## Overview",
@@ -23,6 +31,17 @@ def main() -> int:
         default=[],
         help="Additional required section heading",
     )
+    parser.add_argument("--lint", action="store_true", help="Lint the manifests the plan mentions")
+    parser.add_argument(
+        "--manifests",
+        action="append",
+        default=[],
+        help="Manifest file or directory to lint (repeatable; implies --lint)",
+    )
+    parser.add_argument("--jobs", type=int, help="Lint processes (default: CPU count)")
+    parser.add_argument("--cache", help="Lint cache (default: .manifest-lint-cache.json beside the plan)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or update the lint cache")
+    parser.add_argument("--strict", action="store_true", help="Fail on warnings as well as errors")
     args = parser.parse_args()
 
     path = Path(args.input)
@@ -38,6 +57,36 @@ def main() -> int:
         print("Missing required sections: " + ", ".join(missing))
         return 1
 
+    if args.lint or args.manifests:
+        references = plan_references(text, path.parent)
+        targets = list(references) + [Path(value) for value in args.manifests]
+        absent = [value for value in args.manifests if not Path(value).exists()]
+        if absent:
+            print(f"Manifest path not found: {', '.join(absent)}")
+            return 1
+        files = discover(targets)
+        if not files:
+            print(f"No manifests found (mention them in {path} or pass --manifests)")
+            return 1
+        cache_path = Path(args.cache) if args.cache else path.parent / ".manifest-lint-cache.json"
+        cache = LintCache(None if args.no_cache else cache_path)
+        start = time.perf_counter()
+        findings, linted = lint_files(files, cache, args.jobs or os.cpu_count() or 1)
+        elapsed = time.perf_counter() - start
+        cache.save({str(file) for file in files})
+        for line in render_findings(findings, path, plan_sections(text), references):
+            print(line)
+        counts = {"error": 0, "warning": 0, "info": 0}
+        for items in findings.values():
+            for finding in items:
+                counts[finding["severity"]] += 1
+        print(
+            f"Linted {len(files):,} manifests ({linted:,} changed) in {elapsed:.2f}s: "
+            f"{counts['error']} errors, {counts['warning']} warnings"
+        )
+        if counts["error"] or args.strict and counts["warning"]:
+            return 1
+
     print(f"Validated {path}")
     return 0
 
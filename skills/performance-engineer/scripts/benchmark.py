@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# Benchmark runner for the performance-engineer skill.
+#
+# Runs a shell command or an importable Python callable repeatedly at one or
+# more concurrency levels, records latencies in a quantile sketch and stores
+# the results (optionally as the baseline) for perf_report.py.
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import importlib
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+from perfstats import QuantileSketch, format_ms, new_results, run_entry, save_results
+
+
+def load_callable(spec: str):
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"Callable must look like module:function, got {spec!r}")
+    if "" not in sys.path:
+        sys.path.insert(0, "")
+    target = importlib.import_module(module_name)
+    for part in attr.split("."):
+        target = getattr(target, part)
+    if not callable(target):
+        raise ValueError(f"{spec} is not callable")
+    return target
+
+
+def make_task(command: str | None, callable_spec: str | None):
+    """Return a zero-argument function that runs one iteration and reports success."""
+    if callable_spec:
+        func = load_callable(callable_spec)
+
+        def call() -> bool:
+            try:
+                func()
+            except Exception:
+                return False
+            return True
+
+        return call
+
+    argv = shlex.split(command or "")
+    if not argv:
+        raise ValueError("Empty --command")
+
+    def run() -> bool:
+        result = subprocess.run(
+            argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+        )
+        return result.returncode == 0
+
+    return run
+
+
+def run_level(task, concurrency: int, iterations: int, warmup: int) -> dict:
+    sketches = [QuantileSketch() for _ in range(concurrency)]
+    errors = [0] * concurrency
+    remaining = iter(range(warmup + iterations))
+    lock = threading.Lock()
+    measured_from = [time.perf_counter()]
+
+    def next_index() -> int | None:
+        with lock:
+            index = next(remaining, None)
+            if index == warmup:
+                measured_from[0] = time.perf_counter()
+            return index
+
+    def worker(slot: int) -> None:
+        sketch = sketches[slot]
+        while True:
+            index = next_index()
+            if index is None:
+                return
+            started = time.perf_counter()
+            ok = task()
+            elapsed = time.perf_counter() - started
+            if index < warmup:
+                continue
+            if ok:
+                sketch.add(elapsed)
+            else:
+                errors[slot] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(worker, slot) for slot in range(concurrency)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - measured_from[0]
+
+    merged = QuantileSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return run_entry(concurrency, merged, sum(errors), elapsed)
+
+
+def parse_levels(value: str) -> list[int]:
+    levels = [int(part) for part in value.split(",") if part.strip()]
+    if not levels or any(level < 1 for level in levels):
+        raise ValueError(f"Invalid concurrency levels: {value}")
+    return levels
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a benchmark and store results.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--command", help="Shell command to run per iteration")
+    target.add_argument("--callable", help="Python callable as module:function")
+    parser.add_argument("--name", default="example", help="Benchmark name")
+    parser.add_argument("--iterations", type=int, default=100, help="Measured iterations per level")
+    parser.add_argument("--warmup", type=int, default=10, help="Discarded warmup iterations per level")
+    parser.add_argument("--concurrency", default="1", help="Comma-separated concurrency levels")
+    parser.add_argument("--output", default="bench-results.json", help="Results file path")
+    parser.add_argument(
+        "--save-baseline",
+        default="",
+        help="Also store the results as the baseline at this path",
+    )
+    args = parser.parse_args()
+
+    if args.iterations < 1 or args.warmup < 0:
+        print("--iterations must be positive and --warmup non-negative")
+        return 1
+    try:
+        levels = parse_levels(args.concurrency)
+        task = make_task(args.command, args.callable)
+    except (ValueError, ImportError, AttributeError) as exc:
+        print(exc)
+        return 1
+
+    results = new_results(args.name, args.command or args.callable)
+    print("concurrency  requests  errors  p50  p95  p99  throughput")
+    for level in levels:
+        entry = run_level(task, level, args.iterations, args.warmup)
+        results["runs"].append(entry)
+        sketch = QuantileSketch.from_dict(entry["latency"])
+        print(
+            f"{level:>11}  {entry['requests']:>8}  {entry['errors']:>6}  "
+            f"{format_ms(sketch.quantile(0.5))}  {format_ms(sketch.quantile(0.95))}  "
+            f"{format_ms(sketch.quantile(0.99))}  {entry['throughput']:.1f}/s"
+        )
+
+    output = Path(args.output)
+    save_results(output, results)
+    print(f"Wrote {output}")
+    if args.save_baseline:
+        baseline = Path(args.save_baseline)
+        save_results(baseline, results)
+        print(f"Wrote baseline {baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# Asyncio HTTP load generator for the performance-engineer skill.
+#
+# Closed-loop mode keeps --connections requests in flight back to back.
+# Open-loop mode issues requests on a fixed arrival schedule at --rate and
+# measures latency from the intended send time, so a stalled server shows
+# up as queueing delay instead of silently lowering the offered load
+# (coordinated omission). Latencies go into the perfstats sketch, whose
+# logarithmic buckets give HDR-style bounded relative error, and results are
+# written in the format perf_report.py --results reads.
+#
+# --standin starts a local stand-in server in a subprocess so the generator
+# can be exercised without a live service.
+
+from pathlib import Path
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import socket
+import ssl
+import subprocess
+import sys
+
+from perfstats import QuantileSketch, format_ms, new_results, run_entry, save_results
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+STANDIN_BODY = b'{"ok":true}'
+STANDIN_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+    b"Content-Length: " + str(len(STANDIN_BODY)).encode() + b"\r\n\r\n" + STANDIN_BODY
+)
+
+
+class StandInProtocol(asyncio.Protocol):
+    """Minimal keep-alive HTTP/1.1 responder with an optional fixed delay."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.buffer = b""
+        self.transport = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        self.buffer += data
+        while True:
+            end = self.buffer.find(b"\r\n\r\n")
+            if end < 0:
+                return
+            head = self.buffer[:end].lower()
+            length = 0
+            marker = head.find(b"content-length:")
+            if marker >= 0:
+                line_end = head.find(b"\r\n", marker)
+                length = int(head[marker + 15:line_end if line_end >= 0 else None])
+            total = end + 4 + length
+            if len(self.buffer) < total:
+                return
+            self.buffer = self.buffer[total:]
+            if self.delay:
+                asyncio.get_running_loop().call_later(self.delay, self.respond)
+            else:
+                self.transport.write(STANDIN_RESPONSE)
+
+    def respond(self) -> None:
+        if not self.transport.is_closing():
+            self.transport.write(STANDIN_RESPONSE)
+
+
+async def serve(host: str, port: int, delay: float) -> None:
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: StandInProtocol(delay), host, port, backlog=4096)
+    bound = server.sockets[0].getsockname()[1]
+    print(f"listening {host}:{bound}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def start_standin(delay: float) -> tuple[subprocess.Popen, str]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--port", str(port), "--standin-delay", str(delay)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    proc.stdout.readline()
+    return proc, f"http://127.0.0.1:{port}/"
+
+
+class Target:
+    def __init__(self, url: str, method: str, body: str, timeout: float) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in {"http", "https"}:
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.timeout = timeout
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        payload = body.encode("utf-8")
+        head = f"{method} {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: loadgen\r\n"
+        if payload:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+        self.request = (head + "\r\n").encode("latin-1") + payload
+
+    async def connect(self):
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, bool]:
+    """Read one response and return (status, keep_alive)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    lower = head.lower()
+    keep_alive = b"connection: close" not in lower
+    marker = lower.find(b"content-length:")
+    if marker >= 0:
+        end = lower.find(b"\r\n", marker)
+        await reader.readexactly(int(lower[marker + 15:end]))
+    elif b"transfer-encoding: chunked" in lower:
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif status >= 200 and status not in (204, 304):
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.sketch = QuantileSketch()
+        self.errors = 0
+        self.last_done = 0.0
+
+
+async def connection_worker(target: Target, stats: Stats, next_intended) -> None:
+    loop = asyncio.get_running_loop()
+    reader = writer = None
+    while True:
+        intended = await next_intended()
+        if intended is None:
+            break
+        try:
+            if writer is None:
+                reader, writer = await target.connect()
+            writer.write(target.request)
+            status, keep_alive = await asyncio.wait_for(read_response(reader), target.timeout)
+            done = loop.time()
+            if status < 400:
+                stats.sketch.add(done - intended)
+            else:
+                stats.errors += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            stats.errors += 1
+            done = loop.time()
+            if writer is not None:
+                writer.close()
+            writer = None
+        stats.last_done = max(stats.last_done, done)
+    if writer is not None:
+        writer.close()
+
+
+async def run_closed(target: Target, connections: int, duration: float) -> tuple[Stats, float]:
+    loop = asyncio.get_running_loop()
+    stats = Stats()
+    start = loop.time()
+    deadline = start + duration
+
+    async def next_intended():
+        now = loop.time()
+        return now if now < deadline else None
+
+    await asyncio.gather(*(connection_worker(target, stats, next_intended) for _ in range(connections)))
+    return stats, (stats.last_done or loop.time()) - start
+
+
+async def run_open(
+    target: Target, connections: int, duration: float, rate: float
+) -> tuple[Stats, float]:
+    loop = asyncio.get_running_loop()
+    stats = Stats()
+    queue: asyncio.Queue = asyncio.Queue()
+    total = int(rate * duration)
+    interval = 1.0 / rate
+    start = loop.time()
+
+    async def schedule() -> None:
+        sent = 0
+        while sent < total:
+            due = min(total, int((loop.time() - start) / interval) + 1)
+            # Timer wakeups are coarse; release every arrival that is due so
+            # the offered rate stays exact on average.
+            while sent < due:
+                queue.put_nowait(start + sent * interval)
+                sent += 1
+            await asyncio.sleep(max(0.0, start + sent * interval - loop.time()))
+        for _ in range(connections):
+            queue.put_nowait(None)
+
+    await asyncio.gather(
+        schedule(), *(connection_worker(target, stats, queue.get) for _ in range(connections))
+    )
+    return stats, (stats.last_done or loop.time()) - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate HTTP load and record latencies.")
+    parser.add_argument("--url", default="", help="Target URL")
+    parser.add_argument("--standin", action="store_true", help="Target a local stand-in server")
+    parser.add_argument("--standin-delay", type=float, default=0.0, help="Stand-in response delay (s)")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed", help="Load model")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Requests per second (open mode)")
+    parser.add_argument("--connections", type=int, default=32, help="Concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test duration in seconds")
+    parser.add_argument("--method", default="GET", help="HTTP method")
+    parser.add_argument("--body", default="", help="Request body")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout (s)")
+    parser.add_argument("--name", default="example", help="Benchmark name")
+    parser.add_argument("--output", default="bench-results.json", help="Results file path")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    if args.serve:
+        try:
+            asyncio.run(serve("127.0.0.1", args.port, args.standin_delay))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not args.url and not args.standin:
+        print("Provide --url or --standin")
+        return 1
+    if args.connections < 1 or args.duration <= 0 or args.rate <= 0:
+        print("--connections, --duration and --rate must be positive")
+        return 1
+
+    standin = None
+    url = args.url
+    if args.standin:
+        standin, url = start_standin(args.standin_delay)
+    try:
+        target = Target(url, args.method.upper(), args.body, args.timeout)
+        if args.mode == "open":
+            runner = run_open(target, args.connections, args.duration, args.rate)
+        else:
+            runner = run_closed(target, args.connections, args.duration)
+        stats, elapsed = asyncio.run(runner)
+    except ValueError as exc:
+        print(exc)
+        return 1
+    finally:
+        if standin is not None:
+            standin.terminate()
+            standin.wait()
+
+    sketch = stats.sketch
+    entry = run_entry(args.connections, sketch, stats.errors, elapsed)
+    results = new_results(args.name, f"loadgen --mode {args.mode} {url}")
+    results["runs"].append(entry)
+    output = Path(args.output)
+    save_results(output, results)
+
+    print(
+        f"{entry['requests']} requests in {elapsed:.2f}s ({entry['throughput']:.0f} req/s), "
+        f"{stats.errors} errors"
+    )
+    for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p99.9", 0.999)):
+        print(f"  {label}: {format_ms(sketch.quantile(q))}")
+    print(f"  max: {format_ms(sketch.max if sketch.count else 0.0)}")
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 # Template generator for performance report.
+#
+# With --results (from benchmark.py), the baseline metrics are filled with
+# measured values; with --baseline, deltas and 95% confidence intervals
+# against the stored baseline are added.
 
 from pathlib import Path
 import argparse
 import textwrap
 
+from perfstats import find_run, format_ms, load_results, mean_difference_interval
+
 
 def write_output(path: Path, content: str, force: bool) -> bool:
     if path.exists() and not force:
@@ -15,14 +21,117 @@ def write_output(path: Path, content: str, force: bool) -> bool:
     return True
 
 
+def percent_change(current: float, baseline: float) -> str:
+    if not baseline:
+        return "n/a"
+    return f"{100.0 * (current - baseline) / baseline:+.1f}%"
+
+
+def select_run(results: dict, level: int) -> dict | None:
+    if level:
+        return find_run(results, level)
+    runs = results.get("runs", [])
+    return max(runs, key=lambda run: run["concurrency"]) if runs else None
+
+
+def metric_lines(run: dict | None, baseline_run: dict | None) -> list[str]:
+    if run is None:
+        return ["- p50 latency:", "- p95 latency:", "- error rate:", "- throughput:"]
+
+    sketch = run["sketch"]
+    lines = []
+    for label, q in (("p50", 0.5), ("p95", 0.95)):
+        value = sketch.quantile(q)
+        low, high = sketch.quantile_interval(q)
+        line = f"- {label} latency: {format_ms(value)} (95% CI {format_ms(low)}-{format_ms(high)})"
+        if baseline_run is not None:
+            base = baseline_run["sketch"].quantile(q)
+            line += f"; baseline {format_ms(base)} ({percent_change(value, base)})"
+        lines.append(line)
+
+    error_rate = 100.0 * run["errors"] / run["requests"] if run["requests"] else 0.0
+    line = f"- error rate: {error_rate:.2f}% ({run['errors']}/{run['requests']})"
+    if baseline_run is not None and baseline_run["requests"]:
+        base_rate = 100.0 * baseline_run["errors"] / baseline_run["requests"]
+        line += f"; baseline {base_rate:.2f}%"
+    lines.append(line)
+
+    line = f"- throughput: {run['throughput']:.1f} req/s at concurrency {run['concurrency']}"
+    if baseline_run is not None:
+        line += (
+            f"; baseline {baseline_run['throughput']:.1f} req/s "
+            f"({percent_change(run['throughput'], baseline_run['throughput'])})"
+        )
+    lines.append(line)
+
+    if baseline_run is not None:
+        diff, low, high = mean_difference_interval(sketch, baseline_run["sketch"])
+        lines.append(
+            f"- mean latency delta: {diff * 1000:+.2f}ms "
+            f"(95% CI {low * 1000:+.2f}ms to {high * 1000:+.2f}ms)"
+        )
+    return lines
+
+
+def run_table(results: dict, baseline: dict | None) -> list[str]:
+    lines = [
+        "| Concurrency | Requests | p50 | p95 | p99 | Throughput | p95 vs baseline |",
+        "| --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for run in results.get("runs", []):
+        sketch = run["sketch"]
+        p95 = sketch.quantile(0.95)
+        delta = ""
+        base_run = find_run(baseline, run["concurrency"]) if baseline else None
+        if base_run is not None:
+            delta = percent_change(p95, base_run["sketch"].quantile(0.95))
+        lines.append(
+            f"| {run['concurrency']} | {run['requests']} | {format_ms(sketch.quantile(0.5))} "
+            f"| {format_ms(p95)} | {format_ms(sketch.quantile(0.99))} "
+            f"| {run['throughput']:.1f}/s | {delta} |"
+        )
+    return lines
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Generate a performance report.")
     parser.add_argument("--output", default="perf-report.md", help="Output file path")
     parser.add_argument("--name", default="example", help="System or endpoint name")
     parser.add_argument("--owner", default="team", help="Owning team")
+    parser.add_argument("--results", default="", help="Benchmark results from benchmark.py")
+    parser.add_argument("--baseline", default="", help="Stored baseline results to compare with")
+    parser.add_argument(
+        "--level", type=int, default=0, help="Concurrency level to report (default: highest)"
+    )
     parser.add_argument("--force", action="store_true", help="Overwrite existing file")
     args = parser.parse_args()
 
+    results = None
+    baseline = None
+    try:
+        if args.results:
+            results = load_results(Path(args.results))
+        if args.baseline and Path(args.baseline).exists():
+            baseline = load_results(Path(args.baseline))
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"Cannot load results: {exc}")
+        return 1
+
+    run = select_run(results, args.level) if results else None
+    if results and run is None:
+        print(f"No run at concurrency {args.level} in {args.results}")
+        return 1
+    baseline_run = find_run(baseline, run["concurrency"]) if baseline and run else None
+
+    metrics = "\n".join(metric_lines(run, baseline_run))
+    commands = "- Benchmark commands"
+    regressions = "- Regression checks"
+    if results:
+        commands += f": `{results.get('command', '')}`"
+        regressions += f": compared against `{args.baseline}`" if baseline_run else ": no baseline"
+        table = "\n".join(run_table(results, baseline))
+        metrics += f"\n\n### Benchmark Runs\n{table}"
+
     content = textwrap.dedent(
         f"""\
         # Performance Report
@@ -34,10 +143,7 @@ def main() -> int:
         - Owner: {args.owner}
 
         ## Baseline Metrics
-        - p50 latency:
-        - p95 latency:
-        - error rate:
-        - throughput:
+        {{metrics}}
 
         ## Findings
         - Top bottlenecks
@@ -48,10 +154,15 @@ def main() -> int:
         - Long-term optimizations
 
         ## Validation
-        - Benchmark commands
-        - Regression checks
+        {{commands}}
+        {{regressions}}
         """
     ).strip() + "\n"
+    content = (
+        content.replace("{metrics}", metrics)
+        .replace("{commands}", commands)
+        .replace("{regressions}", regressions)
+    )
 
     output = Path(args.output)
     if not write_output(output, content, args.force):
@@ -0,0 +1,211 @@
+# Shared statistics and result storage for the performance-engineer scripts.
+#
+# Latencies are recorded in a relative-error quantile sketch (logarithmic
+# buckets, DDSketch style): constant memory per run, mergeable across
+# workers, and small enough to keep as an on-disk baseline.
+
+from pathlib import Path
+import json
+import math
+import time
+
+RESULTS_VERSION = 1
+DEFAULT_ACCURACY = 0.01
+Z_95 = 1.959964
+
+
+class QuantileSketch:
+    """Streaming quantile sketch with bounded relative error."""
+
+    def __init__(self, accuracy: float = DEFAULT_ACCURACY) -> None:
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value > 0:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        else:
+            self.zero_count += count
+        self._update_moments(value, count)
+
+    def _update_moments(self, value: float, count: int) -> None:
+        # Welford's update, applied `count` times at once.
+        new_count = self.count + count
+        delta = value - self.mean
+        self.mean += delta * count / new_count
+        self.m2 += delta * (value - self.mean) * count
+        self.count = new_count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.count == 0:
+            return
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        new_count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / new_count
+        self.mean += delta * other.count / new_count
+        self.count = new_count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def value_at_rank(self, rank: float) -> float:
+        if self.count == 0:
+            return 0.0
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def quantile(self, q: float) -> float:
+        return self.value_at_rank(q * (self.count - 1))
+
+    def quantile_interval(self, q: float, z: float = Z_95) -> tuple[float, float]:
+        """Distribution-free confidence interval for a quantile (order statistics)."""
+        n = self.count
+        spread = z * math.sqrt(n * q * (1 - q))
+        low = max(0.0, n * q - spread - 1)
+        high = min(n - 1.0, n * q + spread)
+        return self.value_at_rank(low), self.value_at_rank(high)
+
+    def to_dict(self) -> dict:
+        data = {
+            "accuracy": self.accuracy,
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+            "zero": self.zero_count,
+            "offset": 0,
+            "bins": [],
+        }
+        if self.buckets:
+            low, high = min(self.buckets), max(self.buckets)
+            data["offset"] = low
+            data["bins"] = [self.buckets.get(i, 0) for i in range(low, high + 1)]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data.get("accuracy", DEFAULT_ACCURACY))
+        offset = data.get("offset", 0)
+        sketch.buckets = {
+            offset + i: count for i, count in enumerate(data.get("bins", [])) if count
+        }
+        sketch.zero_count = data.get("zero", 0)
+        sketch.count = data.get("count", 0)
+        sketch.total = data.get("sum", 0.0)
+        sketch.mean = data.get("mean", 0.0)
+        sketch.m2 = data.get("m2", 0.0)
+        if sketch.count:
+            sketch.min = data.get("min", 0.0)
+            sketch.max = data.get("max", 0.0)
+        return sketch
+
+
+def mean_difference_interval(
+    current: QuantileSketch, baseline: QuantileSketch, z: float = Z_95
+) -> tuple[float, float, float]:
+    """Welch interval for mean(current) - mean(baseline) (normal approximation)."""
+    diff = current.mean - baseline.mean
+    if current.count < 2 or baseline.count < 2:
+        return diff, diff, diff
+    error = math.sqrt(
+        current.variance / current.count + baseline.variance / baseline.count
+    )
+    return diff, diff - z * error, diff + z * error
+
+
+def welch_z(current: QuantileSketch, baseline: QuantileSketch) -> float:
+    if current.count < 2 or baseline.count < 2:
+        return 0.0
+    error = math.sqrt(
+        current.variance / current.count + baseline.variance / baseline.count
+    )
+    if error == 0:
+        return 0.0
+    return (current.mean - baseline.mean) / error
+
+
+def one_sided_p_value(z: float) -> float:
+    """P(Z >= z) for a standard normal."""
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def new_results(name: str, command: str) -> dict:
+    return {
+        "version": RESULTS_VERSION,
+        "name": name,
+        "command": command,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "runs": [],
+    }
+
+
+def run_entry(
+    concurrency: int, sketch: QuantileSketch, errors: int, elapsed: float
+) -> dict:
+    return {
+        "concurrency": concurrency,
+        "requests": sketch.count + errors,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": sketch.count / elapsed if elapsed > 0 else 0.0,
+        "latency": sketch.to_dict(),
+    }
+
+
+def save_results(path: Path, results: dict) -> None:
+    # In-memory sketches (added by load_results) are already mirrored in "latency".
+    runs = [{k: v for k, v in run.items() if k != "sketch"} for run in results["runs"]]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps({**results, "runs": runs}, separators=(",", ":")) + "\n",
+        encoding="utf-8",
+    )
+
+
+def load_results(path: Path) -> dict:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict) or data.get("version") != RESULTS_VERSION:
+        raise ValueError(f"Unsupported results version in {path}")
+    for run in data.get("runs", []):
+        run["sketch"] = QuantileSketch.from_dict(run["latency"])
+    return data
+
+
+def find_run(results: dict, concurrency: int) -> dict | None:
+    for run in results.get("runs", []):
+        if run["concurrency"] == concurrency:
+            return run
+    return None
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}ms"
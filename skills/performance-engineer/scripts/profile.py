@@ -1,9 +1,83 @@
 #!/usr/bin/env python3
 # Template generator for performance profile.
+#
+# With --run, the command is executed for --duration under a profiler
+# (py-spy when installed, otherwise cProfile or a built-in stack sampler for
+# Python commands). CPU time, RSS and wall time are sampled from the process
+# tree, stacks are written as a collapsed-stack file (flamegraph.pl /
+# speedscope compatible) and the report is filled with real hotspots.
 
+from collections import Counter
 from pathlib import Path
 import argparse
+import os
+import platform
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
 import textwrap
+import time
+
+DURATION_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*$")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+STOP_GRACE_SECONDS = 5.0
+RUN_TOOLS = ("auto", "py-spy", "cprofile", "sampler")
+# cProfile call paths carrying less than this many microseconds are not expanded further.
+MIN_PATH_MICROS = 1
+MAX_STACK_DEPTH = 128
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# Runs a Python target with a background thread sampling every thread's
+# stack. Passed to `python -c` so this file (which shadows the stdlib
+# `profile` module) is never imported into the target.
+SAMPLER_BOOTSTRAP = textwrap.dedent(
+    """\
+    import collections, os, runpy, sys, threading
+    out, interval, mode, target = sys.argv[1], float(sys.argv[2]), sys.argv[3], sys.argv[4]
+    sys.argv = [target] + sys.argv[5:]
+    counts = collections.Counter()
+    skip = {"<string>", runpy.run_path.__code__.co_filename}
+    stop = threading.Event()
+
+    def label(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def sample():
+        me = threading.get_ident()
+        while not stop.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                while stack and stack[0].co_filename in skip:
+                    stack.pop(0)
+                if stack:
+                    counts[";".join(label(code) for code in stack)] += 1
+
+    thread = threading.Thread(target=sample, daemon=True)
+    thread.start()
+    try:
+        if mode == "module":
+            runpy.run_module(target, run_name="__main__", alter_sys=True)
+        else:
+            sys.path.insert(0, os.path.dirname(os.path.abspath(target)))
+            runpy.run_path(target, run_name="__main__")
+    finally:
+        stop.set()
+        thread.join()
+        with open(out, "w", encoding="utf-8") as handle:
+            for stack, count in counts.most_common():
+                handle.write(f"{stack} {count}\\n")
+    """
+)
 
 
 def write_output(path: Path, content: str, force: bool) -> bool:
@@ -15,20 +89,244 @@ def write_output(path: Path, content: str, force: bool) -> bool:
     return True
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Generate a performance profile.")
-    parser.add_argument("--output", default="perf-profile.txt", help="Output file path")
-    parser.add_argument("--name", default="example", help="Scenario name")
-    parser.add_argument("--tool", default="perf", help="Profiling tool")
-    parser.add_argument("--command", default="run-benchmark.sh", help="Command profiled")
-    parser.add_argument("--duration", default="60s", help="Profile duration")
-    parser.add_argument("--force", action="store_true", help="Overwrite existing file")
-    args = parser.parse_args()
+def parse_duration(value: str) -> float:
+    match = DURATION_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"Invalid duration: {value}")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
+
+
+def python_target(argv: list[str]) -> tuple[str, list[str]] | None:
+    """Return (mode, argv) when the command runs a Python script or module."""
+    if not argv or not Path(argv[0]).name.startswith("python"):
+        return None
+    rest = argv[1:]
+    if len(rest) >= 2 and rest[0] == "-m":
+        return "module", rest[1:]
+    if rest and not rest[0].startswith("-"):
+        return "script", rest
+    return None
+
+
+def resolve_tool(tool: str, argv: list[str]) -> str:
+    is_python = python_target(argv) is not None
+    if tool in {"py-spy", "cprofile", "sampler"}:
+        if tool == "py-spy" and not shutil.which("py-spy"):
+            raise ValueError("py-spy is not installed")
+        if tool == "cprofile" and not is_python:
+            raise ValueError("cprofile requires a `python <script>` or `python -m` command")
+        return tool
+    if shutil.which("py-spy") and is_python:
+        return "py-spy"
+    if is_python:
+        return "sampler"
+    return "resources"
+
+
+def build_command(tool: str, argv: list[str], artifact: Path, rate: int) -> list[str]:
+    if tool == "py-spy":
+        return [
+            "py-spy", "record", "--format", "raw", "--rate", str(rate),
+            "--subprocesses", "--output", str(artifact), "--", *argv,
+        ]
+    if tool == "cprofile":
+        return [argv[0], "-m", "cProfile", "-o", str(artifact), *argv[1:]]
+    if tool == "sampler":
+        mode, target = python_target(argv)
+        return [
+            argv[0], "-c", SAMPLER_BOOTSTRAP, str(artifact), str(1.0 / rate),
+            mode, *target,
+        ]
+    return list(argv)
+
+
+def process_tree(pid: int) -> list[int]:
+    pids = [pid]
+    index = 0
+    while index < len(pids):
+        current = pids[index]
+        index += 1
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                text = Path(f"/proc/{current}/task/{task}/children").read_text()
+                pids.extend(int(child) for child in text.split())
+        except OSError:
+            continue
+    return pids
+
+
+def sample_tree(pid: int) -> tuple[float, int]:
+    """Return (cpu seconds, rss bytes) for a process tree from /proc."""
+    cpu_ticks = 0
+    rss_pages = 0
+    for member in process_tree(pid):
+        try:
+            stat = Path(f"/proc/{member}/stat").read_text()
+        except OSError:
+            continue
+        fields = stat[stat.rfind(")") + 2:].split()
+        cpu_ticks += int(fields[11]) + int(fields[12])
+        rss_pages += int(fields[21])
+    return cpu_ticks / CLK_TCK, rss_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def stop_process(proc: subprocess.Popen) -> None:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGINT)
+        else:
+            proc.send_signal(signal.SIGINT)
+        proc.wait(timeout=STOP_GRACE_SECONDS)
+    except ProcessLookupError:
+        return
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def run_profiled(command: list[str], duration: float, interval: float) -> dict:
+    try:
+        import resource
+    except ImportError:  # Windows: CPU time comes from the samples, if any
+        resource = None
+    has_proc = Path("/proc/self/stat").exists()
+    before = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+    started = time.perf_counter()
+    proc = subprocess.Popen(command, start_new_session=hasattr(os, "killpg"))
+    samples = []
+    timed_out = False
+    while proc.poll() is None:
+        elapsed = time.perf_counter() - started
+        if elapsed >= duration:
+            timed_out = True
+            stop_process(proc)
+            break
+        if has_proc:
+            cpu, rss = sample_tree(proc.pid)
+            samples.append((elapsed, cpu, rss))
+        time.sleep(min(interval, max(duration - elapsed, 0.001)))
+    wall = time.perf_counter() - started
+    rss_values = [rss for _, _, rss in samples]
+    if resource is not None:
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        user = after.ru_utime - before.ru_utime
+        system = after.ru_stime - before.ru_stime
+        peak_rss = after.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    else:
+        user = samples[-1][1] if samples else 0.0
+        system = 0.0
+        peak_rss = 0
+    return {
+        "exit_code": proc.returncode,
+        "timed_out": timed_out,
+        "wall": wall,
+        "user": user,
+        "system": system,
+        "peak_rss": max(rss_values) if rss_values else peak_rss,
+        "avg_rss": sum(rss_values) / len(rss_values) if rss_values else 0,
+        "samples": samples,
+    }
+
+
+def load_collapsed(path: Path) -> Counter:
+    stacks: Counter = Counter()
+    if not path.exists():
+        return stacks
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def cprofile_to_collapsed(path: Path) -> Counter:
+    """Rebuild full call stacks from a cProfile dump, weighted in microseconds of self time.
+
+    cProfile keeps only caller -> callee edges, so each function's time is split
+    across its call paths in proportion to the cumulative time of the edges along
+    them (the same assumption gprof-style tools make).
+    """
+    import pstats
+
+    def label(func: tuple) -> str:
+        filename, line, name = func
+        if filename == "~":
+            return name
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    stacks: Counter = Counter()
+    if not path.exists():
+        return stacks
+    stats = pstats.Stats(str(path)).stats
+    callees: dict[tuple, list[tuple]] = {}
+    inbound: Counter = Counter()
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+            inbound[func] += edge[3]
+
+    def walk(func: tuple, share: float, trail: list[str], seen: set) -> None:
+        tottime = stats[func][2] if func in stats else 0.0
+        trail.append(label(func))
+        micros = int(share * tottime * 1_000_000)
+        if micros:
+            stacks[";".join(trail)] += micros
+        if len(trail) < MAX_STACK_DEPTH:
+            seen.add(func)
+            for callee, cumtime in callees.get(func, ()):
+                if callee in seen or not inbound[callee]:
+                    continue
+                child = share * cumtime / inbound[callee]
+                if child * stats[callee][3] * 1_000_000 >= MIN_PATH_MICROS:
+                    walk(callee, child, trail, seen)
+            seen.discard(func)
+        trail.pop()
 
-    content = textwrap.dedent(
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            walk(func, 1.0, [], set())
+    return +stacks
+
+
+def hotspots(stacks: Counter, top: int) -> list[tuple[str, float, float]]:
+    """Return (frame, self %, total %) for the top frames by self weight."""
+    total = sum(stacks.values())
+    if not total:
+        return []
+    self_weight: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_weight[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+    return [
+        (frame, 100.0 * weight / total, 100.0 * inclusive[frame] / total)
+        for frame, weight in self_weight.most_common(top)
+    ]
+
+
+def format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024 or unit == "GiB":
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def total_memory() -> str:
+    try:
+        return format_bytes(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"))
+    except (ValueError, OSError, AttributeError):
+        return ""
+
+
+def render_template(args: argparse.Namespace) -> str:
+    return textwrap.dedent(
         f"""\
         Profile: {args.name}
-        Tool: {args.tool}
+        Tool: {args.tool or "perf"}
         Command: {args.command}
         Duration: {args.duration}
 
@@ -52,10 +350,156 @@ def main() -> int:
         """
     ).strip() + "\n"
 
-    output = Path(args.output)
+
+def render_report(
+    args: argparse.Namespace,
+    tool: str,
+    result: dict,
+    spots: list[tuple[str, float, float]],
+    collapsed: Path | None,
+) -> str:
+    cpu = result["user"] + result["system"]
+    utilization = 100.0 * cpu / result["wall"] if result["wall"] else 0.0
+    # Busiest sampling interval, from the per-tick CPU time of the process tree.
+    samples = result["samples"]
+    peak = max(
+        (
+            100.0 * (cpu_b - cpu_a) / (t_b - t_a)
+            for (t_a, cpu_a, _), (t_b, cpu_b, _) in zip(samples, samples[1:])
+            if t_b > t_a
+        ),
+        default=None,
+    )
+    lines = [
+        f"Profile: {args.name}",
+        f"Tool: {tool}",
+        f"Command: {args.command}",
+        f"Duration: {args.duration} (measured {result['wall']:.2f}s wall)",
+        "",
+        "Environment:",
+        f"  - CPU: {platform.processor() or platform.machine()} ({os.cpu_count()} cores)",
+        f"  - Memory: {total_memory()}",
+        f"  - OS: {platform.platform()}",
+        f"  - Build: Python {platform.python_version()}",
+        "",
+        "Workload:",
+        "  - Input size:",
+        "  - Concurrency:",
+        "  - Dataset:",
+        "",
+        "CPU:",
+        f"  - User time: {result['user']:.2f}s",
+        f"  - System time: {result['system']:.2f}s",
+        f"  - Utilization: {utilization:.1f}% of one core",
+        f"  - Peak utilization: {f'{peak:.1f}% of one core' if peak is not None else 'n/a (no CPU samples)'}",
+        "",
+        "Memory:",
+        f"  - Peak RSS: {format_bytes(result['peak_rss'])}",
+        f"  - Average RSS: {format_bytes(result['avg_rss'])}",
+        f"  - Resource samples: {len(result['samples'])}",
+        "",
+        "Top Hotspots (self % / total %):",
+    ]
+    if spots:
+        lines.extend(
+            f"  - {frame}: {self_pct:.2f}% / {total_pct:.2f}%"
+            for frame, self_pct, total_pct in spots
+        )
+    else:
+        lines.append("  - No stack samples (command is not a Python process)")
+    lines.extend(["", "Notes:"])
+    status = "stopped after duration" if result["timed_out"] else "completed"
+    lines.append(f"  - Command {status} with exit code {result['exit_code']}")
+    if collapsed is not None:
+        lines.append(f"  - Collapsed stacks: {collapsed}")
+    return "\n".join(lines) + "\n"
+
+
+def run(args: argparse.Namespace, output: Path) -> int:
+    # Refuse before profiling, which takes the full --duration.
+    if output.exists() and not args.force:
+        print(f"{output} already exists (use --force to overwrite)")
+        return 1
+    argv = shlex.split(args.command)
+    if not argv:
+        print("Empty --command")
+        return 1
+    if (args.tool or "auto") not in RUN_TOOLS:
+        print(f"--tool for --run must be one of: {', '.join(RUN_TOOLS)}")
+        return 1
+    try:
+        duration = parse_duration(args.duration)
+        tool = resolve_tool(args.tool or "auto", argv)
+    except ValueError as exc:
+        print(exc)
+        return 1
+
+    collapsed_path = Path(args.collapsed) if args.collapsed else output.with_suffix(".folded")
+    with tempfile.TemporaryDirectory(prefix="profile-") as workdir:
+        artifact = Path(workdir) / ("profile.prof" if tool == "cprofile" else "stacks.folded")
+        command = build_command(tool, argv, artifact, args.rate)
+        try:
+            result = run_profiled(command, duration, args.sample_interval)
+        except FileNotFoundError as exc:
+            print(f"Command not found: {exc.filename}")
+            return 1
+        if tool == "cprofile":
+            stacks = cprofile_to_collapsed(artifact)
+        else:
+            stacks = load_collapsed(artifact)
+
+    collapsed = None
+    if stacks:
+        collapsed_path.parent.mkdir(parents=True, exist_ok=True)
+        with collapsed_path.open("w", encoding="utf-8") as handle:
+            for stack, count in stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        collapsed = collapsed_path
+
+    content = render_report(args, tool, result, hotspots(stacks, args.top), collapsed)
     if not write_output(output, content, args.force):
         return 1
     print(f"Wrote {output}")
+    if collapsed is not None:
+        print(f"Wrote {collapsed}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate a performance profile.")
+    parser.add_argument("--output", default="perf-profile.txt", help="Output file path")
+    parser.add_argument("--name", default="example", help="Scenario name")
+    parser.add_argument(
+        "--tool",
+        help="Profiling tool label (default: perf); with --run, one of auto, py-spy, cprofile, sampler "
+        "(default: auto, py-spy when installed, else the built-in sampler)",
+    )
+    parser.add_argument("--command", default="run-benchmark.sh", help="Command profiled")
+    parser.add_argument("--duration", default="60s", help="Profile duration")
+    parser.add_argument(
+        "--run", action="store_true", help="Run and profile the command instead of writing a template"
+    )
+    parser.add_argument("--rate", type=int, default=100, help="Stack samples per second")
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=0.1,
+        help="Seconds between CPU/RSS samples",
+    )
+    parser.add_argument("--top", type=int, default=10, help="Number of hotspots to report")
+    parser.add_argument(
+        "--collapsed", default="", help="Collapsed-stack output (default: <output>.folded)"
+    )
+    parser.add_argument("--force", action="store_true", help="Overwrite existing file")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    if args.run:
+        return run(args, output)
+
+    if not write_output(output, render_template(args), args.force):
+        return 1
+    print(f"Wrote {output}")
     return 0
 
 
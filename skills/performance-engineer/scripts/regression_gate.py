@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# Performance regression gate for CI.
+#
+# Runs every benchmark in a suite file, compares it with the stored baseline
+# and exits non-zero when p95 latency or throughput regresses beyond the
+# configured threshold and the change is statistically significant. A
+# failing benchmark is re-run up to --retries times and only counts as a
+# regression if every attempt fails, so noisy runners do not flake the build.
+
+from pathlib import Path
+import argparse
+import json
+
+from benchmark import make_task, run_level
+from perfstats import (
+    QuantileSketch,
+    find_run,
+    format_ms,
+    load_results,
+    new_results,
+    one_sided_p_value,
+    save_results,
+    welch_z,
+)
+
+DEFAULT_THRESHOLDS = {"p95": 0.10, "throughput": 0.10, "error_rate": 0.01}
+DEFAULT_ALPHA = 0.05
+
+
+def load_suite(path: Path) -> dict:
+    suite = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(suite, dict):
+        raise ValueError(f"{path} must hold a JSON object")
+    benchmarks = suite.get("benchmarks", [])
+    if not isinstance(benchmarks, list):
+        raise ValueError(f"benchmarks in {path} must be a list")
+    if not benchmarks:
+        raise ValueError(f"No benchmarks defined in {path}")
+    if not isinstance(suite.get("thresholds", {}), dict):
+        raise ValueError(f"thresholds in {path} must be an object")
+    for bench in benchmarks:
+        if not isinstance(bench, dict) or not bench.get("name"):
+            raise ValueError("Every benchmark needs a name")
+        if bool(bench.get("command")) == bool(bench.get("callable")):
+            raise ValueError(f"{bench['name']}: set exactly one of command or callable")
+        levels = bench.get("concurrency", [1])
+        if not isinstance(levels, list) or not all(isinstance(level, int) and level > 0 for level in levels):
+            raise ValueError(f"{bench['name']}: concurrency must be a list of positive integers")
+        for key in ("iterations", "warmup"):
+            if not isinstance(bench.get(key, 0), int) or bench.get(key, 0) < 0:
+                raise ValueError(f"{bench['name']}: {key} must be a non-negative integer")
+    return suite
+
+
+def run_benchmark(bench: dict) -> dict:
+    task = make_task(bench.get("command"), bench.get("callable"))
+    results = new_results(bench["name"], bench.get("command") or bench.get("callable"))
+    for level in bench.get("concurrency", [1]):
+        entry = run_level(task, level, bench.get("iterations", 100), bench.get("warmup", 10))
+        entry["sketch"] = QuantileSketch.from_dict(entry["latency"])
+        results["runs"].append(entry)
+    return results
+
+
+def compare_run(run: dict, base: dict, thresholds: dict, alpha: float) -> list[str]:
+    """Return regression messages for one concurrency level (empty when it passes)."""
+    problems = []
+    current, baseline = run["sketch"], base["sketch"]
+    label = f"concurrency {run['concurrency']}"
+
+    p95, base_p95 = current.quantile(0.95), baseline.quantile(0.95)
+    if base_p95 > 0 and (p95 - base_p95) / base_p95 > thresholds["p95"]:
+        low, _ = current.quantile_interval(0.95)
+        _, base_high = baseline.quantile_interval(0.95)
+        if low > base_high:
+            problems.append(
+                f"{label}: p95 {format_ms(p95)} vs baseline {format_ms(base_p95)} "
+                f"(+{100 * (p95 - base_p95) / base_p95:.1f}%)"
+            )
+
+    throughput, base_throughput = run["throughput"], base["throughput"]
+    if base_throughput > 0 and (base_throughput - throughput) / base_throughput > thresholds["throughput"]:
+        # Throughput is a single figure per run; the latency means carry the
+        # sample variance, so test those for significance.
+        p_value = one_sided_p_value(welch_z(current, baseline))
+        if p_value < alpha:
+            problems.append(
+                f"{label}: throughput {throughput:.1f}/s vs baseline {base_throughput:.1f}/s "
+                f"(-{100 * (base_throughput - throughput) / base_throughput:.1f}%, p={p_value:.3f})"
+            )
+
+    if base["requests"] and run["requests"]:
+        base_rate = base["errors"] / base["requests"]
+        rate = run["errors"] / run["requests"]
+        if rate > base_rate + thresholds["error_rate"] and run["errors"]:
+            problems.append(
+                f"{label}: error rate {100 * rate:.2f}% vs baseline {100 * base_rate:.2f}%"
+            )
+    return problems
+
+
+def compare(results: dict, baseline: dict, thresholds: dict, alpha: float) -> list[str]:
+    problems = []
+    for run in results["runs"]:
+        base = find_run(baseline, run["concurrency"])
+        if base is None:
+            continue
+        problems.extend(compare_run(run, base, thresholds, alpha))
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail when benchmarks regress against baselines.")
+    parser.add_argument("--suite", default="perf-suite.json", help="Benchmark suite definition")
+    parser.add_argument("--baseline-dir", default="perf-baselines", help="Directory of baseline results")
+    parser.add_argument("--retries", type=int, default=None, help="Re-runs before a regression counts")
+    parser.add_argument("--alpha", type=float, default=None, help="Significance level")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="Store current results as the new baselines"
+    )
+    args = parser.parse_args()
+
+    try:
+        suite = load_suite(Path(args.suite))
+    except (OSError, ValueError) as exc:
+        print(f"Cannot load suite: {exc}")
+        return 1
+
+    thresholds = {**DEFAULT_THRESHOLDS, **suite.get("thresholds", {})}
+    retries = args.retries if args.retries is not None else suite.get("retries", 2)
+    alpha = args.alpha if args.alpha is not None else suite.get("alpha", DEFAULT_ALPHA)
+    baseline_dir = Path(args.baseline_dir)
+
+    failures = {}
+    for bench in suite["benchmarks"]:
+        name = bench["name"]
+        baseline_path = baseline_dir / f"{name}.json"
+        try:
+            results = run_benchmark(bench)
+        except (ValueError, ImportError, AttributeError) as exc:
+            print(f"FAIL {name}: {exc}")
+            failures[name] = [str(exc)]
+            continue
+
+        if args.update_baseline or not baseline_path.exists():
+            save_results(baseline_path, results)
+            print(f"BASELINE {name}: wrote {baseline_path}")
+            continue
+
+        try:
+            baseline = load_results(baseline_path)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"FAIL {name}: cannot load baseline {baseline_path}: {exc}")
+            print("  - re-record it with --update-baseline once the current build is trusted")
+            failures[name] = [f"unreadable baseline: {exc}"]
+            continue
+        problems = compare(results, baseline, thresholds, alpha)
+        attempt = 1
+        while problems and attempt <= retries:
+            print(f"RETRY {name}: attempt {attempt + 1} after {len(problems)} regression(s)")
+            problems = compare(run_benchmark(bench), baseline, thresholds, alpha)
+            attempt += 1
+
+        if problems:
+            failures[name] = problems
+            print(f"FAIL {name}")
+            for problem in problems:
+                print(f"  - {problem}")
+        else:
+            print(f"PASS {name}")
+
+    if failures:
+        print(f"{len(failures)} of {len(suite['benchmarks'])} benchmarks regressed")
+        return 1
+    print("No performance regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# Planning-file tracker shared by planning-with-files and prd-planner.
+#
+# Parses markdown plan files (task_plan.md, docs/{scope}-prd-task-plan.md,
+# notes) into phases, tasks and checkbox states, and keeps the result in a
+# small JSON index. On every query each tracked file is checked with one
+# stat() call. A file is re-read and re-parsed only when its mtime or size
+# changed, and not even then if its content hash is unchanged. "What's next"
+# and "what's blocked" are answered from the index, with line numbers, so an
+# agent can open just the lines it needs instead of whole plan documents.
+# Skills are installed independently, so this file is kept identical in
+# planning-with-files and prd-planner.
+
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import re
+
+INDEX_VERSION = 1
+DEFAULT_INDEX = ".plan-index.json"
+DEFAULT_PATTERNS = ("task_plan.md", "docs/*task-plan*.md", "docs/*task_plan*.md")
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+CHECKBOX = re.compile(r"^(\s*)[-*+]\s+\[([ xX~/!-])\]\s+(.*)$")
+PHASE = re.compile(r"^(?:\*\*)?Phase\s+(\d+)(?:\*\*)?\s*[:.)\-–—]?\s*(.*)$", re.I)
+STATUS_LINE = re.compile(r"^\*\*Status:?\*\*:?\s*(.+)$", re.I)
+DEPENDS = re.compile(r"\b(?:after|needs|depends on|blocked by|waiting (?:on|for))\s*:?\s*phase\s+(\d+)", re.I)
+BLOCKED_TEXT = re.compile(r"\bBLOCKED\b|⛔|🚫")
+CURRENT_TEXT = re.compile(r"\(CURRENT\)|\bin[ _]progress\b|🔄", re.I)
+DONE_TEXT = re.compile(r"[✓✅]\s*$")
+MARK_STATES = {" ": "todo", "x": "done", "X": "done", "-": "skipped", "~": "doing", "/": "doing", "!": "blocked"}
+STATUS_WORDS = {
+    "complete": "done", "completed": "done", "done": "done",
+    "in_progress": "doing", "in progress": "doing", "current": "doing",
+    "blocked": "blocked", "pending": "todo", "todo": "todo", "not started": "todo",
+}
+OPEN_STATES = ("todo", "doing")
+CLOSED_STATES = ("done", "skipped")
+# Only open tasks are kept, with clipped text; closed ones are just counted.
+TEXT_LIMIT = 160
+
+
+def task_state(mark: str, text: str) -> str:
+    state = MARK_STATES[mark]
+    if state == "todo":
+        if BLOCKED_TEXT.search(text):
+            return "blocked"
+        if DONE_TEXT.search(text):
+            return "done"
+        if CURRENT_TEXT.search(text):
+            return "doing"
+    return state
+
+
+def clean(text: str) -> str:
+    text = CURRENT_TEXT.sub("", DONE_TEXT.sub("", text))
+    text = re.sub(r"\s+", " ", text).strip(" *")
+    return text if len(text) <= TEXT_LIMIT else text[: TEXT_LIMIT - 1] + "…"
+
+
+def parse_plan(text: str) -> dict:
+    """Phases (from "Phase N" checkboxes or headings), loose tasks and the status line."""
+    plan: dict = {"title": "", "status": "", "phases": [], "tasks": [], "log": "", "closed": 0}
+    section = ""
+    heading_phase = None
+    checkbox_phase = None
+    phase_indent = 0
+    for number, line in enumerate(text.splitlines(), 1):
+        heading = HEADING.match(line)
+        if heading:
+            level, title = len(heading.group(1)), heading.group(2).strip()
+            if level == 1 and not plan["title"]:
+                plan["title"] = title
+            if heading_phase and level <= heading_phase["level"]:
+                heading_phase = None
+            checkbox_phase = None
+            phase = PHASE.match(title)
+            if phase:
+                heading_phase = {
+                    "number": int(phase.group(1)), "title": clean(phase.group(2)), "line": number,
+                    "state": task_state(" ", title), "level": level, "tasks": [], "explicit": False,
+                }
+                plan["phases"].append(heading_phase)
+            else:
+                section = title
+            continue
+
+        stripped = line.strip()
+        if section.lower() == "status" and not heading_phase and stripped and not plan["status"]:
+            plan["status"] = stripped.replace("**", "")
+        if section.lower() == "progress log" and stripped.startswith(("-", "*")):
+            plan["log"] = stripped.lstrip("-* ")
+        status = STATUS_LINE.match(stripped)
+        if status and heading_phase:
+            word = status.group(1).strip().strip("*` ").lower()
+            if word in STATUS_WORDS:
+                heading_phase["state"] = STATUS_WORDS[word]
+                heading_phase["explicit"] = True
+            continue
+
+        box = CHECKBOX.match(line)
+        if not box:
+            continue
+        indent, mark, body = len(box.group(1).expandtabs(4)), box.group(2), box.group(3).strip()
+        phase = PHASE.match(body)
+        if phase and not heading_phase:
+            checkbox_phase = {
+                "number": int(phase.group(1)), "title": clean(phase.group(2)), "line": number,
+                "state": task_state(mark, body), "level": 0, "tasks": [], "explicit": True,
+            }
+            phase_indent = indent
+            plan["phases"].append(checkbox_phase)
+            continue
+        task = {"text": clean(body), "state": task_state(mark, body), "line": number}
+        needs = sorted({int(value) for value in DEPENDS.findall(body)})
+        if needs:
+            task["needs"] = needs
+        if heading_phase:
+            heading_phase["tasks"].append(task)
+        elif checkbox_phase and indent > phase_indent:
+            checkbox_phase["tasks"].append(task)
+        else:
+            checkbox_phase = None
+            task["section"] = section
+            plan["tasks"].append(task)
+
+    for phase in plan["phases"]:
+        # A phase heading without a **Status:** line takes its state from its tasks.
+        if not phase.pop("explicit") and phase["tasks"] and phase["state"] == "todo":
+            states = {task["state"] for task in phase["tasks"]}
+            if states <= set(CLOSED_STATES):
+                phase["state"] = "done"
+            elif states & {"done", "doing"}:
+                phase["state"] = "doing"
+        phase.pop("level")
+        phase["closed"] = sum(1 for task in phase["tasks"] if task["state"] in CLOSED_STATES)
+        phase["tasks"] = [task for task in phase["tasks"] if task["state"] not in CLOSED_STATES]
+    plan["closed"] = sum(1 for task in plan["tasks"] if task["state"] in CLOSED_STATES)
+    plan["tasks"] = [task for task in plan["tasks"] if task["state"] not in CLOSED_STATES]
+    return plan
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class PlanIndex:
+    """Parsed plans keyed by path, refreshed by stat and content hash."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.files: dict[str, dict] = {}
+        self.dirty = False
+        self.reparsed = 0
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == INDEX_VERSION:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError):
+                pass
+
+    def track(self, paths: list[Path]) -> None:
+        for path in paths:
+            key = str(path)
+            if key not in self.files:
+                self.files[key] = {}
+                self.dirty = True
+
+    def refresh(self) -> None:
+        """Re-parse only files whose stat and content changed; drop deleted files."""
+        for key in list(self.files):
+            entry = self.files[key]
+            try:
+                stat = os.stat(key)
+            except OSError:
+                del self.files[key]
+                self.dirty = True
+                continue
+            signature = [stat.st_mtime_ns, stat.st_size]
+            if entry.get("stat") == signature:
+                continue
+            data = Path(key).read_bytes()
+            content = digest(data)
+            if entry.get("hash") != content:
+                entry["plan"] = parse_plan(data.decode("utf-8", errors="replace"))
+                entry["hash"] = content
+                self.reparsed += 1
+            entry["stat"] = signature
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        temp = self.path.with_name(self.path.name + ".tmp")
+        temp.write_text(
+            json.dumps({"version": INDEX_VERSION, "files": self.files}, ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+        os.replace(temp, self.path)
+        self.dirty = False
+
+    def plans(self):
+        for key, entry in sorted(self.files.items()):
+            if "plan" in entry:
+                yield key, entry["plan"]
+
+
+def current_phase(plan: dict) -> dict | None:
+    phases = plan["phases"]
+    return next((phase for phase in phases if phase["state"] == "doing"), None) or next(
+        (phase for phase in phases if phase["state"] in OPEN_STATES), None
+    )
+
+
+def phase_done(plan: dict, number: int) -> bool:
+    matches = [phase for phase in plan["phases"] if phase["number"] == number]
+    return bool(matches) and all(phase["state"] in CLOSED_STATES for phase in matches)
+
+
+def blocked_items(path: str, plan: dict) -> list[dict]:
+    """Tasks and phases marked blocked, or waiting on a phase that is not done."""
+    found = []
+    phases = plan["phases"]
+    for phase in phases:
+        if phase["state"] == "blocked":
+            found.append({"file": path, "line": phase["line"], "item": f"Phase {phase['number']}: {phase['title']}",
+                          "reason": "marked blocked"})
+    tasks = [(task, phase) for phase in phases for task in phase["tasks"]] + [(task, None) for task in plan["tasks"]]
+    for task, phase in tasks:
+        reason = "marked blocked" if task["state"] == "blocked" else ""
+        waiting = [number for number in task.get("needs", []) if not phase_done(plan, number)]
+        if waiting:
+            reason = ", ".join(f"waits for Phase {number}" for number in waiting)
+        elif phase and phase["state"] == "blocked" and not reason:
+            reason = f"Phase {phase['number']} is blocked"
+        if reason:
+            found.append({"file": path, "line": task["line"], "item": task["text"], "reason": reason})
+    return found
+
+
+def next_items(path: str, plan: dict, limit: int) -> list[dict]:
+    """Open, unblocked work in document order, starting with the current phase."""
+    blocked_lines = {item["line"] for item in blocked_items(path, plan)}
+    found = []
+    phase = current_phase(plan)
+    if phase:
+        label = f"Phase {phase['number']}: {phase['title']}"
+        tasks = [task for task in phase["tasks"] if task["state"] in OPEN_STATES and task["line"] not in blocked_lines]
+        for task in tasks:
+            found.append({"file": path, "line": task["line"], "item": task["text"], "phase": label})
+        if not phase["tasks"] and not phase["closed"] and phase["line"] not in blocked_lines:
+            found.append({"file": path, "line": phase["line"], "item": label, "phase": label})
+    for task in plan["tasks"]:
+        if task["state"] in OPEN_STATES and task["line"] not in blocked_lines:
+            found.append({"file": path, "line": task["line"], "item": task["text"], "section": task["section"]})
+    return found[:limit]
+
+
+def summary(path: str, plan: dict) -> dict:
+    phases = plan["phases"]
+    tasks = [task for phase in phases for task in phase["tasks"]] + plan["tasks"]
+    closed = plan["closed"] + sum(item["closed"] for item in phases)
+    phase = current_phase(plan)
+    return {
+        "file": path,
+        "title": plan["title"],
+        "phases_done": sum(1 for item in phases if item["state"] in CLOSED_STATES),
+        "phases": len(phases),
+        "tasks_done": closed,
+        "tasks": closed + len(tasks),
+        "current": f"Phase {phase['number']}: {phase['title']}" if phase else None,
+        "current_line": phase["line"] if phase else None,
+        "status": plan["status"],
+        "last_log": plan["log"],
+    }
+
+
+def discover(root: Path) -> list[Path]:
+    found: set[Path] = set()
+    for pattern in DEFAULT_PATTERNS:
+        found.update(path for path in root.glob(pattern) if path.is_file())
+    return sorted(found)
+
+
+def expand(paths: list[str]) -> list[Path]:
+    found: list[Path] = []
+    for value in paths:
+        path = Path(value)
+        if path.is_dir():
+            found.extend(sorted(path.glob("*.md")))
+        elif path.exists():
+            found.append(path)
+        else:
+            raise FileNotFoundError(value)
+    return found
+
+
+def location(item: dict) -> str:
+    return f"{item['file']}:{item['line']}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Track phases and tasks in planning files via a cached index.")
+    parser.add_argument("command", choices=["status", "next", "blocked", "show", "update"], help="Query to run")
+    parser.add_argument("paths", nargs="*", help="Plan files or directories to track (default: discover)")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help=f"Index file (default: {DEFAULT_INDEX})")
+    parser.add_argument("--limit", type=int, default=5, help="Items per plan for next")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_intermixed_args()
+
+    index = PlanIndex(Path(args.index))
+    try:
+        index.track(expand(args.paths))
+    except FileNotFoundError as exc:
+        print(f"Plan file not found: {exc}")
+        return 1
+    if not index.files:
+        index.track(discover(Path(".")))
+    if not index.files:
+        print("No plan files found; pass task_plan.md or docs/{scope}-prd-task-plan.md.")
+        return 1
+    index.refresh()
+    index.save()
+
+    selected = {str(path) for path in expand(args.paths)} if args.paths else None
+    plans = [(path, plan) for path, plan in index.plans() if selected is None or path in selected]
+
+    if args.command == "update":
+        print(f"Indexed {len(plans)} plan files ({index.reparsed} re-parsed) in {args.index}")
+        return 0
+    if args.command == "show":
+        result = {path: plan for path, plan in plans}
+    elif args.command == "status":
+        result = [summary(path, plan) for path, plan in plans]
+    elif args.command == "next":
+        result = [item for path, plan in plans for item in next_items(path, plan, args.limit)]
+    else:
+        result = [item for path, plan in plans for item in blocked_items(path, plan)]
+
+    if args.json or args.command == "show":
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return 0
+    if args.command == "status":
+        for item in result:
+            current = f"{item['current']} ({item['file']}:{item['current_line']})" if item["current"] else "all phases done"
+            print(f"{item['file']}: {item['title'] or '(untitled)'}")
+            print(f"  Phases {item['phases_done']}/{item['phases']}, tasks {item['tasks_done']}/{item['tasks']}")
+            print(f"  Current: {current}")
+            if item["status"]:
+                print(f"  Status: {item['status']}")
+            if item["last_log"]:
+                print(f"  Last log: {item['last_log']}")
+        return 0
+    if not result:
+        print("Nothing open." if args.command == "next" else "Nothing blocked.")
+        return 0
+    for item in result:
+        context = item.get("reason") or item.get("phase") or item.get("section")
+        print(f"{location(item)}  {item['item']}" + (f"  [{context}]" if context else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 # Template generator for coverage analysis.
+#
+# With --input, real coverage data (Cobertura XML, LCOV or coverage.py JSON)
+# is streamed through coverage_ingest to fill the summary and the gaps.
 
 from pathlib import Path
 import argparse
 import textwrap
 
+from coverage_ingest import INGESTERS, ingest, percent
+
 
 def write_output(path: Path, content: str, force: bool) -> bool:
     if path.exists() and not force:
@@ -20,22 +25,60 @@ def main() -> int:
     parser.add_argument("--output", default="coverage-analysis.md", help="Output file path")
     parser.add_argument("--name", default="example", help="Component or repo name")
     parser.add_argument("--owner", default="team", help="Owning team")
+    parser.add_argument(
+        "--input",
+        action="append",
+        default=[],
+        help="Coverage file (Cobertura XML, LCOV or coverage.py JSON); repeatable",
+    )
+    parser.add_argument(
+        "--format", default="auto", choices=["auto", *INGESTERS], help="Coverage file format"
+    )
+    parser.add_argument("--top", type=int, default=10, help="Number of coverage gaps to list")
     parser.add_argument("--force", action="store_true", help="Overwrite existing file")
     args = parser.parse_args()
 
+    summary = f"Coverage summary for {args.name}."
+    gaps = "- Missing unit tests\n- Missing integration tests"
+    if args.input:
+        paths = [Path(item) for item in args.input]
+        missing = [str(path) for path in paths if not path.exists()]
+        if missing:
+            print("Missing coverage files: " + ", ".join(missing))
+            return 1
+        try:
+            table = ingest(paths, args.format)
+        except (ValueError, OSError, SyntaxError) as exc:
+            print(f"Cannot read coverage data: {exc}")
+            return 1
+        totals = table.totals()
+        summary += "\n\n" + "\n".join(
+            [
+                f"- Lines: {percent(totals['lines_hit'], totals['lines'])}",
+                f"- Branches: {percent(totals['branches_hit'], totals['branches'])}",
+                f"- Functions: {percent(totals['functions_hit'], totals['functions'])}",
+                f"- Files: {len(table)}",
+            ]
+        )
+        gaps = "\n".join(
+            f"- {name}: {percent(row['lines_hit'], row['lines'])} lines, "
+            f"{row['lines'] - row['lines_hit']} lines and "
+            f"{row['branches'] - row['branches_hit']} branches uncovered"
+            for name, row in table.worst(args.top)
+        ) or "- None"
+
     content = textwrap.dedent(
         f"""\
         # Coverage Analysis
 
         ## Summary
-        Coverage summary for {args.name}.
+        {{summary}}
 
         ## Ownership
         - Owner: {args.owner}
 
         ## Coverage Gaps
-        - Missing unit tests
-        - Missing integration tests
+        {{gaps}}
 
         ## Risk Areas
         - Critical paths with low coverage
@@ -49,6 +92,7 @@ def main() -> int:
         - Owners and deadlines
         """
     ).strip() + "\n"
+    content = content.replace("{summary}", summary).replace("{gaps}", gaps)
 
     output = Path(args.output)
     if not write_output(output, content, args.force):
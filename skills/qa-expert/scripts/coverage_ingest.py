@@ -0,0 +1,449 @@
+# Streaming coverage ingestion shared by the coverage scripts.
+#
+# Reads Cobertura XML (iterparse), LCOV (line by line) and coverage.py JSON
+# (incremental per-file decoding) without loading the whole report, and
+# aggregates per-file counts into array-backed columns. With several inputs,
+# per-line, per-branch and per-function hits are kept and merged, so a file
+# reported by two runs counts the union of its lines, not their sum. Line-level
+# hit/miss data can also be streamed for a selected subset of files.
+# Skills are installed independently, so this file is kept identical in
+# test-automator, qa-expert and code-reviewer.
+
+from array import array
+from pathlib import Path
+import json
+import re
+import xml.etree.ElementTree as ET
+
+CHUNK_SIZE = 1 << 20
+CONDITION_PATTERN = re.compile(r"\((\d+)/(\d+)\)")
+COLUMNS = ("lines", "lines_hit", "branches", "branches_hit", "functions", "functions_hit")
+KINDS = (("lines", "lines_hit"), ("branches", "branches_hit"), ("functions", "functions_hit"))
+LCOV_COVERED = re.compile(r"^DA:(\d+),(?!0\b)-?\d", re.M)
+LCOV_UNCOVERED = re.compile(r"^DA:(\d+),0\b", re.M)
+
+
+def new_detail() -> dict:
+    """Per-file hits by line number, branch key ((hit, total) pairs) and function name."""
+    return {"lines": {}, "branches": {}, "functions": {}}
+
+
+class CoverageTable:
+    """Per-file coverage counts stored column-wise in unsigned arrays.
+
+    With merge=True the ingesters also pass per-line detail, and a file added
+    twice gets the union of both reports. Otherwise counts are summed, which is
+    right for one report where each file appears once.
+    """
+
+    def __init__(self, merge: bool = False) -> None:
+        self.files: list[str] = []
+        self.index: dict[str, int] = {}
+        self.columns = {name: array("Q") for name in COLUMNS}
+        self.details: dict[int, dict] | None = {} if merge else None
+
+    def add(self, filename: str, detail: dict | None = None, **counts: int) -> None:
+        row = self.index.get(filename)
+        if row is None:
+            row = len(self.files)
+            self.index[filename] = row
+            self.files.append(filename)
+            for column in self.columns.values():
+                column.append(0)
+        if self.details is None:
+            for name, value in counts.items():
+                self.columns[name][row] += value
+            return
+        merged = self.details.setdefault(row, new_detail())
+        if detail is not None:
+            for number, hit in detail["lines"].items():
+                merged["lines"][number] = merged["lines"].get(number, False) or hit
+            for key, (hit, total) in detail["branches"].items():
+                old_hit, old_total = merged["branches"].get(key, (0, 0))
+                merged["branches"][key] = (max(old_hit, hit), max(old_total, total))
+            for name, hit in detail["functions"].items():
+                merged["functions"][name] = merged["functions"].get(name, False) or hit
+        recounted = {
+            "lines": len(merged["lines"]),
+            "lines_hit": sum(merged["lines"].values()),
+            "branches": sum(total for _, total in merged["branches"].values()),
+            "branches_hit": sum(hit for hit, _ in merged["branches"].values()),
+            "functions": len(merged["functions"]),
+            "functions_hit": sum(merged["functions"].values()),
+        }
+        for total, hit in KINDS:
+            # Summary-only records (no per-line data) can only raise the figures.
+            if counts.get(total, 0) > recounted[total]:
+                recounted[total], recounted[hit] = counts[total], counts.get(hit, 0)
+            if self.columns[total][row] > recounted[total]:
+                recounted[total], recounted[hit] = self.columns[total][row], self.columns[hit][row]
+        for name, value in recounted.items():
+            self.columns[name][row] = value
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def totals(self) -> dict[str, int]:
+        return {name: sum(column) for name, column in self.columns.items()}
+
+    def row(self, index: int) -> dict[str, int]:
+        return {name: column[index] for name, column in self.columns.items()}
+
+    def worst(self, top: int, min_lines: int = 1) -> list[tuple[str, dict[str, int]]]:
+        """Files with uncovered lines, by line coverage ascending, then missed lines."""
+        lines, hits = self.columns["lines"], self.columns["lines_hit"]
+        candidates = [
+            i for i in range(len(self.files)) if lines[i] >= min_lines and hits[i] < lines[i]
+        ]
+        candidates.sort(key=lambda i: (hits[i] / lines[i], -(lines[i] - hits[i])))
+        return [(self.files[i], self.row(i)) for i in candidates[:top]]
+
+
+def percent(hit: int, total: int) -> str:
+    if not total:
+        return "n/a"
+    return f"{100.0 * hit / total:.1f}% ({hit}/{total})"
+
+
+def detect_format(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".xml":
+        return "cobertura"
+    if suffix in {".info", ".lcov"}:
+        return "lcov"
+    if suffix == ".json":
+        return "coveragepy"
+    with path.open("rb") as handle:
+        head = handle.read(512).lstrip()
+    if head.startswith(b"<"):
+        return "cobertura"
+    if head.startswith(b"{"):
+        return "coveragepy"
+    return "lcov"
+
+
+def ingest_cobertura(path: Path, table: CoverageTable) -> None:
+    stack: list[str] = []
+    filename = None
+    method_hit = False
+    method = ""
+    counts = dict.fromkeys(COLUMNS, 0)
+    keep = table.details is not None
+    detail = new_detail() if keep else None
+    context = ET.iterparse(str(path), events=("start", "end"))
+    _, root = next(context)
+    stack.append(root.tag)
+    for event, elem in context:
+        tag = elem.tag
+        if event == "start":
+            stack.append(tag)
+            if tag == "class":
+                filename = elem.get("filename") or elem.get("name") or "<unknown>"
+                counts = dict.fromkeys(COLUMNS, 0)
+                detail = new_detail() if keep else None
+            elif tag == "method":
+                method_hit = False
+                method = f"{elem.get('name', '')}{elem.get('signature', '')}"
+            continue
+
+        stack.pop()
+        if tag == "line":
+            hits = int(elem.get("hits", "0") or 0)
+            parent = stack[-2] if len(stack) >= 2 else ""
+            if parent == "method":
+                method_hit = method_hit or hits > 0
+            elif parent == "class":
+                counts["lines"] += 1
+                counts["lines_hit"] += hits > 0
+                number = int(elem.get("number", "0") or 0)
+                if keep:
+                    detail["lines"][number] = hits > 0
+                if elem.get("branch") == "true":
+                    match = CONDITION_PATTERN.search(elem.get("condition-coverage", ""))
+                    if match:
+                        counts["branches_hit"] += int(match.group(1))
+                        counts["branches"] += int(match.group(2))
+                        if keep:
+                            detail["branches"][number] = (int(match.group(1)), int(match.group(2)))
+        elif tag == "method":
+            counts["functions"] += 1
+            counts["functions_hit"] += method_hit
+            if keep:
+                detail["functions"][method] = method_hit
+        elif tag == "class":
+            table.add(filename, detail, **counts)
+            filename = None
+        if tag in {"class", "package"}:
+            # Drop finished subtrees so memory stays flat on huge reports.
+            elem.clear()
+            root.clear()
+
+
+def ingest_lcov(path: Path, table: CoverageTable) -> None:
+    filename = None
+    counts = dict.fromkeys(COLUMNS, 0)
+    summary: dict[str, int] = {}
+    keep = table.details is not None
+    detail = None
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            tag, _, value = line.rstrip("\n").partition(":")
+            if tag == "SF":
+                filename = value
+                counts = dict.fromkeys(COLUMNS, 0)
+                summary = {}
+                detail = new_detail() if keep else None
+            elif tag == "DA":
+                fields = value.split(",")
+                hit = int(fields[1]) > 0 if len(fields) > 1 else False
+                counts["lines"] += 1
+                counts["lines_hit"] += hit
+                if keep:
+                    number = int(fields[0])
+                    detail["lines"][number] = detail["lines"].get(number, False) or hit
+            elif tag == "BRDA":
+                key, _, taken = value.rpartition(",")
+                hit = taken not in {"-", "0"}
+                counts["branches"] += 1
+                counts["branches_hit"] += hit
+                if keep:
+                    detail["branches"][key] = (int(hit), 1)
+            elif tag == "FNDA":
+                calls, _, name = value.partition(",")
+                hit = int(calls or 0) > 0
+                counts["functions"] += 1
+                counts["functions_hit"] += hit
+                if keep:
+                    detail["functions"][name] = detail["functions"].get(name, False) or hit
+            elif tag in {"LF", "LH", "BRF", "BRH", "FNF", "FNH"}:
+                summary[tag] = int(value or 0)
+            elif tag == "end_of_record" and filename is not None:
+                # Prefer explicit DA/BRDA/FNDA records; fall back to summaries.
+                for total, hit, found, found_hit in (
+                    ("lines", "lines_hit", "LF", "LH"),
+                    ("branches", "branches_hit", "BRF", "BRH"),
+                    ("functions", "functions_hit", "FNF", "FNH"),
+                ):
+                    if not counts[total] and found in summary:
+                        counts[total] = summary[found]
+                        counts[hit] = summary.get(found_hit, 0)
+                table.add(filename, detail, **counts)
+                filename = None
+
+
+class JsonStream:
+    """Incremental decoder for one level of a large JSON object."""
+
+    def __init__(self, handle) -> None:
+        self.handle = handle
+        self.buffer = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.handle.read(max(CHUNK_SIZE, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def next_char(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, char: str) -> None:
+        if self.next_char() != char:
+            raise ValueError(f"Expected {char!r} in JSON input")
+        self.pos += 1
+
+    def value(self):
+        self.next_char()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the buffer edge may be truncated; make sure it ended.
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield (key, value) pairs of the object starting at the cursor."""
+        self.expect("{")
+        if self.next_char() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key, self
+            char = self.next_char()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError("Malformed JSON object")
+
+
+def ingest_coveragepy(path: Path, table: CoverageTable) -> None:
+    with path.open(encoding="utf-8") as handle:
+        stream = JsonStream(handle)
+        for key, _ in stream.items():
+            if key != "files":
+                stream.value()
+                continue
+            for filename, _ in stream.items():
+                data = stream.value()
+                summary = data.get("summary", {})
+                functions = [
+                    info for name, info in data.get("functions", {}).items() if name
+                ]
+                detail = None
+                if table.details is not None:
+                    detail = new_detail()
+                    detail["lines"].update(dict.fromkeys(data.get("missing_lines", []), False))
+                    detail["lines"].update(dict.fromkeys(data.get("executed_lines", []), True))
+                    for branch in data.get("missing_branches", []):
+                        detail["branches"][tuple(branch)] = (0, 1)
+                    for branch in data.get("executed_branches", []):
+                        detail["branches"][tuple(branch)] = (1, 1)
+                    for name, info in data.get("functions", {}).items():
+                        if name:
+                            detail["functions"][name] = info.get("summary", {}).get("covered_lines", 0) > 0
+                table.add(
+                    filename,
+                    detail,
+                    lines=summary.get("num_statements", 0),
+                    lines_hit=summary.get("covered_lines", 0),
+                    branches=summary.get("num_branches", 0),
+                    branches_hit=summary.get("covered_branches", 0),
+                    functions=len(functions),
+                    functions_hit=sum(
+                        1
+                        for info in functions
+                        if info.get("summary", {}).get("covered_lines", 0) > 0
+                    ),
+                )
+
+
+INGESTERS = {
+    "cobertura": ingest_cobertura,
+    "lcov": ingest_lcov,
+    "coveragepy": ingest_coveragepy,
+}
+
+
+def ingest(paths: list[Path], fmt: str = "auto") -> CoverageTable:
+    table = CoverageTable(merge=len(paths) > 1)
+    for path in paths:
+        kind = detect_format(path) if fmt == "auto" else fmt
+        INGESTERS[kind](path, table)
+    return table
+
+
+
+def iter_cobertura_lines(path: Path, select):
+    depth = 0
+    class_depth = -1
+    name = None
+    covered: list[int] = []
+    uncovered: list[int] = []
+    context = ET.iterparse(str(path), events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event == "start":
+            depth += 1
+            if elem.tag == "class":
+                class_depth = depth
+                name = select(elem.get("filename") or elem.get("name") or "")
+                covered, uncovered = [], []
+            continue
+        # Class-level <line> elements sit at class_depth + 2 (class/lines/line).
+        if elem.tag == "line" and name is not None and depth == class_depth + 2:
+            number = int(elem.get("number", "0"))
+            if int(elem.get("hits", "0") or 0) > 0:
+                covered.append(number)
+            else:
+                uncovered.append(number)
+        elif elem.tag == "class":
+            if name is not None:
+                yield name, covered, uncovered
+            name = None
+            elem.clear()
+            root.clear()
+        depth -= 1
+
+
+def iter_lcov_lines(path: Path, select):
+    # Whole records are matched with regexes so unselected files cost one
+    # find() and selected files avoid a Python-level loop per DA line.
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        pending = ""
+        while True:
+            chunk = handle.read(CHUNK_SIZE * 8)
+            data = pending + chunk
+            cut = data.rfind("end_of_record") if chunk else len(data)
+            if cut < 0:
+                pending = data
+                continue
+            pending = data[cut:]
+            for record in data[:cut].split("end_of_record"):
+                start = record.find("SF:")
+                if start < 0:
+                    continue
+                end = record.find("\n", start)
+                name = select(record[start + 3:end if end >= 0 else None].rstrip("\r"))
+                if name is not None:
+                    yield (
+                        name,
+                        list(map(int, LCOV_COVERED.findall(record))),
+                        list(map(int, LCOV_UNCOVERED.findall(record))),
+                    )
+            if not chunk:
+                return
+
+
+def iter_coveragepy_lines(path: Path, select):
+    with path.open(encoding="utf-8") as handle:
+        stream = JsonStream(handle)
+        for key, _ in stream.items():
+            if key != "files":
+                stream.value()
+                continue
+            for filename, _ in stream.items():
+                data = stream.value()
+                name = select(filename)
+                if name is not None:
+                    yield name, data.get("executed_lines", []), data.get("missing_lines", [])
+
+
+LINE_READERS = {
+    "cobertura": iter_cobertura_lines,
+    "lcov": iter_lcov_lines,
+    "coveragepy": iter_coveragepy_lines,
+}
+
+
+def iter_line_coverage(paths: list[Path], select, fmt: str = "auto"):
+    """Yield (key, covered lines, uncovered lines) for files accepted by select().
+
+    select(name) maps a coverage file name to a key, or None to skip the file
+    cheaply. A file may be yielded more than once across inputs.
+    """
+    for path in paths:
+        kind = detect_format(path) if fmt == "auto" else fmt
+        yield from LINE_READERS[kind](path, select)
@@ -0,0 +1,263 @@
+# Source scanner shared by the test-plan generators.
+#
+# Parses Python files with `ast` in a process pool, caches each parse by
+# content hash, and finds public functions, classes and methods that no test
+# file references. A reference only counts when the same test file imports
+# the defining module (or names it in a dotted string such as a mock.patch
+# target), so same-named functions in other modules stay untested. Re-runs
+# reuse cached results for files whose stat or hash is unchanged. Skills are
+# installed independently, so this file is kept identical in test-automator
+# and qa-expert.
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import ast
+import hashlib
+import json
+import os
+
+CACHE_VERSION = 2
+SKIP_DIRS = {
+    ".git", ".hg", ".svn", ".venv", "venv", "env", "node_modules", "__pycache__",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", "build", "dist", "site-packages",
+}
+BRANCH_NODES = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler,
+    ast.With, ast.AsyncWith, ast.Assert, ast.comprehension, ast.match_case,
+)
+POOL_THRESHOLD = 32
+
+
+def is_test_file(rel_path: str) -> bool:
+    parts = rel_path.split("/")
+    name = parts[-1]
+    if name.startswith("test_") or name.endswith("_test.py") or name == "conftest.py":
+        return True
+    return any(part in {"tests", "test", "testing"} for part in parts[:-1])
+
+
+def complexity(node: ast.AST) -> int:
+    """McCabe-style complexity: 1 + decision points (nested defs excluded)."""
+    score = 1
+    stack = list(ast.iter_child_nodes(node))
+    while stack:
+        child = stack.pop()
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(child, BRANCH_NODES):
+            score += 1
+        elif isinstance(child, ast.BoolOp):
+            score += len(child.values) - 1
+        stack.extend(ast.iter_child_nodes(child))
+    return score
+
+
+def definitions(tree: ast.Module) -> list[dict]:
+    found = []
+
+    def visit(body, prefix: str) -> None:
+        for node in body:
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            if node.name.startswith("_"):
+                continue
+            qualname = f"{prefix}{node.name}"
+            is_class = isinstance(node, ast.ClassDef)
+            found.append(
+                {
+                    "name": node.name,
+                    "qualname": qualname,
+                    "kind": "class" if is_class else ("method" if prefix else "function"),
+                    "line": node.lineno,
+                    "size": (node.end_lineno or node.lineno) - node.lineno + 1,
+                    "complexity": 0 if is_class else complexity(node),
+                }
+            )
+            if is_class:
+                visit(node.body, qualname + ".")
+
+    visit(tree.body, "")
+    return found
+
+
+def module_name(rel_path: str) -> str:
+    parts = rel_path[:-3].split("/") if rel_path.endswith(".py") else rel_path.split("/")
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def references(tree: ast.Module, rel_path: str = "") -> tuple[list[str], list[str]]:
+    """Names a test file mentions, and the modules it imports (dotted strings included)."""
+    names = set()
+    modules = set()
+    package = module_name(rel_path).split(".")[:-1] if rel_path else []
+    if rel_path.endswith("__init__.py"):
+        package = module_name(rel_path).split(".")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                modules.add(alias.name)
+                names.add(alias.asname or alias.name.rsplit(".", 1)[-1])
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parent = package[:len(package) - node.level + 1] if node.level > 1 else package
+                base = ".".join(part for part in [*parent, base] if part)
+            if base:
+                modules.add(base)
+            for alias in node.names:
+                names.add(alias.asname or alias.name)
+                # from pkg import module
+                modules.add(f"{base}.{alias.name}" if base else alias.name)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            # test_parse_config / test_parse_config_rejects_blank -> parse_config, ...
+            if node.name.startswith("test_"):
+                parts = node.name[5:].split("_")
+                names.update("_".join(parts[:i]) for i in range(1, len(parts) + 1))
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            # mock.patch("pkg.mod.func") style targets.
+            if node.value.isidentifier():
+                names.add(node.value)
+            elif "." in node.value and " " not in node.value:
+                target, _, name = node.value.rpartition(".")
+                names.add(name)
+                modules.add(target)
+    return sorted(names), sorted(modules)
+
+
+def content_key(data: bytes, rel_path: str) -> str:
+    # Test and source files are analysed differently, so the role is part of the key.
+    digest = hashlib.sha256(data).hexdigest()
+    return digest + (":test" if is_test_file(rel_path) else "")
+
+
+def analyze(path: str, rel_path: str) -> tuple[str, str, dict]:
+    data = Path(path).read_bytes()
+    digest = content_key(data, rel_path)
+    try:
+        tree = ast.parse(data, filename=rel_path)
+    except (SyntaxError, ValueError):
+        return rel_path, digest, {"error": "syntax", "defs": [], "refs": [], "imports": []}
+    test = is_test_file(rel_path)
+    refs, imports = references(tree, rel_path) if test else ([], [])
+    return rel_path, digest, {
+        "defs": [] if test else definitions(tree),
+        "refs": refs,
+        "imports": imports,
+    }
+
+
+def iter_python_files(root: Path):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+        for filename in filenames:
+            if filename.endswith(".py"):
+                full = os.path.join(dirpath, filename)
+                yield full, os.path.relpath(full, root).replace(os.sep, "/")
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"files": {}, "results": {}}
+    if data.get("version") != CACHE_VERSION:
+        return {"files": {}, "results": {}}
+    return data
+
+
+def scan(root: Path, cache_path: Path | None = None, jobs: int | None = None) -> dict:
+    """Scan a tree and return {"files": {rel: result}, "parsed": n, "cached": n}."""
+    cache = load_cache(cache_path) if cache_path else {"files": {}, "results": {}}
+    old_files, results = cache["files"], cache["results"]
+    files: dict[str, dict] = {}
+    stats: dict[str, list] = {}
+    pending = []
+    for full, rel in iter_python_files(root):
+        stat = os.stat(full)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        stats[rel] = signature
+        entry = old_files.get(rel)
+        if entry and entry["stat"] == signature and entry["hash"] in results:
+            files[rel] = entry
+            continue
+        digest = content_key(Path(full).read_bytes(), rel)
+        if digest in results:
+            files[rel] = {"stat": signature, "hash": digest}
+            continue
+        pending.append((full, rel))
+
+    if len(pending) >= POOL_THRESHOLD and (jobs or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed = list(
+                pool.map(analyze, *zip(*pending), chunksize=max(1, len(pending) // 64))
+            )
+    else:
+        parsed = [analyze(full, rel) for full, rel in pending]
+    for rel, digest, result in parsed:
+        results[digest] = result
+        files[rel] = {"stat": stats[rel], "hash": digest}
+
+    live = {entry["hash"] for entry in files.values()}
+    results = {digest: result for digest, result in results.items() if digest in live}
+    if cache_path:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(
+            json.dumps({"version": CACHE_VERSION, "files": files, "results": results}),
+            encoding="utf-8",
+        )
+    return {
+        "files": {rel: results[entry["hash"]] for rel, entry in files.items()},
+        "parsed": len(pending),
+        "cached": len(files) - len(pending),
+    }
+
+
+def untested_targets(scanned: dict) -> tuple[list[dict], int]:
+    """Public definitions no test references, ranked by complexity x size.
+
+    A test's references count for the modules it imports, matched on trailing
+    dotted parts so src/ layouts and tests importing `mod` directly both work.
+    """
+    referenced: dict[str, set[str]] = {}
+    for result in scanned["files"].values():
+        for module in result["imports"]:
+            referenced.setdefault(module, set()).update(result["refs"])
+    targets = []
+    total = 0
+    for rel, result in scanned["files"].items():
+        if not result["defs"]:
+            continue
+        parts = module_name(rel).split(".")
+        names = set()
+        for start in range(len(parts)):
+            names |= referenced.get(".".join(parts[start:]), set())
+        for item in result["defs"]:
+            total += 1
+            if item["name"] in names:
+                continue
+            score = max(item["complexity"], 1) * item["size"]
+            targets.append({**item, "path": rel, "score": score})
+    targets.sort(key=lambda item: (-item["score"], item["path"], item["line"]))
+    return targets, total
+
+
+def render_targets(targets: list[dict], total: int, top: int) -> str:
+    lines = [
+        f"{len(targets)} of {total} public functions, classes and methods have no referencing test.",
+        "",
+        "| Target | Location | Kind | Lines | Complexity |",
+        "| --- | --- | --- | --- | --- |",
+    ]
+    for item in targets[:top]:
+        complexity_cell = item["complexity"] if item["kind"] != "class" else "-"
+        lines.append(
+            f"| `{item['qualname']}` | {item['path']}:{item['line']} | {item['kind']} "
+            f"| {item['size']} | {complexity_cell} |"
+        )
+    return "\n".join(lines)
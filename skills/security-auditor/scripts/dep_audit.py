@@ -0,0 +1,496 @@
+# Offline dependency audit for security_audit.py.
+#
+# Lockfiles (package-lock.json, npm-shrinkwrap.json, requirements*.txt,
+# poetry.lock) are parsed into (ecosystem, package, version) triples and
+# checked against a local copy of the OSV advisory database: a directory of
+# OSV JSON files or the per-ecosystem all.zip exports. Each package's affected
+# ranges are flattened into sorted boundaries where every segment between two
+# boundaries lists the advisories covering it, so a lookup is one bisect.
+# The compiled index is cached next to the database and rebuilt when the
+# database files change.
+
+from bisect import bisect_right
+from pathlib import Path
+import json
+import math
+import os
+import re
+import zipfile
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+INDEX_VERSION = 1
+SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", ".tox"}
+SEVERITY_ORDER = ["Critical", "High", "Medium", "Low", "Unrated"]
+GHSA_SEVERITY = {"CRITICAL": "Critical", "HIGH": "High", "MODERATE": "Medium", "MEDIUM": "Medium", "LOW": "Low"}
+
+PEP440 = re.compile(
+    r"^v?(?:(\d+)!)?(\d+(?:\.\d+)*)"
+    r"(?:[-_.]?(a|alpha|b|beta|c|rc|pre|preview)[-_.]?(\d*))?"
+    r"(?:-(\d+)|[-_.]?(post|rev|r)[-_.]?(\d*))?"
+    r"(?:[-_.]?dev[-_.]?(\d*))?"
+    r"(?:\+[a-z0-9._]+)?$",
+    re.IGNORECASE,
+)
+PRE_RANK = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+SEMVER = re.compile(r"^[v=]?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+REQUIREMENT = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*===?\s*([^\s;,#]+)")
+
+# CVSS v3 base metric weights.
+CVSS_WEIGHTS = {
+    "AV": {"N": 0.85, "A": 0.62, "L": 0.55, "P": 0.2},
+    "AC": {"L": 0.77, "H": 0.44},
+    "UI": {"N": 0.85, "R": 0.62},
+    "C": {"H": 0.56, "L": 0.22, "N": 0.0},
+    "I": {"H": 0.56, "L": 0.22, "N": 0.0},
+    "A": {"H": 0.56, "L": 0.22, "N": 0.0},
+}
+CVSS_PRIVILEGES = {"U": {"N": 0.85, "L": 0.62, "H": 0.27}, "C": {"N": 0.85, "L": 0.68, "H": 0.5}}
+
+
+# --- versions ---------------------------------------------------------------
+# Keys are nested lists so they survive a JSON round trip and still compare.
+
+def pep440_key(version: str) -> list | None:
+    match = PEP440.match(version.strip())
+    if not match:
+        return None
+    epoch, release, pre, pre_number, post_implicit, post, post_number, dev = match.groups()
+    parts = [int(part) for part in release.split(".")]
+    while len(parts) > 1 and parts[-1] == 0:
+        parts.pop()
+    has_post = post_implicit is not None or post is not None
+    if pre:
+        pre_key = [0, PRE_RANK[pre.lower()], int(pre_number or 0)]
+    elif dev is not None and not has_post:
+        pre_key = [-1]  # 1.0.dev1 sorts before 1.0a1
+    else:
+        pre_key = [1]
+    post_key = [0, int(post_implicit or post_number or 0)] if has_post else [-1]
+    dev_key = [0, int(dev or 0)] if dev is not None else [1]
+    return [int(epoch or 0), parts, pre_key, post_key, dev_key]
+
+
+def semver_key(version: str) -> list | None:
+    match = SEMVER.match(version.strip())
+    if not match:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    if prerelease is None:
+        pre_key = [1]
+    else:
+        pre_key = [0] + [[0, int(part)] if part.isdigit() else [1, part] for part in prerelease.split(".")]
+    return [int(major), int(minor or 0), int(patch or 0), pre_key]
+
+
+VERSION_KEYS = {"PyPI": pep440_key, "npm": semver_key}
+
+
+def normalize_name(ecosystem: str, name: str) -> str:
+    if ecosystem == "PyPI":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    return name.lower()
+
+
+# --- lockfiles --------------------------------------------------------------
+
+def is_lockfile(name: str) -> bool:
+    return name in ("package-lock.json", "npm-shrinkwrap.json", "poetry.lock") or (
+        name.startswith("requirements") and name.endswith(".txt")
+    )
+
+
+def find_lockfiles(paths: list[Path]) -> list[Path]:
+    found = []
+    for path in paths:
+        if path.is_file():
+            found.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(name for name in dirs if name not in SKIP_DIRS)
+            found.extend(Path(root) / name for name in sorted(names) if is_lockfile(name))
+    return found
+
+
+def parse_npm_lock(text: str) -> list[tuple[str, str]]:
+    data = json.loads(text)
+    packages = []
+    for key, entry in (data.get("packages") or {}).items():
+        if not key or entry.get("link") or "version" not in entry:
+            continue
+        packages.append((entry.get("name") or key.rsplit("node_modules/", 1)[-1], entry["version"]))
+    if packages:
+        return packages
+    # lockfileVersion 1 nests dependencies.
+    stack = [data.get("dependencies") or {}]
+    while stack:
+        for name, entry in stack.pop().items():
+            if isinstance(entry, dict) and "version" in entry:
+                packages.append((name, entry["version"]))
+                stack.append(entry.get("dependencies") or {})
+    return packages
+
+
+def parse_requirements(text: str) -> tuple[list[tuple[str, str]], list[str]]:
+    """Pinned (name, version) pairs and the names of unpinned requirements."""
+    pinned = []
+    unpinned = []
+    for line in text.replace("\\\n", " ").splitlines():
+        line = line.split(" #", 1)[0].strip()
+        if not line or line.startswith(("#", "-")):
+            continue
+        match = REQUIREMENT.match(line)
+        if match:
+            pinned.append((match.group(1), match.group(2)))
+        else:
+            name = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", line)
+            if name and "://" not in line:
+                unpinned.append(name.group(0))
+    return pinned, unpinned
+
+
+def parse_poetry_lock(text: str) -> list[tuple[str, str]]:
+    if tomllib is not None:
+        return [(entry["name"], entry["version"]) for entry in tomllib.loads(text).get("package", [])]
+    packages = []
+    name = None
+    in_package = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("["):
+            in_package = stripped == "[[package]]"
+            name = None
+        elif in_package and stripped.startswith("name ="):
+            name = stripped.split("=", 1)[1].strip().strip('"')
+        elif in_package and stripped.startswith("version =") and name:
+            packages.append((name, stripped.split("=", 1)[1].strip().strip('"')))
+    return packages
+
+
+def read_lockfiles(paths: list[Path]) -> tuple[dict[tuple[str, str, str], list[str]], list[str], list[str]]:
+    """(ecosystem, name, version) -> lockfiles, unpinned requirement names, and unreadable files."""
+    packages: dict[tuple[str, str, str], list[str]] = {}
+    unpinned: list[str] = []
+    errors: list[str] = []
+    for path in paths:
+        try:
+            text = path.read_text(encoding="utf-8")
+            if path.suffix == ".json":
+                ecosystem, entries = "npm", parse_npm_lock(text)
+            elif path.name == "poetry.lock":
+                ecosystem, entries = "PyPI", parse_poetry_lock(text)
+            else:
+                entries, loose = parse_requirements(text)
+                ecosystem = "PyPI"
+                unpinned.extend(f"{name} ({path})" for name in loose)
+        except (OSError, ValueError, KeyError) as exc:
+            errors.append(f"{path}: {exc}")
+            continue
+        for name, version in entries:
+            sources = packages.setdefault((ecosystem, normalize_name(ecosystem, name), version), [])
+            if str(path) not in sources:
+                sources.append(str(path))
+    return packages, unpinned, errors
+
+
+# --- advisories -------------------------------------------------------------
+
+def cvss3_score(vector: str) -> float | None:
+    metrics = dict(part.split(":", 1) for part in vector.split("/")[1:] if ":" in part)
+    try:
+        scope = metrics["S"]
+        impact_base = 1 - (
+            (1 - CVSS_WEIGHTS["C"][metrics["C"]])
+            * (1 - CVSS_WEIGHTS["I"][metrics["I"]])
+            * (1 - CVSS_WEIGHTS["A"][metrics["A"]])
+        )
+        exploitability = (
+            8.22 * CVSS_WEIGHTS["AV"][metrics["AV"]] * CVSS_WEIGHTS["AC"][metrics["AC"]]
+            * CVSS_PRIVILEGES[scope][metrics["PR"]] * CVSS_WEIGHTS["UI"][metrics["UI"]]
+        )
+    except KeyError:
+        return None
+    if scope == "U":
+        impact = 6.42 * impact_base
+    else:
+        impact = 7.52 * (impact_base - 0.029) - 3.25 * (impact_base - 0.02) ** 15
+    if impact <= 0:
+        return 0.0
+    total = impact + exploitability if scope == "U" else 1.08 * (impact + exploitability)
+    scaled = round(min(total, 10) * 100000)
+    return scaled / 100000 if scaled % 10000 == 0 else (math.floor(scaled / 10000) + 1) / 10
+
+
+def advisory_severity(advisory: dict) -> str:
+    label = GHSA_SEVERITY.get(str((advisory.get("database_specific") or {}).get("severity", "")).upper())
+    if label:
+        return label
+    for entry in advisory.get("severity") or []:
+        if entry.get("type") == "CVSS_V3":
+            score = cvss3_score(entry.get("score", ""))
+            if score is not None:
+                return "Critical" if score >= 9 else "High" if score >= 7 else "Medium" if score >= 4 else "Low"
+    return "Unrated"
+
+
+def affected_intervals(affected: dict, key) -> tuple[list[tuple], list[str]]:
+    """Boundary pairs [start, end) for one affected entry, plus its fixed versions.
+
+    A boundary is [1, version key, 0] at a version, [1, key, 1] just after it,
+    [0] below every version and [2] above every version.
+    """
+    intervals = []
+    fixed = []
+    for span in affected.get("ranges") or []:
+        if span.get("type") not in ("ECOSYSTEM", "SEMVER"):
+            continue
+        start = None
+        for event in span.get("events") or []:
+            if "introduced" in event:
+                value = event["introduced"]
+                version = key(value) if value != "0" else None
+                start = [1, version, 0] if version is not None else [0]
+            elif start is not None and ("fixed" in event or "last_affected" in event):
+                inclusive = "last_affected" in event
+                value = event["last_affected" if inclusive else "fixed"]
+                version = key(value)
+                if version is None:
+                    continue
+                intervals.append((start, [1, version, 1 if inclusive else 0]))
+                if not inclusive:
+                    fixed.append(value)
+                start = None
+        if start is not None:
+            intervals.append((start, [2]))
+    if not intervals:
+        for value in affected.get("versions") or []:
+            version = key(value)
+            if version is not None:
+                intervals.append(([1, version, 0], [1, version, 1]))
+    return intervals, fixed
+
+
+class AdvisoryIndex:
+    """Per-package interval index over OSV advisories."""
+
+    def __init__(self) -> None:
+        self.advisories: list[dict] = []
+        self.packages: dict[str, dict] = {}
+
+    @classmethod
+    def build(cls, records) -> "AdvisoryIndex":
+        index = cls()
+        intervals: dict[str, list] = {}
+        for advisory in records:
+            entry = None
+            for affected in advisory.get("affected") or []:
+                package = affected.get("package") or {}
+                ecosystem = package.get("ecosystem", "").split(":", 1)[0]
+                key = VERSION_KEYS.get(ecosystem)
+                if key is None or not package.get("name"):
+                    continue
+                spans, fixed = affected_intervals(affected, key)
+                if not spans:
+                    continue
+                if entry is None:
+                    summary = (advisory.get("summary") or advisory.get("details") or "").strip()
+                    entry = {
+                        "id": advisory.get("id", "?"),
+                        "aliases": [alias for alias in advisory.get("aliases") or [] if alias.startswith("CVE-")],
+                        "summary": summary.splitlines()[0][:160] if summary else "",
+                        "severity": advisory_severity(advisory),
+                        "fixed": {},
+                    }
+                    index.advisories.append(entry)
+                name = f"{ecosystem}:{normalize_name(ecosystem, package['name'])}"
+                entry["fixed"].setdefault(name, []).extend(fixed)
+                number = len(index.advisories) - 1
+                intervals.setdefault(name, []).extend((start, end, number) for start, end in spans)
+        for name, spans in intervals.items():
+            # Boundaries are lists (unhashable), so deduplicate through their JSON form.
+            unique = {json.dumps(point) for start, end, _ in spans for point in (start, end)}
+            bounds = sorted(json.loads(point) for point in unique)
+            segments: list[list[int]] = [[] for _ in bounds]
+            for start, end, number in spans:
+                for position in range(bisect_right(bounds, start) - 1, bisect_right(bounds, end) - 1):
+                    if number not in segments[position]:
+                        segments[position].append(number)
+            index.packages[name] = {"bounds": bounds, "segments": segments}
+        return index
+
+    def lookup(self, ecosystem: str, name: str, version: str) -> list[dict] | None:
+        """Advisories affecting this version, or None when the version cannot be parsed."""
+        table = self.packages.get(f"{ecosystem}:{name}")
+        if table is None:
+            return []
+        key = VERSION_KEYS[ecosystem](version)
+        if key is None:
+            return None
+        position = bisect_right(table["bounds"], [1, key, 0]) - 1
+        if position < 0:
+            return []
+        return [self.advisories[number] for number in table["segments"][position]]
+
+    def to_json(self) -> dict:
+        return {"advisories": self.advisories, "packages": self.packages}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "AdvisoryIndex":
+        index = cls()
+        index.advisories = data["advisories"]
+        index.packages = data["packages"]
+        return index
+
+
+def iter_osv(sources: list[Path]):
+    for source in sources:
+        if source.is_dir():
+            for root, _, names in os.walk(source):
+                for name in names:
+                    if name.endswith(".json") and not name.startswith("."):
+                        try:
+                            yield json.loads((Path(root) / name).read_text(encoding="utf-8"))
+                        except (OSError, ValueError):
+                            continue
+        elif zipfile.is_zipfile(source):
+            with zipfile.ZipFile(source) as archive:
+                for member in archive.namelist():
+                    if member.endswith(".json"):
+                        try:
+                            yield json.loads(archive.read(member))
+                        except ValueError:
+                            continue
+        else:
+            try:
+                data = json.loads(source.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            yield from data if isinstance(data, list) else [data]
+
+
+def source_signature(sources: list[Path]) -> list:
+    signature = []
+    for source in sources:
+        if source.is_dir():
+            count = size = latest = 0
+            for root, _, names in os.walk(source):
+                for name in names:
+                    if name.endswith(".json") and not name.startswith("."):
+                        stat = (Path(root) / name).stat()
+                        count += 1
+                        size += stat.st_size
+                        latest = max(latest, stat.st_mtime_ns)
+            signature.append([str(source.resolve()), count, size, latest])
+        else:
+            stat = source.stat()
+            signature.append([str(source.resolve()), 1, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def default_index_path(sources: list[Path]) -> Path:
+    first = sources[0]
+    return first / ".advisory-index.json" if first.is_dir() else first.with_name(first.name + ".index.json")
+
+
+def load_index(sources: list[Path], cache: Path | None) -> tuple[AdvisoryIndex, bool]:
+    """The advisory index, and whether it came from the cache."""
+    signature = source_signature(sources)
+    if cache is not None and cache.exists():
+        try:
+            data = json.loads(cache.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION and data.get("sources") == signature:
+                return AdvisoryIndex.from_json(data["index"]), True
+        except (OSError, ValueError, KeyError):
+            pass
+    index = AdvisoryIndex.build(iter_osv(sources))
+    if cache is not None:
+        temp = cache.with_name(cache.name + ".tmp")
+        try:
+            temp.write_text(
+                json.dumps({"version": INDEX_VERSION, "sources": signature, "index": index.to_json()}),
+                encoding="utf-8",
+            )
+            os.replace(temp, cache)
+        except OSError:
+            pass
+    return index, False
+
+
+# --- audit ------------------------------------------------------------------
+
+def audit(packages: dict[tuple[str, str, str], list[str]], index: AdvisoryIndex) -> tuple[list[dict], list[str]]:
+    """Findings sorted by severity, and packages whose versions could not be parsed."""
+    findings = []
+    unparsed = []
+    for (ecosystem, name, version), sources in packages.items():
+        matches = index.lookup(ecosystem, name, version)
+        if matches is None:
+            unparsed.append(f"{name} {version}")
+            continue
+        key = VERSION_KEYS[ecosystem]
+        current = key(version)
+        for advisory in matches:
+            candidates = [
+                value for value in advisory["fixed"].get(f"{ecosystem}:{name}", [])
+                if (key(value) or []) > current
+            ]
+            findings.append({
+                "severity": advisory["severity"],
+                "ecosystem": ecosystem,
+                "package": name,
+                "version": version,
+                "id": advisory["id"],
+                "aliases": advisory["aliases"],
+                "summary": advisory["summary"],
+                "fixed": min(candidates, key=key) if candidates else None,
+                "sources": sources,
+            })
+    findings.sort(key=lambda item: (SEVERITY_ORDER.index(item["severity"]), item["package"], item["id"]))
+    return findings, unparsed
+
+
+def _cell(text: str) -> str:
+    return text.replace("|", "\\|").replace("\n", " ")
+
+
+def render_rows(findings: list[dict], limit: int) -> list[str]:
+    rows = []
+    for finding in findings[:limit]:
+        ids = ", ".join([finding["id"]] + finding["aliases"][:1])
+        issue = f"`{finding['package']}` {finding['version']} ({ids})"
+        impact = finding["summary"] or "Known vulnerability"
+        if finding["fixed"]:
+            recommendation = f"Upgrade to {finding['fixed']} or later"
+        else:
+            recommendation = "No fixed release; remove, replace or mitigate"
+        rows.append(f"| {finding['severity']} | {_cell(issue)} | {_cell(impact)} | {recommendation} |")
+    if len(findings) > limit:
+        rows.append(f"| - | {len(findings) - limit} more findings | - | Rerun with a higher --deps-limit |")
+    return rows
+
+
+def render_upgrades(findings: list[dict], limit: int) -> list[str]:
+    """One upgrade line per vulnerable package, to the highest fix its advisories need."""
+    upgrades: dict[tuple[str, str, str], list] = {}
+    for finding in findings:
+        target = upgrades.setdefault((finding["ecosystem"], finding["package"], finding["version"]), [None, 0, 0])
+        target[1] += 1
+        if not finding["fixed"]:
+            target[2] += 1
+        else:
+            key = VERSION_KEYS[finding["ecosystem"]]
+            if target[0] is None or key(finding["fixed"]) > key(target[0]):
+                target[0] = finding["fixed"]
+    lines = []
+    for (_, package, version), (fixed, count, unfixed) in upgrades.items():
+        action = f"upgrade to {fixed}" if fixed else "no fix available; replace or mitigate"
+        if fixed and unfixed:
+            action += f", then mitigate {unfixed} unfixed"
+        noun = "advisory" if count == 1 else "advisories"
+        lines.append(f"- `{package}` {version}: {action} ({count} {noun})")
+    if len(lines) > limit:
+        lines = lines[:limit] + [f"- {len(lines) - limit} more vulnerable packages"]
+    return lines
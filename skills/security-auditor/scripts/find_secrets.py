@@ -1,53 +1,115 @@
 #!/usr/bin/env python3
 # Lightweight secret scanner for common patterns.
+#
+# Besides the fixed key prefixes below, generic high-entropy tokens are
+# flagged by secret_entropy (vectorized with NumPy when it is installed).
+# Files are scanned in large batches; hash digests, lockfile integrity
+# strings, UUIDs, tokens listed in .secrets-allowlist and lines marked
+# "pragma: allowlist secret" are not reported.
 
 from pathlib import Path
 import argparse
+import os
 import re
+import time
+
+from secret_entropy import MIN_LENGTH, Batch, allowed, redact, score_buffer
 
 PATTERNS = [
-    re.compile(r"AKIA[0-9A-Z]{16}"),
-    re.compile(r"AIza[0-9A-Za-z_-]{35}"),
-    re.compile(r"sk-[0-9A-Za-z]{20,}"),
+    ("AWS access key", re.compile(rb"AKIA[0-9A-Z]{16}")),
+    ("Google API key", re.compile(rb"AIza[0-9A-Za-z_-]{35}")),
+    ("Secret key (sk-)", re.compile(rb"sk-[0-9A-Za-z]{20,}")),
 ]
+SKIP_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".pdf"}
+SKIP_DIRS = {".git", ".hg", ".svn"}
+ALLOWLIST_NAME = ".secrets-allowlist"
+BATCH_BYTES = 16 * 1024 * 1024
+
 
+def iter_files(root: Path):
+    if root.is_file():
+        yield root
+        return
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if name not in SKIP_DIRS)
+        for name in sorted(names):
+            path = Path(directory) / name
+            if path.suffix not in SKIP_SUFFIXES and name != ALLOWLIST_NAME:
+                yield path
 
-def is_text_file(path: Path) -> bool:
-    try:
-        data = path.read_bytes()
-    except OSError:
-        return False
-    return b"\x00" not in data
+
+def load_allowlist(path: Path | None) -> set[bytes]:
+    if path is None or not path.exists():
+        return set()
+    lines = path.read_bytes().splitlines()
+    return {line.strip() for line in lines if line.strip() and not line.startswith(b"#")}
+
+
+def scan_batch(batch: Batch, entropy: bool, min_length: int, allowlist: set[bytes], found: dict, skipped: dict) -> None:
+    buffer = batch.buffer()
+    for name, pattern in PATTERNS:
+        for match in pattern.finditer(buffer):
+            path, line = batch.locate(buffer, match.start())
+            found.setdefault((path, line), f"{name} {redact(match.group())}")
+    if not entropy:
+        return
+    for start, length, score in score_buffer(buffer, min_length):
+        reason = allowed(buffer, start, length, allowlist)
+        if reason:
+            skipped[reason] = skipped.get(reason, 0) + 1
+            continue
+        path, line = batch.locate(buffer, start)
+        token = buffer[start:start + length]
+        found.setdefault((path, line), f"High-entropy string {redact(token)}, {score:.2f} bits/char")
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Scan for common secret patterns.")
     parser.add_argument("path", nargs="?", default=".", help="Path to scan")
+    parser.add_argument("--no-entropy", action="store_true", help="Only match the fixed key patterns")
+    parser.add_argument("--min-length", type=int, default=MIN_LENGTH, help="Shortest token to score for entropy")
+    parser.add_argument("--allowlist", help=f"Known-safe tokens, one per line (default: {ALLOWLIST_NAME} in path)")
     args = parser.parse_args()
 
     root = Path(args.path)
     if not root.exists():
         print("Path not found: " + str(root))
         return 1
+    base = root if root.is_dir() else root.parent
+    allowlist_path = Path(args.allowlist) if args.allowlist else base / ALLOWLIST_NAME
+    allowlist = load_allowlist(allowlist_path)
 
-    matches = []
-    for file_path in root.rglob("*"):
-        if not file_path.is_file():
-            continue
-        if file_path.suffix in {".png", ".jpg", ".jpeg", ".gif", ".pdf"}:
+    start = time.perf_counter()
+    found: dict[tuple[str, int], str] = {}
+    skipped: dict[str, int] = {}
+    files = scanned = 0
+    batch = Batch()
+    for file_path in iter_files(root):
+        try:
+            data = file_path.read_bytes()
+        except OSError:
             continue
-        if not is_text_file(file_path):
+        if b"\x00" in data:
             continue
-        text = file_path.read_text(encoding="utf-8", errors="ignore")
-        for pattern in PATTERNS:
-            if pattern.search(text):
-                matches.append(str(file_path))
-                break
+        batch.add(str(file_path), data)
+        files += 1
+        if batch.size >= BATCH_BYTES:
+            scan_batch(batch, not args.no_entropy, args.min_length, allowlist, found, skipped)
+            scanned += batch.size
+            batch = Batch()
+    if batch.paths:
+        scan_batch(batch, not args.no_entropy, args.min_length, allowlist, found, skipped)
+        scanned += batch.size
+    elapsed = time.perf_counter() - start
 
-    if matches:
+    summary = f"Scanned {files:,} files ({scanned / 1e6:.1f} MB) in {elapsed:.2f}s"
+    if skipped:
+        summary += "; not reported: " + ", ".join(f"{count} {reason}" for reason, count in sorted(skipped.items()))
+    print(summary)
+    if found:
         print("Potential secrets found:")
-        for match in matches:
-            print("- " + match)
+        for (path, line), description in sorted(found.items()):
+            print(f"- {path}:{line}: {description}")
         return 1
 
     print("No secrets found.")
@@ -0,0 +1,240 @@
+# High-entropy token detection for find_secrets.py.
+#
+# Candidate tokens are maximal runs of base64/url-safe characters. Each one is
+# scored by Shannon entropy against a length-dependent threshold (random keys
+# of a given length land in a narrow entropy band; words and paths fall below
+# it), must contain both letters and digits, and must switch between
+# lowercase, uppercase and digits every couple of characters the way random
+# strings do, rather than once per word like camelCase identifiers. With NumPy
+# the whole buffer is scored with array operations: token characters are
+# found with a byte translation, long runs by comparing 8 bytes at a time,
+# and every candidate's byte histogram with one sort. Without NumPy the same
+# rules run per token in Python. Known-safe shapes (hash digests, lockfile
+# integrity strings, UUIDs) and an allowlist drop the rest.
+
+from bisect import bisect_right
+import math
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MIN_LENGTH = 20
+MAX_LENGTH = 256
+BLOCK = 8
+LOWER, UPPER, DIGIT, SYMBOL = 1, 2, 4, 8
+# Entropy threshold: a + b * log2(length), fitted to the 1st percentile of
+# random base62 (and hex) strings from 20 to 128 characters.
+THRESHOLD = (0.38, 0.756)
+HEX_THRESHOLD = (1.04, 0.43)
+MAX_LOG_LENGTH = 7.0
+MIN_SWITCH_RATE = 0.35
+MAX_STEP_RATE = 0.3
+HASH_LENGTHS = {32, 40, 56, 64, 96, 128}
+
+TOKEN = re.compile(rb"[A-Za-z0-9+/_-]{%d,}" % (2 * BLOCK - 1))
+UUID = re.compile(rb"[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}")
+INTEGRITY_PREFIX = re.compile(rb"^sha(?:1|224|256|384|512)-")
+INTEGRITY_CONTEXT = re.compile(rb"(?:sha(?:1|224|256|384|512)[:=]|h1:|base64,|integrity[\"'\s:=]*)$")
+SECRET_HINT = re.compile(rb"(?i)key|secret|token|passw|pwd|auth|credential|bearer|private")
+ALLOW_PRAGMA = b"allowlist secret"
+
+
+def char_class(byte: int) -> int:
+    char = chr(byte)
+    if "a" <= char <= "z":
+        return LOWER
+    if "A" <= char <= "Z":
+        return UPPER
+    if "0" <= char <= "9":
+        return DIGIT
+    return SYMBOL if char in "+/_-" else 0
+
+
+CLASSES = bytes(char_class(byte) for byte in range(256))
+IN_TOKEN = bytes(1 if kind else 0 for kind in CLASSES)
+HEX = bytes(1 if chr(byte) in "0123456789abcdefABCDEF" else 0 for byte in range(256))
+
+
+def threshold(length: int, hexish: bool) -> float:
+    a, b = HEX_THRESHOLD if hexish else THRESHOLD
+    return a + b * min(math.log2(length), MAX_LOG_LENGTH)
+
+
+def is_hexish(classes: int, all_hex: bool) -> bool:
+    """Hex digits in a single letter case (a digest, not base64 that happens to avoid g-z)."""
+    return all_hex and not classes & SYMBOL and (classes & (LOWER | UPPER)) != (LOWER | UPPER)
+
+
+def candidate(length: int, entropy: float, classes: int, all_hex: bool, switches: int, steps: int) -> bool:
+    if not classes & DIGIT or not classes & (LOWER | UPPER):
+        return False
+    if entropy < threshold(length, is_hexish(classes, all_hex)):
+        return False
+    return switches >= MIN_SWITCH_RATE * (length - 1) and steps <= MAX_STEP_RATE * (length - 1)
+
+
+def _score_python(buffer: bytes, min_length: int) -> list[tuple[int, int, float]]:
+    hits = []
+    for match in TOKEN.finditer(buffer):
+        token = match.group()
+        length = len(token)
+        if length < min_length or length > MAX_LENGTH:
+            continue
+        counts: dict[int, int] = {}
+        classes = switches = steps = 0
+        all_hex = True
+        previous_byte = previous_class = None
+        for byte in token:
+            counts[byte] = counts.get(byte, 0) + 1
+            kind = CLASSES[byte]
+            classes |= kind
+            all_hex = all_hex and bool(HEX[byte])
+            if previous_byte is not None:
+                switches += kind != previous_class and SYMBOL not in (kind, previous_class)
+                steps += byte - previous_byte == 1
+            previous_byte, previous_class = byte, kind
+        entropy = math.log2(length) - sum(count * math.log2(count) for count in counts.values()) / length
+        if candidate(length, entropy, classes, all_hex, switches, steps):
+            hits.append((match.start(), length, entropy))
+    return hits
+
+
+def token_runs(buffer: bytes) -> tuple:
+    """Start and length of every run of token characters at least 2 * BLOCK - 1 long.
+
+    Such a run always covers a whole aligned 8-byte block, so only those blocks
+    (one uint64 comparison each) and their two neighbours are looked at.
+    """
+    padding = -len(buffer) % BLOCK + BLOCK
+    mask = np.frombuffer(buffer.translate(IN_TOKEN) + bytes(padding), dtype=np.uint8)
+    blocks = mask.reshape(-1, BLOCK)
+    full = np.flatnonzero(mask.view(np.uint64) == np.frombuffer(bytes([1] * BLOCK), dtype=np.uint64)[0])
+    if not len(full):
+        return full, full
+    breaks = np.flatnonzero(np.diff(full) != 1)
+    first = full[np.concatenate(([0], breaks + 1))]
+    last = full[np.append(breaks, len(full) - 1)]
+    # Token characters spilling into the partial blocks on either side.
+    before = blocks[np.maximum(first - 1, 0), ::-1]
+    trailing = np.where(first > 0, np.argmin(before, axis=1), 0)
+    leading = np.argmin(blocks[last + 1], axis=1)
+    starts = first * BLOCK - trailing
+    lengths = (last + 1) * BLOCK + leading - starts
+    long_enough = lengths >= 2 * BLOCK - 1
+    return starts[long_enough], lengths[long_enough]
+
+
+def _score_numpy(buffer: bytes, min_length: int) -> list[tuple[int, int, float]]:
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    classes_of = np.frombuffer(CLASSES, dtype=np.uint8)
+    starts, lengths = token_runs(buffer)
+    keep = (lengths >= min_length) & (lengths <= MAX_LENGTH)
+    starts, lengths = starts[keep], lengths[keep]
+    count = len(starts)
+    if not count:
+        return []
+
+    # Gather every candidate's bytes into one flat array, token after token.
+    offsets = np.zeros(count, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    total = int(lengths.sum())
+    token_of = np.repeat(np.arange(count, dtype=np.int64), lengths)
+    positions = np.arange(total, dtype=np.int64) + np.repeat(starts - offsets, lengths)
+    chars = data[positions]
+    kinds = classes_of[chars]
+
+    # Entropy: log2(n) - sum(c * log2(c)) / n over each token's byte counts.
+    keys = np.sort(token_of * 256 + chars)
+    run_starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.append(run_starts, total)).astype(np.float64)
+    spread = np.bincount(keys[run_starts] >> 8, weights=counts * np.log2(counts), minlength=count)
+    entropy = np.log2(lengths) - spread / lengths
+
+    classes = np.bitwise_or.reduceat(kinds, offsets)
+    all_hex = np.minimum.reduceat(np.frombuffer(HEX, dtype=np.uint8)[chars], offsets).astype(bool)
+    switched = np.empty(total, dtype=np.int64)
+    switched[0] = 0
+    switched[1:] = (kinds[1:] != kinds[:-1]) & (kinds[1:] != SYMBOL) & (kinds[:-1] != SYMBOL)
+    switched[offsets] = 0
+    stepped = np.empty(total, dtype=np.int64)
+    stepped[0] = 0
+    stepped[1:] = chars[1:].astype(np.int16) - chars[:-1] == 1
+    stepped[offsets] = 0
+    switches = np.add.reduceat(switched, offsets)
+    steps = np.add.reduceat(stepped, offsets)
+
+    letters = classes & (LOWER | UPPER)
+    hexish = all_hex & ((classes & SYMBOL) == 0) & (letters != (LOWER | UPPER))
+    log_length = np.minimum(np.log2(lengths), MAX_LOG_LENGTH)
+    limit = np.where(
+        hexish, HEX_THRESHOLD[0] + HEX_THRESHOLD[1] * log_length, THRESHOLD[0] + THRESHOLD[1] * log_length
+    )
+    passed = (
+        ((classes & DIGIT) > 0)
+        & (letters > 0)
+        & (entropy >= limit)
+        & (switches >= MIN_SWITCH_RATE * (lengths - 1))
+        & (steps <= MAX_STEP_RATE * (lengths - 1))
+    )
+    return [
+        (int(start), int(length), float(score))
+        for start, length, score in zip(starts[passed], lengths[passed], entropy[passed])
+    ]
+
+
+def score_buffer(buffer: bytes, min_length: int = MIN_LENGTH) -> list[tuple[int, int, float]]:
+    """(offset, length, entropy) of every high-entropy token in buffer."""
+    min_length = max(min_length, 2 * BLOCK - 1)
+    if np is not None:
+        return _score_numpy(buffer, min_length)
+    return _score_python(buffer, min_length)
+
+
+def allowed(buffer: bytes, start: int, length: int, allowlist: set[bytes]) -> str | None:
+    """Why a flagged token is known to be safe, or None."""
+    token = buffer[start:start + length]
+    line_start = buffer.rfind(b"\n", 0, start) + 1
+    line_end = buffer.find(b"\n", start + length)
+    line = buffer[line_start:line_end if line_end >= 0 else len(buffer)]
+    if token in allowlist or ALLOW_PRAGMA in line:
+        return "allowlisted"
+    if INTEGRITY_PREFIX.match(token) or INTEGRITY_CONTEXT.search(buffer[max(line_start, start - 24):start]):
+        return "integrity hash"
+    if UUID.fullmatch(token):
+        return "uuid"
+    hexish = all(HEX[byte] for byte in token) and not (re.search(rb"[a-f]", token) and re.search(rb"[A-F]", token))
+    if hexish and length in HASH_LENGTHS and not SECRET_HINT.search(line):
+        return "hash digest"
+    return None
+
+
+class Batch:
+    """Files joined into one buffer so a scan costs a few array operations, not a few per file."""
+
+    def __init__(self) -> None:
+        self.parts: list[bytes] = []
+        self.paths: list[str] = []
+        self.starts: list[int] = []
+        self.size = 0
+
+    def add(self, path: str, data: bytes) -> None:
+        self.paths.append(path)
+        self.starts.append(self.size)
+        self.parts.append(data)
+        self.size += len(data) + 1
+
+    def buffer(self) -> bytes:
+        # Newlines between files keep tokens from running across them.
+        return b"\n".join(self.parts)
+
+    def locate(self, buffer: bytes, offset: int) -> tuple[str, int]:
+        index = bisect_right(self.starts, offset) - 1
+        return self.paths[index], buffer.count(b"\n", self.starts[index], offset) + 1
+
+
+def redact(token: bytes) -> str:
+    text = token.decode("ascii", errors="replace")
+    return f"{text[:4]}...{text[-2:]} ({len(text)} chars)"
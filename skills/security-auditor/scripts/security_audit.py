@@ -1,9 +1,28 @@
 #!/usr/bin/env python3
 # Template generator for security audit.
+#
+# With --deps, lockfiles are audited offline by dep_audit against a local OSV
+# advisory database (--advisories), and the findings fill the Findings table
+# and the Remediation Plan. With --taint, taint_scan traces untrusted input
+# into shell commands, eval/exec and SQL across the Python sources, adds those
+# flows to the table, and lists entry points and trust boundaries.
 
 from pathlib import Path
 import argparse
+import os
 import textwrap
+import time
+
+from dep_audit import (
+    audit,
+    default_index_path,
+    find_lockfiles,
+    load_index,
+    read_lockfiles,
+    render_rows,
+    render_upgrades,
+)
+from taint_scan import render_flow_rows, render_threat_model, scan
 
 
 def write_output(path: Path, content: str, force: bool) -> bool:
@@ -20,9 +39,103 @@ def main() -> int:
     parser.add_argument("--output", default="security-audit.md", help="Output file path")
     parser.add_argument("--name", default="example", help="System or scope name")
     parser.add_argument("--owner", default="team", help="Owning team")
+    parser.add_argument(
+        "--deps",
+        action="append",
+        default=[],
+        help="Lockfile or directory to audit (repeatable)",
+    )
+    parser.add_argument(
+        "--advisories",
+        action="append",
+        default=[],
+        help="OSV advisory directory, all.zip export or JSON file (repeatable)",
+    )
+    parser.add_argument("--advisory-index", help="Compiled index cache (default: next to the first database)")
+    parser.add_argument("--no-advisory-index", action="store_true", help="Rebuild the index without caching it")
+    parser.add_argument("--deps-limit", type=int, default=50, help="Most findings to list in the table")
+    parser.add_argument("--taint", help="Source directory to trace for injection flows (Python)")
+    parser.add_argument("--taint-cache", help="Analysis cache (default: .taint-cache.json beside the output)")
+    parser.add_argument("--no-taint-cache", action="store_true", help="Analyze every file from scratch")
+    parser.add_argument("--taint-limit", type=int, default=50, help="Most flows to list in the table")
+    parser.add_argument("--jobs", type=int, help="Parser processes (default: CPU count)")
     parser.add_argument("--force", action="store_true", help="Overwrite existing file")
     args = parser.parse_args()
 
+    threat_model = "- Entry points\n- Trust boundaries"
+    rows: list[str] = []
+    fix_lines: list[str] = []
+    notes: list[str] = []
+    if args.taint:
+        root = Path(args.taint)
+        if not root.exists():
+            print(f"Path not found: {root}")
+            return 1
+        default_cache = Path(args.output).parent / ".taint-cache.json"
+        cache = None if args.no_taint_cache else Path(args.taint_cache) if args.taint_cache else default_cache
+        start = time.perf_counter()
+        result = scan(root, cache, args.jobs or os.cpu_count() or 1)
+        elapsed = time.perf_counter() - start
+        for error in result["errors"]:
+            print(f"Skipped {error}")
+        print(
+            f"Traced {result['files']:,} Python files in {elapsed:.2f}s "
+            f"({result['parsed']:,} parsed, {result['retraced']:,} re-traced): {len(result['findings'])} flows"
+        )
+        threat_model = render_threat_model(result)
+        rows.extend(render_flow_rows(result["findings"], args.taint_limit))
+        if result["findings"]:
+            fix_lines.append(f"- Break {len(result['findings'])} untrusted-input flows listed under Findings")
+        notes.append(f"- Taint analysis: {result['files']:,} Python files under {root}")
+        if result["errors"]:
+            notes.append(f"- Not analyzed (parse errors): {', '.join(result['errors'][:20])}")
+    if args.deps:
+        if not args.advisories:
+            print("--deps needs --advisories (a local OSV database; the audit never goes online)")
+            return 1
+        missing = [value for value in args.deps + args.advisories if not Path(value).exists()]
+        if missing:
+            print(f"Path not found: {', '.join(missing)}")
+            return 1
+        sources = [Path(value) for value in args.advisories]
+        cache = None if args.no_advisory_index else Path(args.advisory_index or default_index_path(sources))
+        start = time.perf_counter()
+        index, cached = load_index(sources, cache)
+        loaded = time.perf_counter() - start
+        lockfiles = find_lockfiles([Path(value) for value in args.deps])
+        packages, unpinned, errors = read_lockfiles(lockfiles)
+        start = time.perf_counter()
+        findings, unparsed = audit(packages, index)
+        checked = time.perf_counter() - start
+        for error in errors:
+            print(f"Skipped {error}")
+        print(
+            f"Checked {len(packages):,} packages from {len(lockfiles)} lockfiles against "
+            f"{len(index.advisories):,} advisories in {checked * 1000:.1f}ms "
+            f"(index {'cached' if cached else 'built'} in {loaded:.2f}s): {len(findings)} findings"
+        )
+        if findings:
+            rows.extend(render_rows(findings, args.deps_limit))
+            fix_lines.extend(render_upgrades(findings, args.deps_limit))
+        else:
+            rows.append("| Info | No known vulnerable dependencies | - | Keep the advisory database current |")
+        sources_text = ", ".join(str(path) for path in lockfiles) or "no lockfiles"
+        notes.extend([
+            f"- Dependency audit: {len(packages):,} packages from {sources_text}",
+            f"- Advisory database: {', '.join(args.advisories)} ({len(index.advisories):,} advisories)",
+        ])
+        if unpinned:
+            more = " ..." if len(unpinned) > 20 else ""
+            notes.append(f"- Not checked (unpinned): {', '.join(unpinned[:20])}{more}")
+        if unparsed:
+            notes.append(f"- Not checked (unparseable version): {', '.join(unparsed[:20])}")
+    if args.taint and not rows:
+        rows.append("| Info | No untrusted-input flows into shell, eval or SQL found | - | Re-run after changes |")
+
+    findings_rows = "\n".join(rows) or "| High | TBD | TBD | TBD |"
+    fixes = "\n".join(fix_lines) or "- Immediate fixes"
+    evidence = "\n".join(notes + ["- Logs, scans, and screenshots"])
+
     content = textwrap.dedent(
         f"""\
         # Security Audit
@@ -36,22 +149,27 @@ def main() -> int:
 
         ## Threat Model
         - Assets
-        - Entry points
-        - Trust boundaries
+        {{threat_model}}
 
         ## Findings
         | Severity | Issue | Impact | Recommendation |
         | --- | --- | --- | --- |
-        | High | TBD | TBD | TBD |
+        {{findings}}
 
         ## Remediation Plan
-        - Immediate fixes
+        {{fixes}}
         - Long-term hardening
 
         ## Evidence
-        - Logs, scans, and screenshots
+        {{evidence}}
         """
     ).strip() + "\n"
+    content = (
+        content.replace("{threat_model}", threat_model)
+        .replace("{findings}", findings_rows)
+        .replace("{fixes}", fixes)
+        .replace("{evidence}", evidence)
+    )
 
     output = Path(args.output)
     if not write_output(output, content, args.force):
@@ -0,0 +1,681 @@
+# Taint-style flow checks for security_audit.py.
+#
+# Each Python file is parsed once and reduced to a small per-function
+# instruction list (assignments, calls, returns and sinks, with the names and
+# sources each expression depends on). That reduction is the expensive part,
+# so it runs in a process pool and is cached by content hash. Flows are then
+# traced over the instruction lists: untrusted input (HTTP request data,
+# route parameters, stdin, argv) is followed through assignments and calls,
+# including into functions in other modules, until it reaches a shell
+# command, eval/exec, or a SQL statement. Function summaries (which
+# parameters reach a sink or the return value) are cached per file, and an
+# incremental run re-traces only changed files and the files that import
+# them, directly or transitively.
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import ast
+import hashlib
+import json
+import os
+
+CACHE_VERSION = 1
+POOL_THRESHOLD = 32
+SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", ".tox", "site-packages", "build", "dist"}
+
+SOURCE_ATTRS = {
+    "request.args": "HTTP request (request.args)",
+    "request.form": "HTTP request (request.form)",
+    "request.values": "HTTP request (request.values)",
+    "request.json": "HTTP request (request.json)",
+    "request.get_json": "HTTP request (request.json)",
+    "request.data": "HTTP request (request.data)",
+    "request.get_data": "HTTP request (request.data)",
+    "request.cookies": "HTTP request (request.cookies)",
+    "request.headers": "HTTP request (request.headers)",
+    "request.files": "HTTP request (request.files)",
+    "request.GET": "HTTP request (request.GET)",
+    "request.POST": "HTTP request (request.POST)",
+    "request.body": "HTTP request (request.body)",
+    "request.query_params": "HTTP request (request.query_params)",
+    "request.path_params": "HTTP request (request.path_params)",
+    "sys.argv": "command line (sys.argv)",
+    "sys.stdin": "stdin (sys.stdin)",
+}
+SOURCE_CALLS = {"input": "stdin (input())"}
+ROUTE_PARAM = "HTTP route parameter"
+ROUTE_DECORATORS = {"route", "get", "post", "put", "patch", "delete", "api_route", "websocket"}
+SANITIZERS = {
+    "int", "float", "bool", "len", "abs", "round", "hash", "id", "isinstance",
+    "shlex.quote", "pipes.quote", "html.escape", "escape", "markupsafe.escape",
+    "bleach.clean", "secure_filename", "werkzeug.utils.secure_filename", "uuid.UUID",
+}
+SHELL_CALLS = {
+    "subprocess.run", "subprocess.call", "subprocess.Popen", "subprocess.check_output", "subprocess.check_call",
+}
+ALWAYS_SHELL = {"os.system", "os.popen", "subprocess.getoutput", "subprocess.getstatusoutput", "commands.getoutput"}
+CODE_CALLS = {"eval", "exec", "builtins.eval", "builtins.exec"}
+SQL_METHODS = {"execute", "executemany", "executescript", "raw", "read_sql", "read_sql_query"}
+
+KINDS = {
+    "command": (
+        "Critical",
+        "Command injection",
+        "Untrusted input reaches a shell command",
+        "Pass an argument list without shell=True; never build commands from input",
+    ),
+    "code": (
+        "Critical",
+        "Code injection",
+        "Untrusted input is evaluated as Python code",
+        "Remove eval/exec; parse data with json or ast.literal_eval",
+    ),
+    "sql": (
+        "High",
+        "SQL injection",
+        "Untrusted input is formatted into a SQL statement",
+        "Use parameterized queries (execute(sql, params))",
+    ),
+}
+
+
+# --- extraction (per file, cached) -----------------------------------------
+
+def dotted(node) -> str | None:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+def source_of(chain: str | None) -> str | None:
+    if not chain:
+        return None
+    if chain.startswith("self."):
+        chain = chain[5:]
+    for prefix, description in SOURCE_ATTRS.items():
+        if chain == prefix or chain.startswith(prefix + "."):
+            return description
+    return None
+
+
+def target_names(node) -> list[str]:
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return [name for element in node.elts for name in target_names(element)]
+    if isinstance(node, ast.Starred):
+        return target_names(node.value)
+    if isinstance(node, ast.Subscript):
+        return target_names(node.value)
+    chain = dotted(node)
+    return [chain] if chain else []
+
+
+class FunctionExtractor:
+    """Reduces one function body to instructions over dependency tokens.
+
+    Tokens: ["v", name] a variable, ["s", description] an input source, and
+    ["c", callee, [arg tokens...], {keyword: tokens}, receiver tokens, line] a call.
+    Instructions: ["a", targets, tokens], ["e", tokens], ["r", tokens] and
+    ["k", kind, detail, line, tokens] for a sink.
+    """
+
+    def __init__(self, aliases: dict[str, str]) -> None:
+        self.aliases = aliases
+        self.instructions: list = []
+        self.sources: set[str] = set()
+
+    def canonical(self, name: str | None) -> str | None:
+        """The imported name a local alias stands for (`sp.run` -> `subprocess.run`)."""
+        if not name:
+            return name
+        head, dot, rest = name.partition(".")
+        return self.aliases[head] + dot + rest if head in self.aliases else name
+
+    def deps(self, node) -> list:
+        if node is None or isinstance(node, ast.Constant):
+            return []
+        if isinstance(node, ast.Name):
+            return [["v", node.id]]
+        if isinstance(node, ast.Attribute):
+            chain = dotted(node)
+            source = source_of(chain) or source_of(self.canonical(chain))
+            if source:
+                self.sources.add(source)
+                return [["s", source]]
+            tokens = self.deps(node.value)
+            return tokens + [["v", chain]] if chain else tokens
+        if isinstance(node, ast.Subscript):
+            return self.deps(node.value)
+        if isinstance(node, ast.Call):
+            return self.call(node)
+        if isinstance(node, (ast.Lambda, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return []
+        tokens = []
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.expr) or isinstance(child, ast.comprehension) or isinstance(child, ast.keyword):
+                tokens.extend(self.deps(child))
+        return tokens
+
+    def call(self, node: ast.Call) -> list:
+        callee = dotted(node.func)
+        name = self.canonical(callee)
+        source = source_of(callee) or source_of(name) or SOURCE_CALLS.get(name or "")
+        if source:
+            self.sources.add(source)
+            return [["s", source]]
+        args = [self.deps(arg.value if isinstance(arg, ast.Starred) else arg) for arg in node.args]
+        keywords = {keyword.arg: self.deps(keyword.value) for keyword in node.keywords if keyword.arg}
+        for keyword in node.keywords:
+            if keyword.arg is None:
+                args.append(self.deps(keyword.value))
+        self.sink(node, name, args, keywords)
+        if name in SANITIZERS:
+            return []
+        receiver = self.deps(node.func.value) if isinstance(node.func, ast.Attribute) else []
+        return [["c", callee or "", args, keywords, receiver, node.lineno]]
+
+    def sink(self, node: ast.Call, callee: str | None, args: list, keywords: dict) -> None:
+        first = args[0] if args else keywords.get("args") or keywords.get("cmd") or []
+        shell = any(
+            keyword.arg == "shell" and not (isinstance(keyword.value, ast.Constant) and not keyword.value.value)
+            for keyword in node.keywords
+        )
+        if callee in ALWAYS_SHELL or callee in SHELL_CALLS and shell:
+            detail = f"{callee}(shell=True)" if callee in SHELL_CALLS else f"{callee}()"
+            self.instructions.append(["k", "command", detail, node.lineno, first])
+        elif callee in CODE_CALLS:
+            self.instructions.append(["k", "code", f"{callee}()", node.lineno, first])
+        elif isinstance(node.func, ast.Attribute) and node.func.attr in SQL_METHODS:
+            query = args[0] if args else keywords.get("sql") or keywords.get("query") or []
+            self.instructions.append(["k", "sql", f".{node.func.attr}()", node.lineno, query])
+
+    def body(self, statements: list) -> None:
+        for statement in statements:
+            self.statement(statement)
+
+    def statement(self, node) -> None:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return
+        if isinstance(node, ast.Assign):
+            tokens = self.deps(node.value)
+            names = [name for target in node.targets for name in target_names(target)]
+            self.instructions.append(["a", names, tokens])
+        elif isinstance(node, ast.AugAssign):
+            names = target_names(node.target)
+            self.instructions.append(["a", names, self.deps(node.value) + [["v", name] for name in names]])
+        elif isinstance(node, ast.AnnAssign):
+            if node.value is not None:
+                self.instructions.append(["a", target_names(node.target), self.deps(node.value)])
+        elif isinstance(node, (ast.For, ast.AsyncFor)):
+            self.instructions.append(["a", target_names(node.target), self.deps(node.iter)])
+            self.body(node.body)
+            self.body(node.orelse)
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            for item in node.items:
+                tokens = self.deps(item.context_expr)
+                if item.optional_vars is not None:
+                    self.instructions.append(["a", target_names(item.optional_vars), tokens])
+                else:
+                    self.instructions.append(["e", tokens])
+            self.body(node.body)
+        elif isinstance(node, ast.Return):
+            self.instructions.append(["r", self.deps(node.value)])
+        elif isinstance(node, (ast.If, ast.While)):
+            self.instructions.append(["e", self.deps(node.test)])
+            self.body(node.body)
+            self.body(node.orelse)
+        elif isinstance(node, ast.Try) or type(node).__name__ == "TryStar":
+            self.body(node.body)
+            for handler in node.handlers:
+                self.body(handler.body)
+            self.body(node.orelse)
+            self.body(node.finalbody)
+        elif isinstance(node, ast.Match):
+            self.instructions.append(["e", self.deps(node.subject)])
+            for case in node.cases:
+                self.body(case.body)
+        else:
+            tokens = []
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, ast.expr):
+                    tokens.extend(self.deps(child))
+            if tokens:
+                self.instructions.append(["e", tokens])
+
+
+def route_of(node) -> dict | None:
+    for decorator in node.decorator_list:
+        if not isinstance(decorator, ast.Call) or not isinstance(decorator.func, ast.Attribute):
+            continue
+        method = decorator.func.attr
+        if method not in ROUTE_DECORATORS:
+            continue
+        path = decorator.args[0].value if decorator.args and isinstance(decorator.args[0], ast.Constant) else "?"
+        methods = [method.upper()] if method not in ("route", "api_route") else ["GET"]
+        for keyword in decorator.keywords:
+            if keyword.arg == "methods" and isinstance(keyword.value, (ast.List, ast.Tuple)):
+                methods = [element.value for element in keyword.value.elts if isinstance(element, ast.Constant)]
+        return {"path": str(path), "methods": methods}
+    return None
+
+
+def statements_of(body: list):
+    """Every statement nested under body, without descending into expressions."""
+    for node in body:
+        yield node
+        for field in ("body", "orelse", "finalbody", "handlers", "cases"):
+            nested = getattr(node, field, None)
+            if isinstance(nested, list):
+                yield from statements_of(nested)
+
+
+def extract(text: str) -> dict:
+    """Imports, functions (with instructions) and classes of one module."""
+    tree = ast.parse(text)
+    imports: dict[str, list] = {}
+    aliases: dict[str, str] = {}
+    functions: dict[str, dict] = {}
+    for node in statements_of(tree.body):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imports[alias.asname] = [0, alias.name, None]
+                    aliases[alias.asname] = alias.name
+                else:
+                    head = alias.name.split(".", 1)[0]
+                    imports[head] = [0, head, None]
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                local = alias.asname or alias.name
+                imports[local] = [node.level, node.module or "", alias.name]
+                if not node.level and node.module:
+                    aliases[local] = f"{node.module}.{alias.name}"
+
+    def add_function(qualname: str, node, statements: list, params: list[str], method: bool = False) -> None:
+        extractor = FunctionExtractor(aliases)
+        extractor.body(statements)
+        route = route_of(node) if node is not None else None
+        if route and [param for param in params if param not in ("self", "cls", "request")]:
+            extractor.sources.add(ROUTE_PARAM)
+        functions[qualname] = {
+            "line": getattr(node, "lineno", 1),
+            "params": params,
+            "route": route,
+            "method": method,
+            "code": extractor.instructions,
+            "sources": sorted(extractor.sources),
+        }
+
+    def visit(statements: list, prefix: str, in_class: bool = False) -> None:
+        for node in statements:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                arguments = node.args
+                params = [arg.arg for arg in arguments.posonlyargs + arguments.args + arguments.kwonlyargs]
+                add_function(prefix + node.name, node, node.body, params, in_class)
+                visit(node.body, prefix + node.name + ".")
+            elif isinstance(node, ast.ClassDef):
+                visit(node.body, prefix + node.name + ".", True)
+            elif isinstance(node, (ast.If, ast.Try)):
+                visit(node.body + node.orelse, prefix, in_class)
+
+    visit(tree.body, "")
+    add_function("<module>", None, tree.body, [])
+    return {"imports": imports, "functions": functions}
+
+
+def _extract_batch(batch: list[tuple[str, str]]) -> list[tuple[str, dict]]:
+    results = []
+    for path, digest in batch:
+        try:
+            text = Path(path).read_text(encoding="utf-8", errors="replace")
+            results.append((digest, extract(text)))
+        except (SyntaxError, ValueError, RecursionError) as exc:
+            results.append((digest, {"imports": {}, "functions": {}, "error": f"{type(exc).__name__}: {exc}"}))
+    return results
+
+
+# --- tracing (whole program, incremental) ----------------------------------
+
+def module_name(path: Path, root: Path) -> str:
+    relative = path.resolve().relative_to(root.resolve()).with_suffix("")
+    parts = list(relative.parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+class Program:
+    """Every module's extracted functions, with call resolution across imports."""
+
+    def __init__(self, modules: dict[str, dict], paths: dict[str, str]) -> None:
+        self.modules = modules
+        self.paths = paths
+        self.functions: dict[str, tuple[str, dict]] = {}
+        self.methods: dict[str, list[str]] = {}
+        for module, data in modules.items():
+            for qualname, function in data["functions"].items():
+                full = f"{module}.{qualname}" if module else qualname
+                self.functions[full] = (module, function)
+                if function.get("method"):
+                    self.methods.setdefault(qualname.rsplit(".", 1)[-1], []).append(full)
+
+    def resolve_import(self, module: str, entry: list) -> str:
+        level, target, name = entry
+        if level:
+            package = module.split(".")
+            is_package = self.paths.get(module, "").endswith("__init__.py")
+            base = package[: len(package) - level + (1 if is_package else 0)]
+            target = ".".join(base + ([target] if target else []))
+        return f"{target}.{name}" if name else target
+
+    def resolve(self, module: str, qualname: str, callee: str) -> tuple[str | None, int]:
+        """Fully qualified callee and how many leading parameters the call binds implicitly."""
+        if not callee:
+            return None, 0
+        head, _, rest = callee.partition(".")
+        data = self.modules[module]
+        candidates = []
+        if head in ("self", "cls") and "." in qualname and rest:
+            owner = qualname.rsplit(".", 1)[0]
+            candidates.append((f"{module}.{owner}.{rest}" if module else f"{owner}.{rest}", 1))
+        if head in data["imports"]:
+            base = self.resolve_import(module, data["imports"][head])
+            candidates.append((f"{base}.{rest}" if rest else base, 0))
+        candidates.append((f"{module}.{callee}" if module else callee, 0))
+        for full, bound in candidates:
+            if full in self.functions:
+                return full, bound
+            if f"{full}.__init__" in self.functions:
+                return f"{full}.__init__", 1
+        # `obj.method(...)` on an object of unknown type: bind it when only one class defines that method.
+        owners = self.methods.get(callee.rsplit(".", 1)[-1], []) if rest else []
+        if len(owners) == 1:
+            return owners[0], 1
+        return None, 0
+
+    def import_targets(self, module: str) -> set[str]:
+        """Modules this one imports, plus the missing names it looked for on the way (so removals count)."""
+        found = set()
+        for entry in self.modules[module]["imports"].values():
+            target = self.resolve_import(module, entry)
+            while target:
+                found.add(target)
+                if target in self.modules:
+                    break
+                target = target.rpartition(".")[0]
+        return found
+
+
+def _labels(tokens: list, env: dict, context: dict) -> set:
+    labels: set = set()
+    for token in tokens:
+        kind = token[0]
+        if kind == "v":
+            labels |= env.get(token[1], set())
+        elif kind == "s":
+            labels.add("s:" + token[1])
+        else:
+            labels |= _call_labels(token, env, context)
+    return labels
+
+
+def _call_labels(token: list, env: dict, context: dict) -> set:
+    _, callee, args, keywords, receiver, line = token
+    arg_labels = [_labels(arg, env, context) for arg in args]
+    keyword_labels = {name: _labels(value, env, context) for name, value in keywords.items()}
+    receiver_labels = _labels(receiver, env, context)
+    program: Program = context["program"]
+    target, bound = program.resolve(context["module"], context["qualname"], callee)
+    if target is not None:
+        context["callees"].add(target)
+    summary = context["summaries"].get(target) if target else None
+    if summary is None:
+        # Unknown (or not yet summarized) code: assume the result carries whatever went in.
+        result = set(receiver_labels)
+        for labels in arg_labels + list(keyword_labels.values()):
+            result |= labels
+        return result
+    params = program.functions[target][1]["params"]
+    by_index: dict[int, set] = {}
+    for position, labels in enumerate(arg_labels):
+        by_index[position + bound] = labels
+    for name, labels in keyword_labels.items():
+        if name in params:
+            by_index[params.index(name)] = labels
+    if bound and receiver_labels:
+        by_index.setdefault(0, set()).update(receiver_labels)
+    result = set()
+    for label in summary["returns"]:
+        if label.startswith("p:"):
+            result |= by_index.get(int(label[2:]), set())
+        else:
+            result.add(label)
+    for index, sinks in summary["sinks"].items():
+        labels = by_index.get(int(index), set())
+        for sink in sinks:
+            _hit(context, labels, sink[0], sink[1], sink[2], sink[3], [target.rsplit(".", 1)[-1]] + sink[4], line)
+    return result
+
+
+def _hit(context: dict, labels: set, kind: str, detail: str, path: str, line: int, via: list, at: int) -> None:
+    for label in labels:
+        if label.startswith("s:"):
+            key = (kind, path, line, label[2:], context["path"], at)
+            context["hits"][key] = {
+                "kind": kind, "detail": detail, "source": label[2:], "path": context["path"], "line": at,
+                "sink_path": path, "sink_line": line, "via": via, "function": context["qualname"],
+            }
+        elif label.startswith("p:"):
+            sinks = context["sinks"].setdefault(label[2:], [])
+            entry = [kind, detail, path, line, via[:5]]
+            if len(sinks) < 8 and not any(existing[:4] == entry[:4] for existing in sinks):
+                sinks.append(entry)
+
+
+def evaluate(program: Program, module: str, qualname: str, summaries: dict) -> tuple[dict, list, set]:
+    """Summary, findings and resolved callees for one function under the current callee summaries."""
+    function = program.functions[f"{module}.{qualname}" if module else qualname][1]
+    env: dict[str, set] = {}
+    skip = {"self", "cls", "request"}
+    for index, param in enumerate(function["params"]):
+        env[param] = {f"s:{ROUTE_PARAM}"} if function["route"] and param not in skip else {f"p:{index}"}
+    context = {
+        "program": program, "module": module, "qualname": qualname, "summaries": summaries,
+        "path": program.paths[module], "hits": {}, "sinks": {}, "callees": set(),
+    }
+    returns: set = set()
+    # Two passes so values assigned late in a loop body reach uses earlier in it.
+    for _ in range(2):
+        for instruction in function["code"]:
+            kind = instruction[0]
+            if kind == "a":
+                labels = _labels(instruction[2], env, context)
+                for name in instruction[1]:
+                    env[name] = env.get(name, set()) | labels if "." in name else labels
+            elif kind == "e":
+                _labels(instruction[1], env, context)
+            elif kind == "r":
+                returns |= _labels(instruction[1], env, context)
+            else:
+                _, sink_kind, detail, line, tokens = instruction
+                _hit(context, _labels(tokens, env, context), sink_kind, detail, context["path"], line, [], line)
+    summary = {"returns": sorted(returns), "sinks": {key: value for key, value in sorted(context["sinks"].items())}}
+    return summary, list(context["hits"].values()), context["callees"]
+
+
+def trace(program: Program, dirty: set[str], summaries: dict, findings: dict) -> None:
+    """Recomputes summaries and findings for every function in the dirty modules, to a fixpoint."""
+    callers: dict[str, set[str]] = {}
+    queue = []
+    for full, (module, _) in program.functions.items():
+        if module in dirty:
+            summaries.pop(full, None)
+            queue.append(full)
+    for module in dirty:
+        findings[module] = {}
+    queued = set(queue)
+    rounds = 0
+    limit = 20 * max(1, len(queue))
+    while queue and rounds < limit:
+        rounds += 1
+        full = queue.pop()
+        queued.discard(full)
+        module, function = program.functions[full]
+        qualname = full[len(module) + 1:] if module else full
+        summary, hits, callees = evaluate(program, module, qualname, summaries)
+        for callee in callees:
+            callers.setdefault(callee, set()).add(full)
+        findings[module][qualname] = hits
+        if summaries.get(full) != summary:
+            summaries[full] = summary
+            for caller in callers.get(full, ()):
+                if caller not in queued and program.functions[caller][0] in dirty:
+                    queued.add(caller)
+                    queue.append(caller)
+
+
+def discover(paths: list[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        if path.is_file():
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(name for name in dirs if name not in SKIP_DIRS and not name.startswith("."))
+            files.extend(Path(root) / name for name in sorted(names) if name.endswith(".py"))
+    return files
+
+
+def scan(root: Path, cache_path: Path | None, jobs: int) -> dict:
+    """Findings, entry points and trust boundaries for the Python files under root."""
+    if root.is_file():
+        root = root.parent
+    cache = {"version": CACHE_VERSION, "files": {}, "extracted": {}, "summaries": {}, "findings": {}}
+    if cache_path is not None and cache_path.exists():
+        try:
+            loaded = json.loads(cache_path.read_text(encoding="utf-8"))
+            if loaded.get("version") == CACHE_VERSION:
+                cache = loaded
+        except (OSError, ValueError):
+            pass
+    files = discover([root])
+    digests: dict[str, str] = {}
+    restated = 0
+    for path in files:
+        stat = path.stat()
+        key = str(path)
+        entry = cache["files"].get(key)
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            digests[key] = entry[2]
+            continue
+        digests[key] = hashlib.sha256(path.read_bytes()).hexdigest()
+        cache["files"][key] = [stat.st_size, stat.st_mtime_ns, digests[key]]
+        restated += 1
+
+    pending = {}
+    for key, digest in digests.items():
+        if digest not in cache["extracted"]:
+            pending.setdefault(digest, key)
+    work = [(key, digest) for digest, key in pending.items()]
+    if len(work) >= POOL_THRESHOLD and jobs > 1:
+        size = max(4, len(work) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for batch in pool.map(_extract_batch, [work[start:start + size] for start in range(0, len(work), size)]):
+                cache["extracted"].update(batch)
+    else:
+        cache["extracted"].update(_extract_batch(work))
+
+    modules: dict[str, dict] = {}
+    paths: dict[str, str] = {}
+    digest_of: dict[str, str] = {}
+    for key, digest in digests.items():
+        module = module_name(Path(key), root)
+        modules[module] = cache["extracted"][digest]
+        paths[module] = key
+        digest_of[module] = digest
+    program = Program(modules, paths)
+
+    previous = cache.get("modules", {})
+    changed = {module for module in modules if previous.get(module) != digest_of[module]}
+    removed = set(previous) - set(modules)
+    importers: dict[str, set[str]] = {}
+    for module in modules:
+        for imported in program.import_targets(module):
+            importers.setdefault(imported, set()).add(module)
+    dirty = set(changed)
+    stack = list(changed | removed)
+    while stack:
+        for importer in importers.get(stack.pop(), ()):
+            if importer not in dirty:
+                dirty.add(importer)
+                stack.append(importer)
+
+    summaries = {full: summary for full, summary in cache["summaries"].items() if full in program.functions}
+    findings = {module: hits for module, hits in cache["findings"].items() if module in modules}
+    trace(program, dirty, summaries, findings)
+
+    modified = bool(restated or dirty or removed or len(cache["files"]) != len(digests))
+    live = set(digests.values())
+    cache.update(
+        files={key: value for key, value in cache["files"].items() if key in digests},
+        extracted={digest: data for digest, data in cache["extracted"].items() if digest in live},
+        modules=digest_of,
+        summaries=summaries,
+        findings=findings,
+    )
+    if cache_path is not None and modified:
+        temp = cache_path.with_name(cache_path.name + ".tmp")
+        temp.write_text(json.dumps(cache), encoding="utf-8")
+        os.replace(temp, cache_path)
+
+    flat = [hit for module in sorted(findings) for hits in findings[module].values() for hit in hits]
+    flat.sort(key=lambda hit: (list(KINDS).index(hit["kind"]), hit["path"], hit["line"]))
+    routes = []
+    boundaries: dict[str, list[str]] = {}
+    for full, (module, function) in sorted(program.functions.items()):
+        location = f"{paths[module]}:{function['line']}"
+        if function["route"]:
+            routes.append((function["route"], full.rsplit(".", 1)[-1], location))
+        for source in function["sources"]:
+            boundaries.setdefault(source, []).append(location)
+    errors = [f"{paths[module]}: {data['error']}" for module, data in modules.items() if data.get("error")]
+    return {
+        "findings": flat, "routes": routes, "boundaries": boundaries, "files": len(files),
+        "parsed": len(work), "retraced": len(dirty), "errors": errors,
+    }
+
+
+def render_flow_rows(findings: list[dict], limit: int) -> list[str]:
+    rows = []
+    for finding in findings[:limit]:
+        severity, title, impact, recommendation = KINDS[finding["kind"]]
+        path = f"{finding['sink_path']}:{finding['sink_line']}"
+        via = f" via {' → '.join(finding['via'])}" if finding["via"] else ""
+        issue = (
+            f"{title}: {finding['source']} reaches {finding['detail']} at {path}{via} "
+            f"(from `{finding['function']}` {finding['path']}:{finding['line']})"
+        )
+        rows.append(f"| {severity} | {issue.replace('|', '/')} | {impact} | {recommendation} |")
+    if len(findings) > limit:
+        rows.append(f"| - | {len(findings) - limit} more flows | - | Rerun with a higher --taint-limit |")
+    return rows
+
+
+def render_threat_model(result: dict, limit: int = 10) -> str:
+    routes = result["routes"]
+    lines = [f"- Entry points: {len(routes)} HTTP handlers" if routes else "- Entry points: no HTTP handlers found"]
+    for route, name, location in routes[:limit]:
+        lines.append(f"  - `{' '.join(route['methods'])} {route['path']}` `{name}` ({location})")
+    if len(routes) > limit:
+        lines.append(f"  - {len(routes) - limit} more")
+    if result["boundaries"]:
+        lines.append("- Trust boundaries:")
+    else:
+        lines.append("- Trust boundaries: no untrusted input sources found")
+    for source, locations in sorted(result["boundaries"].items(), key=lambda item: -len(item[1])):
+        lines.append(f"  - {source}: read in {len(locations)} functions (e.g. {locations[0]})")
+    return "\n".join(lines)
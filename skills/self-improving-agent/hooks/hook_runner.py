@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# Hook runner for the self-improving agent.
+#
+# Replaces the per-call shell hooks with one Python entry point that records
+# each tool event as a single appended JSONL line instead of echoing whole
+# tool outputs to stderr. Every hook call is its own short-lived process, so
+# there is nothing to hold a batch in memory between calls: each call buffers
+# its event into one O_APPEND write (atomic between concurrent hooks), and the
+# batching happens on the read side, where the worker folds everything logged
+# since its last run in one pass. Large payloads are cut to a head and tail,
+# and payloads of successful calls are sampled, so the log stays small under
+# heavy load. The log is capped in size and rotated once. Session-end work
+# (one episodic memory file per session) runs in a detached background worker,
+# so the Stop hook returns immediately.
+
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import fcntl
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+
+MEMORY_DIR = Path(
+    os.environ.get("SELF_IMPROVING_MEMORY", Path(__file__).resolve().parents[1] / "memory")
+)
+EVENT_LOG = MEMORY_DIR / "working" / "events.jsonl"
+EPISODIC_DIR = MEMORY_DIR / "episodic"
+MAX_LOG_BYTES = 8 * 1024 * 1024
+PAYLOAD_LIMIT = 2048
+SAMPLE_RATE = 0.1
+NOISE = re.compile(r"0x[0-9a-f]+|\d+|'[^']*'|\"[^\"]*\"", re.I)
+# Exit status fields seen in tool_response objects.
+EXIT_KEYS = ("exit_code", "exitCode", "returncode", "code")
+UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def clip(text: str, limit: int = PAYLOAD_LIMIT) -> str:
+    """Keep the head and tail of a large payload; errors usually sit at the end."""
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}\n…[{len(text) - limit} chars truncated]…\n{text[-half:]}"
+
+
+def append_event(event: dict, log_path: Path = EVENT_LOG, max_bytes: int = MAX_LOG_BYTES) -> None:
+    """Append one event with a single O_APPEND write; rotate once past max_bytes."""
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        if os.fstat(fd).st_size <= max_bytes:
+            return
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # Another hook may have rotated while we waited for the lock.
+        if log_path.exists() and log_path.stat().st_size > max_bytes:
+            os.replace(log_path, log_path.with_name(log_path.name + ".1"))
+    finally:
+        os.close(fd)
+
+
+def build_event(kind: str, args: argparse.Namespace) -> dict:
+    event = {"ts": now(), "event": kind, "session": os.environ.get("CLAUDE_SESSION_ID", "")}
+    payload = ""
+    if kind == "pre-tool":
+        event["tool"] = args.first or "unknown"
+        payload = args.second or ""
+    elif kind == "post-bash":
+        payload = args.first or ""
+        try:
+            event["exit"] = int(args.second or 0)
+        except ValueError:
+            event["exit"] = args.second
+    if args.stdin:
+        data = sys.stdin.read()
+        try:
+            hook_input = json.loads(data) if data.strip() else {}
+        except ValueError:
+            hook_input = {"raw": data}
+        event["session"] = hook_input.get("session_id", event["session"])
+        event["tool"] = hook_input.get("tool_name", event.get("tool"))
+        if kind == "pre-tool":
+            request = hook_input.get("tool_input") or ""
+            payload = payload or (request if isinstance(request, str) else json.dumps(request))
+        elif kind == "post-bash":
+            output, code = read_response(hook_input.get("tool_response"))
+            payload = payload or output
+            if not args.second:
+                # No status on the command line: take it from the response (None when it has none).
+                event["exit"] = code
+    if payload:
+        event["size"] = len(payload)
+        failed = event.get("exit") not in (None, 0)
+        # Failures are always kept; successful payloads are only sampled.
+        if failed or random.random() < args.sample_rate:
+            event["payload"] = clip(payload, args.payload_limit)
+    return event
+
+
+def read_response(response) -> tuple[str, int | None]:
+    """Output text and exit status of a tool_response (status None when it carries none)."""
+    if response is None:
+        return "", None
+    if not isinstance(response, dict):
+        return str(response), None
+    code = next((response[key] for key in EXIT_KEYS if isinstance(response.get(key), int)), None)
+    if code is None and (response.get("is_error") or response.get("interrupted")):
+        code = 1
+    parts = [response.get(key) for key in ("stdout", "stderr", "output", "error")]
+    output = "\n".join(part for part in parts if isinstance(part, str) and part)
+    if not output and code is None:
+        output = json.dumps(response)
+    return output, code
+
+
+def start_worker(log_path: Path) -> None:
+    subprocess.Popen(
+        [sys.executable, __file__, "worker", "--log", str(log_path)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def signature(payload: str) -> str:
+    """Normalise the last non-empty line of a failure so repeats group together."""
+    lines = [line.strip() for line in payload.splitlines() if line.strip()]
+    return NOISE.sub("#", lines[-1])[:160] if lines else ""
+
+
+def read_lines(path: Path, offset: int):
+    """Yield (end offset, event) for complete lines after offset."""
+    with path.open("rb") as handle:
+        handle.seek(offset)
+        for raw in handle:
+            if not raw.endswith(b"\n"):
+                return
+            offset += len(raw)
+            try:
+                yield offset, json.loads(raw)
+            except ValueError:
+                yield offset, None
+
+
+def read_new_events(log_path: Path, state: dict):
+    """Events appended since the last run, including the tail of a rotated log."""
+    stat = log_path.stat()
+    offset = state.get("offset", 0)
+    if state.get("inode") != stat.st_ino:
+        rotated = log_path.with_name(log_path.name + ".1")
+        if rotated.exists() and rotated.stat().st_ino == state.get("inode"):
+            for _, event in read_lines(rotated, offset):
+                if event is not None:
+                    yield event
+        offset = 0
+    elif offset > stat.st_size:
+        offset = 0
+    state.update(inode=stat.st_ino, offset=offset)
+    for offset, event in read_lines(log_path, offset):
+        state["offset"] = offset
+        if event is not None:
+            yield event
+
+
+def summarise(events: list[dict]) -> dict:
+    """Tool counts and failure signatures of one session's events."""
+    tools: dict[str, int] = {}
+    failures: dict[str, dict] = {}
+    commands = errors = 0
+    for event in events:
+        if event.get("event") == "pre-tool":
+            tool = event.get("tool") or "unknown"
+            tools[tool] = tools.get(tool, 0) + 1
+        elif event.get("event") == "post-bash":
+            commands += 1
+            if event.get("exit") not in (None, 0):
+                errors += 1
+                key = signature(event.get("payload", "")) or f"exit {event.get('exit')}"
+                entry = failures.setdefault(
+                    key, {"signature": key, "count": 0, "example": event.get("payload", "")[-400:]}
+                )
+                entry["count"] += 1
+    return {
+        "started": events[0].get("ts"),
+        "ended": events[-1].get("ts"),
+        "tools": dict(sorted(tools.items(), key=lambda item: -item[1])),
+        "commands": commands,
+        "errors": errors,
+        # Repeated failures are the raw material for new patterns.
+        "recurring_failures": sorted(
+            (item for item in failures.values() if item["count"] > 1),
+            key=lambda item: -item["count"],
+        ),
+        "failures": len(failures),
+    }
+
+
+def run_worker(log_path: Path) -> int:
+    """Summarise events since the last run into one episodic memory file per session."""
+    if not log_path.exists():
+        return 0
+    with open(log_path.with_name(".worker.lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        state_file = log_path.with_name("worker-state.json")
+        state = json.loads(state_file.read_text()) if state_file.exists() else {}
+        sessions: dict[str, list[dict]] = {}
+        for event in read_new_events(log_path, state):
+            sessions.setdefault(event.get("session") or "", []).append(event)
+
+        stamp = datetime.now(timezone.utc)
+        for session, events in sessions.items():
+            EPISODIC_DIR.mkdir(parents=True, exist_ok=True)
+            slug = UNSAFE.sub("-", session)[:36].strip("-") or "unknown"
+            episode = {"id": f"ep-{stamp:%Y-%m-%d-%H%M%S}-{slug}", "session": session, **summarise(events)}
+            path = EPISODIC_DIR / f"{stamp:%Y-%m-%d}-session-{stamp:%H%M%S}-{slug}.json"
+            path.write_text(json.dumps(episode, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        state_file.write_text(json.dumps(state))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Record self-improving-agent hook events.")
+    parser.add_argument("event", choices=["pre-tool", "post-bash", "session-end", "worker"])
+    parser.add_argument("first", nargs="?", help="Tool name (pre-tool) or tool output (post-bash)")
+    parser.add_argument("second", nargs="?", help="Tool input (pre-tool) or exit code (post-bash)")
+    parser.add_argument("--stdin", action="store_true", help="Read the hook's JSON input from stdin")
+    parser.add_argument("--log", default=str(EVENT_LOG), help="Event log path")
+    parser.add_argument("--max-bytes", type=int, default=MAX_LOG_BYTES, help="Rotate the log past this size")
+    parser.add_argument("--payload-limit", type=int, default=PAYLOAD_LIMIT, help="Characters kept per payload")
+    parser.add_argument("--sample-rate", type=float, default=SAMPLE_RATE, help="Share of successful payloads kept")
+    parser.add_argument("--sync", action="store_true", help="Run session-end work in the foreground")
+    args = parser.parse_args()
+
+    log_path = Path(args.log)
+    if args.event == "worker":
+        return run_worker(log_path)
+    try:
+        event = build_event(args.event, args)
+        append_event(event, log_path, args.max_bytes)
+        if event.get("exit") not in (None, 0):
+            print(f"[self-improving-agent] exit={event['exit']} logged to {log_path}", file=sys.stderr)
+        if args.event == "session-end":
+            if args.sync:
+                return run_worker(log_path)
+            start_worker(log_path)
+    except OSError as exc:
+        # A hook must never break the tool call it observes.
+        print(f"[self-improving-agent] hook logging failed: {exc}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
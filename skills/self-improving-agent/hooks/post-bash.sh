@@ -1,10 +1,3 @@
 #!/usr/bin/env bash
-set -euo pipefail
-
-tool_output="${1:-}"
-exit_code="${2:-0}"
-
-echo "[self-improving-agent] PostToolUse: exit=${exit_code}" >&2
-if [[ -n "${tool_output}" ]]; then
-  echo "[self-improving-agent] Output: ${tool_output}" >&2
-fi
+# Thin wrapper kept for existing hook configs; see hook_runner.py.
+exec python3 "$(dirname "$0")/hook_runner.py" post-bash "$@"
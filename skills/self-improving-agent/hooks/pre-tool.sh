@@ -1,10 +1,3 @@
 #!/usr/bin/env bash
-set -euo pipefail
-
-tool_name="${1:-unknown}"
-tool_input="${2:-}"
-
-echo "[self-improving-agent] PreToolUse: ${tool_name}" >&2
-if [[ -n "${tool_input}" ]]; then
-  echo "[self-improving-agent] Input: ${tool_input}" >&2
-fi
+# Thin wrapper kept for existing hook configs; see hook_runner.py.
+exec python3 "$(dirname "$0")/hook_runner.py" pre-tool "$@"
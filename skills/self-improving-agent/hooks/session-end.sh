@@ -1,4 +1,3 @@
 #!/usr/bin/env bash
-set -euo pipefail
-
-echo "[self-improving-agent] Session ended" >&2
+# Thin wrapper kept for existing hook configs; see hook_runner.py.
+exec python3 "$(dirname "$0")/hook_runner.py" session-end "$@"
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# Similarity retrieval over learned semantic patterns.
+#
+# Each pattern's name, summary, problem, rules and target skills are embedded
+# offline with the hashing trick: word and bigram features are hashed into a
+# fixed 2^20 space and weighted by sublinear term frequency. IDF is applied at
+# query time from live document frequencies, so adding a pattern never
+# re-weights the others. Postings are kept sorted by weight, and a query only
+# reads the first --budget entries of each posting list. That bounds the work
+# per query (approximate top-k) no matter how many patterns exist. With NumPy
+# the truncated posting slices are scored as arrays (one bincount and one
+# argpartition per query); without it the same sums run in Python.
+#
+# Vectors and postings are cached next to the source in <name>.index as flat
+# arrays, with a content hash per pattern. Re-runs embed only patterns that
+# are new or changed, and drop patterns that were removed; saving compacts the
+# slots removed patterns leave behind.
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from zlib import crc32
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import re
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pattern_store import DEFAULT_DB, DEFAULT_JSON, PatternStore
+
+INDEX_VERSION = 1
+FEATURE_MASK = (1 << 20) - 1
+POSTING_BUDGET = 256
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "has", "have",
+    "if", "in", "into", "is", "it", "its", "not", "of", "on", "or", "so", "that", "the",
+    "their", "then", "this", "to", "use", "when", "with", "without",
+}
+TEXT_FIELDS = ("name", "pattern", "problem", "category")
+LIST_FIELDS = ("when_to_use", "quality_rules", "quality_checklist", "benefits", "target_skills")
+
+
+def pattern_text(pattern: dict) -> str:
+    parts = [str(pattern.get(field, "")) for field in TEXT_FIELDS]
+    for field in LIST_FIELDS:
+        parts.extend(str(item) for item in pattern.get(field, []))
+    return "\n".join(part for part in parts if part).replace("_", " ")
+
+
+def embed(text: str) -> dict[int, float]:
+    """L2-normalised sublinear-tf vector over hashed word and bigram features."""
+    tokens = [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+    counts = Counter(crc32(token.encode()) & FEATURE_MASK for token in tokens)
+    counts.update(
+        crc32(f"{first} {second}".encode()) & FEATURE_MASK
+        for first, second in zip(tokens, tokens[1:])
+    )
+    weights = {feature: 1.0 + math.log(count) for feature, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+    return {feature: weight / norm for feature, weight in weights.items()}
+
+
+def content_hash(pattern: dict) -> str:
+    return hashlib.sha1(pattern_text(pattern).encode("utf-8")).hexdigest()
+
+
+class PatternIndex:
+    """Incremental inverted index with weight-ordered, budget-truncated postings.
+
+    Postings loaded from the cache stay in flat CSR arrays; a feature's list is
+    copied into its own arrays only when an add or remove touches it.
+    """
+
+    def __init__(self, budget: int = POSTING_BUDGET) -> None:
+        self.budget = budget
+        self.keys: list[str | None] = []
+        self.ids: dict[str, int] = {}
+        self.hashes: dict[str, str] = {}
+        # Vectors of documents added since load; older ones live in doc_* CSR.
+        self.vectors: dict[int, dict[int, float]] = {}
+        self.doc_offsets, self.doc_features, self.doc_weights = array("Q", [0]), array("I"), array("f")
+        # feature -> slot in the loaded CSR postings.
+        self.base: dict[int, int] = {}
+        self.post_offsets, self.post_docs, self.post_weights = array("Q", [0]), array("I"), array("f")
+        # feature -> (negated weights ascending, doc ids); negation lets bisect
+        # keep each list in descending weight order.
+        self.postings: dict[int, tuple[array, array]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def vector(self, doc: int) -> dict[int, float]:
+        if doc in self.vectors:
+            return self.vectors[doc]
+        start, end = self.doc_offsets[doc], self.doc_offsets[doc + 1]
+        return dict(zip(self.doc_features[start:end], self.doc_weights[start:end]))
+
+    def _posting(self, feature: int) -> tuple[array, array]:
+        posting = self.postings.get(feature)
+        if posting is None:
+            slot = self.base.pop(feature, None)
+            if slot is None:
+                posting = (array("f"), array("I"))
+            else:
+                start, end = self.post_offsets[slot], self.post_offsets[slot + 1]
+                posting = (self.post_weights[start:end], self.post_docs[start:end])
+            self.postings[feature] = posting
+        return posting
+
+    def _span(self, feature: int):
+        posting = self.postings.get(feature)
+        if posting is not None:
+            return posting[0], posting[1], 0, len(posting[1])
+        slot = self.base.get(feature)
+        if slot is None:
+            return None
+        return self.post_weights, self.post_docs, self.post_offsets[slot], self.post_offsets[slot + 1]
+
+    def add(self, key: str, pattern: dict, digest: str | None = None) -> None:
+        self.add_many([(key, pattern, digest or content_hash(pattern))])
+
+    def add_many(self, items) -> None:
+        """Embed (key, pattern, digest) items and merge them into the postings."""
+        pending: dict[int, list[tuple[float, int]]] = {}
+        for key, pattern, digest in items:
+            if self.hashes.get(key) == digest:
+                continue
+            if key in self.ids:
+                self.remove(key)
+            vector = embed(pattern_text(pattern))
+            doc = len(self.keys)
+            self.keys.append(key)
+            self.vectors[doc] = vector
+            self.ids[key] = doc
+            self.hashes[key] = digest
+            for feature, weight in vector.items():
+                pending.setdefault(feature, []).append((-weight, doc))
+        for feature, entries in pending.items():
+            weights, docs = self._posting(feature)
+            if len(entries) <= 8:
+                for weight, doc in entries:
+                    at = bisect_left(weights, weight)
+                    weights.insert(at, weight)
+                    docs.insert(at, doc)
+                continue
+            # Large batches: one sort beats repeated array inserts.
+            entries.extend(zip(weights, docs))
+            entries.sort()
+            weights[:] = array("f", [weight for weight, _ in entries])
+            docs[:] = array("I", [doc for _, doc in entries])
+
+    def remove(self, key: str) -> None:
+        doc = self.ids.pop(key)
+        del self.hashes[key]
+        for feature in self.vector(doc):
+            weights, docs = self._posting(feature)
+            at = docs.index(doc)
+            del weights[at]
+            del docs[at]
+        self.keys[doc] = None
+        self.vectors[doc] = {}
+
+    def _spans(self, text: str) -> list[tuple]:
+        """(weights, docs, start, stop, scale) of each query feature's budget-truncated posting."""
+        total = len(self.ids) + 1
+        spans = []
+        for feature, query_weight in embed(text).items():
+            span = self._span(feature)
+            if span is None or span[2] == span[3]:
+                continue
+            weights, docs, start, end = span
+            idf = math.log(total / (end - start + 0.5)) + 1.0
+            spans.append((weights, docs, start, min(end, start + self.budget), -query_weight * idf * idf))
+        return spans
+
+    def search(self, text: str, top: int = 5) -> list[tuple[str, float]]:
+        spans = self._spans(text)
+        if np is not None and spans:
+            return self._search_numpy(spans, top)
+        scores: dict[int, float] = {}
+        get = scores.get
+        for weights, docs, start, stop, scale in spans:
+            for i in range(start, stop):
+                doc = docs[i]
+                scores[doc] = get(doc, 0.0) + weights[i] * scale
+        # Ties go to the older document, in both paths.
+        best = heapq.nlargest(top, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.keys[doc], score) for doc, score in best]
+
+    def _search_numpy(self, spans: list[tuple], top: int) -> list[tuple[str, float]]:
+        docs = np.concatenate([np.frombuffer(docs, dtype=np.uint32)[start:stop] for _, docs, start, stop, _ in spans])
+        weights = np.concatenate([
+            np.frombuffer(weights, dtype=np.float32)[start:stop].astype(np.float64) * scale
+            for weights, _, start, stop, scale in spans
+        ])
+        scores = np.bincount(docs, weights=weights, minlength=len(self.keys))
+        touched = np.zeros(len(scores), dtype=bool)
+        touched[docs] = True
+        candidates = np.flatnonzero(touched)
+        if len(candidates) > top:
+            # Keep every candidate tied with the k-th score so ties break the same way as in Python.
+            kth = np.partition(scores[candidates], len(candidates) - top)[len(candidates) - top]
+            candidates = candidates[scores[candidates] >= kth]
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))][:top]
+        return [(self.keys[doc], float(scores[doc])) for doc in ranked]
+
+    def sync(self, patterns: dict[str, dict]) -> tuple[int, int]:
+        """Bring the index in line with patterns; return (embedded, removed)."""
+        removed = [key for key in self.ids if key not in patterns]
+        for key in removed:
+            self.remove(key)
+        changed = []
+        for key, pattern in patterns.items():
+            digest = content_hash(pattern)
+            if self.hashes.get(key) != digest:
+                changed.append((key, pattern, digest))
+        self.add_many(changed)
+        return len(changed), len(removed)
+
+    def save(self, path: Path) -> None:
+        """Write a JSON header line followed by the raw CSR arrays, renumbering live documents densely."""
+        live = [doc for doc, key in enumerate(self.keys) if key is not None]
+        renumber = None
+        if len(live) < len(self.keys):
+            renumber = array("I", [0]) * len(self.keys)
+            for new, doc in enumerate(live):
+                renumber[doc] = new
+        doc_offsets, doc_features, doc_weights = array("Q", [0]), array("I"), array("f")
+        for doc in live:
+            if doc in self.vectors:
+                doc_features.extend(self.vectors[doc].keys())
+                doc_weights.extend(self.vectors[doc].values())
+            else:
+                start, end = self.doc_offsets[doc], self.doc_offsets[doc + 1]
+                doc_features.extend(self.doc_features[start:end])
+                doc_weights.extend(self.doc_weights[start:end])
+            doc_offsets.append(len(doc_features))
+
+        features = sorted(feature for feature in set(self.base) | set(self.postings))
+        post_offsets, post_docs, post_weights = array("Q", [0]), array("I"), array("f")
+        for feature in features:
+            weights, docs, start, end = self._span(feature)
+            post_weights.extend(weights[start:end])
+            post_docs.extend(docs[start:end])
+            post_offsets.append(len(post_docs))
+        if renumber is not None:
+            if np is not None:
+                remapped = np.frombuffer(renumber, dtype=np.uint32)[np.frombuffer(post_docs, dtype=np.uint32)]
+                post_docs = array("I", remapped.tobytes())
+            else:
+                post_docs = array("I", [renumber[doc] for doc in post_docs])
+
+        arrays = [doc_offsets, doc_features, doc_weights,
+                  array("I", features), post_offsets, post_docs, post_weights]
+        keys = [self.keys[doc] for doc in live]
+        header = {
+            "version": INDEX_VERSION,
+            "keys": keys,
+            "hashes": [self.hashes[key] for key in keys],
+            "lengths": [len(item) for item in arrays],
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as handle:
+            handle.write(json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n")
+            for item in arrays:
+                item.tofile(handle)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, budget: int = POSTING_BUDGET) -> "PatternIndex":
+        index = cls(budget)
+        with path.open("rb") as handle:
+            header = json.loads(handle.readline())
+            if header.get("version") != INDEX_VERSION:
+                return index
+            arrays = []
+            for typecode, length in zip("QIfIQIf", header["lengths"]):
+                item = array(typecode)
+                item.fromfile(handle, length)
+                arrays.append(item)
+        (index.doc_offsets, index.doc_features, index.doc_weights,
+         features, index.post_offsets, index.post_docs, index.post_weights) = arrays
+        index.base = dict(zip(features, range(len(features))))
+        index.keys = header["keys"]
+        for doc, (key, digest) in enumerate(zip(header["keys"], header["hashes"])):
+            if key is not None:
+                index.ids[key] = doc
+                index.hashes[key] = digest
+        return index
+
+
+def load_patterns(db: Path | None, json_path: Path) -> dict[str, dict]:
+    if db is not None and db.exists():
+        with PatternStore(db) as store:
+            return store.export_document()["patterns"]
+    return json.loads(json_path.read_text(encoding="utf-8")).get("patterns", {})
+
+
+def load_index(
+    patterns: dict[str, dict], cache_path: Path | None, budget: int = POSTING_BUDGET
+) -> PatternIndex:
+    """Load the cached index, re-embed what changed, and save it back."""
+    index = PatternIndex(budget)
+    if cache_path is not None and cache_path.exists():
+        try:
+            index = PatternIndex.load(cache_path, budget)
+        except (OSError, ValueError, EOFError):
+            index = PatternIndex(budget)
+    embedded, removed = index.sync(patterns)
+    if cache_path is not None and (embedded or removed or not cache_path.exists()):
+        index.save(cache_path)
+    return index
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Find the learned patterns most relevant to a task.")
+    parser.add_argument("query", help="Task or problem description")
+    parser.add_argument("--top", type=int, default=5, help="Number of patterns to return")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help="Pattern store (used when it exists)")
+    parser.add_argument("--json", default=str(DEFAULT_JSON), help="semantic-patterns.json fallback")
+    parser.add_argument("--index", help="Vector cache (default: next to the pattern source)")
+    parser.add_argument("--budget", type=int, default=POSTING_BUDGET, help="Postings read per query term")
+    parser.add_argument("--show", action="store_true", help="Print full pattern JSON")
+    args = parser.parse_args()
+
+    db, json_path = Path(args.db), Path(args.json)
+    source = db if db.exists() else json_path
+    try:
+        patterns = load_patterns(db, json_path)
+    except (OSError, ValueError) as exc:
+        print(f"Cannot load patterns: {exc}")
+        return 1
+    cache = Path(args.index) if args.index else source.with_suffix(".index")
+    index = load_index(patterns, cache, args.budget)
+
+    start = time.perf_counter()
+    results = index.search(args.query, args.top)
+    elapsed = time.perf_counter() - start
+
+    for key, score in results:
+        pattern = patterns[key]
+        print(f"{score:.3f}  {key}  [{pattern.get('category', '-')}] {pattern.get('pattern', '')}")
+        if args.show:
+            print(json.dumps(pattern, indent=2, ensure_ascii=False))
+    print(f"{len(results)} of {len(index)} patterns in {elapsed * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# Indexed store for self-improving-agent semantic patterns.
+#
+# memory/semantic-patterns.json has to be loaded and rewritten whole for every
+# change, which gets slow and racy once many sessions learn patterns at the
+# same time. This store keeps one row per pattern in SQLite in WAL mode, so
+# readers never block the writer. Category, confidence, source and target
+# skill are indexed. Writes run in BEGIN IMMEDIATE transactions, so concurrent
+# sessions queue up instead of overwriting each other. `export` regenerates
+# the JSON document in its existing shape.
+
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+MEMORY_DIR = Path(__file__).resolve().parents[1] / "memory"
+DEFAULT_DB = MEMORY_DIR / "semantic-patterns.db"
+DEFAULT_JSON = MEMORY_DIR / "semantic-patterns.json"
+DEFAULT_VERSION = "1.0.0"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patterns (
+    key TEXT PRIMARY KEY,
+    id TEXT,
+    name TEXT,
+    category TEXT,
+    source TEXT,
+    confidence REAL NOT NULL DEFAULT 0,
+    applications INTEGER NOT NULL DEFAULT 0,
+    created TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS patterns_category ON patterns (category, confidence DESC);
+CREATE INDEX IF NOT EXISTS patterns_confidence ON patterns (confidence DESC);
+CREATE INDEX IF NOT EXISTS patterns_source ON patterns (source, confidence DESC);
+CREATE TABLE IF NOT EXISTS pattern_skills (
+    skill TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES patterns (key) ON DELETE CASCADE,
+    PRIMARY KEY (skill, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pattern_skills_key ON pattern_skills (key);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class PatternStore:
+    """SQLite-backed semantic memory with indexed lookups and atomic updates."""
+
+    def __init__(self, path: Path = DEFAULT_DB, timeout: float = 30.0) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly below.
+        self.conn = sqlite3.connect(str(path), timeout=timeout, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "PatternStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction; takes the write lock up front so read-modify-write is atomic."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _write(self, key: str, pattern: dict) -> None:
+        confidence = pattern.get("confidence", 0)
+        if not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+            raise ValueError(f"{key}: confidence must be a number between 0 and 1")
+        self.conn.execute(
+            """
+            INSERT INTO patterns (key, id, name, category, source, confidence, applications, created, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                id = excluded.id, name = excluded.name, category = excluded.category,
+                source = excluded.source, confidence = excluded.confidence,
+                applications = excluded.applications, created = excluded.created,
+                data = excluded.data
+            """,
+            (
+                key,
+                pattern.get("id"),
+                pattern.get("name"),
+                pattern.get("category"),
+                pattern.get("source"),
+                float(confidence),
+                int(pattern.get("applications", 0)),
+                pattern.get("created"),
+                json.dumps(pattern, ensure_ascii=False),
+            ),
+        )
+        self.conn.execute("DELETE FROM pattern_skills WHERE key = ?", (key,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO pattern_skills (skill, key) VALUES (?, ?)",
+            [(skill, key) for skill in pattern.get("target_skills", [])],
+        )
+        self._touch()
+
+    def _touch(self) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('last_updated', ?)",
+            (date.today().isoformat(),),
+        )
+
+    def put(self, key: str, pattern: dict) -> None:
+        with self.transaction():
+            self._write(key, pattern)
+
+    def get(self, key: str) -> dict | None:
+        row = self.conn.execute("SELECT data FROM patterns WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def delete(self, key: str) -> bool:
+        with self.transaction():
+            cursor = self.conn.execute("DELETE FROM patterns WHERE key = ?", (key,))
+            if cursor.rowcount:
+                self._touch()
+        return cursor.rowcount > 0
+
+    def record_application(self, key: str, confidence_delta: float = 0.0) -> dict:
+        """Count one application of a pattern and optionally nudge its confidence."""
+        with self.transaction():
+            pattern = self.get(key)
+            if pattern is None:
+                raise KeyError(key)
+            pattern["applications"] = int(pattern.get("applications", 0)) + 1
+            if confidence_delta:
+                confidence = float(pattern.get("confidence", 0)) + confidence_delta
+                pattern["confidence"] = round(min(1.0, max(0.0, confidence)), 4)
+            self._write(key, pattern)
+        return pattern
+
+    def query(
+        self,
+        category: str | None = None,
+        source: str | None = None,
+        min_confidence: float | None = None,
+        skill: str | None = None,
+        limit: int | None = None,
+    ) -> list[tuple[str, dict]]:
+        """Patterns matching every given filter, most confident first."""
+        clauses, params = [], []
+        if category:
+            clauses.append("p.category = ?")
+            params.append(category)
+        if source:
+            clauses.append("p.source = ?")
+            params.append(source)
+        if min_confidence is not None:
+            clauses.append("p.confidence >= ?")
+            params.append(min_confidence)
+        join = ""
+        if skill:
+            join = "JOIN pattern_skills s ON s.key = p.key AND s.skill = ?"
+            params.insert(0, skill)
+        sql = f"SELECT p.key, p.data FROM patterns p {join}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY p.confidence DESC, p.key"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [(row["key"], json.loads(row["data"])) for row in self.conn.execute(sql, params)]
+
+    def categories(self) -> list[tuple[str, int]]:
+        rows = self.conn.execute(
+            "SELECT category, COUNT(*) AS n FROM patterns GROUP BY category ORDER BY n DESC, category"
+        )
+        return [(row["category"], row["n"]) for row in rows]
+
+    def import_document(self, document: dict, replace: bool = False) -> int:
+        patterns = document.get("patterns", {})
+        meta = document.get("meta", {})
+        with self.transaction():
+            if replace:
+                self.conn.execute("DELETE FROM patterns")
+            for key, pattern in patterns.items():
+                self._write(key, pattern)
+            for name in ("version", "last_updated", "categories"):
+                if meta.get(name):
+                    value = meta[name] if isinstance(meta[name], str) else json.dumps(meta[name])
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value)
+                    )
+        return len(patterns)
+
+    def export_document(self) -> dict:
+        """The whole store in the semantic-patterns.json shape, from one snapshot."""
+        self.conn.execute("BEGIN")
+        try:
+            rows = self.conn.execute("SELECT key, category, data FROM patterns ORDER BY rowid").fetchall()
+            meta = {row["name"]: row["value"] for row in self.conn.execute("SELECT * FROM meta")}
+        finally:
+            self.conn.execute("COMMIT")
+        # Keep the recorded category order, then append categories seen since.
+        categories = [
+            name for name in json.loads(meta.get("categories", "[]"))
+            if any(row["category"] == name for row in rows)
+        ]
+        for row in rows:
+            if row["category"] and row["category"] not in categories:
+                categories.append(row["category"])
+        return {
+            "patterns": {row["key"]: json.loads(row["data"]) for row in rows},
+            "meta": {
+                "version": meta.get("version", DEFAULT_VERSION),
+                "last_updated": meta.get("last_updated", date.today().isoformat()),
+                "total_patterns": len(rows),
+                "categories": categories,
+            },
+        }
+
+
+def write_json_atomic(path: Path, document: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2, ensure_ascii=False)
+            handle.write("\n")
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def print_patterns(rows: list[tuple[str, dict]], as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(dict(rows), indent=2, ensure_ascii=False))
+        return
+    for key, pattern in rows:
+        print(
+            f"{pattern.get('confidence', 0):.2f}  {pattern.get('category', '-'):<16} "
+            f"{key}  ({pattern.get('applications', 0)} applications)"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query and update the semantic pattern store.")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help="SQLite store path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = commands.add_parser("import", help="Load patterns from JSON")
+    import_cmd.add_argument("--json", default=str(DEFAULT_JSON), help="semantic-patterns.json path")
+    import_cmd.add_argument("--replace", action="store_true", help="Drop patterns missing from the file")
+
+    export_cmd = commands.add_parser("export", help="Write the store as semantic-patterns.json")
+    export_cmd.add_argument("--json", default=str(DEFAULT_JSON), help="Output path ('-' for stdout)")
+
+    query_cmd = commands.add_parser("query", help="List patterns by index filters")
+    query_cmd.add_argument("--category", help="Pattern category")
+    query_cmd.add_argument("--source", help="Pattern source")
+    query_cmd.add_argument("--min-confidence", type=float, help="Minimum confidence")
+    query_cmd.add_argument("--skill", help="Target skill")
+    query_cmd.add_argument("--limit", type=int, help="Maximum patterns to list")
+    query_cmd.add_argument("--json", action="store_true", help="Print full patterns as JSON")
+
+    get_cmd = commands.add_parser("get", help="Print one pattern")
+    get_cmd.add_argument("key")
+
+    put_cmd = commands.add_parser("put", help="Insert or replace one pattern")
+    put_cmd.add_argument("key")
+    put_cmd.add_argument("--file", default="-", help="Pattern JSON file ('-' for stdin)")
+
+    apply_cmd = commands.add_parser("apply", help="Record one application of a pattern")
+    apply_cmd.add_argument("key")
+    apply_cmd.add_argument("--confidence-delta", type=float, default=0.0, help="Confidence adjustment")
+
+    delete_cmd = commands.add_parser("delete", help="Remove one pattern")
+    delete_cmd.add_argument("key")
+
+    commands.add_parser("categories", help="Pattern counts per category")
+    args = parser.parse_args()
+
+    try:
+        with PatternStore(Path(args.db)) as store:
+            if args.command == "import":
+                document = json.loads(Path(args.json).read_text(encoding="utf-8"))
+                count = store.import_document(document, args.replace)
+                print(f"Imported {count} patterns into {args.db}")
+            elif args.command == "export":
+                document = store.export_document()
+                if args.json == "-":
+                    print(json.dumps(document, indent=2, ensure_ascii=False))
+                else:
+                    write_json_atomic(Path(args.json), document)
+                    print(f"Exported {document['meta']['total_patterns']} patterns to {args.json}")
+            elif args.command == "query":
+                rows = store.query(
+                    args.category, args.source, args.min_confidence, args.skill, args.limit
+                )
+                print_patterns(rows, args.json)
+            elif args.command == "get":
+                pattern = store.get(args.key)
+                if pattern is None:
+                    print(f"Unknown pattern: {args.key}")
+                    return 1
+                print(json.dumps(pattern, indent=2, ensure_ascii=False))
+            elif args.command == "put":
+                text = sys.stdin.read() if args.file == "-" else Path(args.file).read_text(encoding="utf-8")
+                store.put(args.key, json.loads(text))
+                print(f"Stored {args.key}")
+            elif args.command == "apply":
+                pattern = store.record_application(args.key, args.confidence_delta)
+                print(
+                    f"{args.key}: {pattern['applications']} applications, "
+                    f"confidence {pattern.get('confidence', 0):.2f}"
+                )
+            elif args.command == "delete":
+                if not store.delete(args.key):
+                    print(f"Unknown pattern: {args.key}")
+                    return 1
+                print(f"Deleted {args.key}")
+            elif args.command == "categories":
+                for category, count in store.categories():
+                    print(f"{count:5d}  {category}")
+    except KeyError as exc:
+        print(f"Unknown pattern: {exc.args[0]}")
+        return 1
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        print(f"Pattern store error: {exc}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+# Structured session event log for session-logger.
+#
+# Events are appended as compact JSONL to per-session segment files. Writes
+# are buffered, and fsync is batched to at most one per --fsync-interval.
+# Segments rotate by size. Every flushed block starts at a checkpoint, and
+# each checkpoint records (timestamp, byte offset) in a small .idx sidecar.
+# Flushes hold an flock on the session's .lock file, so concurrent writers to
+# one session take offsets from the real end of the segment and follow each
+# other's rotations.
+# When a session is closed, its segments are gzip-compressed one block per
+# gzip member, so the checkpoints stay seekable in the compressed files.
+# Closed sessions are listed in catalog.jsonl, and compaction folds old ones
+# into summaries.jsonl.
+#
+# The reader finds sessions by time from the catalog, skips whole segments
+# by their time span, and seeks to the nearest checkpoint inside a segment,
+# so reading a session or time range never scans unrelated data.
+#
+# Layout under --root (default sessions/events):
+#   catalog.jsonl          one line per closed session (last line wins)
+#   summaries.jsonl        compacted sessions
+#   <session>/000001.jsonl[.gz] + 000001.idx, .lock
+
+from bisect import bisect_right
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import argparse
+import fcntl
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import zlib
+
+DEFAULT_ROOT = Path("sessions") / "events"
+MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+FLUSH_BYTES = 256 * 1024
+FLUSH_EVENTS = 1024
+FSYNC_INTERVAL = 1.0
+SESSION_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+def parse_time(value: str | None) -> float | None:
+    """Epoch seconds from an epoch number or an ISO 8601 date/time."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def format_time(ts: float | None) -> str:
+    if ts is None:
+        return "-"
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+def read_json_lines(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def append_json_line(path: Path, record: dict) -> None:
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+class SessionWriter:
+    """Buffered appender for one session's events."""
+
+    def __init__(
+        self,
+        root: Path,
+        session: str,
+        max_segment_bytes: int = MAX_SEGMENT_BYTES,
+        fsync_interval: float = FSYNC_INTERVAL,
+    ) -> None:
+        if not SESSION_PATTERN.match(session):
+            raise ValueError(f"Invalid session id: {session!r}")
+        self.root = root
+        self.session = session
+        self.directory = root / session
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_interval = fsync_interval
+        self.buffer: list[bytes] = []
+        self.buffered = 0
+        self.first_ts: float | None = None
+        self.last_ts = 0.0
+        self.last_fsync = time.monotonic()
+        self.events = 0
+        self.lock = (self.directory / ".lock").open("a")
+        self.seq = 0
+        try:
+            with self._locked():
+                self._follow()
+        except ValueError:
+            self.lock.close()
+            raise
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self.lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock, fcntl.LOCK_UN)
+
+    def _follow(self) -> None:
+        """Open the newest segment (another writer may have rotated); call with the lock held."""
+        segments = sorted(self.directory.glob("*.jsonl"))
+        if list(self.directory.glob("*.jsonl.gz")) and not segments:
+            raise ValueError(f"Session {self.session} is closed")
+        latest = int(segments[-1].name.split(".")[0]) if segments else 1
+        if latest == self.seq:
+            return
+        if self.seq:
+            self.handle.close()
+            self.index.close()
+        self.seq = latest
+        self._open_segment()
+
+    def _open_segment(self) -> None:
+        path = self.directory / f"{self.seq:06d}.jsonl"
+        self.handle = path.open("ab")
+        self.index = (self.directory / f"{self.seq:06d}.idx").open("a", encoding="utf-8")
+        self.offset = self.handle.tell()
+        if self.offset:
+            # Resuming: terminate a line torn by a crash so it stays isolated,
+            # and keep timestamps monotonic with what is on disk.
+            with path.open("rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b"\n":
+                    self.handle.write(b"\n")
+                    self.offset += 1
+            last = self._disk_last()
+            if last is not None:
+                self.last_ts = max(self.last_ts, last)
+
+    def _disk_last(self) -> float | None:
+        """Timestamp of the last event on disk; the final block may span well past its checkpoint."""
+        checkpoints = load_checkpoints(self.directory / f"{self.seq:06d}.idx")
+        if not checkpoints:
+            return None
+        last = last_timestamp(self.directory / f"{self.seq:06d}.jsonl", checkpoints[-1][1])
+        return last if last is not None else checkpoints[-1][0]
+
+    def write(self, event_type: str, data: dict | None = None, ts: float | None = None) -> None:
+        # Timestamps are clamped to be non-decreasing so range reads can stop early.
+        ts = max(ts if ts is not None else time.time(), self.last_ts)
+        record = {"ts": round(ts, 6), "type": event_type}
+        if data:
+            record.update((key, value) for key, value in data.items() if key not in record)
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        if self.first_ts is None:
+            self.first_ts = record["ts"]
+        self.last_ts = record["ts"]
+        self.buffer.append(line)
+        self.buffered += len(line)
+        self.events += 1
+        if self.buffered >= FLUSH_BYTES or len(self.buffer) >= FLUSH_EVENTS:
+            self.flush()
+
+    def flush(self, sync: bool = False) -> None:
+        if self.buffer:
+            with self._locked():
+                self._follow()
+                end = os.fstat(self.handle.fileno()).st_size
+                if end != self.offset:
+                    # Another writer appended since our last flush.
+                    self.offset = end
+                    last = self._disk_last()
+                    if last is not None and last > self.first_ts:
+                        self._restamp(last)
+                self.index.write(f"{self.first_ts} {self.offset}\n")
+                self.handle.write(b"".join(self.buffer))
+                self.offset += self.buffered
+                self.buffer.clear()
+                self.buffered = 0
+                self.first_ts = None
+                self.handle.flush()
+                self.index.flush()
+                if self.offset >= self.max_segment_bytes:
+                    self._rotate()
+        now = time.monotonic()
+        if sync or now - self.last_fsync >= self.fsync_interval:
+            os.fsync(self.handle.fileno())
+            os.fsync(self.index.fileno())
+            self.last_fsync = now
+
+    def _restamp(self, floor: float) -> None:
+        """Raise buffered timestamps below floor, written by another writer meanwhile."""
+        lines = []
+        for line in self.buffer:
+            record = json.loads(line)
+            record["ts"] = max(record["ts"], floor)
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        self.buffer = lines
+        self.buffered = sum(map(len, lines))
+        self.first_ts = max(self.first_ts, floor)
+        self.last_ts = max(self.last_ts, floor)
+
+    def _rotate(self) -> None:
+        self.handle.close()
+        self.index.close()
+        self.seq += 1
+        self._open_segment()
+
+    def close(self, compress: bool = True) -> dict:
+        """Flush, compress the session's segments and record it in the catalog."""
+        self.flush(sync=True)
+        self.handle.close()
+        self.index.close()
+        with self._locked():
+            entry = close_session(self.root, self.session, compress)
+        self.lock.close()
+        return entry
+
+    def __enter__(self) -> "SessionWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self.handle.closed:
+            self.flush(sync=True)
+            self.handle.close()
+            self.index.close()
+        if not self.lock.closed:
+            self.lock.close()
+
+
+def load_checkpoints(path: Path) -> list[tuple[float, int, int | None]]:
+    """(ts, raw offset, compressed offset or None) per flushed block."""
+    checkpoints = []
+    if not path.exists():
+        return checkpoints
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            fields = line.split()
+            if len(fields) >= 2:
+                checkpoints.append(
+                    (float(fields[0]), int(fields[1]), int(fields[2]) if len(fields) > 2 else None)
+                )
+    return checkpoints
+
+
+def last_timestamp(path: Path, start: int) -> float | None:
+    """Timestamp of the last complete event at or after byte offset start."""
+    with path.open("rb") as handle:
+        handle.seek(start)
+        data = handle.read()
+    for line in reversed(data.split(b"\n")):
+        try:
+            return float(json.loads(line)["ts"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return None
+
+
+def compress_segment(raw: Path) -> tuple[Path, int]:
+    """Gzip a segment one member per checkpoint block and record member offsets.
+
+    Returns the compressed path and the number of events in the segment.
+    """
+    sidecar = raw.with_suffix(".idx")
+    checkpoints = load_checkpoints(sidecar)
+    target = raw.with_name(raw.name + ".gz")
+    size = raw.stat().st_size
+    bounds = [offset for _, offset, _ in checkpoints] + [size]
+    lines = []
+    events = 0
+    with raw.open("rb") as source, target.open("wb") as sink:
+        for (ts, offset, _), end in zip(checkpoints, bounds[1:]):
+            source.seek(offset)
+            block = source.read(end - offset)
+            events += block.count(b"\n")
+            lines.append(f"{ts} {offset} {sink.tell()}\n")
+            sink.write(gzip.compress(block, compresslevel=6, mtime=0))
+        sink.flush()
+        os.fsync(sink.fileno())
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    tmp.write_text("".join(lines), encoding="utf-8")
+    os.replace(tmp, sidecar)
+    raw.unlink()
+    return target, events
+
+
+def count_events(segment: Path) -> int:
+    with segment.open("rb") as handle:
+        if segment.name.endswith(".gz"):
+            return sum(chunk.count(b"\n") for chunk in iter_gzip_members(handle, 0))
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: handle.read(1 << 20), b""))
+
+
+def index_path(segment: Path) -> Path:
+    return segment.with_name(segment.name.split(".")[0] + ".idx")
+
+
+def session_segments(directory: Path) -> list[Path]:
+    return sorted(
+        path for path in directory.iterdir()
+        if path.name.endswith(".jsonl") or path.name.endswith(".jsonl.gz")
+    )
+
+
+def close_session(root: Path, session: str, compress: bool = True) -> dict:
+    """Compress a finished session's segments and append it to the catalog."""
+    directory = root / session
+    segments = []
+    events = 0
+    for path in session_segments(directory):
+        if compress and path.name.endswith(".jsonl"):
+            path, count = compress_segment(path)
+        else:
+            count = count_events(path)
+        segments.append(path)
+        events += count
+    reader = SessionReader(root)
+    first = next(
+        (points[0][0] for points in map(load_checkpoints, map(index_path, segments)) if points),
+        None,
+    )
+    last = None
+    # The last timestamp only needs the final block.
+    for event in reader.tail_events(session):
+        last = event["ts"]
+    entry = {
+        "session": session,
+        "started": first,
+        "ended": last,
+        "events": events,
+        "segments": len(segments),
+        "bytes": sum(path.stat().st_size for path in segments),
+        "status": "closed",
+    }
+    append_json_line(root / "catalog.jsonl", entry)
+    return entry
+
+
+def iter_gzip_members(handle, start: int):
+    """Decompress concatenated gzip members starting at a member boundary."""
+    handle.seek(start)
+    decoder = zlib.decompressobj(wbits=31)
+    while True:
+        chunk = handle.read(1 << 16)
+        if not chunk:
+            return
+        while chunk:
+            yield decoder.decompress(chunk)
+            if not decoder.eof:
+                break
+            chunk = decoder.unused_data
+            decoder = zlib.decompressobj(wbits=31)
+
+
+def iter_lines(chunks):
+    pending = b""
+    for chunk in chunks:
+        data = pending + chunk
+        lines = data.split(b"\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+class SessionReader:
+    """Indexed access to sessions by id and time range."""
+
+    def __init__(self, root: Path = DEFAULT_ROOT) -> None:
+        self.root = root
+
+    def catalog(self) -> dict[str, dict]:
+        entries: dict[str, dict] = {}
+        for entry in read_json_lines(self.root / "catalog.jsonl"):
+            entries[entry["session"]] = entry
+        return entries
+
+    def sessions(self, start: float | None = None, end: float | None = None) -> list[dict]:
+        """Closed, open and compacted sessions overlapping [start, end]."""
+        entries = self.catalog()
+        if self.root.exists():
+            for directory in self.root.iterdir():
+                if directory.is_dir() and directory.name not in entries:
+                    checkpoints = [
+                        point for idx in sorted(directory.glob("*.idx"))
+                        for point in load_checkpoints(idx)
+                    ]
+                    entries[directory.name] = {
+                        "session": directory.name,
+                        "started": checkpoints[0][0] if checkpoints else None,
+                        "ended": None,
+                        "status": "open",
+                    }
+        selected = []
+        for entry in entries.values():
+            started = entry.get("started")
+            ended = entry.get("ended")
+            if end is not None and started is not None and started > end:
+                continue
+            if start is not None and ended is not None and ended < start:
+                continue
+            selected.append(entry)
+        selected.sort(key=lambda entry: entry.get("started") or 0)
+        return selected
+
+    def segment_events(self, segment: Path, start: float | None = None, end: float | None = None):
+        checkpoints = load_checkpoints(index_path(segment))
+        position = 0
+        if start is not None and checkpoints:
+            block = max(0, bisect_right([point[0] for point in checkpoints], start) - 1)
+            point = checkpoints[block]
+            position = point[2] if segment.name.endswith(".gz") else point[1]
+        with segment.open("rb") as handle:
+            if segment.name.endswith(".gz"):
+                chunks = iter_gzip_members(handle, position or 0)
+            else:
+                handle.seek(position)
+                chunks = iter(lambda: handle.read(1 << 16), b"")
+            for line in iter_lines(chunks):
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write.
+                    continue
+                ts = event.get("ts", 0)
+                if start is not None and ts < start:
+                    continue
+                if end is not None and ts > end:
+                    return
+                yield event
+
+    def events(self, session: str, start: float | None = None, end: float | None = None):
+        directory = self.root / session
+        if not directory.is_dir():
+            raise KeyError(session)
+        segments = session_segments(directory)
+        firsts = []
+        for segment in segments:
+            blocks = load_checkpoints(index_path(segment))
+            firsts.append(blocks[0][0] if blocks else None)
+        for i, segment in enumerate(segments):
+            following = next((ts for ts in firsts[i + 1:] if ts is not None), None)
+            # Skip segments that end before the window or start after it.
+            if start is not None and following is not None and following < start:
+                continue
+            if end is not None and firsts[i] is not None and firsts[i] > end:
+                return
+            yield from self.segment_events(segment, start, end)
+
+    def tail_events(self, session: str):
+        """Events of the final block of the session's last segment."""
+        segments = session_segments(self.root / session)
+        if not segments:
+            return iter(())
+        blocks = load_checkpoints(index_path(segments[-1]))
+        start = blocks[-1][0] if blocks else None
+        return self.segment_events(segments[-1], start)
+
+
+def summarise(reader: SessionReader, session: str) -> dict:
+    counts: Counter = Counter()
+    tools: Counter = Counter()
+    first = last = None
+    errors = 0
+    for event in reader.events(session):
+        first = event["ts"] if first is None else first
+        last = event["ts"]
+        counts[event.get("type", "event")] += 1
+        if event.get("tool"):
+            tools[event["tool"]] += 1
+        if event.get("type") == "error" or event.get("status") == "error":
+            errors += 1
+    return {
+        "session": session,
+        "started": first,
+        "ended": last,
+        "events": sum(counts.values()),
+        "types": dict(counts.most_common()),
+        "tools": dict(tools.most_common(20)),
+        "errors": errors,
+    }
+
+
+def compact(root: Path, older_than: float) -> list[str]:
+    """Fold closed sessions that ended before older_than into summaries.jsonl."""
+    reader = SessionReader(root)
+    compacted = []
+    for entry in reader.catalog().values():
+        if entry.get("status") != "closed" or (entry.get("ended") or 0) >= older_than:
+            continue
+        summary = summarise(reader, entry["session"])
+        append_json_line(root / "summaries.jsonl", summary)
+        append_json_line(root / "catalog.jsonl", {**entry, "status": "compacted"})
+        shutil.rmtree(root / entry["session"])
+        compacted.append(entry["session"])
+    return compacted
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write and query structured session event logs.")
+    parser.add_argument("--root", default=str(DEFAULT_ROOT), help="Event log directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    append_cmd = commands.add_parser("append", help="Append events to a session")
+    append_cmd.add_argument("--session", required=True, help="Session id")
+    append_cmd.add_argument("--type", default="note", help="Event type")
+    append_cmd.add_argument("--data", help="Event fields as a JSON object")
+    append_cmd.add_argument("--stdin", action="store_true", help="Read JSONL events from stdin")
+
+    close_cmd = commands.add_parser("close", help="Compress a finished session")
+    close_cmd.add_argument("--session", required=True, help="Session id")
+
+    list_cmd = commands.add_parser("list", help="List sessions in a time range")
+    list_cmd.add_argument("--since", help="Start time (ISO 8601 or epoch)")
+    list_cmd.add_argument("--until", help="End time (ISO 8601 or epoch)")
+
+    read_cmd = commands.add_parser("read", help="Print a session's events as JSONL")
+    read_cmd.add_argument("--session", required=True, help="Session id")
+    read_cmd.add_argument("--since", help="Start time (ISO 8601 or epoch)")
+    read_cmd.add_argument("--until", help="End time (ISO 8601 or epoch)")
+    read_cmd.add_argument("--type", help="Only events of this type")
+
+    compact_cmd = commands.add_parser("compact", help="Summarise and drop old sessions")
+    compact_cmd.add_argument("--older-than-days", type=float, default=30.0, help="Age cutoff")
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    try:
+        if args.command == "append":
+            with SessionWriter(root, args.session) as writer:
+                if args.stdin:
+                    for number, line in enumerate(sys.stdin, 1):
+                        if line.strip():
+                            event = json.loads(line)
+                            raw_ts = event.pop("ts", None)
+                            try:
+                                ts = parse_time(str(raw_ts)) if raw_ts is not None else None
+                            except ValueError:
+                                raise ValueError(
+                                    f"stdin line {number}: ts {raw_ts!r} is not epoch seconds or ISO 8601"
+                                ) from None
+                            writer.write(event.pop("type", args.type), event, ts)
+                else:
+                    writer.write(args.type, json.loads(args.data) if args.data else None)
+        elif args.command == "close":
+            if not (root / args.session).is_dir():
+                raise KeyError(args.session)
+            entry = close_session(root, args.session)
+            print(f"Closed {args.session}: {entry['events']} events, {entry['bytes']} bytes")
+        elif args.command == "list":
+            reader = SessionReader(root)
+            for entry in reader.sessions(parse_time(args.since), parse_time(args.until)):
+                print(
+                    f"{entry['session']}  {format_time(entry.get('started'))} → "
+                    f"{format_time(entry.get('ended'))}  {entry.get('events', '-')} events  "
+                    f"[{entry.get('status')}]"
+                )
+        elif args.command == "read":
+            reader = SessionReader(root)
+            for event in reader.events(args.session, parse_time(args.since), parse_time(args.until)):
+                if args.type and event.get("type") != args.type:
+                    continue
+                sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+        elif args.command == "compact":
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=args.older_than_days)).timestamp()
+            compacted = compact(root, cutoff)
+            print(f"Compacted {len(compacted)} sessions into {root / 'summaries.jsonl'}")
+    except KeyError as exc:
+        print(f"Unknown session: {exc.args[0]}")
+        return 1
+    except (OSError, ValueError) as exc:
+        print(f"Session log error: {exc}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
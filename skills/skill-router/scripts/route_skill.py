@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# Skill router backed by a precomputed trigger index.
+#
+# Trigger keywords and phrases are extracted from every skill's front-matter
+# description (quoted phrases, skill-name terms, content words and bigrams).
+# Discovery and front-matter parsing follow scripts/validate_skills.py but are
+# kept here, since the skill is installed on its own (next to its siblings in
+# a skills directory) without the repository's scripts/.
+# Each trigger is weighted by how rare it is across skills. All triggers are
+# compiled into one Aho-Corasick automaton over tokens, so a request is
+# matched against every skill in a single pass. The cost follows the request
+# length, not the number of skills. "WITHOUT mentioning X" clauses become
+# negative triggers, and configuration-only skills ("DO NOT use directly")
+# are never suggested. Triggers shared by a large share of skills are dropped,
+# so per-request work stays bounded as the catalogue grows.
+#
+# The compiled index is cached and rebuilt only when a SKILL.md changes.
+
+from collections import deque
+from pathlib import Path
+import argparse
+import json
+import math
+import re
+import time
+
+INDEX_VERSION = 1
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+IGNORE_DIRS = {"reference"}
+ROUTER_NAME = "skill-router"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[぀-ヿ㐀-鿿]")
+QUOTED_PATTERN = re.compile(r"[\"“]([^\"”]+)[\"”]")
+NEGATIVE_PATTERN = re.compile(r"without mentioning ([^.;,]+)", re.I)
+CONFIG_ONLY_PATTERN = re.compile(r"do not use directly", re.I)
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "as", "asks", "at", "be", "by", "can",
+    "each", "for", "from", "help", "helps", "in", "into", "is", "it", "its", "like", "mention",
+    "mentions", "more", "of", "on", "or", "other", "s", "say", "says", "should", "skill",
+    "skills", "so", "specific", "that", "the", "their", "then", "these", "this", "to",
+    "use", "used", "user", "uses", "using", "via", "when", "which", "while", "who", "with",
+}
+PHRASE_BOOST = 3.0
+NAME_BOOST = 2.0
+# Large enough to veto the skill outright.
+NEGATIVE_WEIGHT = -100.0
+# Triggers shared by this share of skills carry almost no signal and would make
+# routing cost grow with the catalogue, so they are dropped.
+MAX_SHARE = 0.05
+MIN_SHARED = 20
+
+
+def load_front_matter(text: str) -> dict[str, str] | None:
+    match = re.match(r"^---\n([\s\S]*?)\n---\n", text)
+    if not match:
+        return None
+    front_matter = {}
+    for line in match.group(1).splitlines():
+        if not line.strip() or line.strip().startswith("#") or ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        front_matter[key.strip()] = value.strip()
+    return front_matter
+
+
+def iter_skill_dirs(skills_dir: Path):
+    """Yield every skill directory, in name order."""
+    for skill_dir in sorted(p for p in skills_dir.iterdir() if p.is_dir()):
+        # Installed skills folders are often git checkouts; skip .git and other hidden dirs.
+        if skill_dir.name not in IGNORE_DIRS and not skill_dir.name.startswith("."):
+            yield skill_dir
+
+
+def stem(token: str) -> str:
+    """Light suffix stripping so "tests", "testing" and "test" meet."""
+    if len(token) <= 4 or not token.isascii():
+        return token
+    for suffix in ("ing", "ed", "es", "s"):
+        if token.endswith(suffix) and not token.endswith(("ss", "us", "is")):
+            base = token[: -len(suffix)]
+            if suffix in ("ing", "ed") and len(base) > 3 and base[-1] == base[-2]:
+                base = base[:-1]
+            if len(base) >= 3:
+                return base
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def content_tokens(text: str) -> list[str]:
+    return [token for token in tokenize(text) if token not in STOPWORDS]
+
+
+def extract_triggers(name: str, description: str) -> dict[tuple[str, ...], float]:
+    """Trigger token sequences for one skill with their base boost (negative = veto)."""
+    triggers: dict[tuple[str, ...], float] = {}
+
+    def put(tokens, boost: float) -> None:
+        key = tuple(tokens)
+        if key and (boost < 0 or triggers.get(key, 0.0) < boost):
+            triggers[key] = boost
+
+    negatives = [match.group(1) for match in NEGATIVE_PATTERN.finditer(description)]
+    positive_text = NEGATIVE_PATTERN.sub(" ", description)
+    for phrase in QUOTED_PATTERN.findall(positive_text):
+        put(tokenize(phrase), PHRASE_BOOST)
+    name_tokens = tokenize(name.replace("-", " "))
+    put(name_tokens, PHRASE_BOOST)
+    for token in name_tokens:
+        if token not in STOPWORDS:
+            put([token], NAME_BOOST)
+    for sentence in re.split(r"[.;:!?()]", positive_text):
+        # CJK text is only matched through quoted phrases; single characters are noise.
+        words = [word for word in content_tokens(sentence) if word.isascii()]
+        for word in words:
+            put([word], 1.0)
+        for first, second in zip(words, words[1:]):
+            put([first, second], 1.5)
+    for phrase in negatives:
+        for quoted in QUOTED_PATTERN.findall(phrase) or [phrase]:
+            put(content_tokens(quoted), NEGATIVE_WEIGHT)
+    return triggers
+
+
+class TriggerIndex:
+    """Token-level Aho-Corasick automaton mapping trigger hits to skill weights."""
+
+    def __init__(self) -> None:
+        self.skills: list[dict] = []
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        # state -> trigger ids ending there; trigger id -> [(skill, weight)]
+        self.output: list[list[int]] = [[]]
+        self.triggers: list[tuple[str, ...]] = []
+        self.postings: list[list[tuple[int, float]]] = []
+
+    @classmethod
+    def build(cls, skills: list[dict]) -> "TriggerIndex":
+        index = cls()
+        index.skills = [
+            {"name": skill["name"], "description": skill["description"], "path": skill["path"]}
+            for skill in skills
+        ]
+        by_trigger: dict[tuple[str, ...], list[tuple[int, float]]] = {}
+        for number, skill in enumerate(skills):
+            for trigger, boost in extract_triggers(skill["name"], skill["description"]).items():
+                by_trigger.setdefault(trigger, []).append((number, boost))
+        total = max(len(skills), 1)
+        limit = max(MIN_SHARED, int(total * MAX_SHARE))
+        for trigger, hits in by_trigger.items():
+            if len(hits) > limit:
+                continue
+            positive = sum(1 for _, boost in hits if boost > 0) or 1
+            idf = math.log(1 + total / positive)
+            weight_scale = idf * (1 + 0.5 * (len(trigger) - 1))
+            index._insert(trigger, [(skill, round(boost * weight_scale, 4)) for skill, boost in hits])
+        index._link()
+        return index
+
+    def _insert(self, trigger: tuple[str, ...], postings: list[tuple[int, float]]) -> None:
+        state = 0
+        for token in trigger:
+            following = self.goto[state].get(token)
+            if following is None:
+                following = len(self.goto)
+                self.goto[state][token] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = following
+        self.output[state].append(len(self.triggers))
+        self.triggers.append(trigger)
+        self.postings.append(postings)
+
+    def _link(self) -> None:
+        """Breadth-first failure links; outputs are merged along them."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, following in self.goto[state].items():
+                queue.append(following)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(token, 0)
+                self.fail[following] = target if target != following else 0
+                self.output[following] = self.output[following] + self.output[self.fail[following]]
+
+    def match(self, text: str) -> dict[int, tuple[float, list[str]]]:
+        """One pass over the request; each distinct trigger counts once."""
+        state = 0
+        seen: set[int] = set()
+        for token in tokenize(text):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            seen.update(self.output[state])
+        scores: dict[int, tuple[float, list[str]]] = {}
+        for trigger in seen:
+            label = " ".join(self.triggers[trigger])
+            for skill, weight in self.postings[trigger]:
+                score, terms = scores.get(skill, (0.0, []))
+                scores[skill] = (score + weight, terms + [("-" if weight < 0 else "") + label])
+        return scores
+
+    def route(self, text: str, top: int = 3) -> list[dict]:
+        ranked = sorted(
+            ((score, skill, terms) for skill, (score, terms) in self.match(text).items() if score > 0),
+            key=lambda item: (-item[0], self.skills[item[1]]["name"]),
+        )
+        return [
+            {"skill": self.skills[skill]["name"], "score": round(score, 3), "matched": sorted(terms)}
+            for score, skill, terms in ranked[:top]
+        ]
+
+    def to_dict(self, signature: list) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "signature": signature,
+            "skills": self.skills,
+            "goto": self.goto,
+            "fail": self.fail,
+            "output": self.output,
+            "triggers": [" ".join(trigger) for trigger in self.triggers],
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TriggerIndex":
+        index = cls()
+        index.skills = data["skills"]
+        index.goto = data["goto"]
+        index.fail = data["fail"]
+        index.output = data["output"]
+        index.triggers = [tuple(trigger.split(" ")) for trigger in data["triggers"]]
+        index.postings = [[tuple(item) for item in postings] for postings in data["postings"]]
+        return index
+
+
+def discover(skills_dir: Path) -> list[dict]:
+    """Routable skills: every skill with a description, minus the router and config-only skills."""
+    skills = []
+    for skill_dir in iter_skill_dirs(skills_dir):
+        skill_file = skill_dir / "SKILL.md"
+        if not skill_file.exists():
+            continue
+        front_matter = load_front_matter(skill_file.read_text(encoding="utf-8", errors="ignore"))
+        if not front_matter or not front_matter.get("description"):
+            continue
+        name = front_matter.get("name") or skill_dir.name
+        description = front_matter["description"]
+        if name == ROUTER_NAME or CONFIG_ONLY_PATTERN.search(description):
+            continue
+        skills.append({"name": name, "description": description, "path": str(skill_file)})
+    return skills
+
+
+def signature_of(skills_dir: Path) -> list:
+    """(name, mtime, size) of every SKILL.md, compared against the cached index."""
+    signature = []
+    for skill_dir in iter_skill_dirs(skills_dir):
+        skill_file = skill_dir / "SKILL.md"
+        if skill_file.exists():
+            stat = skill_file.stat()
+            signature.append([skill_dir.name, stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def load_index(skills_dir: Path, cache_path: Path | None) -> TriggerIndex:
+    """Cached index when no SKILL.md changed, otherwise rebuild and re-cache."""
+    signature = signature_of(skills_dir)
+    if cache_path is not None and cache_path.exists():
+        try:
+            data = json.loads(cache_path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION and data.get("signature") == signature:
+                return TriggerIndex.from_dict(data)
+        except (OSError, ValueError, KeyError):
+            pass
+    index = TriggerIndex.build(discover(skills_dir))
+    if cache_path is not None:
+        try:
+            cache_path.write_text(
+                json.dumps(index.to_dict(signature), ensure_ascii=False, separators=(",", ":")),
+                encoding="utf-8",
+            )
+        except OSError:
+            pass
+    return index
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Route a request to the best matching skills.")
+    parser.add_argument("request", help="The user's request")
+    parser.add_argument("--top", type=int, default=3, help="Number of candidates to return")
+    parser.add_argument("--skills-dir", default=str(SKILLS_DIR), help="Directory of skills")
+    parser.add_argument("--cache", help="Index cache (default: <skills-dir>/.skill-router-index.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Always rebuild the index")
+    parser.add_argument("--json", action="store_true", help="Print candidates as JSON")
+    args = parser.parse_args()
+
+    skills_dir = Path(args.skills_dir)
+    if not skills_dir.is_dir():
+        print(f"Skills directory not found: {skills_dir}")
+        return 1
+    cache = None if args.no_cache else Path(args.cache or skills_dir / ".skill-router-index.json")
+    index = load_index(skills_dir, cache)
+
+    start = time.perf_counter()
+    candidates = index.route(args.request, args.top)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(candidates, ensure_ascii=False, indent=2))
+        return 0
+    if not candidates:
+        print("No matching skill; ask a clarifying question.")
+        return 0
+    for rank, candidate in enumerate(candidates, 1):
+        print(f"{rank}. {candidate['skill']} ({candidate['score']}): {', '.join(candidate['matched'])}")
+    print(f"Routed against {len(index.skills)} skills in {elapsed * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 # Template generator for coverage report.
+#
+# With --input, real coverage data (Cobertura XML, LCOV or coverage.py JSON)
+# is streamed through coverage_ingest and the totals and worst-covered
+# files are filled in.
 
 from pathlib import Path
 import argparse
 import textwrap
 
+from coverage_ingest import INGESTERS, ingest, percent
+
 
 def write_output(path: Path, content: str, force: bool) -> bool:
     if path.exists() and not force:
@@ -20,9 +26,47 @@ def main() -> int:
     parser.add_argument("--output", default="coverage-report.md", help="Output file path")
     parser.add_argument("--name", default="example", help="Component or repo name")
     parser.add_argument("--owner", default="team", help="Owning team")
+    parser.add_argument(
+        "--input",
+        action="append",
+        default=[],
+        help="Coverage file (Cobertura XML, LCOV or coverage.py JSON); repeatable",
+    )
+    parser.add_argument(
+        "--format", default="auto", choices=["auto", *INGESTERS], help="Coverage file format"
+    )
+    parser.add_argument("--top", type=int, default=10, help="Number of low-coverage files to list")
     parser.add_argument("--force", action="store_true", help="Overwrite existing file")
     args = parser.parse_args()
 
+    breakdown = "- Lines:\n- Branches:\n- Functions:"
+    low_coverage = "- Module:\n- Module:"
+    if args.input:
+        paths = [Path(item) for item in args.input]
+        missing = [str(path) for path in paths if not path.exists()]
+        if missing:
+            print("Missing coverage files: " + ", ".join(missing))
+            return 1
+        try:
+            table = ingest(paths, args.format)
+        except (ValueError, OSError, SyntaxError) as exc:
+            print(f"Cannot read coverage data: {exc}")
+            return 1
+        totals = table.totals()
+        breakdown = "\n".join(
+            [
+                f"- Lines: {percent(totals['lines_hit'], totals['lines'])}",
+                f"- Branches: {percent(totals['branches_hit'], totals['branches'])}",
+                f"- Functions: {percent(totals['functions_hit'], totals['functions'])}",
+                f"- Files: {len(table)}",
+            ]
+        )
+        low_coverage = "\n".join(
+            f"- {name}: {percent(row['lines_hit'], row['lines'])} lines, "
+            f"{row['lines'] - row['lines_hit']} missed"
+            for name, row in table.worst(args.top)
+        ) or "- None"
+
     content = textwrap.dedent(
         f"""\
         # Coverage Report
@@ -34,19 +78,17 @@ def main() -> int:
         - Owner: {args.owner}
 
         ## Coverage Breakdown
-        - Lines:
-        - Branches:
-        - Functions:
+        {{breakdown}}
 
         ## Low Coverage Areas
-        - Module:
-        - Module:
+        {{low_coverage}}
 
         ## Action Items
         - Add missing tests
         - Track progress
         """
     ).strip() + "\n"
+    content = content.replace("{breakdown}", breakdown).replace("{low_coverage}", low_coverage)
 
     output = Path(args.output)
     if not write_output(output, content, args.force):
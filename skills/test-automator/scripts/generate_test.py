@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 # Template generator for test plan.
+#
+# With --source, the tree is scanned by source_scan (ast parsing in a process
+# pool, cached by content hash) and public functions, classes and methods
+# that no test references are listed, ranked by complexity and size.
 
 from pathlib import Path
 import argparse
 import textwrap
 
+from source_scan import render_targets, scan, untested_targets
+
 
 def write_output(path: Path, content: str, force: bool) -> bool:
     if path.exists() and not force:
@@ -20,9 +26,28 @@ def main() -> int:
     parser.add_argument("--output", default="tests/test-plan.md", help="Output file path")
     parser.add_argument("--name", default="example", help="Feature or release name")
     parser.add_argument("--owner", default="team", help="Owning team")
+    parser.add_argument("--source", help="Source tree to scan for untested targets")
+    parser.add_argument("--cache", help="Scan cache (default: <source>/.test-scan-cache.json)")
+    parser.add_argument("--jobs", type=int, help="Parser processes (default: CPU count)")
+    parser.add_argument("--top", type=int, default=20, help="Number of untested targets to list")
     parser.add_argument("--force", action="store_true", help="Overwrite existing file")
     args = parser.parse_args()
 
+    scenarios = "- Happy path\n- Error handling\n- Edge cases"
+    if args.source:
+        source = Path(args.source)
+        if not source.is_dir():
+            print(f"Source directory not found: {source}")
+            return 1
+        cache = Path(args.cache) if args.cache else source / ".test-scan-cache.json"
+        scanned = scan(source, cache, args.jobs)
+        targets, total = untested_targets(scanned)
+        scenarios += "\n\n### Untested Targets\n" + render_targets(targets, total, args.top)
+        print(
+            f"Scanned {len(scanned['files'])} files "
+            f"({scanned['parsed']} parsed, {scanned['cached']} cached)"
+        )
+
     content = textwrap.dedent(
         f"""\
         # Test Plan
@@ -35,9 +60,7 @@ def main() -> int:
         - QA contact: TBD
 
         ## Scenarios
-        - Happy path
-        - Error handling
-        - Edge cases
+        {{scenarios}}
 
         ## Test Types
         - Unit
@@ -54,6 +77,7 @@ def main() -> int:
         - Defects triaged
         """
     ).strip() + "\n"
+    content = content.replace("{scenarios}", scenarios)
 
     output = Path(args.output)
     if not write_output(output, content, args.force):
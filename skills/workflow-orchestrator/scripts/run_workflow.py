@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# Workflow executor for multi-skill chains.
+#
+# Loads a JSON workflow definition into a DAG of steps, each a shell-style
+# command or a skill script (a generator or validator under skills/*/scripts/,
+# named as "<skill>/<file>"), and runs every
+# step whose dependencies are done in a bounded pool. When several steps are
+# ready, the one with the longest remaining path goes first, using timings
+# from earlier runs. Each step gets a key hashed from its command, its input
+# files (including the skill script itself) and the results of its
+# dependencies. A step whose key and outputs are
+# unchanged since its last success is skipped. A dependency that re-runs but
+# produces the same outputs does not invalidate its dependents. Per-step
+# timings are printed and can be written to a JSON report.
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+CACHE_VERSION = 1
+DEFAULT_JOBS = min(8, os.cpu_count() or 1)
+OUTPUT_TAIL = 2000
+
+
+def load_workflow(path: Path) -> dict:
+    """Parse and validate a workflow; steps come back in topological order."""
+    workflow = json.loads(path.read_text(encoding="utf-8"))
+    steps = workflow.get("steps", [])
+    if not steps:
+        raise ValueError(f"No steps defined in {path}")
+    by_id: dict[str, dict] = {}
+    for step in steps:
+        step_id = step.get("id")
+        if not step_id:
+            raise ValueError("Every step needs an id")
+        if step_id in by_id:
+            raise ValueError(f"Duplicate step id: {step_id}")
+        if bool(step.get("command")) == bool(step.get("script")):
+            raise ValueError(f"{step_id}: set exactly one of command or script")
+        by_id[step_id] = step
+    for step in steps:
+        for need in step.get("needs", []):
+            if need not in by_id:
+                raise ValueError(f"{step['id']}: unknown dependency {need}")
+
+    # Kahn's algorithm; anything left over sits on a cycle.
+    indegree = {step_id: len(step.get("needs", [])) for step_id, step in by_id.items()}
+    dependents: dict[str, list[str]] = {step_id: [] for step_id in by_id}
+    for step in steps:
+        for need in step.get("needs", []):
+            dependents[need].append(step["id"])
+    ready = [step_id for step_id in by_id if indegree[step_id] == 0]
+    order = []
+    while ready:
+        step_id = ready.pop(0)
+        order.append(step_id)
+        for child in dependents[step_id]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+    if len(order) != len(by_id):
+        cycle = sorted(step_id for step_id, count in indegree.items() if count)
+        raise ValueError(f"Dependency cycle between: {', '.join(cycle)}")
+
+    workflow["name"] = workflow.get("name") or path.stem
+    workflow["steps"] = [by_id[step_id] for step_id in order]
+    workflow["dependents"] = dependents
+    return workflow
+
+
+def select_steps(workflow: dict, targets: list[str]) -> list[dict]:
+    """The requested steps plus everything they depend on."""
+    by_id = {step["id"]: step for step in workflow["steps"]}
+    wanted: set[str] = set()
+    stack = list(targets)
+    while stack:
+        step_id = stack.pop()
+        if step_id not in by_id:
+            raise ValueError(f"Unknown step: {step_id}")
+        if step_id not in wanted:
+            wanted.add(step_id)
+            stack.extend(by_id[step_id].get("needs", []))
+    return [step for step in workflow["steps"] if step["id"] in wanted]
+
+
+def levels(steps: list[dict]) -> list[list[str]]:
+    """Group steps into stages that can run side by side."""
+    depth: dict[str, int] = {}
+    for step in steps:
+        depth[step["id"]] = 1 + max((depth[need] for need in step.get("needs", [])), default=-1)
+    stages: list[list[str]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for step_id, level in depth.items():
+        stages[level].append(step_id)
+    return stages
+
+
+def priorities(steps: list[dict], dependents: dict, durations: dict) -> dict[str, float]:
+    """Longest remaining path from each step, weighted by its last known duration."""
+    selected = {step["id"] for step in steps}
+    remaining: dict[str, float] = {}
+    for step in reversed(steps):
+        step_id = step["id"]
+        tail = max((remaining[child] for child in dependents[step_id] if child in selected), default=0.0)
+        remaining[step_id] = durations.get(step_id, 1.0) + tail
+    return remaining
+
+
+class FileDigests:
+    """Content hashes with a (mtime, size) fast path, shared across runs via the cache."""
+
+    def __init__(self, known: dict | None = None) -> None:
+        self.known = known or {}
+        self.lock = threading.Lock()
+
+    def digest(self, path: Path) -> str:
+        key = str(path.resolve())
+        try:
+            stat = path.stat()
+        except OSError:
+            return "missing"
+        signature = [stat.st_mtime_ns, stat.st_size]
+        entry = self.known.get(key)
+        if entry and entry[:2] == signature:
+            return entry[2]
+        hasher = hashlib.sha256()
+        with path.open("rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        with self.lock:
+            self.known[key] = signature + [digest]
+        return digest
+
+
+def expand(patterns: list[str], cwd: Path) -> list[Path]:
+    """Input/output globs relative to the step directory; literal paths are kept even if missing."""
+    paths: set[Path] = set()
+    for pattern in patterns:
+        matches = glob.glob(str(cwd / pattern), recursive=True)
+        if not matches and not glob.has_magic(pattern):
+            matches = [str(cwd / pattern)]
+        paths.update(Path(match) for match in matches if not Path(match).is_dir())
+    return sorted(paths)
+
+
+def split_args(value) -> list[str]:
+    return [str(item) for item in value] if isinstance(value, list) else shlex.split(value or "")
+
+
+def script_path(step: dict) -> Path:
+    """"<skill>/<file>" resolves to <skills>/<skill>/scripts/<file>."""
+    skill, _, name = step["script"].partition("/")
+    return SKILLS_DIR / skill / "scripts" / name
+
+
+def step_argv(step: dict) -> list[str]:
+    if step.get("script"):
+        return [sys.executable, str(script_path(step)), *split_args(step.get("args"))]
+    return split_args(step["command"])
+
+
+def step_key(step: dict, cwd: Path, digests: FileDigests, upstream: dict[str, str]) -> str:
+    hasher = hashlib.sha256()
+    definition = {
+        "command": step_argv(step),
+        "cwd": str(cwd.resolve()),
+        "env": step.get("env", {}),
+        "needs": {need: upstream[need] for need in step.get("needs", [])},
+    }
+    hasher.update(json.dumps(definition, sort_keys=True).encode("utf-8"))
+    paths = expand(step.get("inputs", []), cwd)
+    if step.get("script"):
+        paths.append(script_path(step))
+    for path in paths:
+        hasher.update(f"\0{path}\0{digests.digest(path)}".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def output_digests(step: dict, cwd: Path, digests: FileDigests) -> dict[str, str]:
+    return {str(path): digests.digest(path) for path in expand(step.get("outputs", []), cwd)}
+
+
+def result_digest(outputs: dict[str, str], stdout: str) -> str:
+    """What dependents see of a step: its output files, or its stdout when it declares none."""
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps(outputs, sort_keys=True).encode("utf-8") if outputs else stdout.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def run_step(step: dict, base_dir: Path, digests: FileDigests, upstream: dict, cached: dict | None, force: bool) -> dict:
+    """Run one step unless its cache entry is still valid. Runs in a pool thread."""
+    started = time.perf_counter()
+    cwd = base_dir / step.get("cwd", ".")
+    key = step_key(step, cwd, digests, upstream)
+    if cached and not force and cached.get("key") == key:
+        outputs = output_digests(step, cwd, digests)
+        if outputs == cached.get("outputs", {}) and "missing" not in outputs.values():
+            return {
+                "id": step["id"], "status": "cached", "key": key, "outputs": outputs,
+                "result": cached["result"], "seconds": time.perf_counter() - started,
+                "last_seconds": cached.get("seconds", 0.0),
+            }
+
+    env = {**os.environ, **{name: str(value) for name, value in step.get("env", {}).items()}}
+    status, exit_code, stdout, stderr = "ok", 0, "", ""
+    try:
+        completed = subprocess.run(
+            step_argv(step), cwd=cwd, env=env, capture_output=True, text=True,
+            timeout=step.get("timeout"), check=False,
+        )
+        exit_code, stdout, stderr = completed.returncode, completed.stdout, completed.stderr
+        if exit_code != 0:
+            status = "failed"
+    except subprocess.TimeoutExpired as exc:
+        status, exit_code = "timeout", None
+        stderr = exc.stderr.decode("utf-8", "replace") if isinstance(exc.stderr, bytes) else exc.stderr or ""
+    except OSError as exc:
+        status, exit_code, stderr = "failed", None, str(exc)
+    outputs = output_digests(step, cwd, digests)
+    return {
+        "id": step["id"], "status": status, "key": key, "exit": exit_code, "outputs": outputs,
+        "result": result_digest(outputs, stdout), "seconds": time.perf_counter() - started,
+        "stdout": stdout[-OUTPUT_TAIL:], "stderr": stderr[-OUTPUT_TAIL:],
+    }
+
+
+def execute(workflow: dict, steps: list[dict], base_dir: Path, cache: dict, jobs: int,
+            force: bool = False, keep_going: bool = False, on_done=None) -> list[dict]:
+    """Schedule steps as their dependencies finish; returns results in completion order."""
+    entries = cache.setdefault("steps", {})
+    digests = FileDigests(cache.setdefault("files", {}))
+    durations = {step_id: entry.get("seconds", 1.0) for step_id, entry in entries.items()}
+    priority = priorities(steps, workflow["dependents"], durations)
+    by_id = {step["id"]: step for step in steps}
+    waiting = {step["id"]: sum(1 for need in step.get("needs", []) if need in by_id) for step in steps}
+    ready = [step_id for step_id, count in waiting.items() if count == 0]
+    upstream: dict[str, str] = {}
+    results: list[dict] = []
+    stopped = False
+
+    def block(step_id: str, reason: str) -> None:
+        for child in workflow["dependents"][step_id]:
+            if child in waiting:
+                waiting.pop(child)
+                result = {"id": child, "status": "blocked", "reason": reason, "seconds": 0.0}
+                results.append(result)
+                if on_done:
+                    on_done(result)
+                block(child, reason)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        running = {}
+        while ready or running:
+            ready.sort(key=lambda step_id: -priority[step_id])
+            while ready and not stopped:
+                step_id = ready.pop(0)
+                waiting.pop(step_id, None)
+                future = pool.submit(
+                    run_step, by_id[step_id], base_dir, digests, upstream, entries.get(step_id), force
+                )
+                running[future] = step_id
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step_id = running.pop(future)
+                result = future.result()
+                results.append(result)
+                if on_done:
+                    on_done(result)
+                if result["status"] in ("ok", "cached"):
+                    upstream[step_id] = result["result"]
+                    entries[step_id] = {
+                        "key": result["key"], "outputs": result["outputs"], "result": result["result"],
+                        "seconds": result.get("last_seconds", result["seconds"]),
+                    }
+                    for child in workflow["dependents"][step_id]:
+                        if child in waiting:
+                            waiting[child] -= 1
+                            if waiting[child] == 0:
+                                ready.append(child)
+                else:
+                    entries.pop(step_id, None)
+                    block(step_id, f"{step_id} {result['status']}")
+                    stopped = stopped or not keep_going
+        for step_id in waiting:
+            results.append({"id": step_id, "status": "skipped", "reason": "stopped after failure", "seconds": 0.0})
+    return results
+
+
+def load_cache(path: Path | None) -> dict:
+    if path is None or not path.exists():
+        return {"version": CACHE_VERSION}
+    try:
+        cache = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"version": CACHE_VERSION}
+    return cache if cache.get("version") == CACHE_VERSION else {"version": CACHE_VERSION}
+
+
+def save_cache(path: Path, cache: dict) -> None:
+    temp = path.with_name(path.name + ".tmp")
+    temp.write_text(json.dumps(cache, separators=(",", ":")), encoding="utf-8")
+    os.replace(temp, path)
+
+
+def critical_path(steps: list[dict], results: list[dict]) -> tuple[float, list[str]]:
+    """Longest chain of measured step times through the DAG."""
+    seconds = {result["id"]: result["seconds"] for result in results}
+    best: dict[str, tuple[float, list[str]]] = {}
+    for step in steps:
+        step_id = step["id"]
+        before = max((best[need] for need in step.get("needs", []) if need in best), default=(0.0, []))
+        best[step_id] = (before[0] + seconds.get(step_id, 0.0), before[1] + [step_id])
+    return max(best.values(), default=(0.0, []))
+
+
+def print_result(result: dict) -> None:
+    label = {"ok": "OK", "cached": "CACHED", "failed": "FAILED", "timeout": "TIMEOUT"}.get(
+        result["status"], result["status"].upper()
+    )
+    detail = f" ({result['reason']})" if result.get("reason") else ""
+    if result["status"] == "failed" and result.get("exit") is not None:
+        detail = f" (exit {result['exit']})"
+    print(f"  {label:<8} {result['id']:<28} {result['seconds']:8.2f}s{detail}", flush=True)
+    if result["status"] in ("failed", "timeout"):
+        output = (result.get("stderr") or result.get("stdout") or "").strip()
+        for line in output.splitlines()[-10:]:
+            print(f"           | {line}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a workflow DAG with parallel steps and cached results.")
+    parser.add_argument("workflow", help="Workflow definition (JSON)")
+    parser.add_argument("--step", action="append", default=[], help="Run only this step and its dependencies")
+    parser.add_argument("--jobs", type=int, help=f"Steps run at once (default: workflow jobs or {DEFAULT_JOBS})")
+    parser.add_argument("--cache", help="Step cache (default: .<workflow>.cache.json next to the workflow)")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the step cache")
+    parser.add_argument("--force", action="store_true", help="Re-run every step, then refresh the cache")
+    parser.add_argument("--keep-going", action="store_true", help="Keep running independent steps after a failure")
+    parser.add_argument("--dry-run", action="store_true", help="Print the execution stages and exit")
+    parser.add_argument("--report", help="Write per-step timings and statuses to this JSON file")
+    args = parser.parse_args()
+
+    workflow_path = Path(args.workflow)
+    if not workflow_path.exists():
+        print(f"Workflow not found: {workflow_path}")
+        return 1
+    try:
+        workflow = load_workflow(workflow_path)
+        steps = select_steps(workflow, args.step) if args.step else workflow["steps"]
+    except ValueError as exc:
+        print(f"Invalid workflow: {exc}")
+        return 1
+
+    if args.dry_run:
+        for number, stage in enumerate(levels(steps), 1):
+            print(f"Stage {number}: {', '.join(stage)}")
+        return 0
+
+    base_dir = Path(workflow.get("cwd", "."))
+    jobs = args.jobs or workflow.get("jobs") or DEFAULT_JOBS
+    cache_path = None if args.no_cache else Path(
+        args.cache or workflow_path.with_name(f".{workflow_path.stem}.cache.json")
+    )
+    cache = load_cache(cache_path)
+
+    print(f"Workflow {workflow['name']}: {len(steps)} steps, {jobs} at a time")
+    start = time.perf_counter()
+    results = execute(
+        workflow, steps, base_dir, cache, jobs,
+        force=args.force, keep_going=args.keep_going, on_done=print_result,
+    )
+    wall = time.perf_counter() - start
+    if cache_path is not None:
+        save_cache(cache_path, cache)
+
+    counts: dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    busy = sum(result["seconds"] for result in results)
+    path_seconds, path = critical_path(steps, results)
+    print(f"\n{', '.join(f'{count} {status}' for status, count in sorted(counts.items()))}")
+    print(f"Wall time {wall:.2f}s, step time {busy:.2f}s, critical path {path_seconds:.2f}s ({' -> '.join(path)})")
+
+    if args.report:
+        report = {
+            "workflow": workflow["name"],
+            "jobs": jobs,
+            "wall_seconds": round(wall, 4),
+            "step_seconds": round(busy, 4),
+            "critical_path": {"seconds": round(path_seconds, 4), "steps": path},
+            "steps": [
+                {key: (round(value, 4) if key == "seconds" else value)
+                 for key, value in result.items() if key not in ("stdout", "stderr", "outputs", "last_seconds")}
+                for result in results
+            ],
+        }
+        Path(args.report).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Report written to {args.report}")
+    failed = any(result["status"] not in ("ok", "cached") for result in results)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())